@@ -0,0 +1,225 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 18:15
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Benchmark suite for the download manager, run against a local stand-in server.
+
+Every scenario downloads a number of synthetic gzip files, over HTTP or FTP, with the given concurrency settings, from
+a stand-in server that may be told to misbehave, and it measures how long it takes, the throughput achieved, and how the
+download manager recovered from the failures, e.g. how many attempts it needed. Files are inflated and verified
+against their checksums while they are downloaded, as it happens when collecting data from Ensembl.
+"""
+
+import os
+import json
+import time
+import shutil
+# App imports
+import config_manager
+from download_manager.manager import Manager as DownloadManager
+from download_manager.scheduler import DownloadScheduler
+from download_manager.engines import TransferEngineFactory
+from download_manager.checksums import read_checksums_file
+from benchmarks.standin_server import StandInServer, StandInBehaviour, create_synthetic_files
+
+
+class BenchmarkScenario:
+    """
+    A benchmark scenario, i.e. what to download, how, and from what kind of server
+    """
+
+    def __init__(self, name, protocol='http', file_count=1, file_size=8 * 1024 * 1024, max_concurrent_downloads=8,
+                 max_concurrent_downloads_per_host=4, segment_count=1, latency=0, bandwidth=None,
+                 missing_file_count=0, disconnected_file_count=0, download_timeout=600, byte_ranges=True):
+        """
+        :param name: name for the scenario
+        :param protocol: 'http' or 'ftp'
+        :param file_count: number of files to download
+        :param file_size: size of every file, in bytes
+        :param max_concurrent_downloads: download scheduler global concurrency limit
+        :param max_concurrent_downloads_per_host: download scheduler per host concurrency limit
+        :param segment_count: number of byte range segments for every file
+        :param latency: delay, in seconds, added by the server to every request
+        :param bandwidth: bandwidth cap, in bytes per second, of the server for every transfer
+        :param missing_file_count: number of files the server will answer 'not found' for
+        :param disconnected_file_count: number of files whose first transfer will be interrupted half way, half way
+        through its first segment for segmented downloads
+        :param download_timeout: download timeout, in seconds, for every download attempt
+        :param byte_ranges: whether the server honors byte range requests
+        """
+        self.name = name
+        self.protocol = protocol
+        self.file_count = file_count
+        self.file_size = file_size
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self.max_concurrent_downloads_per_host = max_concurrent_downloads_per_host
+        self.segment_count = segment_count
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.missing_file_count = missing_file_count
+        self.disconnected_file_count = disconnected_file_count
+        self.download_timeout = download_timeout
+        self.byte_ranges = byte_ranges
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class DownloadManagerBenchmark:
+    """
+    Runs benchmark scenarios, every scenario with its own stand-in server and download scheduler
+    """
+    _FOLDER_NAME_SERVER = 'server'
+    _FOLDER_NAME_DOWNLOADS = 'downloads'
+
+    def __init__(self, work_folder):
+        """
+        :param work_folder: folder for the synthetic files and the downloads, it will be created if it doesn't exist
+        """
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        self.__work_folder = work_folder
+
+    def __prepare_folder(self, folder_name):
+        folder = os.path.join(self.__work_folder, folder_name)
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+        os.makedirs(folder)
+        return folder
+
+    def run_scenario(self, scenario):
+        """
+        Run a benchmark scenario
+        :param scenario: BenchmarkScenario
+        :return: dictionary with the scenario, and its results
+        """
+        self._logger.info("Running download manager benchmark scenario '{}'".format(scenario.name))
+        server_folder = self.__prepare_folder(self._FOLDER_NAME_SERVER)
+        downloads_folder = self.__prepare_folder(self._FOLDER_NAME_DOWNLOADS)
+        file_names = create_synthetic_files(server_folder, [scenario.file_size] * scenario.file_count)
+        checksums = read_checksums_file(os.path.join(server_folder, 'CHECKSUMS'))
+        missing_files = file_names[:scenario.missing_file_count]
+        # Interrupt transfers half way through, a segment transfer is only as long as the segment
+        disconnects = {file_name: (scenario.file_size // (2 * max(scenario.segment_count, 1)), 1)
+                       for file_name in file_names[scenario.missing_file_count:
+                                                   scenario.missing_file_count + scenario.disconnected_file_count]}
+        behaviour = StandInBehaviour(latency=scenario.latency,
+                                     bandwidth=scenario.bandwidth,
+                                     missing_files=missing_files,
+                                     disconnects=disconnects,
+                                     byte_ranges=scenario.byte_ranges)
+        with StandInServer(server_folder, behaviour) as server:
+            urls = [server.get_url(scenario.protocol, file_name) for file_name in file_names]
+            download_manager = DownloadManager(urls,
+                                               downloads_folder,
+                                               self._logger,
+                                               download_timeout=scenario.download_timeout,
+                                               scheduler=DownloadScheduler(
+                                                   max_concurrent_downloads=scenario.max_concurrent_downloads,
+                                                   max_concurrent_downloads_per_host=scenario
+                                                       .max_concurrent_downloads_per_host),
+                                               transfer_engine=TransferEngineFactory.get_transfer_engine(
+                                                   segment_count=scenario.segment_count,
+                                                   segment_min_size=1),
+                                               decompress=True,
+                                               expected_checksums={url: checksums[file_name]
+                                                                   for url, file_name in zip(urls, file_names)})
+            start_time = time.time()
+            download_manager.start_downloads()
+            download_manager.wait_all()
+            wall_time = time.time() - start_time
+        summary = download_manager.get_summary()
+        successful_urls = download_manager.get_successful_urls()
+        result = {'scenario': scenario.to_dict(),
+                  'wall_time': wall_time,
+                  'bytes_transferred': summary['bytes_transferred'],
+                  'throughput': summary['bytes_transferred'] / wall_time if wall_time else None,
+                  'files_expected': scenario.file_count - scenario.missing_file_count,
+                  'files_downloaded': len(successful_urls),
+                  'attempts': summary['attempts'],
+                  'timeouts': summary['timeouts'],
+                  'average_time_to_first_byte': summary['average_time_to_first_byte'],
+                  'server_requests': behaviour.get_count_requests(),
+                  'server_disconnects': behaviour.get_count_disconnects(),
+                  'server_range_requests': behaviour.get_count_range_requests()}
+        self._logger.info("Benchmark scenario '{}' results: {}".format(scenario.name, json.dumps(result)))
+        return result
+
+    def run(self, scenarios, report_file_path=None):
+        """
+        Run the given benchmark scenarios, one after the other
+        :param scenarios: list of BenchmarkScenario
+        :param report_file_path: if given, results are written to this file, as JSON lines, one scenario per line
+        :return: list of results
+        """
+        results = []
+        for scenario in scenarios:
+            results.append(self.run_scenario(scenario))
+            if report_file_path:
+                with open(report_file_path, 'a') as report_file:
+                    report_file.write("{}\n".format(json.dumps(results[-1], sort_keys=True)))
+        shutil.rmtree(os.path.join(self.__work_folder, self._FOLDER_NAME_SERVER), ignore_errors=True)
+        shutil.rmtree(os.path.join(self.__work_folder, self._FOLDER_NAME_DOWNLOADS), ignore_errors=True)
+        return results
+
+
+def get_benchmark_scenarios(file_counts=(1, 8), file_size=8 * 1024 * 1024, concurrency_settings=((1, 1), (8, 4)),
+                            protocols=('http', 'ftp'), segment_counts=(1,), latency=0.05, bandwidth=None):
+    """
+    Build the benchmark suite, throughput scenarios for every combination of protocol, number of files, concurrency
+    settings and number of segments, plus failure recovery scenarios, with missing files and interrupted transfers, for
+    the largest number of files
+    :param file_counts: numbers of files to download
+    :param file_size: size of every file, in bytes
+    :param concurrency_settings: list of (max concurrent downloads, max concurrent downloads per host)
+    :param protocols: protocols to benchmark
+    :param segment_counts: numbers of segments to split every file into
+    :param latency: delay, in seconds, added by the server to every request
+    :param bandwidth: bandwidth cap, in bytes per second, of the server for every transfer
+    :return: list of BenchmarkScenario
+    """
+    scenarios = []
+    for protocol in protocols:
+        for file_count in file_counts:
+            for max_concurrent_downloads, max_concurrent_downloads_per_host in concurrency_settings:
+                for segment_count in segment_counts:
+                    scenarios.append(BenchmarkScenario("throughput-{}-files_{}-concurrency_{}x{}-segments_{}"
+                                                       .format(protocol,
+                                                               file_count,
+                                                               max_concurrent_downloads,
+                                                               max_concurrent_downloads_per_host,
+                                                               segment_count),
+                                                       protocol=protocol,
+                                                       file_count=file_count,
+                                                       file_size=file_size,
+                                                       max_concurrent_downloads=max_concurrent_downloads,
+                                                       max_concurrent_downloads_per_host=
+                                                       max_concurrent_downloads_per_host,
+                                                       segment_count=segment_count,
+                                                       latency=latency,
+                                                       bandwidth=bandwidth))
+        # Failure recovery, a quarter of the files are missing, and another quarter get interrupted half way
+        file_count = max(file_counts)
+        max_concurrent_downloads, max_concurrent_downloads_per_host = concurrency_settings[-1]
+        scenarios.append(BenchmarkScenario("recovery-{}-files_{}".format(protocol, file_count),
+                                           protocol=protocol,
+                                           file_count=file_count,
+                                           file_size=file_size,
+                                           max_concurrent_downloads=max_concurrent_downloads,
+                                           max_concurrent_downloads_per_host=max_concurrent_downloads_per_host,
+                                           latency=latency,
+                                           bandwidth=bandwidth,
+                                           missing_file_count=file_count // 4,
+                                           disconnected_file_count=max(1, file_count // 4)))
+    return scenarios
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
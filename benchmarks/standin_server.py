@@ -0,0 +1,436 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 17:40
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Local stand-in for a download server, like Ensembl FTP, for measuring the download manager offline.
+
+The stand-in serves the files in a local folder, over HTTP and FTP, on the loopback interface, and it can be told to
+misbehave like a real server on the other side of the world would, adding latency to every request, capping the
+bandwidth of every transfer, answering 'not found' for some files, or dropping the connection in the middle of some
+transfers, or ignoring byte range requests.
+
+HTTP supports keep-alive connections, 'HEAD' and byte ranges, FTP supports passive mode, 'SIZE' and 'REST', that is,
+everything the download manager may use.
+"""
+
+import os
+import gzip
+import time
+import socket
+import threading
+import socketserver
+import http.server
+from urllib.parse import unquote, urlparse
+# App imports
+from exceptions import AppException
+from download_manager.checksums import ChecksumFactory
+
+
+# Exceptions
+class StandInServerException(AppException):
+    def __init__(self, value):
+        super(StandInServerException, self).__init__(value)
+
+
+class StandInDisconnectException(StandInServerException):
+    def __init__(self, value):
+        super(StandInDisconnectException, self).__init__(value)
+
+
+class StandInBehaviour:
+    """
+    How the stand-in server misbehaves, shared by its HTTP and FTP servers
+    """
+    # WARNING! - MAGIC NUMBER AHEAD!!! - data is sent in chunks of this size, for capping the bandwidth
+    _SEND_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, latency=0, bandwidth=None, missing_files=None, disconnects=None, byte_ranges=True):
+        """
+        :param latency: delay, in seconds, before answering every request
+        :param bandwidth: maximum bandwidth, in bytes per second, for every transfer, None means no limit
+        :param missing_files: names of the files to answer 'not found' for, even if they are there
+        :param disconnects: map from file name to (number of bytes, number of times), transfers of that file will be
+        interrupted after sending that number of bytes, the given number of times
+        :param byte_ranges: whether byte range requests are honored, when they are not, HTTP still advertises them, as
+        some servers do, but sends whole files, and FTP rejects 'REST'
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.missing_files = set(missing_files or [])
+        self.byte_ranges = byte_ranges
+        self.__disconnects = dict(disconnects or {})
+        self.__lock = threading.Lock()
+        self.__count_requests = 0
+        self.__count_disconnects = 0
+        self.__count_range_requests = 0
+
+    def is_missing(self, file_name):
+        return file_name in self.missing_files
+
+    def start_request(self):
+        with self.__lock:
+            self.__count_requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def start_range_request(self):
+        """
+        Account for a byte range request, i.e. an HTTP 'Range' or an FTP 'REST'
+        :return: True if the byte range request is honored, False otherwise
+        """
+        with self.__lock:
+            self.__count_range_requests += 1
+        return self.byte_ranges
+
+    def get_disconnect_offset(self, file_name):
+        """
+        Find out whether the next transfer of the given file should be interrupted
+        :param file_name: name of the file to transfer
+        :return: the number of bytes after which the transfer will be interrupted, or None if it won't be
+        """
+        with self.__lock:
+            if file_name not in self.__disconnects:
+                return None
+            offset, times = self.__disconnects[file_name]
+            if times <= 0:
+                return None
+            self.__disconnects[file_name] = (offset, times - 1)
+            self.__count_disconnects += 1
+            return offset
+
+    def send_file(self, send, file_path, start, end, disconnect_offset=None):
+        """
+        Send the byte range [start, end) of the given file, honoring the bandwidth cap
+        :param send: callable that sends a chunk of data to the client
+        :param file_path: path to the file
+        :param start: first byte to send
+        :param end: end of the byte range, not included
+        :param disconnect_offset: if given, the transfer is interrupted after sending this number of bytes
+        :return: number of bytes sent
+        :except: StandInDisconnectException if the transfer has been interrupted on purpose
+        """
+        bytes_sent = 0
+        transfer_start_time = time.time()
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            while start + bytes_sent < end:
+                chunk_size = min(self._SEND_CHUNK_SIZE, end - start - bytes_sent)
+                if disconnect_offset is not None:
+                    chunk_size = min(chunk_size, disconnect_offset - bytes_sent)
+                    if chunk_size <= 0:
+                        raise StandInDisconnectException("Transfer of '{}' INTERRUPTED after #{} bytes"
+                                                         .format(file_path, bytes_sent))
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                send(chunk)
+                bytes_sent += len(chunk)
+                if self.bandwidth:
+                    # Wait until the data sent so far fits within the bandwidth cap
+                    delay = (bytes_sent / self.bandwidth) - (time.time() - transfer_start_time)
+                    if delay > 0:
+                        time.sleep(delay)
+        return bytes_sent
+
+    def get_count_requests(self):
+        return self.__count_requests
+
+    def get_count_disconnects(self):
+        return self.__count_disconnects
+
+    def get_count_range_requests(self):
+        return self.__count_range_requests
+
+
+class _StandInHttpRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Keep quiet, this is a benchmark
+        pass
+
+    def __send_empty_response(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def __serve(self, send_body):
+        behaviour = self.server.behaviour
+        behaviour.start_request()
+        file_name = unquote(urlparse(self.path).path).lstrip('/')
+        file_path = self.server.stand_in.get_file_path(file_name)
+        if behaviour.is_missing(file_name) or (file_path is None):
+            self.__send_empty_response(404)
+            return
+        file_size = os.path.getsize(file_path)
+        start, end = 0, file_size
+        range_header = self.headers.get('Range')
+        if range_header and range_header.startswith('bytes=') and behaviour.start_range_request():
+            range_start, range_end = range_header[len('bytes='):].split('-', 1)
+            start = int(range_start)
+            end = (int(range_end) + 1) if range_end else file_size
+            if start >= file_size:
+                self.__send_empty_response(416)
+                return
+            end = min(end, file_size)
+            self.send_response(206)
+            self.send_header('Content-Range', "bytes {}-{}/{}".format(start, end - 1, file_size))
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        if not send_body:
+            return
+        try:
+            behaviour.send_file(self.wfile.write, file_path, start, end, behaviour.get_disconnect_offset(file_name))
+        except StandInDisconnectException:
+            self.close_connection = True
+            self.wfile.flush()
+            self.connection.shutdown(socket.SHUT_RDWR)
+
+    def do_GET(self):
+        self.__serve(True)
+
+    def do_HEAD(self):
+        self.__serve(False)
+
+
+class _StandInHttpServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address, stand_in, behaviour):
+        super().__init__(server_address, _StandInHttpRequestHandler)
+        self.stand_in = stand_in
+        self.behaviour = behaviour
+
+
+class _StandInFtpRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough of an FTP server for anonymous, passive mode, binary downloads
+    """
+    def __reply(self, reply):
+        self.wfile.write("{}\r\n".format(reply).encode('utf8'))
+        self.wfile.flush()
+
+    def __open_data_listener(self):
+        if self.__data_listener is not None:
+            self.__data_listener.close()
+        self.__data_listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__data_listener.bind((self.server.server_address[0], 0))
+        self.__data_listener.listen(1)
+        return self.__data_listener.getsockname()
+
+    def __retrieve(self, file_name):
+        behaviour = self.server.behaviour
+        file_path = self.server.stand_in.get_file_path(file_name)
+        if behaviour.is_missing(file_name) or (file_path is None):
+            self.__reply("550 No such file or directory.")
+            return
+        if self.__data_listener is None:
+            self.__reply("425 Use PASV or EPSV first.")
+            return
+        rest_offset, self.__rest_offset = self.__rest_offset, 0
+        self.__reply("150 Opening BINARY mode data connection.")
+        data_connection, address = self.__data_listener.accept()
+        self.__data_listener.close()
+        self.__data_listener = None
+        try:
+            behaviour.send_file(data_connection.sendall,
+                                file_path,
+                                rest_offset,
+                                os.path.getsize(file_path),
+                                behaviour.get_disconnect_offset(file_name))
+        except StandInDisconnectException:
+            data_connection.close()
+            self.__reply("426 Connection closed; transfer aborted.")
+            return
+        except OSError:
+            # The client closed the data connection, e.g. it got all the bytes it wanted
+            data_connection.close()
+            self.__reply("426 Connection closed; transfer aborted.")
+            return
+        data_connection.close()
+        self.__reply("226 Transfer complete.")
+
+    def handle(self):
+        self.__data_listener = None
+        self.__rest_offset = 0
+        self.__reply("220 Stand-in FTP server ready.")
+        try:
+            for line in self.rfile:
+                command, _, argument = line.decode('utf8').strip().partition(' ')
+                command = command.upper()
+                self.server.behaviour.start_request()
+                if command == 'USER':
+                    self.__reply("331 Username ok, send password.")
+                elif command == 'PASS':
+                    self.__reply("230 Login successful.")
+                elif command in ('TYPE', 'NOOP', 'MODE', 'STRU'):
+                    self.__reply("200 Command okay.")
+                elif command == 'SYST':
+                    self.__reply("215 UNIX Type: L8")
+                elif command == 'PWD':
+                    self.__reply('257 "/" is the current directory.')
+                elif command == 'CWD':
+                    self.__reply("250 Directory changed.")
+                elif command == 'PASV':
+                    host, port = self.__open_data_listener()
+                    self.__reply("227 Entering passive mode ({},{},{}).".format(host.replace('.', ','),
+                                                                                port >> 8,
+                                                                                port & 0xff))
+                elif command == 'EPSV':
+                    host, port = self.__open_data_listener()
+                    self.__reply("229 Entering extended passive mode (|||{}|).".format(port))
+                elif command == 'SIZE':
+                    file_path = self.server.stand_in.get_file_path(argument.lstrip('/'))
+                    if self.server.behaviour.is_missing(argument.lstrip('/')) or (file_path is None):
+                        self.__reply("550 No such file or directory.")
+                    else:
+                        self.__reply("213 {}".format(os.path.getsize(file_path)))
+                elif command == 'REST':
+                    if not self.server.behaviour.start_range_request():
+                        self.__reply("502 Command not implemented.")
+                        continue
+                    self.__rest_offset = int(argument)
+                    self.__reply("350 Restarting at position {}.".format(self.__rest_offset))
+                elif command == 'RETR':
+                    self.__retrieve(argument.lstrip('/'))
+                elif command == 'QUIT':
+                    self.__reply("221 Goodbye.")
+                    break
+                else:
+                    self.__reply("502 Command not implemented.")
+        except (OSError, ValueError):
+            # The client went away, or sent garbage
+            pass
+        finally:
+            if self.__data_listener is not None:
+                self.__data_listener.close()
+
+
+class _StandInFtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address, stand_in, behaviour):
+        super().__init__(server_address, _StandInFtpRequestHandler)
+        self.stand_in = stand_in
+        self.behaviour = behaviour
+
+
+class StandInServer:
+    """
+    HTTP and FTP stand-in servers for the files in a local folder, on ephemeral loopback ports, it can be used as a
+    context manager
+    """
+
+    def __init__(self, root_folder, behaviour=None, host='127.0.0.1'):
+        """
+        :param root_folder: folder with the files to serve
+        :param behaviour: StandInBehaviour, by default, the stand-in behaves like a perfect server
+        :param host: address to listen on
+        """
+        self.__root_folder = os.path.abspath(root_folder)
+        self.__behaviour = behaviour or StandInBehaviour()
+        self.__host = host
+        self.__servers = {}
+        self.__threads = []
+
+    def get_file_path(self, file_name):
+        """
+        Get the local path to a file served by this stand-in
+        :param file_name: name of the file, relative to the root folder
+        :return: the path to the file, or None if there is no such file in the root folder
+        """
+        file_path = os.path.abspath(os.path.join(self.__root_folder, file_name))
+        if not file_path.startswith(self.__root_folder + os.sep):
+            # Nothing outside of the root folder is served
+            return None
+        if not os.path.isfile(file_path):
+            return None
+        return file_path
+
+    def start(self):
+        if self.__servers:
+            raise StandInServerException("Stand-in server ALREADY STARTED")
+        self.__servers['http'] = _StandInHttpServer((self.__host, 0), self, self.__behaviour)
+        self.__servers['ftp'] = _StandInFtpServer((self.__host, 0), self, self.__behaviour)
+        for server in self.__servers.values():
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.__servers.values():
+            server.shutdown()
+            server.server_close()
+        for thread in self.__threads:
+            thread.join()
+        self.__servers = {}
+        self.__threads = []
+
+    def get_url(self, protocol, file_name):
+        """
+        Get the URL for a file served by this stand-in
+        :param protocol: 'http' or 'ftp'
+        :param file_name: name of the file
+        :return: the URL
+        """
+        if protocol not in self.__servers:
+            raise StandInServerException("Stand-in server for '{}' is NOT RUNNING".format(protocol))
+        host, port = self.__servers[protocol].server_address[:2]
+        return "{}://{}:{}/{}".format(protocol, host, port, file_name)
+
+    def get_behaviour(self):
+        return self.__behaviour
+
+    def get_root_folder(self):
+        return self.__root_folder
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def create_synthetic_files(folder, file_sizes, file_name_prefix='synthetic'):
+    """
+    Create gzip files, of the given sizes, made of random data, together with a 'CHECKSUMS' file for them, like the
+    ones found in Ensembl download folders
+    :param folder: destination folder, it must exist
+    :param file_sizes: list of file sizes, in bytes, the actual gzip files will be a few bytes longer
+    :param file_name_prefix: prefix for the file names
+    :return: list of file names
+    """
+    file_names = []
+    checksums_lines = []
+    for index, file_size in enumerate(file_sizes):
+        file_name = "{}_{:04d}.dat.gz".format(file_name_prefix, index)
+        file_path = os.path.join(folder, file_name)
+        # Random data does not compress, so the size of the gzip file is predictable
+        with gzip.open(file_path, 'wb', compresslevel=1) as f:
+            remaining = file_size
+            while remaining > 0:
+                chunk = os.urandom(min(remaining, 1024 * 1024))
+                f.write(chunk)
+                remaining -= len(chunk)
+        checksums_lines.append("{}  {}".format(ChecksumFactory.get_checksum_for_file(file_path,
+                                                                                     ChecksumFactory.ALGORITHM_MD5),
+                                               file_name))
+        file_names.append(file_name)
+    with open(os.path.join(folder, 'CHECKSUMS'), 'w') as f:
+        f.write("\n".join(checksums_lines) + "\n")
+    return file_names
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -151,6 +151,22 @@ class ConfigurationManager:
         else:
             return default
 
+    def _get_optional_setting(self, section, key, default):
+        """
+        Get the value of an optional setting, or the given default if it is not in the configuration file
+        :param section: keys leading to the section the setting is in, from the root of the configuration object, e.g.
+        ('data_downloader', 'storage')
+        :param key: setting key within the section
+        :param default: default value for the setting
+        :return: the configured value for the setting, or the given default if it is not in the configuration file
+        """
+        value = self.__configuration_object
+        for section_key in list(section) + [key]:
+            if (not isinstance(value, dict)) or (section_key not in value):
+                return default
+            value = value[section_key]
+        return value
+
     def _get_configuration_object(self):
         return self.__configuration_object
 
@@ -94,6 +94,7 @@ class BedToBigBedConverter(FileDataFormatConverter):
         return runner
 
     def _fetch_and_dump_chromosome_sizes(self, taxonomy_id, chromosome_sizes_file_path):
+        # Chromosome sizes requested by the trackhub exporter up front are already cached by the Ensembl service
         chromosome_sizes = ensembl_service.get_service().get_ucsc_chromosome_sizes_for_taxonomy(taxonomy_id)
         with open(chromosome_sizes_file_path, 'w') as wf:
             for chromosome, size in chromosome_sizes.items():
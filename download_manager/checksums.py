@@ -0,0 +1,202 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 12:40
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Checksums for verifying downloaded files, computed incrementally while the data is being received.
+
+Ensembl publishes a 'CHECKSUMS' file in every download folder, with lines like
+
+    '<checksum> <number of 1KB blocks> <file name>'
+
+as produced by the BSD 'sum' algorithm, some mirrors publish md5 digests instead, as in
+
+    '<md5 hex digest>  <file name>'
+
+both formats are supported.
+
+Checksums of files that are already on disk, e.g. files found in the local repository, can be computed with coreutils
+'sum -r' instead, on request, see 'ChecksumFactory.get_checksum_for_file'.
+"""
+
+import abc
+import re
+import shutil
+import hashlib
+import subprocess
+# App imports
+from .exceptions import ChecksumException
+
+
+class ChecksumFactory:
+    ALGORITHM_BSD_SUM = 'sum'
+    ALGORITHM_MD5 = 'md5'
+    # Command for computing BSD 'sum' checksums of local files with coreutils
+    _BSD_SUM_COMMAND = ['sum', '-r']
+
+    @staticmethod
+    def get_checksum(algorithm):
+        """
+        Get a checksum calculator for the given algorithm
+        :param algorithm: checksum algorithm, 'sum' or 'md5'
+        :return: a Checksum instance
+        """
+        if algorithm == ChecksumFactory.ALGORITHM_BSD_SUM:
+            return BsdSumChecksum()
+        if algorithm == ChecksumFactory.ALGORITHM_MD5:
+            return Md5Checksum()
+        raise ChecksumException("UNKNOWN checksum algorithm '{}'".format(algorithm))
+
+    @staticmethod
+    def get_checksum_for_file(file_path, algorithm, use_sum_tool=False):
+        """
+        Compute the checksum of a local file
+        :param file_path: path to the file
+        :param algorithm: checksum algorithm
+        :param use_sum_tool: if True, BSD 'sum' checksums are computed by coreutils 'sum -r', when it is available,
+        which reads the file by itself
+        :return: the checksum value for the file
+        :except: ChecksumException if 'sum -r' fails on the file
+        """
+        if use_sum_tool and (algorithm == ChecksumFactory.ALGORITHM_BSD_SUM) \
+                and shutil.which(ChecksumFactory._BSD_SUM_COMMAND[0]):
+            return ChecksumFactory.__get_bsd_sum_with_sum_tool(file_path)
+        checksum = ChecksumFactory.get_checksum(algorithm)
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(Checksum._READ_CHUNK_SIZE), b''):
+                checksum.update(chunk)
+        return checksum.get_value()
+
+    @staticmethod
+    def __get_bsd_sum_with_sum_tool(file_path):
+        command = ChecksumFactory._BSD_SUM_COMMAND + [file_path]
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # e.g. '08403     1 <file name>'
+        fields = completed.stdout.decode('utf8', errors='replace').split()
+        if (completed.returncode != 0) or (len(fields) < 2) or (not fields[0].isdigit()) \
+                or (not fields[1].isdigit()):
+            raise ChecksumException("'{}' FAILED, exit code '{}', STDOUT: |||> {} <|||, STDERR XXX> {} <XXX"
+                                    .format(" ".join(command),
+                                            completed.returncode,
+                                            completed.stdout.decode('utf8', errors='replace'),
+                                            completed.stderr.decode('utf8', errors='replace')))
+        return "{} {}".format(int(fields[0]), int(fields[1]))
+
+
+class Checksum(metaclass=abc.ABCMeta):
+    """
+    Incremental checksum calculator
+    """
+    # WARNING! - MAGIC NUMBER AHEAD!!! - 1MB chunks
+    _READ_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+
+    @abc.abstractmethod
+    def update(self, data):
+        """
+        Add more data to the checksum
+        :param data: next chunk of data
+        :return: no return value
+        """
+        ...
+
+    @abc.abstractmethod
+    def reset(self):
+        """
+        Start over, as if no data had been added yet
+        :return: no return value
+        """
+        ...
+
+    @abc.abstractmethod
+    def get_value(self):
+        """
+        Get the checksum value for the data added so far, in the same format used by 'CHECKSUMS' files
+        :return: checksum value as a string
+        """
+        ...
+
+
+class BsdSumChecksum(Checksum):
+    """
+    BSD 'sum' algorithm, a 16 bit rotating checksum plus the number of 1KB blocks in the data
+    """
+    # WARNING! - MAGIC NUMBER AHEAD!!!
+    _BLOCK_SIZE = 1024
+    # The checksum is rotated right before adding every byte, this table has the rotated value for every possible (not
+    # yet truncated to 16 bits) checksum, up to 0xffff + 0xff, so the work per byte is just a lookup and an addition
+    _ROTATED = [(((value & 0xffff) >> 1) | ((value & 1) << 15)) for value in range(0, 0xffff + 0xff + 1)]
+
+    def __init__(self):
+        super().__init__(ChecksumFactory.ALGORITHM_BSD_SUM)
+        self.__checksum = 0
+        self.__size = 0
+
+    def update(self, data):
+        rotated = self._ROTATED
+        checksum = self.__checksum
+        for byte in data:
+            checksum = rotated[checksum] + byte
+        self.__checksum = checksum & 0xffff
+        self.__size += len(data)
+
+    def reset(self):
+        self.__checksum = 0
+        self.__size = 0
+
+    def get_value(self):
+        return "{} {}".format(self.__checksum, -(-self.__size // self._BLOCK_SIZE))
+
+
+class Md5Checksum(Checksum):
+    def __init__(self):
+        super().__init__(ChecksumFactory.ALGORITHM_MD5)
+        self.__md5 = hashlib.md5()
+
+    def update(self, data):
+        self.__md5.update(data)
+
+    def reset(self):
+        self.__md5 = hashlib.md5()
+
+    def get_value(self):
+        return self.__md5.hexdigest()
+
+
+def parse_checksums(content):
+    """
+    Parse the content of a 'CHECKSUMS' file
+    :param content: text content of the file
+    :return: a dictionary that maps file names to their expected checksum, as {'algorithm': ..., 'value': ...}
+    """
+    checksums = {}
+    for line in content.splitlines():
+        fields = line.split()
+        if (len(fields) == 3) and fields[0].isdigit() and fields[1].isdigit():
+            checksums[fields[2]] = {'algorithm': ChecksumFactory.ALGORITHM_BSD_SUM,
+                                    'value': "{} {}".format(int(fields[0]), int(fields[1]))}
+        elif (len(fields) == 2) and re.fullmatch(r'[0-9a-fA-F]{32}', fields[0]):
+            checksums[fields[1].lstrip('*')] = {'algorithm': ChecksumFactory.ALGORITHM_MD5,
+                                                'value': fields[0].lower()}
+    return checksums
+
+
+def read_checksums_file(file_path):
+    """
+    Read a local copy of a 'CHECKSUMS' file
+    :param file_path: path to the file
+    :return: a dictionary that maps file names to their expected checksum, see 'parse_checksums'
+    """
+    with open(file_path, 'r') as f:
+        return parse_checksums(f.read())
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
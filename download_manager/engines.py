@@ -0,0 +1,1084 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 10:12
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Transfer engines used by download agents for fetching the content of a URL into a local file.
+
+The native engine streams the content in fixed size chunks straight to disk, resuming partial downloads via HTTP
+'Range' requests or FTP 'REST' offsets, without spawning any subprocess. The 'curl' engine is kept as a fallback, it
+runs curl for every download attempt.
+
+Gzip compressed content can be inflated while it is being downloaded, so only the uncompressed file needs to be written
+to disk, optionally keeping the compressed file as well. A checksum of the transferred data can be computed on the fly
+too.
+
+Stream writers take the data as it arrives, they can be chained, and they all support 'replay', for processing the data
+already available locally when a transfer is resumed, without storing it again.
+
+The native engine keeps the FTP sessions and HTTP keep-alive connections it opens in a connection pool, so consecutive
+transfers from the same host don't need to connect (and log in) again.
+
+Transfer engines can list remote folders as well, via FTP 'NLST', or by parsing the index page an HTTP server returns
+for a folder.
+
+Local 'file://' URLs, e.g. files on a local mirror of a remote site, are supported by all transfer engines, they are
+not transferred, but symlinked, or copied, to the destination file, see 'local file modes'.
+"""
+
+import os
+import abc
+import json
+import zlib
+import time
+import socket
+import ftplib
+import threading
+import subprocess
+import http.client
+import concurrent.futures
+from html.parser import HTMLParser
+from urllib.parse import urlparse, urljoin, unquote
+from urllib.request import url2pathname
+# App imports
+from toolbox import general
+from .pool import ConnectionPool
+from .exceptions import TransferEngineException, TransferTimeoutException, RangesNotSupportedException, \
+    TransferNotFoundException, TransferAuthException
+
+
+class TransferEngineFactory:
+    ENGINE_NATIVE = 'native'
+    ENGINE_CURL = 'curl'
+
+    @staticmethod
+    def get_transfer_engine(engine_name=ENGINE_NATIVE, segment_count=1, segment_min_size=None,
+                            max_connections_per_host=None, connection_idle_timeout=None, local_file_mode=None):
+        """
+        Get a transfer engine by name, the native one is the default
+        :param engine_name: name of the transfer engine, 'native' or 'curl'
+        :param segment_count: number of byte range segments to split large files into, native engine only
+        :param segment_min_size: minimum file size, in bytes, for splitting it into segments, native engine only
+        :param max_connections_per_host: maximum number of open connections per host, native engine only
+        :param connection_idle_timeout: time, in seconds, after which idle connections are closed, native engine only
+        :param local_file_mode: how local 'file://' URLs are made available at their destination, 'symlink' or 'copy'
+        :return: a TransferEngine instance
+        """
+        if local_file_mode is None:
+            local_file_mode = TransferEngine.LOCAL_FILE_MODE_SYMLINK
+        if local_file_mode not in (TransferEngine.LOCAL_FILE_MODE_SYMLINK, TransferEngine.LOCAL_FILE_MODE_COPY):
+            raise TransferEngineException("UNKNOWN local file mode '{}'".format(local_file_mode))
+        if engine_name == TransferEngineFactory.ENGINE_NATIVE:
+            if segment_min_size is None:
+                segment_min_size = TransferEngine._DEFAULT_SEGMENT_MIN_SIZE
+            connection_pool_settings = {}
+            if max_connections_per_host is not None:
+                connection_pool_settings['max_connections_per_host'] = max_connections_per_host
+            if connection_idle_timeout is not None:
+                connection_pool_settings['idle_timeout'] = connection_idle_timeout
+            return NativeTransferEngine(segment_count=segment_count,
+                                        segment_min_size=segment_min_size,
+                                        connection_pool=ConnectionPool(**connection_pool_settings),
+                                        local_file_mode=local_file_mode)
+        if engine_name == TransferEngineFactory.ENGINE_CURL:
+            return CurlTransferEngine(local_file_mode=local_file_mode)
+        raise TransferEngineException("UNKNOWN transfer engine '{}'".format(engine_name))
+
+
+class FileStreamWriter:
+    """
+    Stream writer that stores the data, as it is, in a file
+    """
+
+    def __init__(self, file_path, append=False):
+        self.file_path = file_path
+        self.__file = open(file_path, 'ab' if append else 'wb')
+
+    def write(self, data):
+        self.__file.write(data)
+
+    def replay(self, data):
+        # The data is already in the file
+        pass
+
+    def close(self):
+        """
+        The stream is complete
+        :return: no return value
+        """
+        self.__file.close()
+
+    def abort(self):
+        """
+        The stream has been interrupted, whatever has been written so far is kept, so it can be resumed later
+        :return: no return value
+        """
+        self.__file.close()
+
+
+class GunzipStreamWriter:
+    """
+    Stream writer that inflates the gzip compressed data written to it into the given (uncompressed) file, as it
+    arrives, optionally passing the compressed data on to another stream writer, e.g. for keeping a copy of the
+    compressed file. Multi member gzip streams are supported.
+    """
+
+    def __init__(self, decompressed_file_path, compressed_stream_writer=None):
+        self.decompressed_file_path = decompressed_file_path
+        self.__compressed_stream_writer = compressed_stream_writer
+        self.__decompressed_file = open(decompressed_file_path, 'wb')
+        self.__decompressor = self.__get_decompressor()
+        self.__member_in_progress = False
+        self.__count_members = 0
+
+    @staticmethod
+    def __get_decompressor():
+        # Expect gzip header and trailer
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def replay(self, data):
+        """
+        Inflate the given compressed data into the uncompressed file, without passing it on to the compressed stream
+        writer, e.g. for the part of the compressed file we already have when resuming a download
+        :param data: gzip compressed data
+        :return: no return value
+        :except: TransferEngineException if the data is not a valid gzip stream
+        """
+        try:
+            while data:
+                self.__decompressed_file.write(self.__decompressor.decompress(data))
+                self.__member_in_progress = True
+                if not self.__decompressor.eof:
+                    break
+                self.__count_members += 1
+                self.__member_in_progress = False
+                # Whatever comes after the end of a member, is the beginning of the next one
+                data = self.__decompressor.unused_data
+                self.__decompressor = self.__get_decompressor()
+        except zlib.error as e:
+            raise TransferEngineException("CORRUPTED gzip stream for '{}', '{}'"
+                                          .format(self.decompressed_file_path, e)) from e
+
+    def write(self, data):
+        if self.__compressed_stream_writer:
+            self.__compressed_stream_writer.write(data)
+        self.replay(data)
+
+    def close(self):
+        """
+        The compressed stream is complete, make sure it is not truncated
+        :return: no return value
+        :except: TransferEngineException if the gzip stream is incomplete
+        """
+        self.__decompressed_file.close()
+        if self.__compressed_stream_writer:
+            self.__compressed_stream_writer.close()
+        if self.__member_in_progress or (not self.__count_members):
+            raise TransferEngineException("TRUNCATED gzip stream for '{}'".format(self.decompressed_file_path))
+
+    def abort(self):
+        """
+        The compressed stream has been interrupted, the uncompressed file is incomplete
+        :return: no return value
+        """
+        self.__decompressed_file.close()
+        if self.__compressed_stream_writer:
+            self.__compressed_stream_writer.abort()
+
+
+class ChecksumStreamWriter:
+    """
+    Stream writer that updates a checksum with the data written to it, before passing it on to another stream writer,
+    if any
+    """
+
+    def __init__(self, checksum, stream_writer=None):
+        self.__checksum = checksum
+        self.__stream_writer = stream_writer
+        self.__checksum.reset()
+
+    def write(self, data):
+        self.__checksum.update(data)
+        if self.__stream_writer:
+            self.__stream_writer.write(data)
+
+    def replay(self, data):
+        self.__checksum.update(data)
+        if self.__stream_writer:
+            self.__stream_writer.replay(data)
+
+    def close(self):
+        if self.__stream_writer:
+            self.__stream_writer.close()
+
+    def abort(self):
+        if self.__stream_writer:
+            self.__stream_writer.abort()
+
+
+class FolderIndexParser(HTMLParser):
+    """
+    Collects the entries of the index page an HTTP server returns for a folder, i.e. the relative links in it, leaving
+    out sorting links, parent folders and links elsewhere
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        href = dict(attrs).get('href')
+        if (not href) or href.startswith(('?', '#', '/', '.')) or ('://' in href) or href.startswith('mailto:'):
+            return
+        entry = unquote(href.split('?', 1)[0].rstrip('/'))
+        if entry and ('/' not in entry) and (entry not in self.entries):
+            self.entries.append(entry)
+
+
+class TransferEngine(metaclass=abc.ABCMeta):
+    """
+    A transfer engine downloads the content of a URL into a local file, resuming the download if the local file
+    already contains part of it
+    """
+    # WARNING! - MAGIC NUMBER AHEAD!!! - 1MB chunks
+    _DEFAULT_CHUNK_SIZE = 1024 * 1024
+    # Files smaller than 32MB are not worth splitting into segments
+    _DEFAULT_SEGMENT_MIN_SIZE = 32 * 1024 * 1024
+    # Local file modes, i.e. how the content of local 'file://' URLs is made available at the destination file
+    LOCAL_FILE_MODE_SYMLINK = 'symlink'
+    LOCAL_FILE_MODE_COPY = 'copy'
+    _LOCAL_URL_SCHEME = 'file'
+
+    def __init__(self, chunk_size=_DEFAULT_CHUNK_SIZE, local_file_mode=LOCAL_FILE_MODE_SYMLINK):
+        self.chunk_size = chunk_size
+        self.local_file_mode = local_file_mode
+
+    @staticmethod
+    def _get_stream_writer(dst_file_path, store_data, append, decompressed_file_path, checksum):
+        """
+        Build the chain of stream writers for a transfer
+        :param dst_file_path: destination file path
+        :param store_data: whether to store the transferred data, as it is, in the destination file or not
+        :param append: whether the destination file is being resumed or not
+        :param decompressed_file_path: if given, the data is inflated into this file
+        :param checksum: if given, this checksum is updated with the transferred data
+        :return: the stream writer at the head of the chain
+        """
+        writer = FileStreamWriter(dst_file_path, append=append) if store_data else None
+        if decompressed_file_path:
+            writer = GunzipStreamWriter(decompressed_file_path, writer)
+        if checksum:
+            writer = ChecksumStreamWriter(checksum, writer)
+        return writer
+
+    def _replay_local_file(self, file_path, writer):
+        """
+        Feed the content of a local file to the 'replay' method of the given stream writer, the writer is aborted if
+        anything goes wrong
+        :param file_path: local file path
+        :param writer: stream writer
+        :return: no return value
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    writer.replay(chunk)
+        except Exception:
+            writer.abort()
+            raise
+
+    def _process_local_file(self, dst_file_path, decompressed_file_path, keep_compressed, checksum):
+        """
+        Inflate and / or compute the checksum of an already downloaded file, for those transfers where this could not
+        be done on the fly
+        :param dst_file_path: path to the downloaded file
+        :param decompressed_file_path: if given, the downloaded file is inflated into this file
+        :param keep_compressed: when inflating the downloaded file, whether to keep it or not
+        :param checksum: if given, this checksum is computed for the downloaded file
+        :return: no return value
+        :except: TransferEngineException if the downloaded file is not a complete, valid, gzip stream
+        """
+        if not (decompressed_file_path or checksum):
+            return
+        writer = self._get_stream_writer(dst_file_path, False, True, decompressed_file_path, checksum)
+        self._replay_local_file(dst_file_path, writer)
+        writer.close()
+        if decompressed_file_path and (not keep_compressed):
+            os.remove(dst_file_path)
+
+    @staticmethod
+    def _is_local_url(url):
+        return urlparse(url).scheme == TransferEngine._LOCAL_URL_SCHEME
+
+    @staticmethod
+    def _get_local_path(url):
+        return url2pathname(urlparse(url).path)
+
+    @staticmethod
+    def _remove_dst_file(dst_file_path):
+        # It may be a symlink to a local file, whatever it points to is left alone
+        if os.path.lexists(dst_file_path):
+            os.remove(dst_file_path)
+
+    def _download_local_file(self, url, dst_file_path, progress_callback, decompressed_file_path, keep_compressed,
+                             checksum):
+        """
+        Make the content of a local 'file://' URL available at the destination file, according to the local file mode
+        of this engine, it is inflated, and / or its checksum computed, straight from the local file. There is nothing
+        to resume, the destination file is made from scratch.
+        :param url: local file URL
+        :param dst_file_path: destination file path
+        :param progress_callback: if given, it will be called with the size of the local file, once it is available at
+        the destination file
+        :param decompressed_file_path: if given, the local file is inflated into this file
+        :param keep_compressed: when inflating the local file, whether to make it available at the destination file too
+        :param checksum: if given, this checksum is computed for the destination file, or the local file if it is
+        inflated without being made available at the destination file
+        :return: size of the local file
+        :except: TransferNotFoundException if the local file does not exist, and TransferEngineException for any other
+        error
+        """
+        file_path = self._get_local_path(url)
+        if not os.path.isfile(file_path):
+            raise TransferNotFoundException("Local file '{}' NOT FOUND".format(url))
+        self._remove_dst_file(dst_file_path)
+        try:
+            # Whatever is made available at the destination file is what gets inflated and checked, i.e. copies are
+            # checked, not the local file they have been made from
+            replay_file_path = file_path
+            if (not decompressed_file_path) or keep_compressed:
+                if self.local_file_mode == self.LOCAL_FILE_MODE_SYMLINK:
+                    os.symlink(os.path.abspath(file_path), dst_file_path)
+                else:
+                    general.copy_file(file_path, dst_file_path)
+                replay_file_path = dst_file_path
+            if decompressed_file_path or checksum:
+                writer = self._get_stream_writer(dst_file_path, False, True, decompressed_file_path, checksum)
+                self._replay_local_file(replay_file_path, writer)
+                writer.close()
+        except OSError as e:
+            self._remove_dst_file(dst_file_path)
+            raise TransferEngineException("Local file '{}' COULD NOT BE MADE available at '{}', '{}'"
+                                          .format(url, dst_file_path, e)) from e
+        except TransferEngineException:
+            self._remove_dst_file(dst_file_path)
+            raise
+        size = os.path.getsize(file_path)
+        if progress_callback:
+            progress_callback(size)
+        return size
+
+    def _list_local_folder(self, url):
+        """
+        List the names of the entries in a local 'file://' folder URL
+        :param url: local folder URL
+        :return: list of entry names
+        :except: TransferNotFoundException if the folder does not exist, and TransferEngineException for any other error
+        """
+        try:
+            return os.listdir(self._get_local_path(url))
+        except FileNotFoundError as e:
+            raise TransferNotFoundException("Local folder '{}' NOT FOUND".format(url)) from e
+        except OSError as e:
+            raise TransferEngineException("Listing of local folder '{}' FAILED, '{}'".format(url, e)) from e
+
+    @abc.abstractmethod
+    def download(self, url, dst_file_path, timeout, progress_callback=None,
+                 decompressed_file_path=None, keep_compressed=True, checksum=None):
+        """
+        Download the given URL to the given destination file, resuming the transfer from the current size of the
+        destination file, if it exists
+        :param url: URL to download
+        :param dst_file_path: destination file path
+        :param timeout: maximum amount of time, in seconds, for the transfer to complete
+        :param progress_callback: if given, it will be called with the number of bytes written so far to the destination
+        file, every time a chunk of data is received
+        :param decompressed_file_path: if given, the content is gzip compressed, and it will be inflated into this file
+        :param keep_compressed: when inflating the content, whether to keep the compressed destination file as well
+        :param checksum: if given, this checksum will be computed for the whole content, as it is transferred
+        :return: number of bytes transferred by this call
+        :except: TransferTimeoutException when the transfer can't be completed within the given time, and
+        TransferEngineException for any other error
+        """
+        ...
+
+    @staticmethod
+    def _parse_folder_index(content):
+        """
+        Get the names of the entries in a remote folder from the index page an HTTP server returned for it
+        :param content: index page
+        :return: list of entry names
+        """
+        parser = FolderIndexParser()
+        parser.feed(content)
+        parser.close()
+        return parser.entries
+
+    @abc.abstractmethod
+    def list_folder(self, url, timeout):
+        """
+        List the names of the entries, files and subfolders, in a remote folder
+        :param url: URL of the remote folder
+        :param timeout: maximum amount of time, in seconds, for getting the listing
+        :return: list of entry names
+        :except: TransferNotFoundException if the folder does not exist, TransferTimeoutException when the listing
+        can't be obtained within the given time, and TransferEngineException for any other error
+        """
+        ...
+
+
+class NativeTransferEngine(TransferEngine):
+    """
+    In-process transfer engine for HTTP(S), FTP and local file URLs.
+
+    Files of, at least, 'segment_min_size' bytes can be downloaded as 'segment_count' byte ranges fetched concurrently
+    and written in place into the (preallocated) destination file. The progress of every segment is kept in a
+    '<destination file>.segments' file, so segmented downloads can be resumed as well. When the server does not support
+    ranges, the file is downloaded as a single stream.
+
+    Connections are taken from, and given back to, a connection pool, they are only given back for reuse after a clean
+    transfer, e.g. an FTP session that has been interrupted in the middle of a transfer (as segments are) is closed.
+    """
+    # WARNING! - MAGIC NUMBER AHEAD!!!
+    _MAX_HTTP_REDIRECTS = 10
+    _SEGMENTS_FILE_EXTENSION = '.segments'
+    # Errors that tell us that the server closed an idle keep-alive connection
+    _HTTP_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                                     BrokenPipeError, ConnectionResetError)
+
+    def __init__(self, chunk_size=TransferEngine._DEFAULT_CHUNK_SIZE, segment_count=1,
+                 segment_min_size=TransferEngine._DEFAULT_SEGMENT_MIN_SIZE, connection_pool=None,
+                 local_file_mode=TransferEngine.LOCAL_FILE_MODE_SYMLINK):
+        super().__init__(chunk_size, local_file_mode)
+        self.segment_count = segment_count
+        self.segment_min_size = segment_min_size
+        self.connection_pool = connection_pool
+        if self.connection_pool is None:
+            self.connection_pool = ConnectionPool()
+
+    @staticmethod
+    def _get_remaining_time(deadline, url):
+        remaining_time = deadline - time.time()
+        if remaining_time <= 0:
+            raise TransferTimeoutException("Transfer of '{}' TIMED OUT".format(url))
+        return remaining_time
+
+    def _stream_to_file(self, read_chunk, dst_file, deadline, url, progress_callback, max_bytes=None):
+        """
+        Copy chunks of data to the destination file until there are no more
+        :param read_chunk: callable that, given a maximum size, returns the next chunk of data, an empty one when there
+        is no more data
+        :param dst_file: file object where to write the data, at its current position
+        :param deadline: point in time when the transfer times out
+        :param url: URL being transferred, for reporting purposes
+        :param progress_callback: if given, it is called with the number of bytes written to the destination file after
+        every chunk
+        :param max_bytes: if given, stop after writing this number of bytes
+        :return: number of bytes written to the destination file
+        """
+        bytes_written = 0
+        while (max_bytes is None) or (bytes_written < max_bytes):
+            self._get_remaining_time(deadline, url)
+            chunk_size = self.chunk_size
+            if max_bytes is not None:
+                chunk_size = min(chunk_size, max_bytes - bytes_written)
+            try:
+                chunk = read_chunk(chunk_size)
+            except socket.timeout as e:
+                raise TransferTimeoutException("Transfer of '{}' TIMED OUT while reading data".format(url)) from e
+            except (OSError, http.client.HTTPException) as e:
+                raise TransferEngineException("Transfer of '{}' INTERRUPTED, '{}'".format(url, e)) from e
+            if not chunk:
+                break
+            dst_file.write(chunk)
+            bytes_written += len(chunk)
+            if progress_callback:
+                progress_callback(bytes_written)
+        return bytes_written
+
+    @staticmethod
+    def _get_http_error(response, url):
+        """
+        Build the error for an unexpected HTTP response, telling apart permanent errors
+        :param response: HTTP response
+        :param url: requested URL
+        :return: the exception to raise
+        """
+        message = "HTTP ERROR '{} {}' for '{}'".format(response.status, response.reason, url)
+        if response.status in (404, 410):
+            return TransferNotFoundException(message)
+        if response.status in (401, 403, 407):
+            return TransferAuthException(message)
+        return TransferEngineException(message)
+
+    @staticmethod
+    def _get_ftp_error(error, message):
+        """
+        Build the error for a failed FTP command, telling apart permanent errors
+        :param error: the error raised by ftplib
+        :param message: description of the failure
+        :return: the exception to raise
+        """
+        message = "{}, '{}'".format(message, error)
+        if isinstance(error, ftplib.error_perm):
+            reply = str(error)
+            if reply.startswith('550'):
+                return TransferNotFoundException(message)
+            if reply.startswith('530') or reply.startswith('332'):
+                return TransferAuthException(message)
+        return TransferEngineException(message)
+
+    @staticmethod
+    def _is_ftp_rest_rejected(error):
+        # 'REST' is rejected with a permanent error, that is not 'file not available', or with an unexpected reply
+        return isinstance(error, ftplib.error_reply) or \
+            (isinstance(error, ftplib.error_perm) and not str(error).startswith('550'))
+
+    @staticmethod
+    def _connect_http(url):
+        # The connection is actually established when sending the first request through it
+        parsed_url = urlparse(url)
+        if parsed_url.scheme == 'https':
+            return http.client.HTTPSConnection(parsed_url.netloc)
+        return http.client.HTTPConnection(parsed_url.netloc)
+
+    @staticmethod
+    def _set_connection_timeout(connection, timeout):
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+
+    def _request_http(self, url, deadline, method, headers):
+        """
+        Send an HTTP request for the given URL, through a pooled connection, if the server dropped it, the request is
+        sent again through a new one
+        :return: (connection, response)
+        """
+        parsed_url = urlparse(url)
+        path = parsed_url.path or '/'
+        if parsed_url.query:
+            path = "{}?{}".format(path, parsed_url.query)
+        while True:
+            connection, reused = self.connection_pool.acquire(url,
+                                                              self._connect_http,
+                                                              timeout=self._get_remaining_time(deadline, url))
+            self._set_connection_timeout(connection, self._get_remaining_time(deadline, url))
+            try:
+                connection.request(method, path, headers=headers)
+                return connection, connection.getresponse()
+            except socket.timeout as e:
+                self.connection_pool.release(url, connection, reusable=False)
+                raise TransferTimeoutException("Request for '{}' TIMED OUT".format(url)) from e
+            except self._HTTP_STALE_CONNECTION_ERRORS as e:
+                self.connection_pool.release(url, connection, reusable=False)
+                if reused:
+                    continue
+                raise TransferEngineException("Request for '{}' FAILED, '{}'".format(url, e)) from e
+            except (OSError, http.client.HTTPException) as e:
+                self.connection_pool.release(url, connection, reusable=False)
+                raise TransferEngineException("Request for '{}' FAILED, '{}'".format(url, e)) from e
+
+    def _release_http(self, connection, response):
+        """
+        Give an HTTP connection back to the pool, it is reused only if its response has been read completely and the
+        server is not closing it
+        :param connection: HTTP connection
+        :param response: last response received through the connection
+        :return: no return value
+        """
+        reusable = response.isclosed() and not response.will_close
+        self.connection_pool.release(response.url_requested, connection, reusable=reusable)
+
+    def _open_http(self, url, deadline, method='GET', headers=None):
+        """
+        Send an HTTP request for the given URL, following redirections
+        :param url: URL
+        :param deadline: point in time when the transfer times out
+        :param method: HTTP method
+        :param headers: request headers
+        :return: (connection, response), the caller is in charge of giving the connection back, via '_release_http'
+        """
+        current_url = url
+        for redirect_counter in range(0, self._MAX_HTTP_REDIRECTS + 1):
+            connection, response = self._request_http(current_url, deadline, method, headers or {})
+            # Keep track of where the connection goes to, for giving it back to the pool
+            response.url_requested = current_url
+            if response.status in (301, 302, 303, 307, 308):
+                self.connection_pool.release(current_url, connection, reusable=False)
+                current_url = urljoin(current_url, response.getheader('Location'))
+                continue
+            return connection, response
+        raise TransferEngineException("TOO MANY REDIRECTIONS for '{}'".format(url))
+
+    def _connect_ftp(self, url, deadline):
+        """
+        Open an FTP control connection, logged in and in binary mode, for the given URL
+        :param url: FTP URL
+        :param deadline: point in time when the transfer times out
+        :return: ftp control connection
+        """
+        parsed_url = urlparse(url)
+        ftp = ftplib.FTP(timeout=self._get_remaining_time(deadline, url))
+        try:
+            ftp.connect(parsed_url.hostname, parsed_url.port or ftplib.FTP_PORT)
+            ftp.login(unquote(parsed_url.username or 'anonymous'), unquote(parsed_url.password or ''))
+            ftp.voidcmd('TYPE I')
+        except socket.timeout as e:
+            ftp.close()
+            raise TransferTimeoutException("FTP connection for '{}' TIMED OUT".format(url)) from e
+        except (OSError, ftplib.Error, EOFError) as e:
+            ftp.close()
+            raise self._get_ftp_error(e, "FTP connection for '{}' FAILED".format(url)) from e
+        return ftp
+
+    def _is_ftp_alive(self, ftp, deadline, url):
+        self._set_ftp_timeout(ftp, self._get_remaining_time(deadline, url))
+        try:
+            ftp.voidcmd('NOOP')
+        except (OSError, ftplib.Error, EOFError):
+            return False
+        return True
+
+    @staticmethod
+    def _set_ftp_timeout(ftp, timeout):
+        # The timeout is used for the data connections as well
+        ftp.timeout = timeout
+        if ftp.sock is not None:
+            ftp.sock.settimeout(timeout)
+
+    def _open_ftp(self, url, deadline):
+        """
+        Get an FTP control connection, logged in and in binary mode, for the given URL
+        :param url: FTP URL
+        :param deadline: point in time when the transfer times out
+        :return: (ftp control connection, path to the file on the server), the caller is in charge of giving the
+        connection back to the pool
+        """
+        ftp, reused = self.connection_pool.acquire(url,
+                                                   lambda connection_url: self._connect_ftp(connection_url, deadline),
+                                                   is_alive=lambda connection: self._is_ftp_alive(connection,
+                                                                                                  deadline,
+                                                                                                  url),
+                                                   timeout=self._get_remaining_time(deadline, url))
+        self._set_ftp_timeout(ftp, self._get_remaining_time(deadline, url))
+        return ftp, unquote(urlparse(url).path)
+
+    def _get_remote_size_if_ranges_supported(self, url, deadline):
+        """
+        Find out the size of the remote file, if the server supports fetching byte ranges for it
+        :param url: URL
+        :param deadline: point in time when the transfer times out
+        :return: the size of the remote file, or None if unknown or byte ranges are not supported
+        """
+        if urlparse(url).scheme == 'ftp':
+            ftp, path = self._open_ftp(url, deadline)
+            reusable = True
+            try:
+                return ftp.size(path)
+            except ftplib.Error:
+                return None
+            except (OSError, EOFError):
+                reusable = False
+                return None
+            finally:
+                self.connection_pool.release(url, ftp, reusable=reusable)
+        connection, response = self._open_http(url, deadline, method='HEAD')
+        try:
+            # There is no body in a response to a 'HEAD' request, this just marks the response as done
+            response.read()
+            if (response.status != 200) or (response.getheader('Accept-Ranges', '').lower() != 'bytes'):
+                return None
+            content_length = response.getheader('Content-Length')
+            return int(content_length) if content_length else None
+        except (OSError, http.client.HTTPException):
+            return None
+        finally:
+            self._release_http(connection, response)
+
+    def _download_http(self, url, offset, open_writer, deadline, progress_callback):
+        """
+        Download the given URL as a single stream, resuming it from the given offset when possible
+        :param url: HTTP(S) URL
+        :param offset: number of bytes already downloaded
+        :param open_writer: callable that, given the offset the transfer actually resumes from, returns the stream
+        writer for the data
+        :param deadline: point in time when the transfer times out
+        :param progress_callback: if given, it is called with the total number of bytes transferred so far
+        :return: number of bytes transferred by this call
+        """
+        headers = {}
+        if offset:
+            headers['Range'] = "bytes={}-".format(offset)
+        connection, response = self._open_http(url, deadline, headers=headers)
+        writer = None
+        try:
+            if response.status == 416 and offset:
+                # The local file already holds all the content
+                writer = open_writer(offset)
+                writer.close()
+                writer = None
+                return 0
+            if response.status == 200:
+                # The server ignored our range request (or there was none), start over
+                offset = 0
+            elif response.status != 206:
+                raise self._get_http_error(response, url)
+            writer = open_writer(offset)
+            bytes_written = self._stream_to_file(response.read1,
+                                                 writer,
+                                                 deadline,
+                                                 url,
+                                                 (lambda written: progress_callback(offset + written))
+                                                 if progress_callback else None)
+            writer.close()
+            writer = None
+            return bytes_written
+        finally:
+            if writer:
+                writer.abort()
+            self._release_http(connection, response)
+
+    def _download_ftp(self, url, offset, open_writer, deadline, progress_callback):
+        """
+        Download the given URL as a single stream, resuming it from the given offset when possible
+        :param url: FTP URL
+        :param offset: number of bytes already downloaded
+        :param open_writer: callable that, given the offset the transfer actually resumes from, returns the stream
+        writer for the data
+        :param deadline: point in time when the transfer times out
+        :param progress_callback: if given, it is called with the total number of bytes transferred so far
+        :return: number of bytes transferred by this call
+        """
+        ftp, path = self._open_ftp(url, deadline)
+        writer = None
+        # The control connection can only be reused if it is known to be in a clean state
+        reusable = False
+        try:
+            try:
+                try:
+                    data_connection = ftp.transfercmd("RETR {}".format(path), rest=offset or None)
+                except ftplib.Error as e:
+                    if not (offset and self._is_ftp_rest_rejected(e)):
+                        raise
+                    # The server does not support resuming transfers, start over
+                    offset = 0
+                    data_connection = ftp.transfercmd("RETR {}".format(path))
+            except socket.timeout as e:
+                raise TransferTimeoutException("FTP request for '{}' TIMED OUT".format(url)) from e
+            except (OSError, ftplib.Error, EOFError) as e:
+                # A rejected command, e.g. the file is not there, leaves the session ready for the next one
+                reusable = isinstance(e, ftplib.error_perm)
+                raise self._get_ftp_error(e, "FTP request for '{}' FAILED".format(url)) from e
+            writer = open_writer(offset)
+            with data_connection:
+                bytes_written = self._stream_to_file(data_connection.recv,
+                                                     writer,
+                                                     deadline,
+                                                     url,
+                                                     (lambda written: progress_callback(offset + written))
+                                                     if progress_callback else None)
+            try:
+                ftp.voidresp()
+            except (OSError, ftplib.Error, EOFError) as e:
+                raise TransferEngineException("FTP transfer for '{}' NOT CONFIRMED by the server, '{}'"
+                                              .format(url, e)) from e
+            reusable = True
+            writer.close()
+            writer = None
+            return bytes_written
+        finally:
+            if writer:
+                writer.abort()
+            self.connection_pool.release(url, ftp, reusable=reusable)
+
+    def _download_segment(self, url, dst_file_path, segment_start, segment_end, deadline, progress_callback):
+        """
+        Download the byte range [segment_start, segment_end) of the given URL into the same position of the
+        destination file
+        :return: number of bytes written
+        :except: RangesNotSupportedException if the server did not honor the range request
+        """
+        segment_length = segment_end - segment_start
+        with open(dst_file_path, 'r+b') as dst_file:
+            dst_file.seek(segment_start)
+            if urlparse(url).scheme == 'ftp':
+                ftp, path = self._open_ftp(url, deadline)
+                try:
+                    try:
+                        data_connection = ftp.transfercmd("RETR {}".format(path), rest=segment_start)
+                    except socket.timeout as e:
+                        raise TransferTimeoutException("FTP request for '{}' TIMED OUT".format(url)) from e
+                    except (OSError, ftplib.Error, EOFError) as e:
+                        if self._is_ftp_rest_rejected(e):
+                            raise RangesNotSupportedException("FTP server does not support 'REST' for '{}'"
+                                                              .format(url)) from e
+                        raise self._get_ftp_error(e, "FTP request for '{}' FAILED".format(url)) from e
+                    with data_connection:
+                        bytes_written = self._stream_to_file(data_connection.recv, dst_file, deadline, url,
+                                                             progress_callback, max_bytes=segment_length)
+                finally:
+                    # We may have stopped reading in the middle of the transfer, this control connection is not
+                    # usable any more
+                    self.connection_pool.release(url, ftp, reusable=False)
+            else:
+                connection, response = self._open_http(url, deadline, headers={
+                    'Range': "bytes={}-{}".format(segment_start, segment_end - 1)})
+                try:
+                    if response.status == 200:
+                        raise RangesNotSupportedException("HTTP server ignored the range request for '{}'"
+                                                          .format(url))
+                    if response.status != 206:
+                        raise self._get_http_error(response, url)
+                    bytes_written = self._stream_to_file(response.read1, dst_file, deadline, url,
+                                                         progress_callback, max_bytes=segment_length)
+                finally:
+                    self._release_http(connection, response)
+        if bytes_written != segment_length:
+            raise TransferEngineException("Segment [{}, {}) of '{}' INCOMPLETE, #{} bytes received"
+                                          .format(segment_start, segment_end, url, bytes_written))
+        return bytes_written
+
+    def _download_segmented(self, url, dst_file_path, remote_size, deadline, progress_callback):
+        """
+        Download the given URL as byte range segments fetched concurrently
+        :return: number of bytes written to the destination file by this call
+        """
+        segments_file_path = "{}{}".format(dst_file_path, self._SEGMENTS_FILE_EXTENSION)
+        segments = None
+        if os.path.isfile(segments_file_path) and os.path.isfile(dst_file_path):
+            # Resume a previous segmented download of the same remote file
+            try:
+                segments_progress = general.read_json(segments_file_path)
+                if segments_progress['size'] == remote_size:
+                    segments = segments_progress['segments']
+            except Exception:
+                segments = None
+        if segments is None:
+            segment_size = -(-remote_size // self.segment_count)
+            segments = [[start, min(start + segment_size, remote_size), 0]
+                        for start in range(0, remote_size, segment_size)]
+            with open(dst_file_path, 'wb') as dst_file:
+                dst_file.truncate(remote_size)
+        progress_lock = threading.Lock()
+
+        def save_progress():
+            with progress_lock:
+                with open(segments_file_path, 'w') as segments_file:
+                    json.dump({'size': remote_size, 'segments': segments}, segments_file)
+
+        def report_segment_progress(segment, written):
+            with progress_lock:
+                segment[2] = written
+                if progress_callback:
+                    progress_callback(sum([done for start, end, done in segments]))
+
+        def download_segment(segment):
+            start, end, done = segment
+            already_done = done
+            if start + done >= end:
+                return 0
+            return self._download_segment(url, dst_file_path, start + done, end, deadline,
+                                          lambda written: report_segment_progress(segment, already_done + written))
+
+        save_progress()
+        bytes_written_before = sum([done for start, end, done in segments])
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(segments)) as executor:
+                # Collect the results, raising the first error found
+                for result in executor.map(download_segment, segments):
+                    pass
+        finally:
+            save_progress()
+        os.remove(segments_file_path)
+        return remote_size - bytes_written_before
+
+    def download(self, url, dst_file_path, timeout, progress_callback=None,
+                 decompressed_file_path=None, keep_compressed=True, checksum=None):
+        deadline = time.time() + timeout
+        scheme = urlparse(url).scheme
+        if scheme == self._LOCAL_URL_SCHEME:
+            return self._download_local_file(url, dst_file_path, progress_callback, decompressed_file_path,
+                                             keep_compressed, checksum)
+        if scheme not in ('http', 'https', 'ftp'):
+            raise TransferEngineException("UNSUPPORTED URL scheme '{}' for '{}'".format(scheme, url))
+        segments_file_path = "{}{}".format(dst_file_path, self._SEGMENTS_FILE_EXTENSION)
+        if self.segment_count > 1:
+            remote_size = self._get_remote_size_if_ranges_supported(url, deadline)
+            if remote_size and (remote_size >= self.segment_min_size):
+                try:
+                    bytes_written = self._download_segmented(url, dst_file_path, remote_size, deadline,
+                                                             progress_callback)
+                except RangesNotSupportedException:
+                    # Fall back to downloading the file as a single stream
+                    pass
+                else:
+                    # Segments arrive out of order, they can only be inflated and checked once the file is complete
+                    self._process_local_file(dst_file_path, decompressed_file_path, keep_compressed, checksum)
+                    return bytes_written
+        if os.path.isfile(segments_file_path):
+            # The destination file is a preallocated file from a segmented download, it can't be resumed as a stream
+            os.remove(segments_file_path)
+            if os.path.isfile(dst_file_path):
+                os.remove(dst_file_path)
+        store_data = (not decompressed_file_path) or keep_compressed
+        offset = os.path.getsize(dst_file_path) if os.path.isfile(dst_file_path) else 0
+        if not store_data:
+            # Without the data we already got, there is nothing to resume from
+            offset = 0
+            if os.path.isfile(dst_file_path):
+                os.remove(dst_file_path)
+
+        def open_writer(resume_offset):
+            writer = self._get_stream_writer(dst_file_path, store_data, resume_offset > 0,
+                                             decompressed_file_path, checksum)
+            if resume_offset:
+                # Process the data we already have, before appending the rest of the stream
+                self._replay_local_file(dst_file_path, writer)
+            return writer
+
+        if scheme == 'ftp':
+            return self._download_ftp(url, offset, open_writer, deadline, progress_callback)
+        return self._download_http(url, offset, open_writer, deadline, progress_callback)
+
+    def _list_folder_ftp(self, url, deadline):
+        ftp, path = self._open_ftp(url, deadline)
+        reusable = False
+        try:
+            try:
+                entries = ftp.nlst(path)
+            except socket.timeout as e:
+                raise TransferTimeoutException("FTP listing of '{}' TIMED OUT".format(url)) from e
+            except (OSError, ftplib.Error, EOFError) as e:
+                reusable = isinstance(e, ftplib.error_perm)
+                raise self._get_ftp_error(e, "FTP listing of '{}' FAILED".format(url)) from e
+            reusable = True
+        finally:
+            self.connection_pool.release(url, ftp, reusable=reusable)
+        # Some servers give back the full path of every entry
+        return [entry.rstrip('/').rsplit('/', 1)[-1] for entry in entries]
+
+    def _list_folder_http(self, url, deadline):
+        connection, response = self._open_http(url if url.endswith('/') else "{}/".format(url), deadline)
+        try:
+            if response.status != 200:
+                raise self._get_http_error(response, url)
+            content = response.read()
+        except socket.timeout as e:
+            raise TransferTimeoutException("HTTP listing of '{}' TIMED OUT".format(url)) from e
+        except (OSError, http.client.HTTPException) as e:
+            raise TransferEngineException("HTTP listing of '{}' FAILED, '{}'".format(url, e)) from e
+        finally:
+            self._release_http(connection, response)
+        return self._parse_folder_index(content.decode('utf-8', errors='replace'))
+
+    def list_folder(self, url, timeout):
+        deadline = time.time() + timeout
+        scheme = urlparse(url).scheme
+        if scheme == 'ftp':
+            return self._list_folder_ftp(url, deadline)
+        if scheme in ('http', 'https'):
+            return self._list_folder_http(url, deadline)
+        if scheme == self._LOCAL_URL_SCHEME:
+            return self._list_local_folder(url)
+        raise TransferEngineException("UNSUPPORTED URL scheme '{}' for '{}'".format(scheme, url))
+
+
+class CurlTransferEngine(TransferEngine):
+    """
+    Fallback transfer engine, it runs 'curl' for every download, compressed content is inflated, and checksums are
+    computed, once the download is complete
+    """
+
+    # WARNING! - MAGIC NUMBERS AHEAD!!! - curl exit codes
+    _CURL_EXIT_CODE_HTTP_ERROR = 22
+    _CURL_EXIT_CODES_NOT_FOUND = (78,)
+    _CURL_EXIT_CODES_AUTH = (9, 67)
+
+    def __init__(self, chunk_size=TransferEngine._DEFAULT_CHUNK_SIZE,
+                 local_file_mode=TransferEngine.LOCAL_FILE_MODE_SYMLINK):
+        super().__init__(chunk_size, local_file_mode)
+
+    @staticmethod
+    def _get_curl_error(exit_code, stderr, message):
+        """
+        Build the error for a failed curl run, telling apart permanent errors
+        :param exit_code: curl exit code
+        :param stderr: curl error output
+        :param message: description of the failure
+        :return: the exception to raise
+        """
+        if exit_code in CurlTransferEngine._CURL_EXIT_CODES_NOT_FOUND:
+            return TransferNotFoundException(message)
+        if exit_code in CurlTransferEngine._CURL_EXIT_CODES_AUTH:
+            return TransferAuthException(message)
+        if exit_code == CurlTransferEngine._CURL_EXIT_CODE_HTTP_ERROR:
+            # e.g. 'curl: (22) The requested URL returned error: 404'
+            if any([" {}".format(status) in stderr for status in (404, 410)]):
+                return TransferNotFoundException(message)
+            if any([" {}".format(status) in stderr for status in (401, 403, 407)]):
+                return TransferAuthException(message)
+        return TransferEngineException(message)
+
+    def download(self, url, dst_file_path, timeout, progress_callback=None,
+                 decompressed_file_path=None, keep_compressed=True, checksum=None):
+        if self._is_local_url(url):
+            return self._download_local_file(url, dst_file_path, progress_callback, decompressed_file_path,
+                                             keep_compressed, checksum)
+        offset = os.path.getsize(dst_file_path) if os.path.isfile(dst_file_path) else 0
+        download_subprocess = subprocess.Popen(['curl', '-s', '-S', '-f', '-L', '-C', '-', '-o', dst_file_path, url],
+                                               stdout=subprocess.PIPE,
+                                               stderr=subprocess.PIPE)
+        try:
+            (stdout, stderr) = download_subprocess.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            download_subprocess.kill()
+            download_subprocess.communicate()
+            raise TransferTimeoutException("Transfer of '{}' with curl TIMED OUT".format(url)) from e
+        if download_subprocess.returncode != 0:
+            message = "curl ERROR '{}' downloading '{}', STDOUT: |||> {} <|||, STDERR XXX> {} <XXX" \
+                .format(download_subprocess.returncode,
+                        url,
+                        stdout.decode('utf8'),
+                        stderr.decode('utf8'))
+            raise self._get_curl_error(download_subprocess.returncode, stderr.decode('utf8'), message)
+        size = os.path.getsize(dst_file_path) if os.path.isfile(dst_file_path) else 0
+        if progress_callback:
+            progress_callback(size)
+        self._process_local_file(dst_file_path, decompressed_file_path, keep_compressed, checksum)
+        return max(0, size - offset)
+
+    def list_folder(self, url, timeout):
+        if self._is_local_url(url):
+            return self._list_local_folder(url)
+        folder_url = url if url.endswith('/') else "{}/".format(url)
+        is_ftp = urlparse(url).scheme == 'ftp'
+        listing_subprocess = subprocess.Popen(['curl', '-s', '-S', '-f', '-L'] +
+                                              (['--list-only'] if is_ftp else []) +
+                                              [folder_url],
+                                              stdout=subprocess.PIPE,
+                                              stderr=subprocess.PIPE)
+        try:
+            (stdout, stderr) = listing_subprocess.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            listing_subprocess.kill()
+            listing_subprocess.communicate()
+            raise TransferTimeoutException("Listing of '{}' with curl TIMED OUT".format(url)) from e
+        if listing_subprocess.returncode != 0:
+            message = "curl ERROR '{}' listing '{}', STDERR XXX> {} <XXX" \
+                .format(listing_subprocess.returncode, url, stderr.decode('utf8'))
+            raise self._get_curl_error(listing_subprocess.returncode, stderr.decode('utf8'), message)
+        content = stdout.decode('utf-8', errors='replace')
+        if is_ftp:
+            return [entry.strip() for entry in content.splitlines() if entry.strip()]
+        return self._parse_folder_index(content)
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -24,5 +24,45 @@ class AgentException(AppException):
         super(AgentException, self).__init__(value)
 
 
+class TransferEngineException(AgentException):
+    def __init__(self, value):
+        super(TransferEngineException, self).__init__(value)
+
+
+class TransferTimeoutException(TransferEngineException):
+    def __init__(self, value):
+        super(TransferTimeoutException, self).__init__(value)
+
+
+class TransferNotFoundException(TransferEngineException):
+    def __init__(self, value):
+        super(TransferNotFoundException, self).__init__(value)
+
+
+class TransferAuthException(TransferEngineException):
+    def __init__(self, value):
+        super(TransferAuthException, self).__init__(value)
+
+
+class RangesNotSupportedException(TransferEngineException):
+    def __init__(self, value):
+        super(RangesNotSupportedException, self).__init__(value)
+
+
+class ChecksumException(AppException):
+    def __init__(self, value):
+        super(ChecksumException, self).__init__(value)
+
+
+class DownloadSchedulerException(AppException):
+    def __init__(self, value):
+        super(DownloadSchedulerException, self).__init__(value)
+
+
+class ConnectionPoolException(AppException):
+    def __init__(self, value):
+        super(ConnectionPoolException, self).__init__(value)
+
+
 if __name__ == '__main__':
     print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -11,31 +11,83 @@
 Download manager and its helper agents
 """
 
+import os
+import json
 import time
 import random
 import threading
-import subprocess
+from urllib.parse import urlparse
+# App imports
+from .scheduler import DownloadScheduler
+from .engines import TransferEngineFactory
+from .checksums import ChecksumFactory
+from .retry import RetryPolicy, RetryState, ExponentialBackoffRetryPolicy
+from .metrics import TransferMetrics, summarize, write_report
+from .exceptions import TransferEngineException
 
 
-class Agent(threading.Thread):
-    def __init__(self, url, dst_folder, download_attempts=32, timeout_attempts=3, download_timeout=600):
-        super(Agent, self).__init__()
+class Agent:
+    """
+    A download agent is a download job for a single URL, it is run by a worker thread of a download scheduler.
+
+    When asked to decompress the downloaded content, gzip compressed ('.gz') files are inflated while they are being
+    downloaded, into a file with the same name without the '.gz' extension, the compressed file is kept only if
+    requested.
+
+    Files are written as '<file name>.part', and they are renamed only once they are complete and, if an expected
+    checksum has been given, verified, so a file with its final name is always a good one.
+
+    Failed download attempts are retried according to a retry policy, by default, permanent errors (e.g. file not
+    found) are not retried, and transient ones are retried with exponential backoff, within an overall deadline.
+
+    Besides its result, an agent keeps structured metrics on its transfer, see 'get_metrics'.
+
+    The content of the URL can be fetched from alternative sources, e.g. a local mirror, they are tried, in the given
+    order, before the URL itself, and the agent falls back to the next source as soon as a source fails.
+    """
+    _COMPRESSED_FILE_EXTENSION = '.gz'
+    _PART_FILE_EXTENSION = '.part'
+
+    def __init__(self, url, dst_folder, download_attempts=32, timeout_attempts=3, download_timeout=600,
+                 transfer_engine=None, decompress=False, keep_compressed=False, expected_checksum=None,
+                 retry_policy=None, download_deadline=None, source_urls=None):
         self.__download_url = url
+        # Sources for the content of the URL, in order, the URL itself is the last resort
+        self.__source_urls = [source_url for source_url in (source_urls or []) if source_url != url] + [url]
+        self.__source_index = 0
+        self.__host = urlparse(url).netloc
         self.__dst_folder = dst_folder
         self.__download_attempts = download_attempts
         self.__timeout_attempts = timeout_attempts
         self.__download_timeout = download_timeout
         # Compute destination file name, using the same file name as in the given URL
         self.__dst_filename = url[url.rfind("/") + 1:]
-        # Prepare standard output and error output
-        self.__stdout = b' '
-        self.__stderr = b' '
-        # Result object
+        # Only gzip compressed files are inflated
+        self.__decompress = decompress and self.__dst_filename.endswith(self._COMPRESSED_FILE_EXTENSION)
+        self.__keep_compressed = keep_compressed
+        # Expected checksum for the downloaded file, as {'algorithm': ..., 'value': ...}
+        self.__expected_checksum = expected_checksum
+        self.__transfer_engine = transfer_engine
+        if self.__transfer_engine is None:
+            self.__transfer_engine = TransferEngineFactory.get_transfer_engine()
+        self.__retry_policy = retry_policy
+        if self.__retry_policy is None:
+            self.__retry_policy = ExponentialBackoffRetryPolicy(max_attempts=download_attempts,
+                                                                max_timeout_attempts=timeout_attempts,
+                                                                deadline=download_deadline)
+        # Number of bytes of the destination file received so far
+        self.__bytes_transferred = 0
+        # Result object, its message is built from the list of messages when requested
         self.__result = {'msg': '', 'success': True, 'url': str(self.__download_url)}
+        self.__messages = []
+        self.__metrics = TransferMetrics(self.__download_url)
+        # Number of bytes transferred by the last download attempt, if it succeeded
+        self.__attempt_bytes_transferred = None
         # Seed random module
         random.seed(time.time())
-        # We have everything we need, auto-start the thread
-        self.start()
+        # This agent is done when this event is set, no matter the outcome
+        self.__done = threading.Event()
+        self.__cancelled = threading.Event()
 
     def _build_result(self, msg, success=True):
         """
@@ -47,142 +99,193 @@ class Agent(threading.Thread):
         :param success: whether this extra informatoin makes the process successful or not
         :return: no value is returned
         """
-        self.__result['msg'] = self.__result['msg'] + "\n" + msg
+        self.__messages.append(msg)
         self.__result['success'] = self.__result['success'] and success
 
-    def __download_with_timeout(self):
+    def __report_progress(self, bytes_transferred):
         """
-        This is a helper method that will download the given URL setting a timeout limit.
-        :return: True if success
-        :except: a subprocess.TimeoutExpired exception is raised if the download can't be completed within the given
-        temporal constraints
+        Progress callback for the transfer engine
+        :param bytes_transferred: number of bytes of the destination file received so far
+        :return: no value is returned
         """
-        download_command = "cd " + str(self.get_dst_folder()) + "; curl -L -O -C - " + str(self.get_download_url())
-        download_subprocess = subprocess.Popen(download_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                               shell=True)
-        stdout = b' '
-        stderr = b' '
-        try:
-            self._build_result("Downloading '{}' with timeout set to {} seconds"
-                               .format(self.get_download_url(),
-                                       self.get_download_timeout()))
-            (stdout, stderr) = download_subprocess.communicate(timeout=self.get_download_timeout())
-        except subprocess.TimeoutExpired as exception_download_timeout:
-            self._build_result("Timeout ({} seconds) ERROR downloading '{}', STDOUT: |||> {} <|||, STDERR XXX> {} <XXX"
-                               .format(self.get_download_timeout(),
-                                       self.get_download_url(),
-                                       stdout.decode('utf8'),
-                                       stderr.decode('utf8')))
-            raise
-        # Let's check the result from downloading the file
-        if download_subprocess.poll() is not None:
-            if download_subprocess.returncode != 0:
-                # ERROR
-                self._build_result("ERROR downloading '{}', STDOUT: |||> {} <|||, STDERR XXX> {} <XXX"
-                                   .format(self.get_download_timeout(),
-                                           self.get_download_url(),
-                                           stdout.decode('utf8'),
-                                           stderr.decode('utf8')))
-                return False
-            # SUCCESS
-            self._build_result("SUCCESSFUL download for '{}', STDOUT: |||> {} <|||, STDERR XXX> {} <XXX"
-                               .format(self.get_download_timeout(),
-                                       self.get_download_url(),
-                                       stdout.decode('utf8'),
-                                       stderr.decode('utf8')))
-        else:
-            # TODO
-            # The child process is still running, and this is weird stuff because we are using a timeout parameter, we
-            # should never reach this part of the code
-            self._build_result("WEIRD DOWNLOAD - THE SUBPROCESS IS STILL RUNNING FOR '{}' DESPITE THE TIME OUT "
-                               "PARAMETER, STDOUT: |||> {} <|||, STDERR XXX> {} <XXX"
-                               .format(self.get_download_timeout(),
-                                       self.get_download_url(),
-                                       stdout.decode('utf8'),
-                                       stderr.decode('utf8')))
-            download_subprocess.kill()
-            return False
-        return True
+        self.__bytes_transferred = bytes_transferred
+        self.__metrics.record_progress(bytes_transferred)
 
-    def __download_with_timeout_attempts(self):
+    def __download_attempt(self, timeout):
         """
-        Download the given URL given a time constraint with a limited number of attempts upon timeout errors.
-        :return: True if success, False if we reached the maximum number of attempts
+        Make a single attempt at downloading the given URL, within the given time limit
+        :param timeout: maximum amount of time, in seconds, for this attempt
+        :return: None if the download succeeded, the failure type otherwise
         """
-        timeout_attempt_counter = 0
-        while timeout_attempt_counter < self.get_timeout_attempts():
-            self._build_result("Downloading '{}', timeout attempt #{} out of #{}"
+        self._build_result("Downloading '{}' from '{}' with timeout set to {:.0f} seconds"
+                           .format(self.get_download_url(), self.get_source_url(), timeout))
+        dst_part_file_path = self.__get_part_file_path(self.get_dst_file_path())
+        decompressed_part_file_path = None
+        if self.is_decompress():
+            decompressed_part_file_path = self.__get_part_file_path(self.get_decompressed_file_path())
+        checksum = None
+        if self.get_expected_checksum():
+            checksum = ChecksumFactory.get_checksum(self.get_expected_checksum()['algorithm'])
+        self.__attempt_bytes_transferred = None
+        try:
+            bytes_transferred = self.get_transfer_engine().download(self.get_source_url(),
+                                                                    dst_part_file_path,
+                                                                    timeout,
+                                                                    self.__report_progress,
+                                                                    decompressed_file_path=decompressed_part_file_path,
+                                                                    keep_compressed=self.is_keep_compressed(),
+                                                                    checksum=checksum)
+        except TransferEngineException as exception_download:
+            failure_type = self.get_retry_policy().classify_failure(exception_download)
+            self._build_result("ERROR ('{}') downloading '{}' from '{}', '{}'"
+                               .format(failure_type,
+                                       self.get_download_url(),
+                                       self.get_source_url(),
+                                       exception_download.value))
+            return failure_type
+        self.__attempt_bytes_transferred = bytes_transferred
+        self._build_result("SUCCESSFUL download for '{}', #{} bytes transferred, #{} bytes long"
+                           .format(self.get_download_url(),
+                                   bytes_transferred,
+                                   self.get_bytes_transferred()))
+        if checksum and (checksum.get_value() != self.get_expected_checksum()['value']):
+            self._build_result("CHECKSUM MISMATCH for '{}', '{}' checksum is '{}', expected '{}'"
                                .format(self.get_download_url(),
-                                       timeout_attempt_counter,
-                                       self.get_timeout_attempts()))
-            timeout_attempt_counter += 1
-            try:
-                return self.__download_with_timeout()
-            except subprocess.TimeoutExpired as exception_download_timeout:
-                self._build_result("Download of '{}' TIMED OUT, timeout attempt #{} out of #{}"
-                                   .format(self.get_download_url(),
-                                           timeout_attempt_counter,
-                                           self.get_timeout_attempts()))
-                # wait for a random amount of time before retrying the download
-                # WARNING! - MAGIC NUMBER AHEAD!!!
-                time.sleep(random.randint(0, 60))
-        return False
+                                       checksum.algorithm,
+                                       checksum.get_value(),
+                                       self.get_expected_checksum()['value']))
+            # The data is corrupted, there is nothing worth resuming from
+            self.__remove_files([dst_part_file_path, decompressed_part_file_path])
+            return RetryPolicy.FAILURE_NETWORK
+        # Accept the file(s)
+        if os.path.isfile(dst_part_file_path):
+            os.replace(dst_part_file_path, self.get_dst_file_path())
+        if decompressed_part_file_path:
+            os.replace(decompressed_part_file_path, self.get_decompressed_file_path())
+            self._build_result("'{}' INFLATED into '{}'".format(self.get_download_url(),
+                                                                self.get_decompressed_file_path()))
+        return None
 
     def run(self):
         """
-        This is the main thread for the download agent
+        This is the main algorithm for the download agent, it is run by a download worker
         :return: no value is returned
         """
+        try:
+            self.__run_download()
+        finally:
+            self.__done.set()
+
+    def __run_download(self):
         # TODO - Validate URL
-        attempt_counter = 0
-        download_completion = False
-        while attempt_counter < self.get_download_attempts():
-            attempt_counter += 1
-            self._build_result("Downloading '{}', download attempt #{} out of #{}"
-                               .format(self.get_download_url(),
-                                       attempt_counter,
-                                       self.get_download_attempts()))
+        self.get_metrics().start()
+        if self.__cancelled.is_set():
+            self._build_result("Download for '{}' CANCELLED before it started".format(self.get_download_url()), False)
+            self.get_metrics().finish(TransferMetrics.STATUS_CANCELLED)
+            return
+        retry_state = RetryState()
+        final_status = TransferMetrics.STATUS_FAILED
+        while not self.__cancelled.is_set():
+            remaining_time = self.get_retry_policy().get_remaining_time(retry_state)
+            if (remaining_time is not None) and (remaining_time <= 0):
+                self._build_result("Download for '{}' FAILED, deadline REACHED after #{} attempts"
+                                   .format(self.get_download_url(), retry_state.count_attempts), False)
+                break
+            timeout = self.get_download_timeout()
+            if remaining_time is not None:
+                timeout = min(timeout, remaining_time)
+            retry_state.start_attempt()
+            self.get_metrics().start_attempt()
+            self._build_result("Downloading '{}', download attempt #{}"
+                               .format(self.get_download_url(), retry_state.count_attempts))
             try:
-                download_completion = self.__download_with_timeout_attempts()
-                if download_completion:
-                    # Quit as soon as we succeed on downloading the file
-                    break
+                failure_type = self.__download_attempt(timeout)
             except Exception as e:
-                self._build_result("ERROR downloading '{}', on download attempt #{} out of #{}, ERROR: {}"
-                                   .format(self.get_download_url(),
-                                           attempt_counter,
-                                           self.get_download_attempts(),
+                failure_type = self.get_retry_policy().classify_failure(e)
+                self._build_result("UNEXPECTED ERROR ('{}') downloading '{}', on download attempt #{}, ERROR: {}"
+                                   .format(failure_type,
+                                           self.get_download_url(),
+                                           retry_state.count_attempts,
                                            str(e)))
-        if download_completion:
-            self._build_result("Download for '{}' COMPLETED, on download attempt #{} out of #{}"
-                               .format(self.get_download_url(),
-                                       attempt_counter,
-                                       self.get_download_attempts()),
-                               True)
+            self.get_metrics().end_attempt(self.__attempt_bytes_transferred, failure_type)
+            if failure_type is None:
+                self._build_result("Download for '{}' COMPLETED, on download attempt #{}"
+                                   .format(self.get_download_url(), retry_state.count_attempts), True)
+                self.get_metrics().finish(TransferMetrics.STATUS_COMPLETED, self.get_bytes_transferred())
+                return
+            if failure_type == RetryPolicy.FAILURE_TIMEOUT:
+                self.get_metrics().record_timeout()
+            if self.__source_index < (len(self.__source_urls) - 1):
+                # Alternative sources are not retried, the next one is tried straight away
+                self.__source_index += 1
+                self._build_result("Download for '{}' FALLING BACK to '{}'"
+                                   .format(self.get_download_url(), self.get_source_url()))
+                continue
+            retry_state.record_failure(failure_type)
+            retry_delay = self.get_retry_policy().get_retry_delay(retry_state)
+            if retry_delay is None:
+                self._build_result("Download for '{}' FAILED, NOT RETRYING after '{}' failure on download attempt #{}"
+                                   .format(self.get_download_url(), failure_type, retry_state.count_attempts),
+                                   False)
+                break
+            remaining_time = self.get_retry_policy().get_remaining_time(retry_state)
+            if (remaining_time is not None) and (retry_delay >= remaining_time):
+                self._build_result("Download for '{}' FAILED, NO TIME LEFT for another attempt after #{} attempts"
+                                   .format(self.get_download_url(), retry_state.count_attempts), False)
+                break
+            self._build_result("Retrying download for '{}' in {:.1f} seconds"
+                               .format(self.get_download_url(), retry_delay))
+            # Waiting is cut short if the download is cancelled
+            self.__cancelled.wait(retry_delay)
         else:
-            self._build_result("Download for '{}' FAILED, on download attempt #{} out of #{}"
-                               .format(self.get_download_url(),
-                                       attempt_counter,
-                                       self.get_download_attempts()),
-                               False)
+            self._build_result("Download for '{}' CANCELLED after #{} attempts"
+                               .format(self.get_download_url(), retry_state.count_attempts), False)
+            final_status = TransferMetrics.STATUS_CANCELLED
+        self.__remove_leftovers()
+        self.get_metrics().finish(final_status)
+
+    @staticmethod
+    def __get_part_file_path(file_path):
+        return "{}{}".format(file_path, Agent._PART_FILE_EXTENSION)
+
+    @staticmethod
+    def __remove_files(file_paths):
+        for file_path in file_paths:
+            if file_path and os.path.isfile(file_path):
+                os.remove(file_path)
+
+    def __remove_leftovers(self):
+        """
+        Get rid of the files that can't be used for resuming a failed download, i.e. the incomplete uncompressed file
+        and, if not to be kept, the compressed one
+        :return: no value is returned
+        """
+        if not self.is_decompress():
+            return
+        leftovers = [self.__get_part_file_path(self.get_decompressed_file_path())]
+        if not self.is_keep_compressed():
+            leftovers.append(self.__get_part_file_path(self.get_dst_file_path()))
+        self.__remove_files(leftovers)
 
     def cancel(self):
         """
-        I think this is the way to stop the thread, but I'm not sure, because the documentation about it is a little bit
-        tricky, or I didn't find the right documentation.
+        Cancel this download, if it has not been started yet, it will never be, otherwise, no more download attempts
+        will be made once the current one finishes.
         :return: no value is returned
         """
-        self.alive = False
-        self.join()
+        self.__cancelled.set()
 
     def wait(self):
         """
-        Wait for this thread to finish its job (download a file), and get the result object.
+        Wait for this agent to finish its job (download a file), and get the result object.
         :return: result object with information on the finished download process
         """
-        self.join()
+        self.__done.wait()
         return self.get_result()
 
+    def is_done(self):
+        return self.__done.is_set()
+
     def get_result(self):
         """
         Get the result object built by this Agent.
@@ -190,17 +293,70 @@ class Agent(threading.Thread):
         This method should be called when the agent finishes its job, but not in the middle of it.
         :return: result object with information on the finished download process
         """
+        self.__result['msg'] = "\n".join(self.__messages)
         return self.__result
 
+    def get_metrics(self):
+        """
+        Get the metrics on the transfer made by this agent, they are complete only when the agent finishes its job
+        :return: a TransferMetrics instance
+        """
+        return self.__metrics
+
     def get_dst_folder(self):
         return self.__dst_folder
 
+    def get_dst_file_path(self):
+        return os.path.join(self.get_dst_folder(), self.__dst_filename)
+
+    def get_decompressed_file_path(self):
+        """
+        Get the path to the uncompressed file, if this agent inflates the downloaded content
+        :return: the path to the uncompressed file, or None if the downloaded content is not inflated
+        """
+        if not self.is_decompress():
+            return None
+        return self.get_dst_file_path()[:-len(self._COMPRESSED_FILE_EXTENSION)]
+
+    def is_decompress(self):
+        return self.__decompress
+
+    def is_keep_compressed(self):
+        return self.__keep_compressed
+
+    def get_expected_checksum(self):
+        return self.__expected_checksum
+
+    def get_transfer_engine(self):
+        return self.__transfer_engine
+
+    def get_retry_policy(self):
+        return self.__retry_policy
+
+    def get_bytes_transferred(self):
+        """
+        Get the number of bytes of the destination file received so far, it can be used for checking on the progress
+        of the download while it is running
+        :return: number of bytes
+        """
+        return self.__bytes_transferred
+
     def get_download_timeout(self):
         return self.__download_timeout
 
     def get_download_url(self):
         return self.__download_url
 
+    def get_source_url(self):
+        """
+        Get the source the content of the URL is being fetched from
+        :return: the URL of the current source
+        """
+        return self.__source_urls[self.__source_index]
+
+    def get_host(self):
+        return self.__host
+
     def get_timeout_attempts(self):
         return self.__timeout_attempts
 
@@ -209,14 +365,43 @@ class Agent(threading.Thread):
 
 
 class Manager:
+    """
+    The download manager submits one download agent per URL to a download scheduler, and it collects their results.
+
+    A scheduler can be shared among different download managers, so the concurrency limits apply to all of them, if no
+    scheduler is given, the manager will use its own.
+
+    Gzip compressed files can be inflated while they are downloaded, see 'decompress' and 'keep_compressed', and the
+    downloaded files can be verified against their expected checksums, given as a map from URL to expected checksum.
+
+    Alternative sources for the URLs, e.g. a local mirror, can be given as a map from URL to its list of sources, see
+    'Agent'.
+
+    Retry policies keep no state of their own, so the same retry policy, if given, is used by all the download agents.
+
+    Once the downloads are finished, the metrics of every transfer are available, as well as a summary of them, and
+    they can be written to a JSON lines report file.
+    """
+
     def __init__(self, urls, download_destination_folder, logger, download_attempts=32, timeout_attempts=3,
-                 download_timeout=600):
+                 download_timeout=600, scheduler=None, priority=DownloadScheduler.PRIORITY_NORMAL,
+                 transfer_engine=None, decompress=False, keep_compressed=False, expected_checksums=None,
+                 retry_policy=None, download_deadline=None, source_urls=None):
         self.__urls = urls
         self.__download_destination_folder = download_destination_folder
         self.__logger = logger
         self.__download_attempts = download_attempts
         self.__timeout_attempts = timeout_attempts
         self.__download_timeout = download_timeout
+        self.__scheduler = scheduler
+        self.__priority = priority
+        self.__transfer_engine = transfer_engine
+        self.__decompress = decompress
+        self.__keep_compressed = keep_compressed
+        self.__expected_checksums = expected_checksums or {}
+        self.__retry_policy = retry_policy
+        self.__download_deadline = download_deadline
+        self.__source_urls = source_urls or {}
         self.__agents = {}
         self.__success = True
 
@@ -242,13 +427,21 @@ class Manager:
 
     def start_downloads(self):
         for url in self.get_urls_to_download():
-            self._get_logger().debug("Launching download agent for URL '{}'".format(url))
-            self.__add_agent_for_url(url,
-                                     Agent(url,
-                                           self.get_download_destination_folder(),
-                                           download_attempts=self.get_download_attempts(),
-                                           timeout_attempts=self.get_timeout_attempts(),
-                                           download_timeout=self.get_download_timeout()))
+            self._get_logger().debug("Queueing download agent for URL '{}'".format(url))
+            agent = Agent(url,
+                          self.get_download_destination_folder(),
+                          download_attempts=self.get_download_attempts(),
+                          timeout_attempts=self.get_timeout_attempts(),
+                          download_timeout=self.get_download_timeout(),
+                          transfer_engine=self.get_transfer_engine(),
+                          decompress=self.is_decompress(),
+                          keep_compressed=self.is_keep_compressed(),
+                          expected_checksum=self.get_expected_checksums().get(url),
+                          retry_policy=self.get_retry_policy(),
+                          download_deadline=self.get_download_deadline(),
+                          source_urls=self.get_source_urls().get(url))
+            self.__add_agent_for_url(url, agent)
+            self.get_scheduler().submit(agent, self.__priority)
 
     def wait_all(self):
         self._get_logger().debug("Waiting for #{} download agents to finish"
@@ -263,10 +456,70 @@ class Manager:
                 self._get_logger().error(result['msg'])
                 self.__set_fail()
         self.__set_success()
+        self._get_logger().debug("Download metrics summary: {}".format(json.dumps(self.get_summary())))
 
     def is_success(self):
         return self.__success
 
+    def get_successful_urls(self):
+        """
+        Get the URLs that have been successfully downloaded, this should be called once all the downloads are finished
+        :return: list of URLs
+        """
+        return [url for (url, agent) in self.__get_agent_entries() if agent.is_done() and agent.get_result()['success']]
+
+    def get_metrics(self):
+        """
+        Get the metrics of the transfers made by this download manager, this should be called once all the downloads
+        are finished
+        :return: list of TransferMetrics, one per URL
+        """
+        return [agent.get_metrics() for (url, agent) in self.__get_agent_entries()]
+
+    def get_summary(self):
+        """
+        Get a summary of the metrics of the transfers made by this download manager, overall and per host
+        :return: dictionary with the summary, see 'download_manager.metrics.summarize'
+        """
+        return summarize(self.get_metrics())
+
+    def write_metrics_report(self, report_file_path, append=True):
+        """
+        Write the metrics of the transfers made by this download manager as a JSON lines report, one transfer per line
+        :param report_file_path: path to the report file
+        :param append: whether to add the transfers to the report file, or to overwrite it
+        :return: no return value
+        """
+        write_report(self.get_metrics(), report_file_path, append)
+
+    def get_transfer_engine(self):
+        if self.__transfer_engine is None:
+            self.__transfer_engine = TransferEngineFactory.get_transfer_engine()
+        return self.__transfer_engine
+
+    def is_decompress(self):
+        return self.__decompress
+
+    def is_keep_compressed(self):
+        return self.__keep_compressed
+
+    def get_expected_checksums(self):
+        return self.__expected_checksums
+
+    def get_retry_policy(self):
+        return self.__retry_policy
+
+    def get_download_deadline(self):
+        return self.__download_deadline
+
+    def get_source_urls(self):
+        return self.__source_urls
+
+    def get_scheduler(self):
+        if self.__scheduler is None:
+            self.__scheduler = DownloadScheduler()
+        return self.__scheduler
+
     def get_urls_to_download(self):
         return self.__urls
 
@@ -0,0 +1,212 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 17:05
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Structured metrics for downloads.
+
+Every download agent records, for its transfer, how many bytes went through the network, how long it took, how long it
+took to get the first byte of data, its average and peak throughput, how many attempts it needed, how many of them
+timed out, and how it finished. Metrics for a collection of transfers can be summarized, e.g. per host, for spotting
+slow mirrors, and they can be written as a JSON lines report, one transfer per line.
+"""
+
+import json
+import time
+from urllib.parse import urlparse
+
+
+class TransferMetrics:
+    """
+    Metrics for the transfer of a single URL, including all its download attempts
+    """
+    # Final status of a transfer
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    # WARNING! - MAGIC NUMBER AHEAD!!! - peak throughput is measured over windows of, at least, this number of seconds
+    _PEAK_THROUGHPUT_WINDOW = 1.0
+
+    def __init__(self, url):
+        self.url = url
+        self.host = urlparse(url).netloc
+        self.start_time = None
+        self.end_time = None
+        self.status = self.STATUS_PENDING
+        self.attempts = 0
+        self.timeouts = 0
+        # Failure type -> number of failed attempts with that type of failure
+        self.failures = {}
+        # Bytes received from the network, by all the attempts
+        self.bytes_transferred = 0
+        # Size of the downloaded file
+        self.file_size = None
+        # Time spent in download attempts, i.e. not waiting between them
+        self.transfer_time = 0.0
+        self.time_to_first_byte = None
+        self.peak_throughput = None
+        # State of the current attempt
+        self.__attempt_start_time = None
+        self.__attempt_first_progress = None
+        self.__attempt_last_progress = None
+        self.__window_start = None
+
+    def start(self):
+        self.start_time = time.time()
+
+    def start_attempt(self):
+        self.attempts += 1
+        self.__attempt_start_time = time.time()
+        self.__attempt_first_progress = None
+        self.__attempt_last_progress = None
+        self.__window_start = None
+
+    def record_progress(self, bytes_so_far):
+        """
+        Record the progress of the current attempt
+        :param bytes_so_far: number of bytes of the destination file received so far, as reported by the transfer
+        engine
+        :return: no return value
+        """
+        now = time.time()
+        if self.__attempt_first_progress is None:
+            self.__attempt_first_progress = bytes_so_far
+            self.__window_start = (now, bytes_so_far)
+            if self.time_to_first_byte is None:
+                self.time_to_first_byte = now - self.__attempt_start_time
+        self.__attempt_last_progress = bytes_so_far
+        window_start_time, window_start_bytes = self.__window_start
+        if (now - window_start_time) >= self._PEAK_THROUGHPUT_WINDOW:
+            throughput = (bytes_so_far - window_start_bytes) / (now - window_start_time)
+            self.peak_throughput = max(self.peak_throughput or 0, throughput)
+            self.__window_start = (now, bytes_so_far)
+
+    def end_attempt(self, bytes_transferred=None, failure_type=None):
+        """
+        Record the outcome of the current attempt
+        :param bytes_transferred: number of bytes transferred by the attempt, if known, otherwise it is estimated from
+        its progress
+        :param failure_type: type of failure, if the attempt failed
+        :return: no return value
+        """
+        self.transfer_time += time.time() - self.__attempt_start_time
+        if bytes_transferred is None:
+            bytes_transferred = 0
+            if self.__attempt_first_progress is not None:
+                # The first chunk of the attempt is not accounted for, as we don't know where the attempt started from
+                bytes_transferred = max(0, self.__attempt_last_progress - self.__attempt_first_progress)
+        self.bytes_transferred += bytes_transferred
+        if failure_type:
+            self.failures[failure_type] = self.failures.get(failure_type, 0) + 1
+
+    def record_timeout(self):
+        self.timeouts += 1
+
+    def finish(self, status, file_size=None):
+        """
+        Record the end of the transfer
+        :param status: final status of the transfer
+        :param file_size: size of the downloaded file, if any
+        :return: no return value
+        """
+        self.end_time = time.time()
+        self.status = status
+        self.file_size = file_size
+        if (self.peak_throughput is None) and self.bytes_transferred:
+            # The transfer was too short for measuring its throughput over a whole window
+            self.peak_throughput = self.get_average_throughput()
+
+    def get_duration(self):
+        if self.start_time is None:
+            return None
+        return (self.end_time or time.time()) - self.start_time
+
+    def get_average_throughput(self):
+        """
+        Average throughput, in bytes per second, while transferring data, i.e. not counting the waits between attempts
+        :return: average throughput, None if unknown
+        """
+        if not (self.transfer_time and self.bytes_transferred):
+            return None
+        return self.bytes_transferred / self.transfer_time
+
+    def to_dict(self):
+        return {'url': self.url,
+                'host': self.host,
+                'status': self.status,
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                'duration': self.get_duration(),
+                'transfer_time': self.transfer_time,
+                'bytes_transferred': self.bytes_transferred,
+                'file_size': self.file_size,
+                'time_to_first_byte': self.time_to_first_byte,
+                'average_throughput': self.get_average_throughput(),
+                'peak_throughput': self.peak_throughput,
+                'attempts': self.attempts,
+                'timeouts': self.timeouts,
+                'failures': dict(self.failures)}
+
+
+def summarize(transfer_metrics):
+    """
+    Aggregate the metrics of a collection of transfers, overall and per host
+    :param transfer_metrics: list of TransferMetrics
+    :return: dictionary with the summary
+    """
+    def aggregate(metrics):
+        time_to_first_byte = [m.time_to_first_byte for m in metrics if m.time_to_first_byte is not None]
+        start_times = [m.start_time for m in metrics if m.start_time is not None]
+        end_times = [m.end_time for m in metrics if m.end_time is not None]
+        transfer_time = sum([m.transfer_time for m in metrics])
+        bytes_transferred = sum([m.bytes_transferred for m in metrics])
+        statuses = {}
+        for m in metrics:
+            statuses[m.status] = statuses.get(m.status, 0) + 1
+        return {'transfers': len(metrics),
+                'statuses': statuses,
+                'bytes_transferred': bytes_transferred,
+                'wall_time': (max(end_times) - min(start_times)) if (start_times and end_times) else None,
+                'transfer_time': transfer_time,
+                # Throughput of a single transfer, on average, as concurrent transfers overlap in time
+                'average_throughput': (bytes_transferred / transfer_time) if transfer_time else None,
+                'peak_throughput': max([m.peak_throughput for m in metrics if m.peak_throughput is not None],
+                                       default=None),
+                'average_time_to_first_byte': (sum(time_to_first_byte) / len(time_to_first_byte))
+                if time_to_first_byte else None,
+                'max_time_to_first_byte': max(time_to_first_byte, default=None),
+                'attempts': sum([m.attempts for m in metrics]),
+                'timeouts': sum([m.timeouts for m in metrics])}
+
+    hosts = {}
+    for metrics in transfer_metrics:
+        hosts.setdefault(metrics.host, []).append(metrics)
+    summary = aggregate(transfer_metrics)
+    if summary['wall_time']:
+        # Throughput of all the transfers together
+        summary['aggregate_throughput'] = summary['bytes_transferred'] / summary['wall_time']
+    summary['hosts'] = {host: aggregate(hosts[host]) for host in hosts}
+    return summary
+
+
+def write_report(transfer_metrics, report_file_path, append=True):
+    """
+    Write the metrics of the given transfers as a JSON lines report, one transfer per line
+    :param transfer_metrics: list of TransferMetrics
+    :param report_file_path: path to the report file
+    :param append: whether to add the transfers to the report file, or to overwrite it
+    :return: no return value
+    """
+    with open(report_file_path, 'a' if append else 'w') as report_file:
+        for metrics in transfer_metrics:
+            report_file.write("{}\n".format(json.dumps(metrics.to_dict(), sort_keys=True)))
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
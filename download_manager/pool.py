@@ -0,0 +1,204 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 16:10
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Connection pool for transfer engines.
+
+Opening an FTP session means connecting, logging in and setting the transfer type, and opening an HTTPS one means
+connecting and a TLS handshake. Most of the files we fetch live on the same few hosts, so, instead of paying that price
+for every file, open connections are kept in a pool, per host, when a transfer is done, and they are handed to the next
+transfer for the same host.
+
+Connections are pooled by (scheme, host, port, user), there is a maximum number of connections, in use or idle, per
+host, and connections that have been idle for too long are closed, as the server is likely to have dropped them anyway.
+"""
+
+import time
+import threading
+from urllib.parse import urlparse, unquote
+# App imports
+import config_manager
+from .exceptions import ConnectionPoolException, TransferTimeoutException
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of open connections, the pool knows nothing about the connections it holds, other than they can be
+    closed, new connections are opened by the caller provided 'connect' callable.
+    """
+    # WARNING! - MAGIC NUMBER AHEAD!!!
+    _DEFAULT_PORTS = {'ftp': 21, 'http': 80, 'https': 443}
+
+    def __init__(self, max_connections_per_host=8, idle_timeout=30):
+        """
+        :param max_connections_per_host: maximum number of open connections, in use or idle, per host
+        :param idle_timeout: connections idle for longer than this amount of time, in seconds, are closed
+        """
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        if max_connections_per_host < 1:
+            raise ConnectionPoolException("INVALID maximum number of connections per host '{}'"
+                                          .format(max_connections_per_host))
+        self.__max_connections_per_host = max_connections_per_host
+        self.__idle_timeout = idle_timeout
+        self.__condition = threading.Condition()
+        # Pool key -> list of (connection, point in time when it became idle), most recently used last
+        self.__idle_connections = {}
+        # Pool key -> number of connections handed out
+        self.__count_in_use = {}
+
+    @staticmethod
+    def get_pool_key(url):
+        """
+        Get the key that identifies the connections that can be used for the given URL
+        :param url: URL
+        :return: (scheme, host, port, user)
+        """
+        parsed_url = urlparse(url)
+        return (parsed_url.scheme,
+                parsed_url.hostname,
+                parsed_url.port or ConnectionPool._DEFAULT_PORTS.get(parsed_url.scheme),
+                unquote(parsed_url.username or ''))
+
+    @staticmethod
+    def __close_connection(connection):
+        try:
+            connection.close()
+        except Exception:
+            # There is nothing we can do about it, and the connection is gone anyway
+            pass
+
+    def __remove_expired_connections(self):
+        # This method must be called holding the pool lock, it returns the expired connections, for closing them
+        # outside of the lock
+        expired_connections = []
+        now = time.time()
+        for pool_key in list(self.__idle_connections.keys()):
+            idle_connections = self.__idle_connections[pool_key]
+            expired_connections.extend([connection for connection, idle_since in idle_connections
+                                        if (now - idle_since) > self.__idle_timeout])
+            self.__idle_connections[pool_key] = [(connection, idle_since) for connection, idle_since in idle_connections
+                                                 if (now - idle_since) <= self.__idle_timeout]
+            if not self.__idle_connections[pool_key]:
+                del self.__idle_connections[pool_key]
+        return expired_connections
+
+    def __get_count_connections(self, pool_key):
+        # This method must be called holding the pool lock
+        return self.__count_in_use.get(pool_key, 0) + len(self.__idle_connections.get(pool_key, []))
+
+    def acquire(self, url, connect, is_alive=None, timeout=None):
+        """
+        Get a connection for the given URL, an idle one from the pool if available, a new one otherwise, waiting for
+        one of the connections in use to be released when the host has reached its maximum number of connections.
+
+        The connection must be given back to the pool, via 'release', when done with it.
+        :param url: URL the connection is for
+        :param connect: callable that, given the URL, opens a new connection for it
+        :param is_alive: if given, callable that, given an idle connection, tells whether it can still be used or not
+        :param timeout: maximum amount of time, in seconds, to wait for a connection, None means forever
+        :return: (connection, True if it is a reused connection, False if it is a new one)
+        :except: TransferTimeoutException if no connection became available within the given timeout
+        """
+        pool_key = self.get_pool_key(url)
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            connection = None
+            expired_connections = []
+            try:
+                with self.__condition:
+                    while True:
+                        expired_connections.extend(self.__remove_expired_connections())
+                        if self.__idle_connections.get(pool_key):
+                            connection, idle_since = self.__idle_connections[pool_key].pop()
+                            if not self.__idle_connections[pool_key]:
+                                del self.__idle_connections[pool_key]
+                            break
+                        if self.__get_count_connections(pool_key) < self.__max_connections_per_host:
+                            break
+                        remaining_time = None if deadline is None else deadline - time.time()
+                        if (remaining_time is not None) and (remaining_time <= 0):
+                            raise TransferTimeoutException("TIMED OUT waiting for a connection to '{}'".format(url))
+                        self.__condition.wait(remaining_time)
+                    # Take the slot for the connection, either the reused or the new one
+                    self.__count_in_use[pool_key] = self.__count_in_use.get(pool_key, 0) + 1
+            finally:
+                for expired_connection in expired_connections:
+                    self.__close_connection(expired_connection)
+            if connection is not None:
+                try:
+                    alive = (is_alive is None) or is_alive(connection)
+                except Exception:
+                    self.release(url, connection, reusable=False)
+                    raise
+                if alive:
+                    self._logger.debug("REUSING connection to '{}'".format(pool_key))
+                    return connection, True
+                # The server dropped it, try with the next one
+                self.release(url, connection, reusable=False)
+                continue
+            try:
+                connection = connect(url)
+            except Exception:
+                self.release(url, None, reusable=False)
+                raise
+            self._logger.debug("NEW connection to '{}'".format(pool_key))
+            return connection, False
+
+    def release(self, url, connection, reusable=True):
+        """
+        Give back a connection obtained via 'acquire', it will be closed if it can't be reused
+        :param url: URL the connection was acquired for
+        :param connection: the connection
+        :param reusable: whether the connection can be used for another transfer or not, e.g. after an error or an
+        incomplete transfer, it can't
+        :return: no return value
+        """
+        pool_key = self.get_pool_key(url)
+        with self.__condition:
+            self.__count_in_use[pool_key] -= 1
+            if not self.__count_in_use[pool_key]:
+                del self.__count_in_use[pool_key]
+            if reusable and (connection is not None):
+                self.__idle_connections.setdefault(pool_key, []).append((connection, time.time()))
+            expired_connections = self.__remove_expired_connections()
+            self.__condition.notify_all()
+        if (not reusable) and (connection is not None):
+            expired_connections.append(connection)
+        for expired_connection in expired_connections:
+            self.__close_connection(expired_connection)
+
+    def close_idle_connections(self):
+        """
+        Close all the idle connections in the pool, connections in use are not affected
+        :return: no return value
+        """
+        with self.__condition:
+            idle_connections = [connection
+                                for pool_key in self.__idle_connections
+                                for connection, idle_since in self.__idle_connections[pool_key]]
+            self.__idle_connections = {}
+            self.__condition.notify_all()
+        for connection in idle_connections:
+            self.__close_connection(connection)
+
+    def get_count_idle_connections(self):
+        with self.__condition:
+            return sum([len(idle_connections) for idle_connections in self.__idle_connections.values()])
+
+    def get_max_connections_per_host(self):
+        return self.__max_connections_per_host
+
+    def get_idle_timeout(self):
+        return self.__idle_timeout
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -0,0 +1,138 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 15:20
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Retry policies for download agents.
+
+Failed download attempts are classified by the kind of failure, a retry policy decides, given the history of failures
+for a download, whether to retry it and after how long, within an overall deadline for the download.
+"""
+
+import abc
+import time
+import random
+# App imports
+from .exceptions import TransferNotFoundException, TransferAuthException, TransferTimeoutException
+
+
+class RetryState:
+    """
+    History of attempts and failures of a single download
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.count_attempts = 0
+        # Failure type -> number of failures of that type
+        self.count_failures = {}
+        self.last_failure = None
+
+    def start_attempt(self):
+        self.count_attempts += 1
+
+    def record_failure(self, failure_type):
+        self.count_failures[failure_type] = self.count_failures.get(failure_type, 0) + 1
+        self.last_failure = failure_type
+
+    def get_count_failures(self, failure_type):
+        return self.count_failures.get(failure_type, 0)
+
+    def get_elapsed_time(self):
+        return time.time() - self.start_time
+
+
+class RetryPolicy(metaclass=abc.ABCMeta):
+    """
+    A retry policy decides whether a failed download should be retried or not, and when
+    """
+    # Failure types
+    FAILURE_NOT_FOUND = 'not_found'
+    FAILURE_AUTH = 'auth'
+    FAILURE_NETWORK = 'network'
+    FAILURE_TIMEOUT = 'timeout'
+
+    def __init__(self, deadline=None):
+        """
+        :param deadline: maximum amount of time, in seconds, for a download, including all its attempts and the waits
+        between them, None means no limit
+        """
+        self.deadline = deadline
+
+    @staticmethod
+    def classify_failure(exception):
+        """
+        Work out the kind of failure from the error that made a download attempt fail
+        :param exception: error raised by the download attempt
+        :return: failure type
+        """
+        if isinstance(exception, TransferNotFoundException):
+            return RetryPolicy.FAILURE_NOT_FOUND
+        if isinstance(exception, TransferAuthException):
+            return RetryPolicy.FAILURE_AUTH
+        if isinstance(exception, TransferTimeoutException):
+            return RetryPolicy.FAILURE_TIMEOUT
+        # Anything else, e.g. connection errors, interrupted or corrupted transfers, may go away on a new attempt
+        return RetryPolicy.FAILURE_NETWORK
+
+    def get_remaining_time(self, retry_state):
+        """
+        Get the amount of time left until the deadline for the download
+        :param retry_state: history of the download
+        :return: remaining time, in seconds, or None if there is no deadline
+        """
+        if self.deadline is None:
+            return None
+        return self.deadline - retry_state.get_elapsed_time()
+
+    @abc.abstractmethod
+    def get_retry_delay(self, retry_state):
+        """
+        Decide whether to retry a download after its last failure
+        :param retry_state: history of the download, including its last failure
+        :return: amount of time, in seconds, to wait before the next attempt, or None if the download should not be
+        retried
+        """
+        ...
+
+
+class ExponentialBackoffRetryPolicy(RetryPolicy):
+    """
+    Permanent failures, i.e. the file is not there or we are not allowed to get it, are not retried at all. Transient
+    failures are retried, with an exponentially growing delay with full jitter between attempts, up to a maximum number
+    of attempts, and a maximum number of those attempts can time out.
+    """
+
+    def __init__(self, max_attempts=32, max_timeout_attempts=3, base_delay=1, max_delay=60, deadline=None):
+        """
+        :param max_attempts: maximum number of download attempts
+        :param max_timeout_attempts: maximum number of download attempts that can time out
+        :param base_delay: delay, in seconds, before the first retry, the upper bound for the delay doubles with every
+        retry
+        :param max_delay: maximum delay, in seconds, between attempts
+        :param deadline: maximum amount of time, in seconds, for the whole download, None means no limit
+        """
+        super().__init__(deadline)
+        self.max_attempts = max_attempts
+        self.max_timeout_attempts = max_timeout_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_retry_delay(self, retry_state):
+        if retry_state.last_failure in (self.FAILURE_NOT_FOUND, self.FAILURE_AUTH):
+            return None
+        if retry_state.count_attempts >= self.max_attempts:
+            return None
+        if retry_state.get_count_failures(self.FAILURE_TIMEOUT) >= self.max_timeout_attempts:
+            return None
+        delay_cap = min(self.max_delay, self.base_delay * (2 ** (retry_state.count_attempts - 1)))
+        return random.uniform(0, delay_cap)
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
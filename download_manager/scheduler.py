@@ -0,0 +1,166 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 09:05
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Download scheduler, a bounded pool of worker threads that take download jobs from a priority (FIFO within the same
+priority) work queue, honoring a global limit on concurrent transfers as well as a per host limit
+"""
+
+import bisect
+import itertools
+import threading
+# App imports
+import config_manager
+from .exceptions import DownloadSchedulerException
+
+
+class DownloadScheduler:
+    """
+    Download jobs (agents) are submitted to the scheduler, that will run them on a pool of worker threads. Workers are
+    spawned on demand, never more than the configured maximum number of concurrent downloads, and they finish when
+    there is no more work in the queue.
+
+    A job is only handed to a worker when its host has not reached the maximum number of concurrent downloads per host,
+    otherwise, the next job in the queue, for a different host, will be picked up instead.
+    """
+    # Lower values are served first
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 50
+    PRIORITY_LOW = 100
+
+    def __init__(self, max_concurrent_downloads=8, max_concurrent_downloads_per_host=4):
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        if max_concurrent_downloads < 1:
+            raise DownloadSchedulerException("INVALID maximum number of concurrent downloads '{}'"
+                                             .format(max_concurrent_downloads))
+        if max_concurrent_downloads_per_host < 1:
+            raise DownloadSchedulerException("INVALID maximum number of concurrent downloads per host '{}'"
+                                             .format(max_concurrent_downloads_per_host))
+        self.__max_concurrent_downloads = max_concurrent_downloads
+        self.__max_concurrent_downloads_per_host = max_concurrent_downloads_per_host
+        self.__condition = threading.Condition()
+        # Sorted list of (priority, sequence number, job), the sequence number keeps FIFO order within a priority
+        self.__queue = []
+        self.__sequence = itertools.count()
+        self.__running_per_host = {}
+        self.__running_count = 0
+        self.__workers = set()
+
+    def __spawn_workers(self):
+        # This method must be called holding the scheduler lock
+        needed_workers = min(self.__max_concurrent_downloads, len(self.__queue) + self.__running_count)
+        while len(self.__workers) < needed_workers:
+            worker = DownloadWorker(self)
+            self.__workers.add(worker)
+            worker.start()
+
+    def __pop_next_runnable_job(self):
+        # This method must be called holding the scheduler lock
+        for index, (priority, sequence, job) in enumerate(self.__queue):
+            if self.__running_per_host.get(job.get_host(), 0) < self.__max_concurrent_downloads_per_host:
+                del self.__queue[index]
+                return job
+        return None
+
+    def submit(self, job, priority=PRIORITY_NORMAL):
+        """
+        Queue a download job, it will be run as soon as there is a worker available and its host has not reached its
+        concurrency limit
+        :param job: download agent to run
+        :param priority: priority for the job, lower values are served first
+        :return: no return value
+        """
+        with self.__condition:
+            bisect.insort(self.__queue, (priority, next(self.__sequence), job))
+            self._logger.debug("Download job for '{}' QUEUED with priority '{}', #{} jobs waiting, #{} running"
+                               .format(job.get_download_url(),
+                                       priority,
+                                       len(self.__queue),
+                                       self.__running_count))
+            self.__spawn_workers()
+            self.__condition.notify_all()
+
+    def _take_job(self, worker):
+        """
+        Get the next job that can be run by the given worker, blocking while all the queued jobs belong to hosts that
+        have reached their concurrency limit.
+        :param worker: worker asking for a job
+        :return: the next job to run, or None if there is no more work and the worker should finish
+        """
+        with self.__condition:
+            while True:
+                if not self.__queue:
+                    self.__workers.discard(worker)
+                    return None
+                job = self.__pop_next_runnable_job()
+                if job:
+                    self.__running_count += 1
+                    self.__running_per_host[job.get_host()] = self.__running_per_host.get(job.get_host(), 0) + 1
+                    return job
+                self.__condition.wait()
+
+    def _release_job(self, job):
+        """
+        Tell the scheduler that a job has finished, making room for the next one on its host
+        :param job: finished job
+        :return: no return value
+        """
+        with self.__condition:
+            self.__running_count -= 1
+            self.__running_per_host[job.get_host()] -= 1
+            if not self.__running_per_host[job.get_host()]:
+                del self.__running_per_host[job.get_host()]
+            self.__condition.notify_all()
+
+    def get_max_concurrent_downloads(self):
+        return self.__max_concurrent_downloads
+
+    def get_max_concurrent_downloads_per_host(self):
+        return self.__max_concurrent_downloads_per_host
+
+    def get_count_queued_jobs(self):
+        with self.__condition:
+            return len(self.__queue)
+
+    def get_count_running_jobs(self):
+        with self.__condition:
+            return self.__running_count
+
+
+class DownloadWorker(threading.Thread):
+    """
+    Worker thread that runs download jobs taken from a scheduler until there is no more work left
+    """
+
+    def __init__(self, scheduler):
+        super().__init__(daemon=True)
+        self.__scheduler = scheduler
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+
+    def run(self):
+        while True:
+            job = self.__scheduler._take_job(self)
+            if job is None:
+                break
+            try:
+                job.run()
+            except Exception as e:
+                # Agents deal with their own errors, this should never happen, but the worker must survive it
+                self._logger.error("UNEXPECTED ERROR running download job for '{}' - '{}'"
+                                   .format(job.get_download_url(), e))
+            finally:
+                self.__scheduler._release_job(job)
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -18,14 +18,32 @@ Some of the use cases for this module:
 # TODO - This file just got too large, refactor it in the future to make it more simple
 
 import os
+import re
+import abc
+import json
+import time
+import shutil
+import pathlib
+import tempfile
+import threading
+import contextlib
+import concurrent.futures
 
 # App imports
 import config_manager
 import ensembl.service
-from exceptions import ConfigManagerException
+from exceptions import ConfigManagerException, ToolBoxException
 from download_manager.manager import Manager as DownloadManager
+from download_manager.scheduler import DownloadScheduler
+from download_manager.engines import TransferEngineFactory, TransferEngine
+from download_manager.checksums import ChecksumFactory, read_checksums_file
+from download_manager.exceptions import TransferEngineException, ChecksumException
 from ensembl.exceptions import EnsemblDownloadManagerException
-from toolbox import general
+from ensembl.manifest import LocalRepositoryManifest
+from toolbox import general, bgzf, derived_artifacts, single_flight
+from toolbox.locks import FileLock, FileLease, FileLockTimeoutException, remove_stale_lock_files
+from toolbox.scratch import ScratchFolder
+from toolbox.decompression import DecompressionEngine
 
 # Common configuration for all instances of the download manager
 __configuration_file = None
@@ -66,8 +84,87 @@ class ConfigurationManager(config_manager.ConfigurationManager):
     _CONFIG_KEY_PROTEIN_SEQUENCE_FILE = 'protein_sequence_file'
     _CONFIG_KEY_FILE_TYPE = 'file_type'
     _CONFIG_KEY_FILE_SUFFIXES = 'file_suffixes'
+    _CONFIG_KEY_DEFAULT_FILE_SUFFIXES = 'default_file_suffixes'
     _CONFIG_KEY_FILE_EXTENSION = 'file_extension'
     _CONFIG_KEY_GTF_FILE = 'gtf_file'
+    # Download manager section, all its settings are optional
+    _CONFIG_KEY_DOWNLOAD_MANAGER = 'download_manager'
+    _CONFIG_KEY_MAX_CONCURRENT_DOWNLOADS = 'max_concurrent_downloads'
+    _CONFIG_KEY_MAX_CONCURRENT_DOWNLOADS_PER_HOST = 'max_concurrent_downloads_per_host'
+    _CONFIG_KEY_TRANSFER_ENGINE = 'transfer_engine'
+    _CONFIG_KEY_SEGMENT_COUNT = 'segment_count'
+    _CONFIG_KEY_SEGMENT_MIN_SIZE = 'segment_min_size'
+    _CONFIG_KEY_KEEP_COMPRESSED_FILES = 'keep_compressed_files'
+    _CONFIG_KEY_DOWNLOAD_DEADLINE = 'download_deadline'
+    _CONFIG_KEY_MAX_CONNECTIONS_PER_HOST = 'max_connections_per_host'
+    _CONFIG_KEY_CONNECTION_IDLE_TIMEOUT = 'connection_idle_timeout'
+    _CONFIG_KEY_METRICS_REPORT = 'metrics_report'
+    _CONFIG_KEY_PREFETCH_CONCURRENCY = 'prefetch_concurrency'
+    # Release rollover
+    _CONFIG_KEY_RELEASE_ROLLOVER = 'release_rollover'
+    _CONFIG_KEY_RELEASE_ROLLOVER_ENABLED = 'enabled'
+    _CONFIG_KEY_RELEASE_ROLLOVER_LINK_MODES = 'link_modes'
+    # Storage of the local repository files
+    _CONFIG_KEY_STORAGE = 'storage'
+    _CONFIG_KEY_STORAGE_MODE = 'mode'
+    _CONFIG_KEY_STORAGE_SCRATCH_FOLDER = 'scratch_folder'
+    _CONFIG_KEY_STORAGE_SCRATCH_MAX_SIZE = 'scratch_max_size'
+    # Artifacts derived from the local repository files
+    _CONFIG_KEY_DERIVED_ARTIFACTS = 'derived_artifacts'
+    _CONFIG_KEY_DERIVED_ARTIFACTS_ENABLED = 'enabled'
+    _CONFIG_KEY_DERIVED_ARTIFACTS_SLIM_GTF_FEATURE_TYPES = 'slim_gtf_feature_types'
+    # Eviction of the least recently used data from the local repository
+    _CONFIG_KEY_EVICTION = 'eviction'
+    _CONFIG_KEY_EVICTION_MAX_SIZE = 'max_size'
+    _CONFIG_KEY_EVICTION_PINNED_TAXONOMIES = 'pinned_taxonomies'
+    _CONFIG_KEY_EVICTION_MIN_AGE = 'min_age'
+    # Local mirrors of Ensembl FTP, tried before it
+    _CONFIG_KEY_LOCAL_MIRRORS = 'local_mirrors'
+    _CONFIG_KEY_LOCAL_MIRRORS_PATHS = 'paths'
+    _CONFIG_KEY_LOCAL_MIRRORS_MODE = 'mode'
+    # Sections with optional settings
+    _SECTION_DOWNLOAD_MANAGER = (_CONFIG_KEY_DATA_DOWNLOADER, _CONFIG_KEY_DOWNLOAD_MANAGER)
+    _SECTION_RELEASE_ROLLOVER = (_CONFIG_KEY_DATA_DOWNLOADER, _CONFIG_KEY_RELEASE_ROLLOVER)
+    _SECTION_STORAGE = (_CONFIG_KEY_DATA_DOWNLOADER, _CONFIG_KEY_STORAGE)
+    _SECTION_DERIVED_ARTIFACTS = (_CONFIG_KEY_DATA_DOWNLOADER, _CONFIG_KEY_DERIVED_ARTIFACTS)
+    _SECTION_EVICTION = (_CONFIG_KEY_DATA_DOWNLOADER, _CONFIG_KEY_EVICTION)
+    _SECTION_LOCAL_MIRRORS = (_CONFIG_KEY_DATA_DOWNLOADER, _CONFIG_KEY_LOCAL_MIRRORS)
+    # Storage modes
+    STORAGE_MODE_UNCOMPRESSED = 'uncompressed'
+    STORAGE_MODE_BGZIP = 'bgzip'
+    # Download manager defaults
+    _DEFAULT_MAX_CONCURRENT_DOWNLOADS = 8
+    _DEFAULT_MAX_CONCURRENT_DOWNLOADS_PER_HOST = 4
+    _DEFAULT_SEGMENT_COUNT = 1
+    _DEFAULT_SEGMENT_MIN_SIZE = 32 * 1024 * 1024
+    _DEFAULT_KEEP_COMPRESSED_FILES = False
+    # WARNING! - MAGIC NUMBER AHEAD!!! - 2 hours per file, all attempts included
+    _DEFAULT_DOWNLOAD_DEADLINE = 7200
+    # Enough for all the segments of the files being downloaded at the same time from the same host
+    _DEFAULT_MAX_CONNECTIONS_PER_HOST = 16
+    _DEFAULT_CONNECTION_IDLE_TIMEOUT = 30
+    _DEFAULT_METRICS_REPORT = True
+    # Enough for keeping the download scheduler busy while other species are being planned
+    _DEFAULT_PREFETCH_CONCURRENCY = 16
+    # Release rollover defaults
+    _DEFAULT_RELEASE_ROLLOVER_ENABLED = True
+    _DEFAULT_RELEASE_ROLLOVER_LINK_MODES = [general.LINK_MODE_HARDLINK, general.LINK_MODE_REFLINK]
+    # Storage defaults
+    _DEFAULT_STORAGE_MODE = STORAGE_MODE_UNCOMPRESSED
+    _DEFAULT_STORAGE_SCRATCH_FOLDER_NAME = 'trackhub-creator-scratch'
+    # WARNING! - MAGIC NUMBER AHEAD!!! - 32GB of transient uncompressed copies
+    _DEFAULT_STORAGE_SCRATCH_MAX_SIZE = 32 * 1024 * 1024 * 1024
+    # Derived artifacts defaults, the feature types PoGo works with
+    _DEFAULT_DERIVED_ARTIFACTS_ENABLED = True
+    _DEFAULT_DERIVED_ARTIFACTS_SLIM_GTF_FEATURE_TYPES = ['gene', 'transcript', 'exon', 'CDS']
+    # Eviction defaults, no disk budget means nothing is ever evicted
+    _DEFAULT_EVICTION_MAX_SIZE = None
+    _DEFAULT_EVICTION_PINNED_TAXONOMIES = []
+    # WARNING! - MAGIC NUMBER AHEAD!!! - species used within the last day are not evicted
+    _DEFAULT_EVICTION_MIN_AGE = 24 * 3600
+    # Local mirrors defaults, no local mirrors means everything comes from Ensembl FTP
+    _DEFAULT_LOCAL_MIRRORS_PATHS = []
+    _DEFAULT_LOCAL_MIRRORS_MODE = TransferEngine.LOCAL_FILE_MODE_SYMLINK
 
     def __init__(self, configuration_object, configuration_file):
         super(ConfigurationManager, self).__init__(configuration_object, configuration_file)
@@ -249,6 +346,31 @@ class ConfigurationManager(config_manager.ConfigurationManager):
                     self._get_configuration_file(),
                     str(e)))
 
+    def _get_default_file_suffixes(self, file_section, all_suffixes):
+        """
+        Default file suffixes, i.e. the file variants fetched when the caller doesn't ask for specific ones, are
+        optional, all the known suffixes are the default when they're not present in the configuration file
+        :param file_section: configuration section for the kind of file, e.g. protein sequence or GTF
+        :param all_suffixes: all the known suffixes for that kind of file
+        :return: a list of suffixes
+        """
+        try:
+            return self._get_configuration_object() \
+                [self._CONFIG_KEY_DATA_DOWNLOADER] \
+                [self._CONFIG_KEY_ENSEMBL_FILE_NAMES] \
+                [file_section] \
+                [self._CONFIG_KEY_DEFAULT_FILE_SUFFIXES]
+        except KeyError:
+            return all_suffixes
+
+    def get_ensembl_protein_sequence_default_file_suffixes(self):
+        """
+        Protein sequence files fetched by default, usually only the 'all' file is needed
+        :return: a list of suffixes for protein sequence files on Ensembl
+        """
+        return self._get_default_file_suffixes(self._CONFIG_KEY_PROTEIN_SEQUENCE_FILE,
+                                               self.get_ensembl_protein_sequence_file_suffixes())
+
     def get_ensembl_protein_sequence_file_extension(self):
         """
         Usually, protein sequence files have extension ".fa" in Ensembl, but it has been included here as a configurable
@@ -297,6 +419,13 @@ class ConfigurationManager(config_manager.ConfigurationManager):
                     self._get_configuration_file(),
                     str(e)))
 
+    def get_ensembl_gtf_default_file_suffixes(self):
+        """
+        GTF files fetched by default, usually only the one with no suffix is needed
+        :return: a list of suffixes for GTF files on Ensembl
+        """
+        return self._get_default_file_suffixes(self._CONFIG_KEY_GTF_FILE, self.get_ensembl_gtf_file_suffixes())
+
     def get_ensembl_gtf_file_extension(self):
         """
         Usually, GTF files have extension ".gtf" in Ensembl, but it has been included here as a configurable
@@ -320,6 +449,242 @@ class ConfigurationManager(config_manager.ConfigurationManager):
                     self._get_configuration_file(),
                     str(e)))
 
+    def is_release_rollover(self):
+        """
+        When a new Ensembl release comes out, files that have not changed since a previous release, i.e. they have the
+        same checksum on Ensembl, are linked from the previous release in the local repository, instead of downloading
+        them again.
+        :return: True if files have to be linked from previous releases when possible, False otherwise
+        """
+        return bool(self._get_optional_setting(self._SECTION_RELEASE_ROLLOVER,
+                                               self._CONFIG_KEY_RELEASE_ROLLOVER_ENABLED,
+                                               self._DEFAULT_RELEASE_ROLLOVER_ENABLED))
+
+    def get_release_rollover_link_modes(self):
+        """
+        Ways of linking files from previous releases, tried in order, i.e. 'hardlink' and / or 'reflink', the latter
+        for copy-on-write file systems, where hard links may not be wanted, or possible.
+        :return: list of link modes
+        """
+        return list(self._get_optional_setting(self._SECTION_RELEASE_ROLLOVER,
+                                               self._CONFIG_KEY_RELEASE_ROLLOVER_LINK_MODES,
+                                               self._DEFAULT_RELEASE_ROLLOVER_LINK_MODES))
+
+    def get_storage_mode(self):
+        """
+        Files in the local repository are kept either 'uncompressed', or 'bgzip' compressed, with their index, in which
+        case their users get a transient uncompressed copy in a local scratch folder.
+        :return: the storage mode
+        """
+        storage_mode = self._get_optional_setting(self._SECTION_STORAGE,
+                                                  self._CONFIG_KEY_STORAGE_MODE,
+                                                  self._DEFAULT_STORAGE_MODE)
+        if storage_mode not in [self.STORAGE_MODE_UNCOMPRESSED, self.STORAGE_MODE_BGZIP]:
+            raise ConfigManagerException("INVALID storage mode '{}' in configuration file '{}'"
+                                         .format(storage_mode, self._get_configuration_file()))
+        return storage_mode
+
+    def get_storage_scratch_folder(self):
+        """
+        Local folder for the transient uncompressed copies of the files in the local repository, when they are kept
+        compressed, a folder in the temporary files folder of the host by default.
+        :return: path to the scratch folder
+        """
+        scratch_folder = self._get_optional_setting(self._SECTION_STORAGE,
+                                                    self._CONFIG_KEY_STORAGE_SCRATCH_FOLDER,
+                                                    None)
+        if not scratch_folder:
+            scratch_folder = os.path.join(tempfile.gettempdir(), self._DEFAULT_STORAGE_SCRATCH_FOLDER_NAME)
+        return os.path.abspath(scratch_folder)
+
+    def get_storage_scratch_max_size(self):
+        """
+        Least recently used transient copies are removed from the scratch folder when they take up more than this size,
+        in bytes.
+        :return: maximum size of the scratch folder
+        """
+        return int(self._get_optional_setting(self._SECTION_STORAGE,
+                                              self._CONFIG_KEY_STORAGE_SCRATCH_MAX_SIZE,
+                                              self._DEFAULT_STORAGE_SCRATCH_MAX_SIZE))
+
+    def is_derived_artifacts(self):
+        """
+        Artifacts derived from the files in the local repository, i.e. FASTA indexes, slim GTF files and chromosome
+        sizes tables, are built once per species and Ensembl release, when the files are fetched, and kept next to them.
+        :return: True if derived artifacts have to be built, False otherwise
+        """
+        return bool(self._get_optional_setting(self._SECTION_DERIVED_ARTIFACTS,
+                                               self._CONFIG_KEY_DERIVED_ARTIFACTS_ENABLED,
+                                               self._DEFAULT_DERIVED_ARTIFACTS_ENABLED))
+
+    def get_derived_artifacts_slim_gtf_feature_types(self):
+        """
+        Feature types kept in the slim version of GTF files, i.e. those the tools using them, like PoGo, work with.
+        :return: list of feature types
+        """
+        return list(self._get_optional_setting(self._SECTION_DERIVED_ARTIFACTS,
+                                               self._CONFIG_KEY_DERIVED_ARTIFACTS_SLIM_GTF_FEATURE_TYPES,
+                                               self._DEFAULT_DERIVED_ARTIFACTS_SLIM_GTF_FEATURE_TYPES))
+
+    def get_eviction_max_size(self):
+        """
+        Disk budget, in bytes, for the local Ensembl repository, all releases included, the least recently used species
+        are evicted when it takes up more than this.
+        :return: the disk budget, or None if there is no budget
+        """
+        max_size = self._get_optional_setting(self._SECTION_EVICTION,
+                                              self._CONFIG_KEY_EVICTION_MAX_SIZE,
+                                              self._DEFAULT_EVICTION_MAX_SIZE)
+        return int(max_size) if max_size else None
+
+    def get_eviction_pinned_taxonomies(self):
+        """
+        Taxonomies whose data for the current Ensembl release is never evicted, e.g. human and mouse.
+        :return: list of ncbi taxonomy ids
+        """
+        return [str(taxonomy_id)
+                for taxonomy_id in self._get_optional_setting(self._SECTION_EVICTION,
+                                                              self._CONFIG_KEY_EVICTION_PINNED_TAXONOMIES,
+                                                              self._DEFAULT_EVICTION_PINNED_TAXONOMIES)]
+
+    def get_eviction_min_age(self):
+        """
+        Species used within this time, in seconds, are not evicted.
+        :return: minimum time since their last use, before species can be evicted
+        """
+        return int(self._get_optional_setting(self._SECTION_EVICTION,
+                                              self._CONFIG_KEY_EVICTION_MIN_AGE,
+                                              self._DEFAULT_EVICTION_MIN_AGE))
+
+    def get_local_mirrors_paths(self):
+        """
+        Local folders mirroring Ensembl FTP, i.e. with the same layout as the folder at the Ensembl FTP base URL, e.g. a
+        shared file system copy of 'ftp://ftp.ensembl.org/pub'. Files are taken from the first local mirror that has
+        them, and downloaded from Ensembl FTP when none of them has.
+        :return: list of absolute paths to the local mirrors, in the order they are tried
+        """
+        return [os.path.abspath(path)
+                for path in self._get_optional_setting(self._SECTION_LOCAL_MIRRORS,
+                                                       self._CONFIG_KEY_LOCAL_MIRRORS_PATHS,
+                                                       self._DEFAULT_LOCAL_MIRRORS_PATHS)]
+
+    def get_local_mirrors_mode(self):
+        """
+        How files from local mirrors are made available, 'symlink' or 'copy', files that are inflated are read straight
+        from the local mirror either way.
+        :return: the local file mode for the transfer engine
+        """
+        return self._get_optional_setting(self._SECTION_LOCAL_MIRRORS,
+                                          self._CONFIG_KEY_LOCAL_MIRRORS_MODE,
+                                          self._DEFAULT_LOCAL_MIRRORS_MODE)
+
+    def get_max_concurrent_downloads(self):
+        """
+        Maximum number of files that will be downloaded at the same time, no matter their origin.
+        :return: maximum number of concurrent downloads
+        """
+        return int(self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                              self._CONFIG_KEY_MAX_CONCURRENT_DOWNLOADS,
+                                              self._DEFAULT_MAX_CONCURRENT_DOWNLOADS))
+
+    def get_max_concurrent_downloads_per_host(self):
+        """
+        Maximum number of files that will be downloaded at the same time from the same host, this keeps us from being
+        throttled or banned by Ensembl FTP.
+        :return: maximum number of concurrent downloads per host
+        """
+        return int(self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                              self._CONFIG_KEY_MAX_CONCURRENT_DOWNLOADS_PER_HOST,
+                                              self._DEFAULT_MAX_CONCURRENT_DOWNLOADS_PER_HOST))
+
+    def get_transfer_engine_name(self):
+        """
+        Name of the transfer engine to use for downloading files, 'native' (in-process, default) or 'curl'.
+        :return: transfer engine name
+        """
+        return self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                          self._CONFIG_KEY_TRANSFER_ENGINE,
+                                          TransferEngineFactory.ENGINE_NATIVE)
+
+    def get_segment_count(self):
+        """
+        Large files can be downloaded as several byte range segments fetched concurrently, this is the number of
+        segments to split them into (1 means no splitting at all).
+        :return: number of segments for large files
+        """
+        return int(self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                              self._CONFIG_KEY_SEGMENT_COUNT,
+                                              self._DEFAULT_SEGMENT_COUNT))
+
+    def get_max_connections_per_host(self):
+        """
+        Open connections to a host, e.g. logged in Ensembl FTP sessions, are kept for reuse by the next files to
+        download from that host, this is the maximum number of connections, in use or idle, per host.
+        :return: maximum number of connections per host
+        """
+        return int(self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                              self._CONFIG_KEY_MAX_CONNECTIONS_PER_HOST,
+                                              self._DEFAULT_MAX_CONNECTIONS_PER_HOST))
+
+    def get_connection_idle_timeout(self):
+        """
+        Connections kept for reuse are closed when they have been idle for longer than this time, in seconds.
+        :return: idle timeout for open connections
+        """
+        return int(self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                              self._CONFIG_KEY_CONNECTION_IDLE_TIMEOUT,
+                                              self._DEFAULT_CONNECTION_IDLE_TIMEOUT))
+
+    def is_metrics_report(self):
+        """
+        Metrics on every file transfer, e.g. throughput, time to first byte, number of attempts, can be written to a
+        JSON lines report in the logs folder, one report per session.
+        :return: True if the download metrics have to be reported, False otherwise
+        """
+        return bool(self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                               self._CONFIG_KEY_METRICS_REPORT,
+                                               self._DEFAULT_METRICS_REPORT))
+
+    def get_segment_min_size(self):
+        """
+        Minimum size, in bytes, for a file to be downloaded as several byte range segments.
+        :return: minimum file size for segmented downloads
+        """
+        return int(self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                              self._CONFIG_KEY_SEGMENT_MIN_SIZE,
+                                              self._DEFAULT_SEGMENT_MIN_SIZE))
+
+    def is_keep_compressed_files(self):
+        """
+        Files are inflated while they are downloaded from Ensembl, this setting tells whether to keep their compressed
+        version in the local repository as well.
+        :return: True if the compressed files have to be kept, False otherwise
+        """
+        return bool(self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                               self._CONFIG_KEY_KEEP_COMPRESSED_FILES,
+                                               self._DEFAULT_KEEP_COMPRESSED_FILES))
+
+    def get_prefetch_concurrency(self):
+        """
+        Number of species files that are worked out, checked and downloaded at the same time when prefetching data for
+        many species, downloads are still bound by the download scheduler concurrency limits.
+        :return: number of concurrent species file fetches
+        """
+        return int(self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                              self._CONFIG_KEY_PREFETCH_CONCURRENCY,
+                                              self._DEFAULT_PREFETCH_CONCURRENCY))
+
+    def get_download_deadline(self):
+        """
+        Maximum amount of time, in seconds, for downloading a file, including all the download attempts and the waits
+        between them, permanent errors, like a file that is not there, are not retried at all.
+        :return: the download deadline, None means no limit
+        """
+        download_deadline = self._get_optional_setting(self._SECTION_DOWNLOAD_MANAGER,
+                                                       self._CONFIG_KEY_DOWNLOAD_DEADLINE,
+                                                       self._DEFAULT_DOWNLOAD_DEADLINE)
+        return None if download_deadline is None else int(download_deadline)
+
     def is_rewrite_local_path_ensembl_repo(self):
         """
         Find out whether we are required to overwrite the local Ensembl repository or not, in case there is an existing
@@ -339,10 +704,142 @@ class ConfigurationManager(config_manager.ConfigurationManager):
                     str(e)))
 
 
+# Kinds of Ensembl data files
+class DataFilesKind(metaclass=abc.ABCMeta):
+    """
+    What the data download service needs to know about a kind of Ensembl data files for fetching them, i.e. their file
+    names, where they are on Ensembl, and where they go in the local repository
+    """
+    # Name of this kind of files, for log messages
+    label = ''
+
+    def __init__(self, data_download_service):
+        self._service = data_download_service
+
+    @abc.abstractmethod
+    def get_default_suffixes(self):
+        """
+        :return: the configured default suffixes of the file variants to fetch
+        """
+        ...
+
+    @abc.abstractmethod
+    def get_known_suffixes(self):
+        """
+        :return: all the suffixes of the file variants available on Ensembl
+        """
+        ...
+
+    @abc.abstractmethod
+    def get_file_names(self, taxonomy_id, suffixes):
+        """
+        :param taxonomy_id: ncbi taxonomy id
+        :param suffixes: suffixes of the file variants
+        :return: the Ensembl file names, or None in case the taxonomy has not been found on Ensembl
+        """
+        ...
+
+    @abc.abstractmethod
+    def get_remote_paths(self, file_names, taxonomy_id):
+        """
+        :param file_names: Ensembl file names
+        :param taxonomy_id: ncbi taxonomy id
+        :return: list of (file name, URL) pairs
+        """
+        ...
+
+    @abc.abstractmethod
+    def get_destination_folder(self, taxonomy_id):
+        """
+        :param taxonomy_id: ncbi taxonomy id
+        :return: the folder of the local repository where the files go
+        """
+        ...
+
+    @abc.abstractmethod
+    def get_local_paths(self, taxonomy_id, file_names):
+        """
+        :param taxonomy_id: ncbi taxonomy id
+        :param file_names: Ensembl file names
+        :return: list of (file name, path in the local repository) pairs
+        """
+        ...
+
+
+class ProteinSequenceFilesKind(DataFilesKind):
+    label = 'protein sequence'
+
+    def get_default_suffixes(self):
+        return self._service._get_configuration_manager().get_ensembl_protein_sequence_default_file_suffixes()
+
+    def get_known_suffixes(self):
+        return self._service.get_protein_sequence_file_suffixes()
+
+    def get_file_names(self, taxonomy_id, suffixes):
+        return self._service._get_protein_sequence_ensembl_file_name_for_species(taxonomy_id, suffixes)
+
+    def get_remote_paths(self, file_names, taxonomy_id):
+        return self._service._get_protein_sequence_file_path_remote(file_names, taxonomy_id)
+
+    def get_destination_folder(self, taxonomy_id):
+        return self._service._get_protein_sequence_file_destination_path_local(taxonomy_id)
+
+    def get_local_paths(self, taxonomy_id, file_names):
+        return self._service._get_protein_sequence_file_path_local(taxonomy_id, file_names)
+
+
+class GenomeReferenceFilesKind(DataFilesKind):
+    label = 'GTF'
+
+    def get_default_suffixes(self):
+        return self._service._get_configuration_manager().get_ensembl_gtf_default_file_suffixes()
+
+    def get_known_suffixes(self):
+        return self._service.get_genome_reference_file_suffixes()
+
+    def get_file_names(self, taxonomy_id, suffixes):
+        return self._service._get_genome_reference_ensembl_file_name_for_species(taxonomy_id, suffixes)
+
+    def get_remote_paths(self, file_names, taxonomy_id):
+        return self._service._get_genome_reference_file_path_remote(file_names, taxonomy_id)
+
+    def get_destination_folder(self, taxonomy_id):
+        return self._service._get_genome_reference_file_destination_path_local(taxonomy_id)
+
+    def get_local_paths(self, taxonomy_id, file_names):
+        return self._service._get_genome_reference_file_path_local(taxonomy_id, file_names)
+
+
 class DataDownloadService:
     """
     This Service is in charge of grabbing data (download) from Ensembl to a local repository
     """
+    # Kinds of Ensembl data files that can be prefetched
+    KIND_PROTEIN_SEQUENCES = 'protein_sequences'
+    KIND_GENOME_REFERENCE = 'genome_reference'
+    # Every Ensembl download folder has one of these, with the checksums for the files in it
+    _CHECKSUMS_FILE_NAME = 'CHECKSUMS'
+    # Lock file for coordinating the downloads into a folder of the local repository among concurrent sessions
+    _DOWNLOAD_LOCK_FILE_NAME = '.download.lock'
+    # Local copy of the listing of an Ensembl remote folder, for the current release
+    _REMOTE_LISTING_FILE_NAME = '.remote_listing.json'
+    # WARNING! - MAGIC NUMBER AHEAD!!! - time, in seconds, for listing an Ensembl remote folder
+    _REMOTE_LISTING_TIMEOUT = 120
+    # Files in the local repository that are not Ensembl data, but bookkeeping, or data still being downloaded, the
+    # '.checksum' verification records are left behind by sessions from before there was a manifest
+    _NON_DATA_FILE_EXTENSIONS = ('.checksum', '.part', '.segments', '.lock', bgzf.BGZF_INDEX_FILE_EXTENSION,
+                                 derived_artifacts.FASTA_INDEX_FILE_EXTENSION,
+                                 derived_artifacts.SLIM_GTF_FILE_EXTENSION,
+                                 derived_artifacts.SLIM_GTF_FILE_EXTENSION + bgzf.BGZF_FILE_EXTENSION,
+                                 derived_artifacts.CHROMOSOME_SIZES_FILE_EXTENSION)
+    # Subfolder of the scratch folder where files are downloaded, before compressing them into the local repository
+    _SCRATCH_FOLDER_NAME_DOWNLOADS = '.downloads'
+    # Download metrics report, in the logs folder, prefixed by the session ID
+    _DOWNLOAD_METRICS_REPORT_FILE_NAME = 'download_metrics.jsonl'
+    # Folder of a release of the local repository with the leases on its species, held by the sessions using them
+    _LEASES_FOLDER_NAME = '.leases'
+    # Eviction report, in the logs folder, prefixed by the session ID
+    _EVICTION_REPORT_FILE_NAME = 'eviction_report.json'
 
     def __init__(self, configuration_object, configuration_file):
         self.__logger = config_manager.get_app_config_manager().get_logger_for(__name__)
@@ -357,6 +854,32 @@ class DataDownloadService:
         self.__folder_name_fasta = None
         # Name for the subfolder of species folder that contains protein sequences files
         self.__folder_name_protein_sequences = None
+        # Download scheduler shared by all the downloads requested to this service
+        self.__download_scheduler = None
+        self.__transfer_engine = None
+        # Guards the lazy set up of the download scheduler and the transfer engine, the service is used by many threads
+        self.__downloads_set_up_lock = threading.Lock()
+        # Remote folder URL -> future for the checksums of the files in that folder, as found in its CHECKSUMS file
+        self.__remote_checksums = {}
+        self.__remote_checksums_lock = threading.Lock()
+        # Remote folder URL -> future for the names of the files in that folder, failed listings are not kept
+        self.__remote_listings = {}
+        self.__remote_listings_lock = threading.Lock()
+        self.__download_metrics_report_lock = threading.Lock()
+        # Manifest of the files in the local Ensembl release
+        self.__manifest = None
+        # (release number, local path, manifest) of the previous Ensembl releases in the local repository, newest first
+        self.__previous_releases = []
+        # Scratch folder for the transient uncompressed copies of compressed files in the local repository
+        self.__scratch_folder = None
+        self.__decompression_engine = None
+        # Lease file path -> lease held by this session on the species it uses, for as long as the session lasts
+        self.__leases = {}
+        self.__leases_lock = threading.Lock()
+        # (release, taxonomy, kind, suffixes) -> future for the files fetched into the local repository, the first
+        # caller fetches them, concurrent callers wait for it, and later ones get them straight away
+        self.__fetches = {}
+        self.__fetches_lock = threading.Lock()
 
     def post_constructor(self):
         """
@@ -364,6 +887,13 @@ class DataDownloadService:
         :return: no return value
         """
         self.__prepare_local_ensembl_repository()
+        self.__manifest = LocalRepositoryManifest(self.get_local_path_ensembl_release())
+        if self._get_configuration_manager().is_release_rollover():
+            self.__previous_releases = self.__find_previous_local_releases()
+        if self._is_storage_compressed():
+            self.__scratch_folder = ScratchFolder(self._get_configuration_manager().get_storage_scratch_folder(),
+                                                  self._get_configuration_manager().get_storage_scratch_max_size())
+            self.__decompression_engine = DecompressionEngine(keep_compressed=True)
 
     def __prepare_local_ensembl_repository(self):
         """
@@ -390,6 +920,34 @@ class DataDownloadService:
         # here.
         # general.create_latest_symlink_overwrite(self.get_local_path_ensembl_release())
 
+    def __get_local_releases(self):
+        """
+        Find the Ensembl releases that are in the local repository
+        :return: list of (release number, local path) for those releases
+        """
+        release_prefix = self._get_configuration_manager().get_folder_prefix_ensembl_release()
+        releases = []
+        for folder_name in os.listdir(self.get_local_path_root_ensembl_repo()):
+            folder_path = os.path.join(self.get_local_path_root_ensembl_repo(), folder_name)
+            release_number = folder_name[len(release_prefix):]
+            if folder_name.startswith(release_prefix) and release_number.isdigit() and os.path.isdir(folder_path):
+                releases.append((int(release_number), folder_path))
+        return releases
+
+    def __find_previous_local_releases(self):
+        """
+        Find the Ensembl releases, previous to the current one, that are in the local repository
+        :return: list of (release number, local path, manifest) for those releases, newest first
+        """
+        current_release_number = int(self._get_ensembl_service().get_release_number())
+        previous_releases = [(release_number, folder_path, LocalRepositoryManifest(folder_path))
+                             for release_number, folder_path in self.__get_local_releases()
+                             if release_number < current_release_number]
+        previous_releases.sort(key=lambda previous_release: previous_release[0], reverse=True)
+        self._get_logger().debug("Previous Ensembl releases in the local repository, for release rollover {}"
+                                 .format([folder_path for release_number, folder_path, manifest in previous_releases]))
+        return previous_releases
+
     def __get_subpath_fasta_for_species(self, taxonomy_id):
         """
         Within an Ensembl release path, get the subpath for protein sequences data given an ncbi taxonomy id,
@@ -432,6 +990,18 @@ class DataDownloadService:
                               .get_name()
                               )
 
+    def __get_species_name(self, taxonomy_id):
+        return self._get_ensembl_service() \
+            .get_species_data_service() \
+            .get_species_entry_for_taxonomy_id(taxonomy_id) \
+            .get_name()
+
+    def __get_assembly_for_species(self, taxonomy_id):
+        return self._get_ensembl_service() \
+            .get_species_data_service() \
+            .get_species_entry_for_taxonomy_id(taxonomy_id) \
+            .get_assembly()
+
     def _get_logger(self):
         return self.__logger
 
@@ -442,6 +1012,593 @@ class DataDownloadService:
     def _get_configuration_manager(self):
         return self.__config_manager
 
+    def _get_download_scheduler(self):
+        """
+        All the downloads requested to this service go through the same download scheduler, so the concurrency limits
+        apply to the whole session
+        :return: the download scheduler for this service
+        """
+        with self.__downloads_set_up_lock:
+            if self.__download_scheduler is None:
+                self.__download_scheduler = DownloadScheduler(
+                    max_concurrent_downloads=self._get_configuration_manager().get_max_concurrent_downloads(),
+                    max_concurrent_downloads_per_host=self._get_configuration_manager()
+                        .get_max_concurrent_downloads_per_host())
+            return self.__download_scheduler
+
+    def _get_transfer_engine(self):
+        with self.__downloads_set_up_lock:
+            if self.__transfer_engine is None:
+                self.__transfer_engine = TransferEngineFactory.get_transfer_engine(
+                    self._get_configuration_manager().get_transfer_engine_name(),
+                    segment_count=self._get_configuration_manager().get_segment_count(),
+                    segment_min_size=self._get_configuration_manager().get_segment_min_size(),
+                    max_connections_per_host=self._get_configuration_manager().get_max_connections_per_host(),
+                    connection_idle_timeout=self._get_configuration_manager().get_connection_idle_timeout(),
+                    local_file_mode=self._get_configuration_manager().get_local_mirrors_mode())
+            return self.__transfer_engine
+
+    def _get_source_urls(self, remote_url):
+        """
+        Get the local mirror sources for an Ensembl remote file or folder, i.e. those local mirrors that have it
+        :param remote_url: URL of the Ensembl remote file or folder
+        :return: list of 'file://' URLs, in the order they should be tried, empty if no local mirror has it
+        """
+        base_url = self.get_remote_path_root_ensembl_repo().rstrip('/')
+        if not remote_url.startswith("{}/".format(base_url)):
+            return []
+        relative_path_parts = remote_url[len(base_url) + 1:].split('/')
+        source_urls = []
+        for local_mirror_path in self._get_configuration_manager().get_local_mirrors_paths():
+            local_path = os.path.join(local_mirror_path, *relative_path_parts)
+            if os.path.exists(local_path):
+                source_urls.append(pathlib.Path(local_path).as_uri())
+        return source_urls
+
+    def _get_source_urls_for(self, remote_urls):
+        """
+        Get the local mirror sources for the given Ensembl remote files, for a download manager
+        :param remote_urls: URLs of the Ensembl remote files
+        :return: map from URL to its local mirror sources, only for those files available on a local mirror
+        """
+        source_urls = {}
+        for remote_url in remote_urls:
+            remote_url_sources = self._get_source_urls(remote_url)
+            if remote_url_sources:
+                source_urls[remote_url] = remote_url_sources
+        return source_urls
+
+    def _get_download_manager(self, download_urls, destination_folder, expected_checksums=None):
+        """
+        Get a download manager for the given URLs, it inflates the gzip compressed files coming from Ensembl while they
+        are being downloaded, unless the local repository keeps them compressed, in which case they are downloaded, as
+        they are, to the scratch folder, see '_store_downloaded_files'
+        :param download_urls: URLs to download
+        :param destination_folder: local folder where to put the downloaded files
+        :param expected_checksums: map from URL to its expected checksum, for verifying the downloaded files
+        :return: a download manager, ready to start the downloads
+        """
+        return DownloadManager(download_urls,
+                               self._get_download_folder(destination_folder),
+                               self._get_logger(),
+                               scheduler=self._get_download_scheduler(),
+                               transfer_engine=self._get_transfer_engine(),
+                               # Compressed files are re-compressed into the local repository, see 'storage mode'
+                               decompress=not self._is_storage_compressed(),
+                               keep_compressed=self._get_configuration_manager().is_keep_compressed_files(),
+                               expected_checksums=expected_checksums,
+                               download_deadline=self._get_configuration_manager().get_download_deadline(),
+                               source_urls=self._get_source_urls_for(download_urls))
+
+    def _get_download_metrics_report_file_path(self):
+        return os.path.join(config_manager.get_app_config_manager().get_folder_logs(),
+                            "{}-{}".format(config_manager.get_app_config_manager().get_session_id(),
+                                           self._DOWNLOAD_METRICS_REPORT_FILE_NAME))
+
+    def _report_download_metrics(self, download_manager):
+        """
+        Log a summary of the transfers made by the given download manager, and add them to this session download
+        metrics report, if enabled
+        :param download_manager: download manager, once its downloads have finished
+        :return: no return value
+        """
+        summary = download_manager.get_summary()
+        for host, host_summary in summary['hosts'].items():
+            self._get_logger().info("Download metrics for host '{}', #{} files {}, #{} bytes, "
+                                    "average throughput {} bytes/s, average time to first byte {} s, "
+                                    "#{} attempts, #{} timeouts"
+                                    .format(host,
+                                            host_summary['transfers'],
+                                            host_summary['statuses'],
+                                            host_summary['bytes_transferred'],
+                                            host_summary['average_throughput'],
+                                            host_summary['average_time_to_first_byte'],
+                                            host_summary['attempts'],
+                                            host_summary['timeouts']))
+        if self._get_configuration_manager().is_metrics_report():
+            with self.__download_metrics_report_lock:
+                download_manager.write_metrics_report(self._get_download_metrics_report_file_path())
+
+    def _get_download_lock(self, destination_folder):
+        """
+        Get the lock that coordinates the downloads into the given folder of the local repository, among different
+        sessions, and different threads within this session. While a session is downloading files into a folder, other
+        sessions wait for it to finish, and then they find the files already there, instead of downloading them again.
+        :param destination_folder: local repository folder
+        :return: a (not acquired) lock for the given folder
+        """
+        return FileLock(os.path.join(destination_folder, self._DOWNLOAD_LOCK_FILE_NAME))
+
+    def _get_lease_file_path(self, release_folder, species):
+        return os.path.join(release_folder, self._LEASES_FOLDER_NAME, species)
+
+    def _lease_species(self, taxonomy_id):
+        """
+        Take a lease on the data of the given taxonomy, in the current release of the local repository, so it is not
+        evicted while this session may be using it, i.e. for as long as this session lasts, the operating system
+        releases the lease when the session process ends, and this includes whatever tools, like PoGo, it runs on
+        those files.
+        :param taxonomy_id: ncbi taxonomy id
+        :return: no return value
+        """
+        species_entry = self._get_ensembl_service() \
+            .get_species_data_service() \
+            .get_species_entry_for_taxonomy_id(taxonomy_id)
+        if not species_entry:
+            return
+        lease_file_path = self._get_lease_file_path(self.get_local_path_ensembl_release(), species_entry.get_name())
+        with self.__leases_lock:
+            if lease_file_path in self.__leases:
+                return
+        lease = FileLease(lease_file_path)
+        lease.acquire_shared()
+        with self.__leases_lock:
+            if lease_file_path not in self.__leases:
+                self.__leases[lease_file_path] = lease
+                return
+        # Some other thread took it in the meantime
+        lease.release()
+
+    def _is_storage_compressed(self):
+        return self._get_configuration_manager().get_storage_mode() == ConfigurationManager.STORAGE_MODE_BGZIP
+
+    def _get_scratch_folder(self):
+        return self.__scratch_folder
+
+    def _get_download_folder(self, destination_folder):
+        """
+        Files to compress into the local repository are downloaded to the local scratch folder, so only their final,
+        compressed, version is written to the (shared) local repository file system
+        :param destination_folder: local repository folder
+        :return: the folder where to download the files for the given local repository folder
+        """
+        if not self._is_storage_compressed():
+            return destination_folder
+        download_folder = os.path.join(self._get_scratch_folder().get_folder(),
+                                       self._SCRATCH_FOLDER_NAME_DOWNLOADS,
+                                       os.path.relpath(destination_folder, self.get_local_path_root_ensembl_repo()))
+        general.check_create_folders([download_folder])
+        return download_folder
+
+    def _store_downloaded_files(self, download_information, files, successful_urls, destination_folder):
+        """
+        Put the downloaded files in the local repository, when it keeps them compressed, the gzip compressed files from
+        Ensembl are re-compressed as BGZF, with their index, from the scratch folder, otherwise they are already there
+        :param download_information: list of (file name, URL) pairs
+        :param files: list of (file name, local file path) pairs that have been downloaded
+        :param successful_urls: URLs that have been successfully downloaded
+        :param destination_folder: local repository folder
+        :return: URLs whose files have been stored in the local repository
+        """
+        if not self._is_storage_compressed():
+            return successful_urls
+        urls = dict(download_information)
+        stored_urls = []
+        for file_name, file_path in files:
+            url = urls.get(file_name)
+            if url not in successful_urls:
+                continue
+            downloaded_file_path = os.path.join(self._get_download_folder(destination_folder), url.rsplit('/', 1)[1])
+            try:
+                uncompressed_size = bgzf.recompress_gzip_file(downloaded_file_path, file_path)
+            except ToolBoxException as e:
+                self._get_logger().error("File '{}' COULD NOT BE STORED in the local repository, '{}'"
+                                         .format(file_name, e))
+                continue
+            finally:
+                if os.path.isfile(downloaded_file_path):
+                    os.remove(downloaded_file_path)
+            self._get_logger().debug("File '{}' stored as BGZF at '{}', {} bytes compressed, {} bytes uncompressed"
+                                     .format(file_name, file_path, os.path.getsize(file_path), uncompressed_size))
+            stored_urls.append(url)
+        return stored_urls
+
+    def __make_uncompressed_copy(self, file_path, copy_file_path):
+        result = self.__decompression_engine.decompress_file(file_path, copy_file_path)
+        if not result.success:
+            raise ToolBoxException(result.error)
+        self._get_logger().info("Uncompressed copy of '{}' made at '{}', {} bytes, {:.0f} bytes/s"
+                                .format(file_path,
+                                        copy_file_path,
+                                        result.uncompressed_size,
+                                        result.get_throughput() or 0))
+
+    def _get_files_for_consumers(self, files):
+        """
+        Get the paths to hand out to the users of the given files in the local repository. When the local repository
+        keeps them compressed, these are transient uncompressed copies in the scratch folder, reused while they are
+        there, and reclaimed in a least recently used fashion.
+        :param files: list of (file name, local file path) pairs in the local repository
+        :return: list of (file name, path to use) pairs, those files that could not be made available are left out
+        """
+        if (files is None) or (not self._is_storage_compressed()):
+            return files
+        consumer_files = []
+        for file_name, file_path in files:
+            copy_relative_path = os.path.relpath(file_path[:-len(bgzf.BGZF_FILE_EXTENSION)],
+                                                 self.get_local_path_root_ensembl_repo())
+            try:
+                consumer_files.append((file_name, self._get_scratch_folder().get_file(copy_relative_path,
+                                                                                      file_path,
+                                                                                      self.__make_uncompressed_copy)))
+                # FASTA indexes hold uncompressed offsets, so they are good for the uncompressed copies as well
+                fasta_index_file_path = derived_artifacts.get_fasta_index_file_path(file_path)
+                if os.path.isfile(fasta_index_file_path):
+                    self._get_scratch_folder().get_file(
+                        derived_artifacts.get_fasta_index_file_path(copy_relative_path),
+                        fasta_index_file_path,
+                        shutil.copyfile)
+            except (ToolBoxException, OSError) as e:
+                self._get_logger().error("File '{}' COULD NOT BE MADE AVAILABLE from '{}', '{}'"
+                                         .format(file_name, file_path, e))
+        return consumer_files
+
+    def _get_chromosome_sizes_file_path(self, taxonomy_id):
+        """
+        Chromosome sizes tables are kept with the genome reference files of the species, one per assembly,
+        e.g. <local_path_ensembl_release>/gtf/homo_sapiens/Homo_sapiens.GRCh38.chrom.sizes
+        :param taxonomy_id: ncbi taxonomy id
+        :return: path to the chromosome sizes table for the given taxonomy, in the local repository
+        """
+        return os.path.join(self._get_genome_reference_file_destination_path_local(taxonomy_id),
+                            "{}.{}{}".format(self.__get_species_name(taxonomy_id).capitalize(),
+                                             self.__get_assembly_for_species(taxonomy_id),
+                                             derived_artifacts.CHROMOSOME_SIZES_FILE_EXTENSION))
+
+    def __build_chromosome_sizes(self, taxonomy_id):
+        # Ensembl GTF files don't carry sequence lengths, they come from the assembly information on Ensembl
+        chromosome_sizes_file_path = self._get_chromosome_sizes_file_path(taxonomy_id)
+        if os.path.isfile(chromosome_sizes_file_path):
+            return
+        try:
+            chromosome_sizes = self._get_ensembl_service().get_chromosome_sizes_for_taxonomy(taxonomy_id)
+            derived_artifacts.write_chromosome_sizes(chromosome_sizes, chromosome_sizes_file_path)
+        except Exception as e:
+            self._get_logger().warning("Chromosome sizes table for taxonomy ID #{} COULD NOT BE BUILT, '{}'"
+                                       .format(taxonomy_id, e))
+            return
+        self._get_logger().info("Chromosome sizes table for taxonomy ID #{} built at '{}', #{} sequences"
+                                .format(taxonomy_id, chromosome_sizes_file_path, len(chromosome_sizes)))
+
+    def __build_derived_artifacts_for_file(self, file_path, kind):
+        if kind == self.KIND_PROTEIN_SEQUENCES:
+            artifact_file_path = derived_artifacts.get_fasta_index_file_path(file_path)
+            if not derived_artifacts.is_up_to_date(artifact_file_path, file_path):
+                count_entries = derived_artifacts.build_fasta_index(file_path, artifact_file_path)
+                self._get_logger().info("FASTA index built at '{}', #{} sequences"
+                                        .format(artifact_file_path, count_entries))
+        else:
+            artifact_file_path = derived_artifacts.get_slim_gtf_file_path(file_path)
+            if not derived_artifacts.is_up_to_date(artifact_file_path, file_path):
+                count_entries = derived_artifacts.build_slim_gtf(
+                    file_path,
+                    self._get_configuration_manager().get_derived_artifacts_slim_gtf_feature_types(),
+                    artifact_file_path)
+                self._get_logger().info("Slim GTF built at '{}', #{} features"
+                                        .format(artifact_file_path, count_entries))
+
+    def _build_derived_artifacts(self, taxonomy_id, kind, files):
+        """
+        Build the artifacts derived from the given files in the local repository, unless they are already there, and up
+        to date, i.e. FASTA indexes for protein sequence files, and slim GTF files, plus the chromosome sizes table of
+        the species, for genome reference files. This is meant to be called holding the download lock of the folder
+        the files are in, so they are built only once per species and Ensembl release, no matter the number of
+        sessions. Artifacts that can't be built are not an error, their users fall back to the original files.
+        :param taxonomy_id: taxonomy the files are about
+        :param kind: kind of data in the files
+        :param files: list of (file name, local file path) pairs in the local repository
+        :return: no return value
+        """
+        if not self._get_configuration_manager().is_derived_artifacts():
+            return
+        for file_name, file_path in files:
+            if not os.path.isfile(file_path):
+                continue
+            try:
+                self.__build_derived_artifacts_for_file(file_path, kind)
+            except ToolBoxException as e:
+                self._get_logger().warning("Derived artifacts for file '{}' COULD NOT BE BUILT, '{}'"
+                                           .format(file_name, e))
+        if kind == self.KIND_GENOME_REFERENCE:
+            self.__build_chromosome_sizes(taxonomy_id)
+
+    def __fetch_remote_checksums(self, remote_folder_url, destination_folder):
+        checksums_file_path = os.path.join(destination_folder, self._CHECKSUMS_FILE_NAME)
+        if not os.path.isfile(checksums_file_path):
+            checksums_urls = ["{}/{}".format(remote_folder_url, self._CHECKSUMS_FILE_NAME)]
+            download_manager = DownloadManager(checksums_urls,
+                                               destination_folder,
+                                               self._get_logger(),
+                                               scheduler=self._get_download_scheduler(),
+                                               priority=DownloadScheduler.PRIORITY_HIGH,
+                                               transfer_engine=self._get_transfer_engine(),
+                                               source_urls=self._get_source_urls_for(checksums_urls))
+            download_manager.start_downloads()
+            download_manager.wait_all()
+            self._report_download_metrics(download_manager)
+        if not os.path.isfile(checksums_file_path):
+            self._get_logger().warning("NO CHECKSUMS available for '{}', "
+                                       "downloaded files in that folder WILL NOT be verified"
+                                       .format(remote_folder_url))
+            return {}
+        return read_checksums_file(checksums_file_path)
+
+    def _get_remote_checksums(self, remote_folder_url, destination_folder):
+        """
+        Get the checksums for the files in an Ensembl remote folder, from its 'CHECKSUMS' file. This file is fetched
+        only once, a local copy is kept in the given destination folder, and its content is cached for the session,
+        unless they could not be fetched. CHECKSUMS files for different folders are fetched at the same time.
+        :param remote_folder_url: URL of the Ensembl remote folder
+        :param destination_folder: local folder that mirrors the remote one
+        :return: a map from remote file name to its expected checksum, empty if the checksums are not available
+        """
+        return single_flight.get_once(self.__remote_checksums,
+                                      self.__remote_checksums_lock,
+                                      remote_folder_url,
+                                      lambda: self.__fetch_remote_checksums(remote_folder_url, destination_folder),
+                                      is_kept=bool)
+
+    def __read_remote_folder_listing(self, remote_folder_url, listing_file_path):
+        # Listings from a different Ensembl release, or a different remote folder, are not valid
+        try:
+            listing = general.read_json(listing_file_path)
+            if (listing['release'] == self.get_ensembl_release_name()) and (listing['url'] == remote_folder_url):
+                return listing['entries']
+        except Exception:
+            # There is no listing, or it can't be used
+            pass
+        return None
+
+    def __get_local_mirror_folder_listing(self, remote_folder_url):
+        for source_url in self._get_source_urls(remote_folder_url):
+            try:
+                listing = self._get_transfer_engine().list_folder(source_url, self._REMOTE_LISTING_TIMEOUT)
+            except TransferEngineException as e:
+                self._get_logger().warning("COULD NOT LIST local mirror folder '{}', '{}'".format(source_url, e))
+            else:
+                self._get_logger().info("Listing for '{}' TAKEN from local mirror folder '{}'"
+                                        .format(remote_folder_url, source_url))
+                return listing
+        return None
+
+    def __list_remote_folder(self, remote_folder_url, destination_folder):
+        listing_file_path = os.path.join(destination_folder, self._REMOTE_LISTING_FILE_NAME)
+        listing = self.__read_remote_folder_listing(remote_folder_url, listing_file_path)
+        if listing is not None:
+            return listing
+        try:
+            listing = self._get_transfer_engine().list_folder(remote_folder_url, self._REMOTE_LISTING_TIMEOUT)
+        except TransferEngineException as e:
+            # Local mirrors may be partial, they are listed only when Ensembl FTP can't be, and their listings are not
+            # kept
+            listing = self.__get_local_mirror_folder_listing(remote_folder_url)
+            if listing is None:
+                self._get_logger().warning("NO LISTING available for '{}', file names in that folder "
+                                           "WILL NOT be checked, '{}'".format(remote_folder_url, e))
+            return listing
+        # Other sessions, and other threads listing a different remote folder, may be reading it
+        temporary_file_path = "{}.{}.{}".format(listing_file_path, os.getpid(), threading.get_ident())
+        with open(temporary_file_path, 'w') as listing_file:
+            json.dump({'release': self.get_ensembl_release_name(),
+                       'url': remote_folder_url,
+                       'entries': listing},
+                      listing_file)
+        os.replace(temporary_file_path, listing_file_path)
+        return listing
+
+    def _get_remote_folder_listing(self, remote_folder_url, destination_folder):
+        """
+        Get the names of the files in an Ensembl remote folder. The folder is listed only once per Ensembl release, a
+        local copy of the listing is kept in the given destination folder, and it is cached for the session. Different
+        folders are listed at the same time, and listings that are not available are not cached, the next caller tries
+        again.
+        :param remote_folder_url: URL of the Ensembl remote folder
+        :param destination_folder: local folder that mirrors the remote one
+        :return: list of file names, or None if the listing is not available
+        """
+        return single_flight.get_once(self.__remote_listings,
+                                      self.__remote_listings_lock,
+                                      remote_folder_url,
+                                      lambda: self.__list_remote_folder(remote_folder_url, destination_folder),
+                                      is_kept=lambda listing: listing is not None)
+
+    def _resolve_remote_file_names(self, download_information, assembly, destination_folder):
+        """
+        Check the given remote files against the listing of their remote folders, so files that are not on Ensembl are
+        never requested. When a file is not there, but there is a single file in the same folder whose name differs
+        only on the assembly part, that file is used instead.
+        :param download_information: list of (file name, URL) pairs
+        :param assembly: species assembly, as it is used in the file names
+        :param destination_folder: local folder that mirrors the remote ones
+        :return: list of (file name, URL) pairs for the files available on Ensembl, files are given back as they are
+        when the listing of their folder is not available
+        """
+        resolved_download_information = []
+        # Folders are listed only once for all their files, even if their listing is not available
+        listings = {}
+        for file_name, url in download_information:
+            remote_folder_url, remote_file_name = url.rsplit('/', 1)
+            if remote_folder_url not in listings:
+                listings[remote_folder_url] = self._get_remote_folder_listing(remote_folder_url, destination_folder)
+            listing = listings[remote_folder_url]
+            if (listing is None) or (remote_file_name in listing):
+                resolved_download_information.append((file_name, url))
+                continue
+            # Remote files have an extra extension, i.e. '.gz', the local ones don't
+            remote_extension = remote_file_name[len(file_name):]
+            name_pattern = re.compile("^{}$".format(re.escape(remote_file_name).replace(re.escape(assembly), '.+', 1)))
+            candidates = [entry for entry in listing if name_pattern.match(entry)]
+            if len(candidates) == 1:
+                self._get_logger().warning("File '{}' NOT FOUND at '{}', RESOLVED to '{}'"
+                                           .format(remote_file_name, remote_folder_url, candidates[0]))
+                resolved_download_information.append((candidates[0][:len(candidates[0]) - len(remote_extension)],
+                                                      "{}/{}".format(remote_folder_url, candidates[0])))
+            else:
+                self._get_logger().error("File '{}' NOT FOUND at '{}', SKIPPED, candidates {}"
+                                         .format(remote_file_name, remote_folder_url, candidates))
+        return resolved_download_information
+
+    def _get_expected_checksums(self, download_information, destination_folder):
+        """
+        Work out the expected checksums for the given remote files
+        :param download_information: list of (file name, URL) pairs
+        :param destination_folder: local folder where the files are downloaded
+        :return: a map from file name to its expected checksum, or None if it is unknown
+        """
+        expected_checksums = {}
+        for file_name, url in download_information:
+            remote_folder_url, remote_file_name = url.rsplit('/', 1)
+            expected_checksums[file_name] = \
+                self._get_remote_checksums(remote_folder_url, destination_folder).get(remote_file_name)
+        return expected_checksums
+
+    def _get_manifest(self):
+        return self.__manifest
+
+    def _is_file_in_repository(self, file_path):
+        # The file system is only checked for those files the manifest doesn't know about
+        return (self._get_manifest().get_entry(file_path) is not None) or os.path.isfile(file_path)
+
+    def _is_local_file_valid(self, file_path, expected_checksum):
+        """
+        A local file is valid if it exists and, when its expected checksum is known, it has been verified against that
+        same checksum, as recorded in the manifest, files the manifest doesn't know about are not trusted. Files in the
+        manifest are checked against their record in it, without looking at the file system.
+        :param file_path: local file path
+        :param expected_checksum: expected checksum for the remote file, or None if unknown
+        :return: True if the local file can be used, False otherwise
+        """
+        manifest_entry = self._get_manifest().get_entry(file_path)
+        if manifest_entry is not None:
+            return (not expected_checksum) or (manifest_entry['checksum'] == expected_checksum)
+        return (not expected_checksum) and os.path.isfile(file_path)
+
+    def _record_verified_files(self, download_information, files, expected_checksums, successful_urls, taxonomy_id,
+                               kind):
+        """
+        Add the downloaded files to the manifest of the local repository, with the checksum they have been verified
+        against, as files are accepted into the local repository only once they have been verified, any successfully
+        downloaded file is a good one.
+        :param download_information: list of (file name, URL) pairs
+        :param files: list of (file name, local file path) pairs that have been downloaded
+        :param expected_checksums: map from file name to its expected checksum, or None if it is unknown
+        :param successful_urls: URLs that have been successfully downloaded
+        :param taxonomy_id: taxonomy the files are about
+        :param kind: kind of data in the files
+        :return: no return value
+        """
+        successful_file_urls = {file_name: url for file_name, url in download_information if url in successful_urls}
+        for file_name, file_path in files:
+            if file_name not in successful_file_urls:
+                continue
+            if os.path.isfile(file_path):
+                self._get_manifest().add_entry(file_path,
+                                               taxonomy_id,
+                                               kind,
+                                               self.__get_species_name(taxonomy_id),
+                                               os.path.getsize(file_path),
+                                               checksum=expected_checksums.get(file_name),
+                                               source_url=successful_file_urls[file_name])
+
+    def _link_files_from_previous_releases(self, download_information, files, expected_checksums, taxonomy_id, kind):
+        """
+        Files that have not changed on Ensembl since a previous release, i.e. the previous release local copy has been
+        verified against the same checksum the file has now on Ensembl, are linked from that previous release into the
+        current one, instead of downloading them again. File names in the previous release may differ in the release
+        number, as it happens for GTF files.
+        :param download_information: list of (file name, URL) pairs
+        :param files: list of (file name, local file path) pairs missing from the local repository
+        :param expected_checksums: map from file name to its expected checksum, or None if it is unknown
+        :param taxonomy_id: taxonomy the files are about
+        :param kind: kind of data in the files
+        :return: list of (file name, local file path) pairs that are still missing from the local repository
+        """
+        if not self.__previous_releases:
+            return files
+        urls = dict(download_information)
+        current_release_number = str(self._get_ensembl_service().get_release_number())
+        still_missing_files = []
+        for file_name, file_path in files:
+            expected_checksum = expected_checksums.get(file_name)
+            linked = False
+            # Files with no known checksum can't be compared
+            if expected_checksum:
+                relative_folder = os.path.dirname(self._get_manifest().get_relative_path(file_path))
+                for release_number, release_folder_path, manifest in self.__previous_releases:
+                    # Local files carry the storage extension, so files kept in a different storage mode in the
+                    # previous release are never linked
+                    previous_file_names = {"{}{}".format(previous_file_name, self.__get_storage_file_extension())
+                                           for previous_file_name in
+                                           [file_name, file_name.replace(".{}.".format(current_release_number),
+                                                                         ".{}.".format(release_number), 1)]}
+                    for previous_file_name in previous_file_names:
+                        previous_file_path = os.path.join(release_folder_path, relative_folder, previous_file_name)
+                        previous_entry = manifest.get_entry(previous_file_path)
+                        if (not previous_entry) or (previous_entry['checksum'] != expected_checksum):
+                            continue
+                        try:
+                            if self._is_storage_compressed():
+                                # The index goes in first
+                                general.link_file(bgzf.get_index_file_path(previous_file_path),
+                                                  bgzf.get_index_file_path(file_path),
+                                                  self._get_configuration_manager()
+                                                  .get_release_rollover_link_modes())
+                            link_mode = general.link_file(previous_file_path,
+                                                          file_path,
+                                                          self._get_configuration_manager()
+                                                          .get_release_rollover_link_modes())
+                        except ToolBoxException as e:
+                            self._get_logger().warning("File '{}' UNCHANGED since release {}, but it COULD NOT BE "
+                                                       "LINKED, it will be downloaded, '{}'"
+                                                       .format(file_name, release_number, e))
+                            continue
+                        self._get_logger().info("File '{}' UNCHANGED since release {}, {} from '{}'"
+                                                .format(file_name, release_number, link_mode, previous_file_path))
+                        self._record_verified_files([(file_name, urls[file_name])],
+                                                    [(file_name, file_path)],
+                                                    expected_checksums,
+                                                    [urls[file_name]],
+                                                    taxonomy_id,
+                                                    kind)
+                        linked = True
+                        break
+                    if linked:
+                        break
+            if not linked:
+                still_missing_files.append((file_name, file_path))
+        return still_missing_files
+
+    @staticmethod
+    def _get_missing_files_errors(files):
+        """
+        Check which of the given files are not present in the local repository
+        :param files: list of (file name, local file path) pairs
+        :return: list of (local file path, error) pairs for those files not present locally
+        """
+        return [(file_local_path, "file NOT AVAILABLE after downloading it")
+                for file_name, file_local_path in files
+                if not os.path.isfile(file_local_path)]
+
     def get_local_path_root_ensembl_repo(self):
         """
         Get the local root folder where all ensembl data releases are going to be made locally available
@@ -517,31 +1674,37 @@ class DataDownloadService:
         return os.path.join(self.get_local_path_ensembl_release(),
                             self.__get_subpath_genome_reference_for_species(taxonomy_id))
 
+    def __get_storage_file_extension(self):
+        # Files kept compressed in the local repository have an extra extension
+        return bgzf.BGZF_FILE_EXTENSION if self._is_storage_compressed() else ''
+
     def _get_protein_sequence_file_path_local(self, taxonomy_id, file_names):
         """
         The local file path for a protein file name is
         <local_path_ensembl_release>/<subpath_protein_sequence_for_species>/file_name (local copies of Ensembl files are
-        stored uncompressed, that's why we use the given name for every file)
+        stored uncompressed, that's why we use the given name for every file, unless they are kept BGZF compressed, in
+        which case they have the '.bgz' extension)
         :param taxonomy_id: target taxonomy id
         :param file_names: protein sequence file names
         :return: a list of tuples of the form (file_name, absolute path to that file in the local Ensembl repository)
         """
         return [(file_name, os.path.abspath(
             os.path.join(self._get_protein_sequence_file_destination_path_local(taxonomy_id),
-                         file_name))) for file_name in file_names]
+                         "{}{}".format(file_name, self.__get_storage_file_extension())))) for file_name in file_names]
 
     def _get_genome_reference_file_path_local(self, taxonomy_id, file_names):
         """
         The local file path for a gtf file name is
         <local_path_ensembl_release>/<subpath_gtf_for_species>/file_name (local copies of Ensembl files are stored
-        uncompressed, that's why we use the given name for every file)
+        uncompressed, that's why we use the given name for every file, unless they are kept BGZF compressed, in which
+        case they have the '.bgz' extension)
         :param taxonomy_id: target taxonomy id
         :param file_names: gtf file names
         :return: a list of tuples of the form (file_name, absolute path to that file in the local Ensembl repository)(
         """
         return [(file_name, os.path.abspath(
             os.path.join(self._get_genome_reference_file_destination_path_local(taxonomy_id),
-                         file_name))) for file_name in file_names]
+                         "{}{}".format(file_name, self.__get_storage_file_extension())))) for file_name in file_names]
 
     def _get_protein_sequence_file_path_remote(self, file_names, species):
         """
@@ -575,12 +1738,34 @@ class DataDownloadService:
         )
         return [(file_name, "{}/{}.gz".format(base_url, file_name)) for file_name in file_names]
 
-    def _get_protein_sequence_ensembl_file_name_for_species(self, taxonomy_id):
+    def get_protein_sequence_file_suffixes(self):
+        """
+        Get all the known protein sequence file variants, for mirroring them all
+        :return: a list of suffixes for protein sequence files on Ensembl
+        """
+        return self._get_configuration_manager().get_ensembl_protein_sequence_file_suffixes()
+
+    def get_genome_reference_file_suffixes(self):
+        """
+        Get all the known GTF file variants, for mirroring them all
+        :return: a list of suffixes for GTF files on Ensembl
+        """
+        return self._get_configuration_manager().get_ensembl_gtf_file_suffixes()
+
+    def _check_requested_file_suffixes(self, suffixes, known_suffixes, file_kind):
+        unknown_suffixes = [suffix for suffix in suffixes if suffix not in known_suffixes]
+        if unknown_suffixes:
+            # Ensembl may still have them, so we try anyway
+            self._get_logger().warning("UNKNOWN {} file suffixes requested {}, known suffixes are {}"
+                                       .format(file_kind, unknown_suffixes, known_suffixes))
+
+    def _get_protein_sequence_ensembl_file_name_for_species(self, taxonomy_id, suffixes):
         """
         The name for a protein sequence file in Ensembl is
         <species_name_with_first_capital_letter>.<species_assembly>.<file_type e.g. 'pep'>.[all,abinitio].fa
         e.g. Homo_sapiens.GRCh38.pep.all.fa, on Ensembl will have the extension .gz, because it is a compressed file
         :param taxonomy_id: taxonomy ID for which to work out the file name
+        :param suffixes: suffixes of the file variants to work out the names for
         :return: the file name, without the .gz extension that is found on Ensembl FTP, or None, if the taxonomy is not
         in Ensembl
         """
@@ -600,17 +1785,18 @@ class DataDownloadService:
                                             file_type,
                                             suffix,
                                             file_extension)
-                    for suffix in self._get_configuration_manager().get_ensembl_protein_sequence_file_suffixes()]
+                    for suffix in suffixes]
         else:
             self._get_logger().error(
                 "TAXONOMY ID #{} NOT FOUND in Ensembl (protein sequence request)".format(taxonomy_id))
         return None
 
-    def _get_genome_reference_ensembl_file_name_for_species(self, taxonomy_id):
+    def _get_genome_reference_ensembl_file_name_for_species(self, taxonomy_id, suffixes):
         """
         The name for a GTF file in Ensembl is
         <species_name_with_first_capital_letter>.<species_assembly>.<ensembl_release_number, e.g. 89>.['','abinitio','chr','chr_patch_hapl_scaff'].gtf
         :param taxonomy_id: taxonomy ID for which to work out the file name
+        :param suffixes: suffixes of the file variants to work out the names for
         :return: the file name, without the .gz extension that is found on Ensembl FTP
         """
         # Deal with those taxonomy IDs that are not in Ensembl
@@ -632,166 +1818,650 @@ class DataDownloadService:
                                            ensembl_release_number,
                                            suffix,
                                            file_extension)
-                    for suffix in self._get_configuration_manager().get_ensembl_gtf_file_suffixes()]
+                    for suffix in suffixes]
         else:
             self._get_logger().error("TAXONOMY ID #{} NOT FOUND in Ensembl (gtf request)".format(taxonomy_id))
         return None
 
-    def get_protein_sequences_for_species(self, taxonomy_id):
+    def get_protein_sequences_for_species(self, taxonomy_id, suffixes=None):
         """
         This method will make sure the protein sequence files are available locally, before returning the result map
-        that contains the file names and their local paths
+        that contains the file names and their local paths. Only the requested file variants are fetched. When the
+        local repository keeps the files compressed, the local paths are those of their uncompressed transient copies.
         :param taxonomy_id: Taxonomy ID for which we want the protein sequences
+        :param suffixes: suffixes of the protein sequence files to fetch, e.g. ['all'], the configured default ones if
+        not specified, see 'get_protein_sequence_file_suffixes' for all of them
         :return: the list of protein sequences file names with their local paths or None in case the taxonomy has not
         been found on Ensembl
         """
-        # Work out the file names for the data to retrieve from Ensembl
-        file_names = self._get_protein_sequence_ensembl_file_name_for_species(taxonomy_id)
-        if not file_names:
-            return None
-        self._get_logger().debug("Working with Ensembl protein sequence file names for taxonomy ID '{}' - '{}'"
-                                 .format(taxonomy_id, str(file_names)))
-        # Work out their path in the local repository
-        protein_sequence_files_local_path = self._get_protein_sequence_file_path_local(taxonomy_id, file_names)
-        self._get_logger().debug("Local Ensembl Repo protein sequence paths for taxonomy ID '{}', file paths '{}'"
-                                 .format(taxonomy_id, str(protein_sequence_files_local_path)))
-        # Check if they already exist locally
-        missing_files = [(missing_file_name, missing_file_path)
-                         for missing_file_name, missing_file_path
-                         in protein_sequence_files_local_path
-                         if not os.path.exists(missing_file_path)]
-        if missing_files:
-            # Work out their remote path on Ensembl FTP
-            self._get_logger() \
-                .debug("There are {} protein sequence files missing from the local repository "
-                       "for taxonomy ID '{}': {}"
-                       .format(len(missing_files),
-                               taxonomy_id,
-                               "[{}]".format(","
-                                             .join(["'{} -> {}'"
-                                                   .format(missing_file_name, missing_file_path)
-                                                    for missing_file_name, missing_file_path
-                                                    in missing_files]))))
-            # Retrieve the files, keep in mind that _get_protein_sequence_file_path_remote operates on file names
-            download_information = self._get_protein_sequence_file_path_remote(
-                [file_entry[0] for file_entry in missing_files],
-                taxonomy_id)
-            destination_folder = self._get_protein_sequence_file_destination_path_local(taxonomy_id)
-            # Make sure that the destination folder exists
-            general.check_create_folders([destination_folder])
-            download_urls = [url for file_name, url in download_information]
-            self._get_logger().info("Protein Sequence files to download to '{}': '{}'".format(
-                destination_folder,
-                ",".join(download_urls)))
-            download_manager = DownloadManager(download_urls,
-                                               destination_folder,
-                                               self._get_logger())
-            download_manager.start_downloads()
-            download_manager.wait_all()
-            if not download_manager.is_success():
-                self._get_logger().error("ERROR Downloading files from Ensembl !!!")
-                # TODO - Should I raise an exception here? See how the code goes and take a decission later
-            # Once the files have been downloaded, we know they come compressed from Ensembl, with .gz extension
-            # Uncompress the files
-            # I have their local paths in 'missin_files' second component of the pairs in the list, I just need to add
-            # the '.gz' extension for them, as they come gzipped from Ensembl
-            errors = general.gunzip_files(
-                ["{}.gz".format(file_local_path) for file_name, file_local_path in missing_files])
-            # Deal with possible errors
-            if errors:
-                msg = "An ERROR occurred while obtaining the following protein sequence files " \
-                      "for taxonomy ID '{}' -> '{}'".format(taxonomy_id,
-                                                            "\n".join(
-                                                                ["File '{}', ERROR '{}'"
-                                                                     .format(file, error) for file, error in errors]
-                                                            ))
-                self._get_logger().error(msg)
-                # I just found out that Ensembl does not have files for all the taxonomies using all the suffixes in a
-                # uniform way, thus, if some of the files where not found, I WILL NOT raise an exception, I will do the
-                # "Windows" here by keeping it quiet ^_^
-                # raise EnsemblDownloadManagerException(msg)
-        # Return the protein sequences file names and their local paths, those that were downloaded successfuly, which
-        # means we may pontentially be missing files out
-        # TODO - I need to review this return value in the future
-        return [(file_name, file_path)
-                for file_name, file_path in protein_sequence_files_local_path
-                if (os.path.isfile(file_path))]
-
-    def get_genome_reference_for_species(self, taxonomy_id):
+        self._lease_species(taxonomy_id)
+        return self._get_files_for_consumers(
+            self._fetch_files_for_species(taxonomy_id, self.KIND_PROTEIN_SEQUENCES, suffixes))
+
+    def get_genome_reference_for_species(self, taxonomy_id, suffixes=None):
         """
         This method will make sure the GTF files are available locally, before returning the result map
-        that contains the file names and their local paths
+        that contains the file names and their local paths. Only the requested file variants are fetched. When the
+        local repository keeps the files compressed, the local paths are those of their uncompressed transient copies.
         :param taxonomy_id: Taxonomy ID for which we want the GTF files
+        :param suffixes: suffixes of the GTF files to fetch, e.g. [''] for the GTF file with no suffix, the configured
+        default ones if not specified, see 'get_genome_reference_file_suffixes' for all of them
         :return: the list of GTF file names with their local paths or None in case the taxonomy has not
         been found on Ensembl
         """
+        self._lease_species(taxonomy_id)
+        return self._get_files_for_consumers(
+            self._fetch_files_for_species(taxonomy_id, self.KIND_GENOME_REFERENCE, suffixes))
+
+    def _get_data_files_kind(self, kind):
+        """
+        Get what this service needs to know for fetching Ensembl data files of the given kind
+        :param kind: kind of data files, see 'KIND_PROTEIN_SEQUENCES' and 'KIND_GENOME_REFERENCE'
+        :return: the DataFilesKind for the given kind of data files
+        :except: EnsemblDownloadManagerException if the given kind of data files is not known
+        """
+        if kind == self.KIND_PROTEIN_SEQUENCES:
+            return ProteinSequenceFilesKind(self)
+        if kind == self.KIND_GENOME_REFERENCE:
+            return GenomeReferenceFilesKind(self)
+        raise EnsemblDownloadManagerException("UNKNOWN kind of Ensembl data files '{}', known kinds are {}"
+                                              .format(kind, [self.KIND_PROTEIN_SEQUENCES, self.KIND_GENOME_REFERENCE]))
+
+    def _fetch_files_for_species_kind(self, kind, taxonomy_id, suffixes=None):
+        """
+        Make sure the Ensembl data files of the given kind are in the local repository, see
+        'get_protein_sequences_for_species' and 'get_genome_reference_for_species'
+        :param kind: kind of data files, see 'KIND_PROTEIN_SEQUENCES' and 'KIND_GENOME_REFERENCE'
+        :param taxonomy_id: ncbi taxonomy id
+        :param suffixes: suffixes of the file variants to fetch, the configured default ones if not specified
+        :return: the list of file names with their paths in the local repository, including those that could not be
+        downloaded, or None in case the taxonomy has not been found on Ensembl
+        :except: EnsemblDownloadManagerException if the given kind of data files is not known. Files that could not be
+        downloaded are logged as errors, but no exception is raised for them, as Ensembl does not have every file
+        variant for every species, callers just don't find them in the result of '_fetch_files_for_species', and the
+        next caller tries to download them again
+        """
+        files_kind = self._get_data_files_kind(kind)
+        if suffixes is None:
+            suffixes = files_kind.get_default_suffixes()
+        self._check_requested_file_suffixes(suffixes, files_kind.get_known_suffixes(), files_kind.label)
         # Work out the file names for the data to retrieve from Ensembl
-        file_names = self._get_genome_reference_ensembl_file_name_for_species(taxonomy_id)
+        file_names = files_kind.get_file_names(taxonomy_id, suffixes)
         if not file_names:
             return None
-        self._get_logger().debug("Working with Ensembl GTF file names for taxonomy ID '{}' - '{}'"
-                                 .format(taxonomy_id, str(file_names)))
-        # Work out their path in the local repository
-        gtf_files_local_path = self._get_genome_reference_file_path_local(taxonomy_id, file_names)
-        self._get_logger().debug("Local Ensembl Repo GTF paths for taxonomy ID '{}', file paths '{}'"
-                                 .format(taxonomy_id, str(gtf_files_local_path)))
-        # Check if they already exist locally
-        missing_files = [(missing_file_name, missing_file_path)
-                         for missing_file_name, missing_file_path
-                         in gtf_files_local_path
-                         if not os.path.exists(missing_file_path)]
-        if missing_files:
-            # If not, work out their remote path on Ensembl FTP
-            self._get_logger() \
-                .debug("There are {} GTF files missing from the local repository for taxonomy ID '{}': {}"
-                       .format(len(missing_files),
-                               taxonomy_id,
-                               "[{}]".format(",".join(["'{} -> {}'".format(
-                                   missing_file_name, missing_file_path)
-                                   for missing_file_name, missing_file_path
-                                   in missing_files]))))
-            # Retrieve the files
-            download_information = self._get_genome_reference_file_path_remote(
-                [file_entry[0] for file_entry in missing_files],
-                taxonomy_id)
+        self._get_logger().debug("Working with Ensembl {} file names for taxonomy ID '{}' - '{}'"
+                                 .format(files_kind.label, taxonomy_id, str(file_names)))
+        # Work out their remote path on Ensembl FTP, and their expected checksums
+        download_information = files_kind.get_remote_paths(file_names, taxonomy_id)
+        destination_folder = files_kind.get_destination_folder(taxonomy_id)
+        # Make sure that the destination folder exists
+        general.check_create_folders([destination_folder])
+        # Only one session at a time checks and downloads files into this folder, anyone else waits for it
+        with self._get_download_lock(destination_folder):
+            # Whatever other sessions have downloaded into this folder, before we got the lock, is in the manifest
+            self._get_manifest().reload()
+            # Only files that are actually on Ensembl are requested
+            download_information = self._resolve_remote_file_names(download_information,
+                                                                   self.__get_assembly_for_species(taxonomy_id),
+                                                                   destination_folder)
+            # Work out their path in the local repository
+            files_local_path = files_kind.get_local_paths(taxonomy_id,
+                                                           [file_name for file_name, url in download_information])
+            self._get_logger().debug("Local Ensembl Repo {} paths for taxonomy ID '{}', file paths '{}'"
+                                     .format(files_kind.label, taxonomy_id, str(files_local_path)))
+            expected_checksums = self._get_expected_checksums(download_information, destination_folder)
+            # Check if they already exist locally, and they are valid
+            missing_files = [(missing_file_name, missing_file_path)
+                             for missing_file_name, missing_file_path
+                             in files_local_path
+                             if not self._is_local_file_valid(missing_file_path,
+                                                              expected_checksums.get(missing_file_name))]
+            # Files that have not changed since a previous release don't need to be downloaded again
+            missing_files = self._link_files_from_previous_releases(download_information,
+                                                                    missing_files,
+                                                                    expected_checksums,
+                                                                    taxonomy_id,
+                                                                    kind)
+            if missing_files:
+                self._get_logger() \
+                    .debug("There are {} {} files missing from the local repository for taxonomy ID '{}': {}"
+                           .format(len(missing_files),
+                                   files_kind.label,
+                                   taxonomy_id,
+                                   "[{}]".format(",".join(["'{} -> {}'".format(missing_file_name, missing_file_path)
+                                                           for missing_file_name, missing_file_path
+                                                           in missing_files]))))
+                # Retrieve the files
+                missing_file_names = [file_entry[0] for file_entry in missing_files]
+                download_urls = [url for file_name, url in download_information if file_name in missing_file_names]
+                self._get_logger().info("{} files to download to '{}': '{}'"
+                                        .format(files_kind.label.capitalize(),
+                                                destination_folder,
+                                                ",".join(download_urls)))
+                download_manager = self._get_download_manager(download_urls,
+                                                              destination_folder,
+                                                              {url: expected_checksums[file_name]
+                                                               for file_name, url in download_information})
+                download_manager.start_downloads()
+                download_manager.wait_all()
+                self._report_download_metrics(download_manager)
+                if not download_manager.is_success():
+                    self._get_logger().error("ERROR Downloading files from Ensembl !!!")
+                # Files come gzip compressed from Ensembl, the download manager inflates them while they are downloaded,
+                # or they are re-compressed as BGZF into the local repository, so anything still missing from the local
+                # repository could not be obtained
+                successful_urls = self._store_downloaded_files(download_information,
+                                                               missing_files,
+                                                               download_manager.get_successful_urls(),
+                                                               destination_folder)
+                self._record_verified_files(download_information,
+                                            missing_files,
+                                            expected_checksums,
+                                            successful_urls,
+                                            taxonomy_id,
+                                            kind)
+                errors = self._get_missing_files_errors(missing_files)
+                # Deal with possible errors
+                if errors:
+                    msg = "An ERROR occurred while obtaining the following {} files for taxonomy ID '{}' -> '{}'" \
+                        .format(files_kind.label,
+                                taxonomy_id,
+                                "\n".join(["File '{}', ERROR '{}'"
+                                           .format(file, error) for file, error in errors]))
+                    self._get_logger().error(msg)
+            # Still holding the download lock, so derived artifacts are built only once per species and release
+            self._build_derived_artifacts(taxonomy_id, kind, files_local_path)
+        # Return all the file names and their local paths, those that could not be downloaded are left out by the
+        # caller, see '_fetch_files_for_species'
+        self._get_manifest().record_access([file_path for file_name, file_path in files_local_path])
+        return files_local_path
+
+    def get_slim_genome_reference_for_species(self, taxonomy_id, suffixes=None):
+        """
+        Same as 'get_genome_reference_for_species', but the slim version of the GTF files is given, i.e. with only the
+        configured feature types in them, for those files that have one, see 'derived artifacts'
+        :param taxonomy_id: Taxonomy ID for which we want the GTF files
+        :param suffixes: suffixes of the GTF files to fetch, the configured default ones if not specified
+        :return: the list of GTF file names with the local paths of their slim version, or the full version if there is
+        no slim one, or None in case the taxonomy has not been found on Ensembl
+        """
+        self._lease_species(taxonomy_id)
+        files = self._fetch_files_for_species(taxonomy_id, self.KIND_GENOME_REFERENCE, suffixes)
+        if files is None:
+            return None
+        slim_files = []
+        for file_name, file_path in files:
+            slim_gtf_file_path = derived_artifacts.get_slim_gtf_file_path(file_path)
+            slim_files.append((file_name, slim_gtf_file_path if os.path.isfile(slim_gtf_file_path) else file_path))
+        return self._get_files_for_consumers(slim_files)
+
+    def get_chromosome_sizes_for_species(self, taxonomy_id):
+        """
+        Get the chromosome sizes for the given taxonomy, with Ensembl chromosome names, from the chromosome sizes table
+        in the local repository, it is built if it is not there yet
+        :param taxonomy_id: ncbi taxonomy id
+        :return: map from chromosome name to its size, or None in case the taxonomy has not been found on Ensembl, or
+        its chromosome sizes are not available
+        """
+        if not self._get_ensembl_service().get_species_data_service().get_species_entry_for_taxonomy_id(taxonomy_id):
+            self._get_logger().error("TAXONOMY ID #{} NOT FOUND in Ensembl (chromosome sizes request)"
+                                     .format(taxonomy_id))
+            return None
+        self._lease_species(taxonomy_id)
+        # The table is written in one go, so it can be read without the download lock of its folder, which is only
+        # taken for building it, it is checked again once the lock is held, see '__build_chromosome_sizes'
+        if not os.path.isfile(self._get_chromosome_sizes_file_path(taxonomy_id)):
             destination_folder = self._get_genome_reference_file_destination_path_local(taxonomy_id)
-            # Make sure that the destination folder exists
             general.check_create_folders([destination_folder])
-            download_urls = [url for file_name, url in download_information]
-            self._get_logger().info("GTF files to download to '{}': '{}'"
-                                    .format(destination_folder, ",".join(download_urls)))
-            download_manager = DownloadManager(download_urls,
-                                               destination_folder,
-                                               self._get_logger())
-            download_manager.start_downloads()
-            download_manager.wait_all()
-            if not download_manager.is_success():
-                self._get_logger().error("ERROR Downloading files from Ensembl !!!")
-                # TODO - Should I raise an exception here? See how the code goes and take a decission later
-            # Once the files have been downloaded, we know they come compressed from Ensembl, with .gz extension
-            # Uncompress the files
-            # I have their local paths in 'missin_files' second component of the pairs in the list, I just need to add
-            # the '.gz' extension for them, as they come gzipped from Ensembl
-            errors = general.gunzip_files(
-                ["{}.gz".format(file_local_path) for file_name, file_local_path in missing_files])
-            # Deal with possible errors
-            if errors:
-                msg = "An ERROR occurred while obtaining the following GTF files for taxonomy ID '{}' -> '{}'" \
-                    .format(taxonomy_id,
-                            "\n".join(["File '{}', ERROR '{}'"
-                                      .format(file, error) for file, error in errors]
-                                      ))
-                self._get_logger().error(msg)
-                # I just found out that Ensembl does not have files for all the taxonomies using all the suffixes in a
-                # uniform way, thus, if some of the files where not found, I WILL NOT raise an exception, I will do the
-                # "Windows" here by keeping it quiet ^_^
-                # raise EnsemblDownloadManagerException(msg)
-        # Return the .gtf file names and their local paths for the given ncbi taxonomy id. Return only those file that
-        # were successfuly downloaded.
-        # TODO - I need to review this return value in the future
-        return [(file_name, file_path)
-                for file_name, file_path in gtf_files_local_path
-                if os.path.isfile(file_path)]
+            with self._get_download_lock(destination_folder):
+                self.__build_chromosome_sizes(taxonomy_id)
+        try:
+            return derived_artifacts.read_chromosome_sizes(self._get_chromosome_sizes_file_path(taxonomy_id))
+        except (OSError, ValueError) as e:
+            self._get_logger().error("Chromosome sizes for taxonomy ID #{} NOT AVAILABLE, '{}'".format(taxonomy_id, e))
+            return None
+
+    def __get_fetch_key(self, taxonomy_id, kind, suffixes):
+        if suffixes is None:
+            suffixes = self._get_data_files_kind(kind).get_default_suffixes()
+        return self.get_ensembl_release_name(), str(taxonomy_id), kind, tuple(sorted(suffixes))
+
+    def _fetch_files_for_species(self, taxonomy_id, kind, suffixes=None):
+        """
+        Make sure the Ensembl data files of the given kind, for the given taxonomy, are in the local repository, only
+        once per session. The first caller fetches them, other threads asking for the same files in the meantime wait
+        for it to finish, instead of working out, and downloading, the same files at the same time, and the result is
+        kept for the rest of the session. Failed fetches, and those where some of the files could not be downloaded, are
+        not kept, the next caller tries again.
+        :param taxonomy_id: ncbi taxonomy id
+        :param kind: kind of data files, see 'KIND_PROTEIN_SEQUENCES' and 'KIND_GENOME_REFERENCE'
+        :param suffixes: suffixes of the file variants to fetch, the configured default ones if not specified
+        :return: the list of file names with their paths in the local repository, those that could not be downloaded
+        are left out, or None in case the taxonomy has not been found on Ensembl
+        """
+        files = single_flight.get_once(self.__fetches,
+                                       self.__fetches_lock,
+                                       self.__get_fetch_key(taxonomy_id, kind, suffixes),
+                                       lambda: self._fetch_files_for_species_kind(kind, taxonomy_id, suffixes),
+                                       is_kept=self.__is_fetch_complete)
+        if files is None:
+            return None
+        # Callers get their own copy of the list
+        return [(file_name, file_path) for file_name, file_path in files if self._is_file_in_repository(file_path)]
+
+    def __is_fetch_complete(self, files):
+        return (files is None) or all([self._is_file_in_repository(file_path) for file_name, file_path in files])
+
+    def prefetch(self, taxonomy_ids, kinds=None, suffixes=None):
+        """
+        Make sure the Ensembl data files for the given taxonomies are available locally. Files for different species
+        are fetched at the same time, through the download scheduler of this service, so the whole job is bound by its
+        concurrency limits, instead of going species by species.
+
+        This is a generator, it gives back the results as they complete, not necessarily in the given order.
+        :param taxonomy_ids: taxonomy IDs for which we want the data
+        :param kinds: kinds of data files to fetch, all of them by default, see 'KIND_PROTEIN_SEQUENCES' and
+        'KIND_GENOME_REFERENCE'
+        :param suffixes: map from kind of data file to the suffixes of the file variants to fetch, the configured
+        default ones for those kinds not in the map
+        :return: (taxonomy ID, kind, list of file names with their paths in the local repository), the list is None in
+        case the taxonomy has not been found on Ensembl, or its files could not be fetched
+        """
+        known_kinds = [self.KIND_PROTEIN_SEQUENCES, self.KIND_GENOME_REFERENCE]
+        kinds = kinds or known_kinds
+        unknown_kinds = [kind for kind in kinds if kind not in known_kinds]
+        if unknown_kinds:
+            raise EnsemblDownloadManagerException("UNKNOWN kinds of Ensembl data files {}, known kinds are {}"
+                                                  .format(unknown_kinds, known_kinds))
+        suffixes = suffixes or {}
+        # Plan up front, taxonomies that are not on Ensembl are left out
+        self.get_remote_path_ensembl_release()
+        species_data_service = self._get_ensembl_service().get_species_data_service()
+        fetches = []
+        for taxonomy_id in taxonomy_ids:
+            if not species_data_service.get_species_entry_for_taxonomy_id(taxonomy_id):
+                self._get_logger().error("TAXONOMY ID #{} NOT FOUND in Ensembl (prefetch request)".format(taxonomy_id))
+                for kind in kinds:
+                    yield taxonomy_id, kind, None
+                continue
+            fetches.extend([(taxonomy_id, kind) for kind in kinds])
+        self._get_logger().info("Prefetching Ensembl data files {} for {} taxonomies"
+                                .format(kinds, len(fetches) // len(kinds)))
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._get_configuration_manager().get_prefetch_concurrency())
+        # Files are only prefetched into the local repository, no transient copies are made for them
+        futures = {executor.submit(self._fetch_files_for_species, taxonomy_id, kind, suffixes.get(kind)):
+                   (taxonomy_id, kind) for taxonomy_id, kind in fetches}
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                taxonomy_id, kind = futures[future]
+                try:
+                    files = future.result()
+                except Exception as e:
+                    self._get_logger().error("ERROR prefetching '{}' files for taxonomy ID #{}, '{}'"
+                                             .format(kind, taxonomy_id, e))
+                    files = None
+                yield taxonomy_id, kind, files
+        finally:
+            # In case the caller is not interested in the rest of the results
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def __get_kind_and_species_for_path(self, relative_path):
+        # The local repository is laid out as Ensembl is, i.e. 'fasta/<species>/pep/<file>' for protein sequence files,
+        # and 'gtf/<species>/<file>' for genome reference files
+        path_parts = relative_path.split(os.sep)
+        if (len(path_parts) == 4) \
+                and (path_parts[0] == self._get_configuration_manager().get_folder_name_fasta()) \
+                and (path_parts[2] == self._get_configuration_manager().get_folder_name_protein_sequences()):
+            return self.KIND_PROTEIN_SEQUENCES, path_parts[1]
+        if (len(path_parts) == 3) and (path_parts[0] == self._get_configuration_manager().get_folder_name_gtf()):
+            return self.KIND_GENOME_REFERENCE, path_parts[1]
+        return None, None
+
+    def _is_data_file(self, file_name):
+        return not (file_name.startswith('.')
+                    or (file_name == self._CHECKSUMS_FILE_NAME)
+                    or file_name.endswith(self._NON_DATA_FILE_EXTENSIONS))
+
+    def __get_verified_checksum(self, file_path, checksums):
+        """
+        Verify a file found in the local repository, for recording it in the manifest. Files can only be verified when
+        the gzip compressed file they come from, as it is on Ensembl, is in the same folder, i.e. for '.gz' files, and
+        for uncompressed files when compressed files are kept, see 'keep_compressed_files'.
+        :param file_path: path to the file
+        :param checksums: map from Ensembl file name to its expected checksum, from the local copy of the 'CHECKSUMS'
+        file of the folder
+        :return: the checksum the file has been verified against, or None if it could not be verified
+        """
+        folder, file_name = os.path.split(file_path)
+        ensembl_file_name = file_name if file_name.endswith('.gz') else "{}.gz".format(file_name)
+        expected_checksum = checksums.get(ensembl_file_name)
+        ensembl_file_path = os.path.join(folder, ensembl_file_name)
+        if (not expected_checksum) or (not os.path.isfile(ensembl_file_path)):
+            return None
+        try:
+            checksum_value = ChecksumFactory.get_checksum_for_file(ensembl_file_path,
+                                                                   expected_checksum['algorithm'],
+                                                                   use_sum_tool=True)
+        except (ChecksumException, OSError) as e:
+            self._get_logger().warning("File '{}' COULD NOT BE VERIFIED, '{}'".format(file_path, e))
+            return None
+        if checksum_value != expected_checksum['value']:
+            self._get_logger().warning("File '{}' FAILED verification, '{}' checksum of '{}' is '{}', expected '{}'"
+                                       .format(file_path,
+                                               expected_checksum['algorithm'],
+                                               ensembl_file_path,
+                                               checksum_value,
+                                               expected_checksum['value']))
+            return None
+        return expected_checksum
+
+    def reconcile_manifest(self):
+        """
+        Rebuild the manifest of the local Ensembl release from what is actually on disk, files that are not there any
+        more are removed from it, and files it doesn't know about are added. Files that are new to the manifest, or
+        whose size has changed, are verified against the local copy of the 'CHECKSUMS' file of their folder, when
+        possible, see '__get_verified_checksum'. Files that can't be verified, e.g. files kept as BGZF, or uncompressed
+        files without their compressed version, are recorded with no checksum, and they will be downloaded again the
+        first time they are asked for, as long as Ensembl publishes a checksum for them. Every folder is scanned holding
+        its download lock, so files being downloaded are left out.
+        :return: dictionary with the number of files 'kept', 'added', 'updated' and 'removed'
+        """
+        manifest = self._get_manifest()
+        manifest.reload()
+        previous_entries = {entry['path']: entry for entry in manifest.get_entries()}
+        # Files found on disk keep their taxonomy from the manifest, as it can't be worked out from their path
+        taxonomy_ids = {entry['species']: entry['taxonomy_id']
+                        for entry in previous_entries.values() if entry.get('taxonomy_id')}
+        entries = []
+        summary = {'kept': 0, 'added': 0, 'updated': 0, 'removed': 0}
+        for dir_path, dir_names, file_names in os.walk(self.get_local_path_ensembl_release()):
+            data_file_paths = [os.path.join(dir_path, file_name)
+                               for file_name in file_names
+                               if self._is_data_file(file_name)
+                               and self.__get_kind_and_species_for_path(manifest.get_relative_path(
+                                   os.path.join(dir_path, file_name)))[0]]
+            if not data_file_paths:
+                continue
+            with self._get_download_lock(dir_path):
+                checksums_file_path = os.path.join(dir_path, self._CHECKSUMS_FILE_NAME)
+                checksums = read_checksums_file(checksums_file_path) if os.path.isfile(checksums_file_path) else {}
+                for file_path in data_file_paths:
+                    if not os.path.isfile(file_path):
+                        continue
+                    relative_path = manifest.get_relative_path(file_path)
+                    kind, species = self.__get_kind_and_species_for_path(relative_path)
+                    size = os.path.getsize(file_path)
+                    previous_entry = previous_entries.get(relative_path)
+                    if previous_entry and (previous_entry['size'] == size):
+                        summary['kept'] += 1
+                        entries.append(previous_entry)
+                        continue
+                    # Files that have changed, or that the manifest doesn't know about, have not been verified yet
+                    summary['updated' if previous_entry else 'added'] += 1
+                    entries.append(manifest.create_entry(file_path,
+                                                         taxonomy_ids.get(species),
+                                                         kind,
+                                                         species,
+                                                         size,
+                                                         checksum=self.__get_verified_checksum(file_path, checksums),
+                                                         source_url=previous_entry.get('source_url')
+                                                         if previous_entry else None,
+                                                         download_time=os.path.getmtime(file_path)))
+        summary['removed'] = len(set(previous_entries.keys()) - set([entry['path'] for entry in entries]))
+        manifest.rebuild(entries)
+        self._get_logger().info("Manifest '{}' RECONCILED with the local repository, {}"
+                                .format(manifest.get_manifest_file_path(), summary))
+        return summary
+
+    def remove_stale_download_locks(self):
+        """
+        Get rid of the download locks left behind, in the local repository, by sessions that died while downloading
+        data. This goes through the whole local repository, all releases included, so it is meant to be run as a
+        maintenance task, not by every session.
+        :return: list of removed lock file paths
+        """
+        removed_lock_files = remove_stale_lock_files(self.get_local_path_root_ensembl_repo(),
+                                                     self._DOWNLOAD_LOCK_FILE_NAME)
+        for lock_file_path in removed_lock_files:
+            self._get_logger().warning("STALE download lock file '{}' REMOVED".format(lock_file_path))
+        return removed_lock_files
+
+    def __get_pinned_species(self):
+        species_data_service = self._get_ensembl_service().get_species_data_service()
+        pinned_species = set()
+        for taxonomy_id in self._get_configuration_manager().get_eviction_pinned_taxonomies():
+            species_entry = species_data_service.get_species_entry_for_taxonomy_id(taxonomy_id)
+            if species_entry:
+                pinned_species.add(species_entry.get_name())
+        return pinned_species
+
+    def __scan_local_repository_for_eviction(self):
+        """
+        Scan the local repository, every species in every release is a candidate for eviction. Files may be hard linked
+        from one release into another, see 'release rollover', so space is accounted per inode, not per file.
+        :return: (list of candidates, map from release path to the rest of its files, map from inode to its size, map
+        from inode to the number of links to it within the local repository)
+        """
+        data_folder_names = [self._get_configuration_manager().get_folder_name_fasta(),
+                             self._get_configuration_manager().get_folder_name_gtf()]
+        current_release_path = self.get_local_path_ensembl_release()
+        pinned_species = self.__get_pinned_species()
+        releases = dict([(release_path, release_number)
+                         for release_number, release_path in self.__get_local_releases()])
+        inode_sizes = {}
+        inode_links = {}
+        # (release path, species) -> candidate
+        candidates = {}
+        # Release path -> list of (file path, inode), for those files that are not about a particular species
+        release_files = {}
+        for dir_path, dir_names, file_names in os.walk(self.get_local_path_root_ensembl_repo()):
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    file_stat = os.lstat(file_path)
+                except FileNotFoundError:
+                    continue
+                inode = (file_stat.st_dev, file_stat.st_ino)
+                inode_sizes[inode] = file_stat.st_size
+                inode_links[inode] = inode_links.get(inode, 0) + 1
+                # Files are laid out as <release>/<fasta or gtf>/<species>/...
+                path_parts = os.path.relpath(file_path, self.get_local_path_root_ensembl_repo()).split(os.sep)
+                release_path = os.path.join(self.get_local_path_root_ensembl_repo(), path_parts[0])
+                if release_path not in releases:
+                    continue
+                if (len(path_parts) < 4) or (path_parts[1] not in data_folder_names):
+                    release_files.setdefault(release_path, []).append((file_path, inode))
+                    continue
+                if file_name == self._DOWNLOAD_LOCK_FILE_NAME:
+                    # Download locks are left alone, someone may be waiting on them
+                    continue
+                candidate = candidates.setdefault((release_path, path_parts[2]), {
+                    'release': releases[release_path],
+                    'release_path': release_path,
+                    'species': path_parts[2],
+                    'taxonomy_id': None,
+                    'pinned': (release_path == current_release_path) and (path_parts[2] in pinned_species),
+                    'last_access': 0,
+                    'size': 0,
+                    'files': []})
+                candidate['files'].append((file_path, inode))
+                candidate['size'] += file_stat.st_size
+                # Files not in the manifest, were last used, at least, when they were last modified
+                candidate['last_access'] = max(candidate['last_access'], file_stat.st_mtime)
+        # Last use of the species, as recorded in the manifest of every release
+        for release_path in releases:
+            manifest = self._get_manifest() if release_path == current_release_path \
+                else LocalRepositoryManifest(release_path)
+            for entry in manifest.get_entries():
+                candidate = candidates.get((release_path, entry['species']))
+                if candidate:
+                    candidate['taxonomy_id'] = entry['taxonomy_id']
+                    candidate['last_access'] = max(candidate['last_access'],
+                                                   LocalRepositoryManifest.get_last_access_time(entry))
+        return list(candidates.values()), release_files, inode_sizes, inode_links
+
+    def __evict_candidate(self, candidate, dry_run):
+        """
+        Remove the files of a species in a release of the local repository, unless any session is using them, i.e.
+        holding a lease on them. Files are removed holding the download locks of their folders, so no session is
+        downloading, or looking, at them at the same time.
+        :param candidate: eviction candidate
+        :param dry_run: if True, nothing is actually removed
+        :return: True if the species has been evicted, False if it is in use
+        """
+        lease_file_path = self._get_lease_file_path(candidate['release_path'], candidate['species'])
+        if dry_run:
+            return not FileLease.is_leased(lease_file_path)
+        lease = FileLease(lease_file_path)
+        if not lease.try_acquire_exclusive():
+            return False
+        try:
+            manifest = self._get_manifest() if candidate['release_path'] == self.get_local_path_ensembl_release() \
+                else LocalRepositoryManifest(candidate['release_path'])
+            with contextlib.ExitStack() as download_locks:
+                # Always in the same order, so sessions evicting at the same time don't deadlock
+                for folder in sorted(set([os.path.dirname(file_path) for file_path, inode in candidate['files']])):
+                    download_locks.enter_context(self._get_download_lock(folder))
+                for file_path, inode in candidate['files']:
+                    if manifest.get_entry(file_path):
+                        manifest.remove_entry(file_path)
+                    try:
+                        os.remove(file_path)
+                    except FileNotFoundError:
+                        pass
+        finally:
+            lease.release()
+        return True
+
+    def __remove_previous_release(self, release_path, dry_run):
+        """
+        Remove a previous release of the local repository as a whole, unless any session is using it, i.e. holding a
+        lease on any of its species, or a download lock on any of its folders. Every lease is taken exclusively, and
+        every download lock taken, before removing anything, so no session can start using the release meanwhile.
+        :param release_path: local path to the release
+        :param dry_run: if True, nothing is actually removed
+        :return: True if the release has been removed, False if it is in use
+        """
+        leases_folder = os.path.join(release_path, self._LEASES_FOLDER_NAME)
+        lease_file_paths = [os.path.join(leases_folder, file_name)
+                            for file_name in (os.listdir(leases_folder) if os.path.isdir(leases_folder) else [])]
+        folders = []
+        for dir_path, dir_names, file_names in os.walk(release_path):
+            dir_names[:] = [dir_name for dir_name in dir_names if dir_name != self._LEASES_FOLDER_NAME]
+            folders.append(dir_path)
+        leases = []
+        download_locks = []
+        try:
+            for lease_file_path in sorted(lease_file_paths):
+                lease = FileLease(lease_file_path)
+                if not lease.try_acquire_exclusive():
+                    return False
+                leases.append(lease)
+            # Always in the same order, so sessions evicting at the same time don't deadlock
+            for folder in sorted(folders):
+                download_lock = FileLock(os.path.join(folder, self._DOWNLOAD_LOCK_FILE_NAME), timeout=0)
+                try:
+                    download_lock.acquire()
+                except FileLockTimeoutException:
+                    return False
+                download_locks.append(download_lock)
+            if not dry_run:
+                shutil.rmtree(release_path, ignore_errors=True)
+            return True
+        finally:
+            for download_lock in reversed(download_locks):
+                download_lock.release()
+            for lease in leases:
+                lease.release()
+
+    def __get_eviction_candidate_summary(self, candidate):
+        return {key: value for key, value in candidate.items() if key not in ['files', 'release_path']}
+
+    def _get_eviction_report_file_path(self):
+        return os.path.join(config_manager.get_app_config_manager().get_folder_logs(),
+                            "{}-{}".format(config_manager.get_app_config_manager().get_session_id(),
+                                           self._EVICTION_REPORT_FILE_NAME))
+
+    def evict(self, dry_run=False):
+        """
+        Bring the local Ensembl repository, all releases included, within its disk budget, by evicting the least
+        recently used species, one release at a time. Species of the current release that are pinned, species used
+        very recently, and species in use by any session, i.e. anyone holding a lease on them, are never evicted.
+        Previous releases with no species left in them, i.e. they had none, or all of them have been evicted by this
+        run, are removed as a whole, no matter the disk budget, unless any session is using them. A report, either of
+        what has been evicted, or of what would be evicted in a dry run, is written to the logs folder.
+        :param dry_run: if True, nothing is actually removed
+        :return: the eviction report, as a dictionary
+        """
+        max_size = self._get_configuration_manager().get_eviction_max_size()
+        min_age = self._get_configuration_manager().get_eviction_min_age()
+        candidates, release_files, inode_sizes, inode_links = self.__scan_local_repository_for_eviction()
+        size = sum(inode_sizes.values())
+        report = {'dry_run': dry_run,
+                  'max_size': max_size,
+                  'size_before': size,
+                  'evicted': [],
+                  'skipped': [],
+                  'removed_releases': [],
+                  'skipped_releases': []}
+        evicted_candidates = set()
+        now = time.time()
+        for candidate in sorted(candidates, key=lambda c: (c['last_access'], c['release'])):
+            if (max_size is None) or (size <= max_size):
+                break
+            summary = self.__get_eviction_candidate_summary(candidate)
+            if candidate['pinned']:
+                summary['reason'] = 'pinned'
+            elif (now - candidate['last_access']) < min_age:
+                summary['reason'] = 'recently used'
+            elif not self.__evict_candidate(candidate, dry_run):
+                summary['reason'] = 'in use'
+            if 'reason' in summary:
+                report['skipped'].append(summary)
+                continue
+            # Only the space of files with no other links left in the local repository is freed
+            summary['freed_size'] = 0
+            for file_path, inode in candidate['files']:
+                inode_links[inode] -= 1
+                if not inode_links[inode]:
+                    summary['freed_size'] += inode_sizes[inode]
+            size -= summary['freed_size']
+            report['evicted'].append(summary)
+            evicted_candidates.add((candidate['release_path'], candidate['species']))
+        # Previous releases with no species left in them are removed as a whole
+        for release_number, release_path in sorted(self.__get_local_releases()):
+            if release_path == self.get_local_path_ensembl_release():
+                continue
+            if any([(candidate['release_path'] == release_path)
+                    and ((release_path, candidate['species']) not in evicted_candidates)
+                    for candidate in candidates]):
+                continue
+            if not self.__remove_previous_release(release_path, dry_run):
+                report['skipped_releases'].append(release_number)
+                continue
+            for file_path, inode in release_files.get(release_path, []):
+                inode_links[inode] -= 1
+                if not inode_links[inode]:
+                    size -= inode_sizes[inode]
+            report['removed_releases'].append(release_number)
+        report['size_after'] = size
+        with open(self._get_eviction_report_file_path(), 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        self._get_logger().info("{}EVICTED #{} species, #{} skipped, releases removed {}, releases in use {}, "
+                                "local repository size {} bytes -> {} bytes, disk budget {} bytes, report at '{}'"
+                                .format("(DRY RUN) " if dry_run else "",
+                                        len(report['evicted']),
+                                        len(report['skipped']),
+                                        report['removed_releases'],
+                                        report['skipped_releases'],
+                                        report['size_before'],
+                                        report['size_after'],
+                                        max_size,
+                                        self._get_eviction_report_file_path()))
+        return report
 
 
 if __name__ == '__main__':
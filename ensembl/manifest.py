@@ -0,0 +1,258 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 19:20
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Manifest of the files in a release of the local Ensembl repository.
+
+Finding out whether a file is in the local repository, and whether it is the right one, used to mean a couple of file
+system metadata requests per file, which are round trips to the server when the repository lives on NFS. The manifest
+keeps a record of every file in the release, i.e. its taxonomy, kind of data, path, size, checksum, where it came from
+and when it was downloaded, so lookups are just a dictionary access. It also keeps track of when files were last used,
+for evicting the least recently used ones from the local repository.
+
+The manifest is an append-only JSON lines log, in the release folder, shared by all the sessions using the local
+repository. Every line either adds (or replaces) or removes the record for a file, appends are serialized among
+sessions via a file lock, and every session picks up the lines appended by the others, reading only what has been
+appended since the last time. Lookups read the log at most once every few seconds, as every read is a round trip to
+the server on NFS as well, and sessions reload it right away when they need to see the latest changes from the others,
+e.g. once they take the download lock on a folder. Accesses to files are appended as well, at most once every few
+minutes per file, so the log doesn't grow with every use of them. The whole log can be rebuilt, e.g. from what is
+actually on disk.
+"""
+
+import os
+import json
+import time
+import threading
+# App imports
+import config_manager
+from toolbox.locks import FileLock
+
+
+class LocalRepositoryManifest:
+    """
+    Thread safe manifest of the files in a folder tree, file paths are recorded relative to the root of the tree
+    """
+    OPERATION_ADD = 'add'
+    OPERATION_REMOVE = 'remove'
+    OPERATION_ACCESS = 'access'
+    # WARNING! - MAGIC NUMBER AHEAD!!! - accesses to a file are recorded at most every 10 minutes
+    _ACCESS_RECORD_INTERVAL = 600
+    # WARNING! - MAGIC NUMBER AHEAD!!! - lookups read what other sessions have appended at most every 5 seconds
+    _RELOAD_INTERVAL = 5
+    _MANIFEST_FILE_NAME = 'manifest.jsonl'
+    _LOCK_FILE_NAME = '.manifest.lock'
+
+    def __init__(self, root_folder):
+        """
+        :param root_folder: root of the folder tree, e.g. the local path of an Ensembl release
+        """
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        self.__root_folder = os.path.abspath(root_folder)
+        self.__manifest_file_path = os.path.join(self.__root_folder, self._MANIFEST_FILE_NAME)
+        self.__lock_file_path = os.path.join(self.__root_folder, self._LOCK_FILE_NAME)
+        self.__lock = threading.RLock()
+        # Relative path -> record
+        self.__entries = {}
+        # (inode, offset) of the log, as loaded so far
+        self.__loaded_inode = None
+        self.__loaded_offset = 0
+        self.__loaded_time = None
+
+    def __apply(self, record):
+        if record.get('operation') == self.OPERATION_REMOVE:
+            self.__entries.pop(record['path'], None)
+        elif record.get('operation') == self.OPERATION_ACCESS:
+            if record['path'] in self.__entries:
+                self.__entries[record['path']]['last_access'] = record['time']
+        else:
+            self.__entries[record['path']] = record
+
+    def __load(self):
+        """
+        Load whatever has been appended to the log since the last time, from the beginning if the log has been rebuilt
+        in the meantime. This method must be called holding the manifest lock.
+        :return: no return value
+        """
+        self.__loaded_time = time.time()
+        try:
+            manifest_file = open(self.__manifest_file_path, 'rb')
+        except FileNotFoundError:
+            self.__entries = {}
+            self.__loaded_inode = None
+            self.__loaded_offset = 0
+            return
+        with manifest_file:
+            file_stat = os.fstat(manifest_file.fileno())
+            if (file_stat.st_ino != self.__loaded_inode) or (file_stat.st_size < self.__loaded_offset):
+                self.__entries = {}
+                self.__loaded_inode = file_stat.st_ino
+                self.__loaded_offset = 0
+            manifest_file.seek(self.__loaded_offset)
+            for line in manifest_file:
+                if not line.endswith(b'\n'):
+                    # Someone is still writing this line
+                    break
+                self.__loaded_offset += len(line)
+                try:
+                    self.__apply(json.loads(line.decode('utf-8')))
+                except (ValueError, KeyError) as e:
+                    self._logger.error("CORRUPTED line in manifest '{}', SKIPPED, '{}'"
+                                       .format(self.__manifest_file_path, e))
+
+    def __load_if_outdated(self):
+        # This method must be called holding the manifest lock
+        if (self.__loaded_time is None) or ((time.time() - self.__loaded_time) >= self._RELOAD_INTERVAL):
+            self.__load()
+
+    def __append(self, records):
+        with self.__lock:
+            with FileLock(self.__lock_file_path):
+                with open(self.__manifest_file_path, 'a') as manifest_file:
+                    for record in records:
+                        manifest_file.write("{}\n".format(json.dumps(record, sort_keys=True)))
+            for record in records:
+                self.__apply(record)
+
+    def reload(self):
+        """
+        Pick up right away whatever other sessions have appended to the manifest, lookups only do it every few seconds
+        :return: no return value
+        """
+        with self.__lock:
+            self.__load()
+
+    def get_relative_path(self, file_path):
+        return os.path.relpath(os.path.abspath(file_path), self.__root_folder)
+
+    def get_absolute_path(self, relative_path):
+        return os.path.join(self.__root_folder, relative_path)
+
+    def get_entry(self, file_path):
+        """
+        Get the record for a file, as of the last time the manifest was loaded, at most a few seconds ago
+        :param file_path: path to the file
+        :return: the record for the file, as a dictionary, or None if the file is not in the manifest
+        """
+        relative_path = self.get_relative_path(file_path)
+        with self.__lock:
+            # It may have been added, or removed, by another session
+            self.__load_if_outdated()
+            entry = self.__entries.get(relative_path)
+            return dict(entry) if entry else None
+
+    def get_entries(self):
+        """
+        Get the records for all the files in the manifest
+        :return: list of records
+        """
+        with self.__lock:
+            self.__load_if_outdated()
+            return [dict(entry) for entry in self.__entries.values()]
+
+    def add_entry(self, file_path, taxonomy_id, kind, species, size, checksum=None, source_url=None,
+                  download_time=None):
+        """
+        Add a file to the manifest, replacing any previous record for it
+        :param file_path: path to the file
+        :param taxonomy_id: taxonomy the file is about
+        :param kind: kind of data in the file
+        :param species: species name the file is about
+        :param size: file size, in bytes
+        :param checksum: checksum the file has been verified against, if any
+        :param source_url: where the file came from
+        :param download_time: when the file was downloaded, now by default
+        :return: the record for the file
+        """
+        record = self.create_entry(file_path, taxonomy_id, kind, species, size, checksum, source_url, download_time)
+        self.__append([record])
+        return dict(record)
+
+    def create_entry(self, file_path, taxonomy_id, kind, species, size, checksum=None, source_url=None,
+                     download_time=None):
+        """
+        Create a record for a file, without adding it to the manifest, see 'add_entry'
+        """
+        return {'operation': self.OPERATION_ADD,
+                'path': self.get_relative_path(file_path),
+                'taxonomy_id': taxonomy_id,
+                'kind': kind,
+                'species': species,
+                'size': size,
+                'checksum': checksum,
+                'source_url': source_url,
+                'download_time': time.time() if download_time is None else download_time}
+
+    def remove_entry(self, file_path):
+        """
+        Remove a file from the manifest
+        :param file_path: path to the file
+        :return: no return value
+        """
+        self.__append([{'operation': self.OPERATION_REMOVE,
+                        'path': self.get_relative_path(file_path),
+                        'time': time.time()}])
+
+    def record_access(self, file_paths):
+        """
+        Record that the given files have been used now, files not in the manifest are ignored, as well as files whose
+        last recorded access is very recent
+        :param file_paths: paths to the files
+        :return: no return value
+        """
+        now = time.time()
+        records = []
+        with self.__lock:
+            self.__load_if_outdated()
+            for file_path in file_paths:
+                relative_path = self.get_relative_path(file_path)
+                entry = self.__entries.get(relative_path)
+                if entry and ((now - self.get_last_access_time(entry)) >= self._ACCESS_RECORD_INTERVAL):
+                    records.append({'operation': self.OPERATION_ACCESS,
+                                    'path': relative_path,
+                                    'time': now})
+        if records:
+            self.__append(records)
+
+    @staticmethod
+    def get_last_access_time(entry):
+        """
+        Files that have not been used since they were downloaded, were last accessed when they were downloaded
+        :param entry: record for a file
+        :return: time of the last recorded access to the file
+        """
+        return entry.get('last_access', entry['download_time'])
+
+    def rebuild(self, entries):
+        """
+        Replace the whole manifest with the given records, other sessions will pick up the new manifest the next time
+        they load it, see 'reload'
+        :param entries: records, see 'create_entry'
+        :return: no return value
+        """
+        with self.__lock:
+            with FileLock(self.__lock_file_path):
+                temporary_file_path = "{}.{}".format(self.__manifest_file_path, os.getpid())
+                with open(temporary_file_path, 'w') as manifest_file:
+                    for entry in entries:
+                        manifest_file.write("{}\n".format(json.dumps(entry, sort_keys=True)))
+                os.replace(temporary_file_path, self.__manifest_file_path)
+                self.__load()
+
+    def get_manifest_file_path(self):
+        return self.__manifest_file_path
+
+    def get_root_folder(self):
+        return self.__root_folder
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -0,0 +1,139 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 23:40
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Persistent cache of Ensembl REST responses.
+
+Most of what this pipeline asks Ensembl REST, e.g. the species information or the assembly of a species, doesn't change
+within an Ensembl release, so responses are kept on disk, per endpoint and Ensembl release, and shared by all the
+sessions, instead of requesting them again, e.g. the multi-megabyte species information, every session. Responses that
+are not bound to a release, e.g. the current release number itself, are kept as well, it is up to the user of the cache
+to decide for how long they are good.
+
+Entries are JSON files, '<cache folder>/<release>/<endpoint>.json', with the time they were written and the response
+content. They are only read from disk when they are asked for, and they are kept in memory from then on.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import threading
+# App imports
+import config_manager
+
+
+class RestResponseCache:
+    """
+    Thread safe, on disk, cache of REST responses, keyed by endpoint and Ensembl release
+    """
+    # Folder for the responses that are not bound to an Ensembl release
+    _UNVERSIONED_FOLDER_NAME = 'unversioned'
+    _ENTRY_FILE_EXTENSION = '.json'
+
+    def __init__(self, cache_folder):
+        """
+        :param cache_folder: folder where the responses are kept, it is created if it doesn't exist
+        """
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        self.__cache_folder = os.path.abspath(cache_folder)
+        self.__lock = threading.Lock()
+        # (endpoint, release) -> entry, None if there is no entry on disk
+        self.__entries = {}
+
+    def __get_entry_file_path(self, endpoint, release):
+        # e.g. 'info/assembly/9606' -> 'info_assembly_9606.json'
+        entry_file_name = "{}{}".format(re.sub(r'[^A-Za-z0-9.-]+', '_', endpoint).strip('_'),
+                                        self._ENTRY_FILE_EXTENSION)
+        release_folder_name = str(release) if release is not None else self._UNVERSIONED_FOLDER_NAME
+        return os.path.join(self.__cache_folder, release_folder_name, entry_file_name)
+
+    def __read_entry(self, endpoint, release):
+        entry_file_path = self.__get_entry_file_path(endpoint, release)
+        try:
+            with open(entry_file_path, 'r') as entry_file:
+                entry = json.load(entry_file)
+            if entry['endpoint'] == endpoint:
+                return entry
+        except (OSError, ValueError, KeyError) as e:
+            if os.path.isfile(entry_file_path):
+                self._logger.warning("IGNORING unreadable cached response '{}', '{}'".format(entry_file_path, e))
+        return None
+
+    def get(self, endpoint, release=None):
+        """
+        Get the cached response for the given endpoint and Ensembl release
+        :param endpoint: REST endpoint, e.g. 'info/species'
+        :param release: Ensembl release the response is bound to, None if it is not bound to any
+        :return: the cache entry, i.e. {'endpoint', 'release', 'timestamp', 'content'}, or None if there is no cached
+        response
+        """
+        with self.__lock:
+            if (endpoint, release) not in self.__entries:
+                self.__entries[(endpoint, release)] = self.__read_entry(endpoint, release)
+            return self.__entries[(endpoint, release)]
+
+    def put(self, endpoint, content, release=None):
+        """
+        Cache the response for the given endpoint and Ensembl release, replacing the one already there, if any
+        :param endpoint: REST endpoint, e.g. 'info/species'
+        :param content: response content, anything JSON serializable
+        :param release: Ensembl release the response is bound to, None if it is not bound to any
+        :return: the cache entry
+        """
+        entry = {'endpoint': endpoint, 'release': release, 'timestamp': time.time(), 'content': content}
+        entry_file_path = self.__get_entry_file_path(endpoint, release)
+        with self.__lock:
+            self.__entries[(endpoint, release)] = entry
+            try:
+                os.makedirs(os.path.dirname(entry_file_path), exist_ok=True)
+                # Other sessions may be reading it
+                temporary_file_path = "{}.{}.{}".format(entry_file_path, os.getpid(), threading.get_ident())
+                with open(temporary_file_path, 'w') as entry_file:
+                    json.dump(entry, entry_file)
+                os.replace(temporary_file_path, entry_file_path)
+            except OSError as e:
+                # The response is still cached for this session
+                self._logger.warning("COULD NOT CACHE response for '{}' at '{}', '{}'"
+                                     .format(endpoint, entry_file_path, e))
+        return entry
+
+    @staticmethod
+    def get_age(entry):
+        """
+        Get how long ago a cache entry was written
+        :param entry: cache entry
+        :return: age of the entry, in seconds
+        """
+        return time.time() - entry['timestamp']
+
+    def remove_releases_other_than(self, release):
+        """
+        Get rid of the cached responses bound to Ensembl releases other than the given one, e.g. once a new Ensembl
+        release is out
+        :param release: Ensembl release whose responses are kept
+        :return: no return value
+        """
+        with self.__lock:
+            self.__entries = {key: entry for key, entry in self.__entries.items()
+                              if (key[1] is None) or (str(key[1]) == str(release))}
+            if not os.path.isdir(self.__cache_folder):
+                return
+            for folder_name in os.listdir(self.__cache_folder):
+                if folder_name in (self._UNVERSIONED_FOLDER_NAME, str(release)):
+                    continue
+                self._logger.info("REMOVING cached responses for Ensembl release '{}'".format(folder_name))
+                shutil.rmtree(os.path.join(self.__cache_folder, folder_name), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -9,13 +9,23 @@
 
 """
 This module models an Ensembl service
+
+Ensembl REST responses are cached on disk, see 'ensembl.rest_cache', so a session that finds them there doesn't make any
+request at all. Responses bound to the current Ensembl release are good for as long as the release is the current one,
+up to the configured time to live, and the current release number is checked again, which is a cheap request, once it
+is older than the configured revalidation interval. When Ensembl REST fails, cached responses are used no matter their
+age.
 """
 
+import os
+import threading
+import concurrent.futures
 # App imports
 import config_manager
 from ensembl.models import SpeciesService
+from ensembl.rest_cache import RestResponseCache
 from exceptions import ConfigManagerException
-from toolbox import rest
+from toolbox import rest, single_flight
 
 # Ensembl Service is going to be a Singleton, unique for the running session
 __configuration_file = None
@@ -42,6 +52,25 @@ class ConfigurationManager(config_manager.ConfigurationManager):
     _CONFIG_KEY_SERVICE = 'service'
     _CONFIG_KEY_ENSEMBL_API = 'ensembl_api'
     _CONFIG_KEY_SERVER = 'server'
+    _CONFIG_KEY_CONCURRENCY = 'concurrency'
+    # REST responses cache, all its settings are optional
+    _CONFIG_KEY_REST_CACHE = 'rest_cache'
+    _CONFIG_KEY_REST_CACHE_ENABLED = 'enabled'
+    _CONFIG_KEY_REST_CACHE_TTL = 'ttl'
+    _CONFIG_KEY_REST_CACHE_RELEASE_REVALIDATION_INTERVAL = 'release_revalidation_interval'
+    # Sections with optional settings
+    _SECTION_ENSEMBL_API = (_CONFIG_KEY_SERVICE, _CONFIG_KEY_ENSEMBL_API)
+    _SECTION_REST_CACHE = (_CONFIG_KEY_SERVICE, _CONFIG_KEY_REST_CACHE)
+    # REST responses cache defaults
+    _DEFAULT_REST_CACHE_ENABLED = True
+    # WARNING! - MAGIC NUMBER AHEAD!!! - responses bound to a release are good for 30 days
+    _DEFAULT_REST_CACHE_TTL = 30 * 24 * 3600
+    # WARNING! - MAGIC NUMBER AHEAD!!! - the current release number is checked again after 6 hours
+    _DEFAULT_REST_CACHE_RELEASE_REVALIDATION_INTERVAL = 6 * 3600
+    _REST_CACHE_FOLDER_NAME = 'ensembl_rest_cache'
+    # WARNING! - MAGIC NUMBER AHEAD!!! - batch requests to Ensembl REST are made at most 4 at a time, the REST client
+    # rate limits them anyway
+    _DEFAULT_CONCURRENCY = 4
 
     def __init__(self, configuration_object, configuration_file):
         super(ConfigurationManager, self).__init__(configuration_object, configuration_file)
@@ -62,9 +91,59 @@ class ConfigurationManager(config_manager.ConfigurationManager):
                     self._CONFIG_KEY_SERVER,
                     self._get_configuration_file()))
 
+    def get_api_concurrency(self):
+        """
+        Maximum number of requests made at the same time to Ensembl REST when working on a batch, this setting is
+        optional
+        :return: maximum number of concurrent requests
+        """
+        return int(self._get_optional_setting(self._SECTION_ENSEMBL_API,
+                                              self._CONFIG_KEY_CONCURRENCY,
+                                              self._DEFAULT_CONCURRENCY))
+
+    def is_rest_cache(self):
+        """
+        Whether Ensembl REST responses are cached on disk or not
+        :return: True if they are, False otherwise
+        """
+        return bool(self._get_optional_setting(self._SECTION_REST_CACHE,
+                                               self._CONFIG_KEY_REST_CACHE_ENABLED,
+                                               self._DEFAULT_REST_CACHE_ENABLED))
+
+    def get_rest_cache_folder(self):
+        """
+        Folder for the cached Ensembl REST responses, within the resources folder, shared by all the sessions
+        :return: absolute path to the folder
+        """
+        return os.path.abspath(os.path.join(config_manager.get_app_config_manager().get_folder_resources(),
+                                            self._REST_CACHE_FOLDER_NAME))
+
+    def get_rest_cache_ttl(self):
+        """
+        Time, in seconds, cached responses bound to the current Ensembl release are good for
+        :return: time to live for the cached responses
+        """
+        return int(self._get_optional_setting(self._SECTION_REST_CACHE,
+                                              self._CONFIG_KEY_REST_CACHE_TTL,
+                                              self._DEFAULT_REST_CACHE_TTL))
+
+    def get_rest_cache_release_revalidation_interval(self):
+        """
+        Time, in seconds, after which the cached current Ensembl release number is checked again against Ensembl REST
+        :return: maximum age of the cached current release number
+        """
+        return int(self._get_optional_setting(self._SECTION_REST_CACHE,
+                                              self._CONFIG_KEY_REST_CACHE_RELEASE_REVALIDATION_INTERVAL,
+                                              self._DEFAULT_REST_CACHE_RELEASE_REVALIDATION_INTERVAL))
+
 
 # Ensembl Service model
 class Service:
+    # Ensembl REST endpoints
+    _ENDPOINT_RELEASE_DATA = 'info/data/?'
+    _ENDPOINT_SPECIES_DATA = 'info/species?'
+    _ENDPOINT_ASSEMBLY = 'info/assembly'
+
     def __init__(self, configuration_object, configuration_file):
         self._logger = config_manager.get_app_config_manager()\
             .get_logger_for("{}.{}".format(__name__, type(self).__name__))
@@ -74,19 +153,67 @@ class Service:
         self.__release_number = None
         # Ensembl Species Data
         self.__species_data_service = None
+        # Cache of Ensembl REST responses
+        self.__rest_cache = None
+        # Chromosome sizes, per taxonomy, for this session, taxonomy ID -> Future
+        self.__chromosome_sizes = {}
+        self.__chromosome_sizes_lock = threading.Lock()
+
+    def _get_rest_cache(self):
+        """
+        Get the cache of Ensembl REST responses
+        :return: the cache, or None if Ensembl REST responses are not cached
+        """
+        if (self.__rest_cache is None) and self._get_config_manager().is_rest_cache():
+            self.__rest_cache = RestResponseCache(self._get_config_manager().get_rest_cache_folder())
+        return self.__rest_cache
+
+    def _request(self, endpoint, release=None, max_age=None):
+        """
+        Request an Ensembl REST endpoint, the cached response is used when there is one, and it is not too old
+        :param endpoint: REST endpoint, relative to the Ensembl REST server, e.g. 'info/species?'
+        :param release: Ensembl release the response is bound to, None if it is not bound to any
+        :param max_age: maximum age, in seconds, of the cached response, the configured time to live by default
+        :return: the response content
+        """
+        if max_age is None:
+            max_age = self._get_config_manager().get_rest_cache_ttl()
+        rest_cache = self._get_rest_cache()
+        entry = rest_cache.get(endpoint, release) if rest_cache else None
+        if entry and (RestResponseCache.get_age(entry) <= max_age):
+            self._logger.debug("Using cached response for '{}', Ensembl release '{}'".format(endpoint, release))
+            return entry['content']
+        request_url = "{}/{}".format(self._get_config_manager().get_api_server(), endpoint)
+        self._logger.debug("Requesting '{}' to Ensembl".format(request_url))
+        try:
+            content = rest.make_rest_request_content_type_json(request_url)
+        except Exception as e:
+            if not entry:
+                raise
+            self._logger.warning("Request for '{}' FAILED, using cached response from {:.0f} seconds ago, '{}'"
+                                 .format(request_url, RestResponseCache.get_age(entry), e))
+            return entry['content']
+        if rest_cache:
+            rest_cache.put(endpoint, content, release)
+        return content
 
     def __request_release_number(self):
-        request_url = self._get_config_manager().get_api_server() + "/info/data/?"
-        current_release_data = rest.make_rest_request_content_type_json(request_url)
+        rest_cache = self._get_rest_cache()
+        cached_entry = rest_cache.get(self._ENDPOINT_RELEASE_DATA) if rest_cache else None
+        current_release_data = \
+            self._request(self._ENDPOINT_RELEASE_DATA,
+                          max_age=self._get_config_manager().get_rest_cache_release_revalidation_interval())
         self._logger.debug("Request Release Number response from Ensembl - '{}'".format(current_release_data))
         self._logger.info(
             "This session is working with Ensembl Release {}".format(current_release_data['releases'][0]))
+        if cached_entry and (cached_entry['content']['releases'][0] != current_release_data['releases'][0]):
+            # Cached responses for previous releases are of no use anymore
+            rest_cache.remove_releases_other_than(current_release_data['releases'][0])
         return current_release_data['releases'][0]
 
     def __request_species_data(self):
-        request_url = self._get_config_manager().get_api_server() + "/info/species?"
-        self._logger.debug("Requesting Species Data to Ensembl, url '{}'".format(request_url))
-        return rest.make_rest_request_content_type_json(request_url)
+        self._logger.debug("Requesting Species Data to Ensembl")
+        return self._request(self._ENDPOINT_SPECIES_DATA, release=self.get_release_number())
 
     def _get_config_manager(self):
         return self.__config_manager
@@ -105,16 +232,70 @@ class Service:
             self.__species_data_service = SpeciesService(self.__request_species_data())
         return self.__species_data_service
 
-    def get_chromosome_sizes_for_taxonomy(self, taxonomy_id):
-        request_url = "{}/{}/{}".format(self._get_config_manager().get_api_server(), "info/assembly", taxonomy_id)
-        response_content = rest.make_rest_request_content_type_json(request_url)
-        regions = response_content["top_level_region"]
-        regions.sort(key=lambda r: r["name"])
+    def __request_chromosome_sizes(self, taxonomy_id):
+        response_content = self._request("{}/{}".format(self._ENDPOINT_ASSEMBLY, taxonomy_id),
+                                         release=self.get_release_number())
+        regions = sorted(response_content["top_level_region"], key=lambda r: r["name"])
         return {region["name"]: region["length"] for region in regions}
 
-    def get_ucsc_chromosome_sizes_for_taxonomy(self, taxonomy_id):
+    def get_chromosome_sizes_for_taxonomy(self, taxonomy_id):
+        """
+        Get the chromosome sizes for the given taxonomy, with Ensembl chromosome names. They are requested to Ensembl
+        only once per session, other threads asking for the same taxonomy in the meantime wait for that request to
+        finish, failed requests are not kept, the next caller tries again.
+        :param taxonomy_id: ncbi taxonomy id
+        :return: map from chromosome name to its size
+        """
+        chromosome_sizes = single_flight.get_once(self.__chromosome_sizes,
+                                                  self.__chromosome_sizes_lock,
+                                                  str(taxonomy_id),
+                                                  lambda: self.__request_chromosome_sizes(taxonomy_id))
+        # Callers get their own copy of the map
+        return dict(chromosome_sizes)
+
+    def get_chromosome_sizes_for_taxonomies(self, taxonomy_ids, max_workers=None):
+        """
+        Get the chromosome sizes for the given taxonomies, with Ensembl chromosome names, requesting them to Ensembl at
+        the same time, instead of one taxonomy after the other, see 'get_chromosome_sizes_for_taxonomy'
+        :param taxonomy_ids: ncbi taxonomy ids, duplicates are requested only once
+        :param max_workers: maximum number of requests made at the same time, the configured one by default
+        :return: map from taxonomy id to its chromosome sizes, None for those taxonomies whose chromosome sizes could
+        not be requested
+        """
+        taxonomy_ids = list(dict.fromkeys(taxonomy_ids))
+        if not taxonomy_ids:
+            return {}
+        # The release number is shared by all the requests, it is worked out before there is more than one thread
+        self.get_release_number()
+        max_workers = max_workers or self._get_config_manager().get_api_concurrency()
+        self._logger.info("Requesting chromosome sizes for {} taxonomies, {} at a time"
+                          .format(len(taxonomy_ids), max_workers))
+        result = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.get_chromosome_sizes_for_taxonomy, taxonomy_id): taxonomy_id
+                       for taxonomy_id in taxonomy_ids}
+            for future in concurrent.futures.as_completed(futures):
+                taxonomy_id = futures[future]
+                try:
+                    result[taxonomy_id] = future.result()
+                except Exception as e:
+                    self._logger.error("ERROR requesting chromosome sizes for taxonomy ID #{}, '{}'"
+                                       .format(taxonomy_id, e))
+                    result[taxonomy_id] = None
+        return result
+
+    def get_ucsc_chromosome_sizes_for_taxonomy(self, taxonomy_id, chromosome_sizes=None):
+        """
+        Get the chromosome sizes for the given taxonomy, with UCSC chromosome names
+        :param taxonomy_id: ncbi taxonomy id
+        :param chromosome_sizes: chromosome sizes with Ensembl chromosome names, e.g. from the local repository, they
+        are requested to Ensembl if not given
+        :return: map from UCSC chromosome name to its size, scaffolds are left out
+        """
+        if chromosome_sizes is None:
+            chromosome_sizes = self.get_chromosome_sizes_for_taxonomy(taxonomy_id)
         result = {}
-        for chromosome, length in self.get_chromosome_sizes_for_taxonomy(taxonomy_id).items():
+        for chromosome, length in chromosome_sizes.items():
             try:
                 int(chromosome)
                 result["chr{}".format(chromosome)] = length
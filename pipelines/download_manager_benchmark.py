@@ -0,0 +1,191 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 18:40
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+This pipeline benchmarks the download manager against a local stand-in server, it measures throughput and failure
+recovery for different numbers of files, concurrency settings, protocols and numbers of segments per file.
+
+Pipeline arguments, all of them optional, look like
+    file_counts=1:8:32,file_size=8388608,concurrency=1x1:8x4,protocols=http:ftp,segment_counts=1:4,latency=0.05,
+    bandwidth=10485760
+
+Description of parameters:
+    file_counts     ->  Numbers of files to download, colon separated
+    file_size       ->  Size, in bytes, of every file
+    concurrency     ->  Download scheduler settings, colon separated, as 'max concurrent downloads'x'max concurrent
+                        downloads per host'
+    protocols       ->  Protocols to benchmark, colon separated, 'http' and / or 'ftp'
+    segment_counts  ->  Numbers of segments every file is split into, colon separated
+    latency         ->  Delay, in seconds, the stand-in server adds to every request
+    bandwidth       ->  Bandwidth cap, in bytes per second, of the stand-in server for every transfer
+
+Results are written to the session working directory, as JSON lines, one scenario per line.
+"""
+
+import os
+import time
+# Application imports
+import config_manager
+from benchmarks.download_manager_benchmark import DownloadManagerBenchmark, get_benchmark_scenarios
+from pipelines.template_pipeline import DirectorConfigurationManager, Director
+
+__configuration_file = None
+__pipeline_arguments = None
+__pipeline_director = None
+
+
+def set_configuration_file(config_file):
+    global __configuration_file
+    if __configuration_file is None:
+        __configuration_file = config_file
+    return __configuration_file
+
+
+def set_pipeline_arguments(pipeline_arguments):
+    global __pipeline_arguments
+    if __pipeline_arguments is None:
+        __pipeline_arguments = pipeline_arguments
+    return __pipeline_arguments
+
+
+def get_pipeline_director():
+    global __pipeline_director
+    if __pipeline_director is None:
+        __pipeline_director = DownloadManagerBenchmarkRunner(config_manager.read_config_from_file(__configuration_file),
+                                                             __configuration_file,
+                                                             __pipeline_arguments)
+    return __pipeline_director
+
+
+class ConfigManager(DirectorConfigurationManager):
+    # Command Line Argument keys
+    _CONFIG_COMMAND_LINE_ARGUMENT_KEY_FILE_COUNTS = 'file_counts'
+    _CONFIG_COMMAND_LINE_ARGUMENT_KEY_FILE_SIZE = 'file_size'
+    _CONFIG_COMMAND_LINE_ARGUMENT_KEY_CONCURRENCY = 'concurrency'
+    _CONFIG_COMMAND_LINE_ARGUMENT_KEY_PROTOCOLS = 'protocols'
+    _CONFIG_COMMAND_LINE_ARGUMENT_KEY_SEGMENT_COUNTS = 'segment_counts'
+    _CONFIG_COMMAND_LINE_ARGUMENT_KEY_LATENCY = 'latency'
+    _CONFIG_COMMAND_LINE_ARGUMENT_KEY_BANDWIDTH = 'bandwidth'
+    # Separators within argument values
+    _LIST_SEPARATOR = ':'
+    _CONCURRENCY_SEPARATOR = 'x'
+
+    def __init__(self, configuration_object, configuration_file, pipeline_arguments):
+        super().__init__(configuration_object, configuration_file, pipeline_arguments)
+
+    def _get_allowed_configuration_keys(self):
+        return {self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_FILE_COUNTS,
+                self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_FILE_SIZE,
+                self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_CONCURRENCY,
+                self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_PROTOCOLS,
+                self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_SEGMENT_COUNTS,
+                self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_LATENCY,
+                self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_BANDWIDTH}
+
+    def _process_pipeline_arguments(self):
+        # All pipeline arguments are optional
+        return super()._process_pipeline_arguments() or {}
+
+    def __get_list_for_pipeline_argument_key(self, key, default):
+        value = self._get_value_for_pipeline_argument_key(key)
+        if not value:
+            return default
+        return value.split(self._LIST_SEPARATOR)
+
+    def get_file_counts(self):
+        return [int(file_count) for file_count in
+                self.__get_list_for_pipeline_argument_key(self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_FILE_COUNTS,
+                                                          ['1', '8'])]
+
+    def get_file_size(self):
+        # WARNING! - MAGIC NUMBER AHEAD!!!
+        return int(self._get_value_for_pipeline_argument_key(self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_FILE_SIZE,
+                                                             8 * 1024 * 1024))
+
+    def get_concurrency_settings(self):
+        return [tuple([int(limit) for limit in setting.split(self._CONCURRENCY_SEPARATOR)]) for setting in
+                self.__get_list_for_pipeline_argument_key(self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_CONCURRENCY,
+                                                          ['1x1', '8x4'])]
+
+    def get_protocols(self):
+        return self.__get_list_for_pipeline_argument_key(self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_PROTOCOLS,
+                                                         ['http', 'ftp'])
+
+    def get_segment_counts(self):
+        return [int(segment_count) for segment_count in
+                self.__get_list_for_pipeline_argument_key(self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_SEGMENT_COUNTS,
+                                                          ['1'])]
+
+    def get_latency(self):
+        return float(self._get_value_for_pipeline_argument_key(self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_LATENCY, 0.05))
+
+    def get_bandwidth(self):
+        bandwidth = self._get_value_for_pipeline_argument_key(self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_BANDWIDTH)
+        if bandwidth is None:
+            return None
+        return int(bandwidth)
+
+    def get_folder_path_benchmark(self):
+        return os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                            "download_manager_benchmark")
+
+    def get_file_path_benchmark_report(self):
+        return os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                            "download_manager_benchmark.jsonl")
+
+
+class DownloadManagerBenchmarkRunner(Director):
+    """
+    This pipeline runs the download manager benchmark suite
+    """
+
+    def __init__(self, configuration_object, configuration_file, pipeline_arguments):
+        runner_id = "{}-{}".format(__name__, time.time())
+        super(DownloadManagerBenchmarkRunner, self).__init__(runner_id)
+        self.__config_manager = ConfigManager(configuration_object, configuration_file, pipeline_arguments)
+
+    def _get_configuration_manager(self):
+        return self.__config_manager
+
+    def _run_pipeline(self):
+        self._get_logger().info("[START]---> Pipeline run")
+        scenarios = get_benchmark_scenarios(file_counts=self._get_configuration_manager().get_file_counts(),
+                                            file_size=self._get_configuration_manager().get_file_size(),
+                                            concurrency_settings=self._get_configuration_manager()
+                                            .get_concurrency_settings(),
+                                            protocols=self._get_configuration_manager().get_protocols(),
+                                            segment_counts=self._get_configuration_manager().get_segment_counts(),
+                                            latency=self._get_configuration_manager().get_latency(),
+                                            bandwidth=self._get_configuration_manager().get_bandwidth())
+        self._get_logger().info("Running {} download manager benchmark scenarios".format(len(scenarios)))
+        results = DownloadManagerBenchmark(self._get_configuration_manager().get_folder_path_benchmark()) \
+            .run(scenarios, self._get_configuration_manager().get_file_path_benchmark_report())
+        pipeline_result = True
+        for result in results:
+            self._get_logger().info("Scenario '{}', {} out of {} files in {:.2f}s, {:.2f} MB/s, {} attempts, "
+                                    "{} server requests, {} server disconnects"
+                                    .format(result['scenario']['name'],
+                                            result['files_downloaded'],
+                                            result['files_expected'],
+                                            result['wall_time'],
+                                            (result['throughput'] or 0) / (1024 * 1024),
+                                            result['attempts'],
+                                            result['server_requests'],
+                                            result['server_disconnects']))
+            if result['files_downloaded'] != result['files_expected']:
+                self._get_logger().error("Scenario '{}' FAILED to download all the expected files"
+                                         .format(result['scenario']['name']))
+                pipeline_result = False
+        self._get_logger().info("Benchmark report at '{}'"
+                                .format(self._get_configuration_manager().get_file_path_benchmark_report()))
+        return pipeline_result
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
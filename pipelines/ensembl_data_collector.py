@@ -9,6 +9,12 @@
 
 """
 This pipeline collects data from Ensembl to avoid race conditions when running other pipelines that use this data
+
+Pipeline arguments look like
+    ncbi_taxonomy_ids=id,id,id,mirror_all_file_variants=True
+
+Only the Ensembl file variants other pipelines use are collected, unless 'mirror_all_file_variants' is set, then all of
+them are, e.g. all the GTF files, not only the one with no suffix.
 """
 
 import os
@@ -48,23 +54,38 @@ def get_pipeline_director():
 
 class ConfigManager(DirectorConfigurationManager):
     _CONFIG_OBJECT_KEY_NCBI_TAXONOMY_IDS = 'ncbi_taxonomy_ids'
+    _CONFIG_OBJECT_KEY_MIRROR_ALL_FILE_VARIANTS = 'mirror_all_file_variants'
 
     def __init__(self, configuration_object, configuration_file, pipeline_arguments):
         super(ConfigManager, self).__init__(configuration_object, configuration_file, pipeline_arguments)
         self.__pipeline_arguments_object = None
 
     def _process_pipeline_arguments(self):
-        # Pipeline arguments for this pipeline are like: "ncbi_taxonomy_ids=id,id,id"
+        # Pipeline arguments for this pipeline are like: "ncbi_taxonomy_ids=id,id,id,mirror_all_file_variants=True"
         id_list = []
+        mirror_all_file_variants = False
         if self._get_pipeline_arguments():
-            id_list = self._get_pipeline_arguments().split('=')[1].split(',')
+            key = None
+            for token in self._get_pipeline_arguments().split(','):
+                if '=' in token:
+                    key, token = token.split('=', 1)
+                if key == self._CONFIG_OBJECT_KEY_NCBI_TAXONOMY_IDS:
+                    id_list.append(token)
+                elif key == self._CONFIG_OBJECT_KEY_MIRROR_ALL_FILE_VARIANTS:
+                    mirror_all_file_variants = token.lower() == 'true'
+                else:
+                    self._logger.error("INVALID pipeline argument '{}', SKIPPED".format(token))
         return {
-            self._CONFIG_OBJECT_KEY_NCBI_TAXONOMY_IDS: id_list
+            self._CONFIG_OBJECT_KEY_NCBI_TAXONOMY_IDS: id_list,
+            self._CONFIG_OBJECT_KEY_MIRROR_ALL_FILE_VARIANTS: mirror_all_file_variants
         }
 
     def get_ncbi_taxonomy_ids(self):
         return self._get_pipeline_arguments_object()[self._CONFIG_OBJECT_KEY_NCBI_TAXONOMY_IDS]
 
+    def is_mirror_all_file_variants(self):
+        return self._get_pipeline_arguments_object()[self._CONFIG_OBJECT_KEY_MIRROR_ALL_FILE_VARIANTS]
+
 
 class EnsemblDataCollector(Director):
     """
@@ -87,25 +108,32 @@ class EnsemblDataCollector(Director):
         return result
 
     def _run_pipeline(self):
-        # TODO - I can easily parallelize this using the parallel module
         # Main pipeline algorithm
         self._get_logger().info("[START]---> Pipeline run")
         self._get_logger().info("Collecting Ensembl data for NCBI Taxonomies: {}"
                                 .format(",".join(self._get_configuration_manager().get_ncbi_taxonomy_ids())))
         ensembl_downloader_service = ensembl.data_downloader.get_data_download_service()
-        for ncbi_taxonomy_id in self._get_configuration_manager().get_ncbi_taxonomy_ids():
-            downloaded_protein_sequences = ensembl_downloader_service \
-                .get_protein_sequences_for_species(ncbi_taxonomy_id)
-            downloaded_gtf_files = ensembl_downloader_service \
-                .get_genome_reference_for_species(ncbi_taxonomy_id)
-            if not downloaded_protein_sequences:
-                self._get_logger().error("MISSING protein sequence data for taxonomy ID #{}".format(ncbi_taxonomy_id))
-            else:
-                self.__check_downloaded_files(downloaded_protein_sequences)
-            if not downloaded_gtf_files:
-                self._get_logger().error("MISSING genome reference data for taxonomy ID #{}".format(ncbi_taxonomy_id))
+        # Default file variants, unless we're mirroring all of them
+        suffixes = {}
+        if self._get_configuration_manager().is_mirror_all_file_variants():
+            self._get_logger().info("Mirroring ALL Ensembl file variants")
+            suffixes = {
+                ensembl_downloader_service.KIND_PROTEIN_SEQUENCES:
+                    ensembl_downloader_service.get_protein_sequence_file_suffixes(),
+                ensembl_downloader_service.KIND_GENOME_REFERENCE:
+                    ensembl_downloader_service.get_genome_reference_file_suffixes()
+            }
+        data_names = {ensembl_downloader_service.KIND_PROTEIN_SEQUENCES: 'protein sequence',
+                      ensembl_downloader_service.KIND_GENOME_REFERENCE: 'genome reference'}
+        # Data for all the taxonomies is collected at the same time, results come back as they are ready
+        for ncbi_taxonomy_id, kind, downloaded_files in \
+                ensembl_downloader_service.prefetch(self._get_configuration_manager().get_ncbi_taxonomy_ids(),
+                                                    suffixes=suffixes):
+            if not downloaded_files:
+                self._get_logger().error("MISSING {} data for taxonomy ID #{}"
+                                         .format(data_names[kind], ncbi_taxonomy_id))
             else:
-                self.__check_downloaded_files(downloaded_gtf_files)
+                self.__check_downloaded_files(downloaded_files)
         return True
 
 
@@ -0,0 +1,137 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 19:45
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+This pipeline runs maintenance tasks on the local Ensembl repository, for the latest Ensembl release
+
+Pipeline arguments look like
+    command=reconcile_manifest
+    command=evict,dry_run=True
+    command=remove_stale_locks
+
+Available commands:
+    reconcile_manifest  ->  Rebuild the manifest of the local Ensembl release from what is actually on disk
+    evict               ->  Evict the least recently used species from the local Ensembl repository, all releases
+                            included, until it is within its disk budget, 'dry_run=True' only reports what would be
+                            evicted
+    remove_stale_locks  ->  Remove the download locks left behind in the local Ensembl repository by sessions that
+                            died while downloading data
+"""
+
+import time
+# Application imports
+import config_manager
+import ensembl.data_downloader
+from pipelines.template_pipeline import DirectorConfigurationManager, Director
+
+__configuration_file = None
+__pipeline_arguments = None
+__pipeline_director = None
+
+
+def set_configuration_file(config_file):
+    global __configuration_file
+    if __configuration_file is None:
+        __configuration_file = config_file
+    return __configuration_file
+
+
+def set_pipeline_arguments(pipeline_arguments):
+    global __pipeline_arguments
+    if __pipeline_arguments is None:
+        __pipeline_arguments = pipeline_arguments
+    return __pipeline_arguments
+
+
+def get_pipeline_director():
+    global __pipeline_director
+    if __pipeline_director is None:
+        __pipeline_director = EnsemblRepositoryMaintenance(config_manager.read_config_from_file(__configuration_file),
+                                                           __configuration_file,
+                                                           __pipeline_arguments)
+    return __pipeline_director
+
+
+class ConfigManager(DirectorConfigurationManager):
+    # Command Line Argument keys
+    _CONFIG_COMMAND_LINE_ARGUMENT_KEY_COMMAND = 'command'
+    _CONFIG_COMMAND_LINE_ARGUMENT_KEY_DRY_RUN = 'dry_run'
+    # Commands
+    COMMAND_RECONCILE_MANIFEST = 'reconcile_manifest'
+    COMMAND_EVICT = 'evict'
+    COMMAND_REMOVE_STALE_LOCKS = 'remove_stale_locks'
+
+    def __init__(self, configuration_object, configuration_file, pipeline_arguments):
+        super().__init__(configuration_object, configuration_file, pipeline_arguments)
+
+    def _get_allowed_configuration_keys(self):
+        return {self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_COMMAND, self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_DRY_RUN}
+
+    def _process_pipeline_arguments(self):
+        return super()._process_pipeline_arguments() or {}
+
+    def get_command(self):
+        return self._get_value_for_pipeline_argument_key(self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_COMMAND)
+
+    def is_dry_run(self):
+        return self._get_value_for_pipeline_argument_key(self._CONFIG_COMMAND_LINE_ARGUMENT_KEY_DRY_RUN) == "True"
+
+
+class EnsemblRepositoryMaintenance(Director):
+    """
+    This pipeline runs the given maintenance command on the local Ensembl repository
+    """
+
+    def __init__(self, configuration_object, configuration_file, pipeline_arguments):
+        runner_id = "{}-{}".format(__name__, time.time())
+        super(EnsemblRepositoryMaintenance, self).__init__(runner_id)
+        self.__config_manager = ConfigManager(configuration_object, configuration_file, pipeline_arguments)
+
+    def _get_configuration_manager(self):
+        return self.__config_manager
+
+    def _run_reconcile_manifest(self):
+        summary = ensembl.data_downloader.get_data_download_service().reconcile_manifest()
+        self._get_logger().info("Manifest reconciled, {} files kept, {} added, {} updated, {} removed"
+                                .format(summary['kept'], summary['added'], summary['updated'], summary['removed']))
+        return True
+
+    def _run_evict(self):
+        report = ensembl.data_downloader.get_data_download_service() \
+            .evict(dry_run=self._get_configuration_manager().is_dry_run())
+        for summary in report['evicted']:
+            self._get_logger().info("{} release #{}, species '{}', last used at {}, {} bytes freed"
+                                    .format("Would evict" if report['dry_run'] else "Evicted",
+                                            summary['release'],
+                                            summary['species'],
+                                            time.ctime(summary['last_access']),
+                                            summary['freed_size']))
+        return True
+
+    def _run_remove_stale_locks(self):
+        removed_lock_files = ensembl.data_downloader.get_data_download_service().remove_stale_download_locks()
+        self._get_logger().info("{} stale download lock files removed".format(len(removed_lock_files)))
+        return True
+
+    def _run_pipeline(self):
+        self._get_logger().info("[START]---> Pipeline run")
+        commands = {ConfigManager.COMMAND_RECONCILE_MANIFEST: self._run_reconcile_manifest,
+                    ConfigManager.COMMAND_EVICT: self._run_evict,
+                    ConfigManager.COMMAND_REMOVE_STALE_LOCKS: self._run_remove_stale_locks}
+        command = self._get_configuration_manager().get_command()
+        if command not in commands:
+            self._get_logger().error("UNKNOWN maintenance command '{}', available commands are {}"
+                                     .format(command, sorted(commands.keys())))
+            return False
+        self._get_logger().info("Running maintenance command '{}'".format(command))
+        return commands[command]()
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
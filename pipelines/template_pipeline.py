@@ -188,6 +188,9 @@ class PogoBasedPipelineDirector(Director):
     """
     Abstract class pipeline director class for those pipelines running PoGo in PRIDE
     """
+    # PoGo only needs the protein sequence file containing all the sequences, and the GTF file with no suffix
+    _POGO_PROTEIN_SEQUENCE_FILE_SUFFIXES = ['all']
+    _POGO_GTF_FILE_SUFFIXES = ['']
 
     def __init__(self, runner_id=None):
         super().__init__(runner_id)
@@ -201,7 +204,8 @@ class PogoBasedPipelineDirector(Director):
         # Get an instance of the Ensembl data downloader
         ensembl_downloader_service = ensembl.data_downloader.get_data_download_service()
         # Get Protein Sequence file from Ensembl for this taxonomy, only the "*all*" kind
-        protein_sequence_files = ensembl_downloader_service.get_protein_sequences_for_species(taxonomy_id)
+        protein_sequence_files = ensembl_downloader_service \
+            .get_protein_sequences_for_species(taxonomy_id, self._POGO_PROTEIN_SEQUENCE_FILE_SUFFIXES)
         # Checking on whether we can find a protein sequence or not for the given taxonomy will tell us if the
         # taxonomy is on Ensembl or not
         if not protein_sequence_files:
@@ -225,7 +229,9 @@ class PogoBasedPipelineDirector(Director):
         """
         # Get an instance of the Ensembl data downloader
         ensembl_downloader_service = ensembl.data_downloader.get_data_download_service()
-        gtf_files = ensembl_downloader_service.get_genome_reference_for_species(taxonomy_id)
+        # The slim version of the GTF files, when available, has only the features PoGo works with
+        gtf_files = ensembl_downloader_service \
+            .get_slim_genome_reference_for_species(taxonomy_id, self._POGO_GTF_FILE_SUFFIXES)
         # For PoGo, we will use the GTF file that has no suffixes, thus, it will be the shortest file name
         pogo_parameter_gtf_file_name = None
         pogo_parameter_gtf_file_path = None
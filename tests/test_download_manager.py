@@ -11,10 +11,25 @@
 Unit Tests for the download manager module
 """
 
+import os
+import gzip
+import json
+import time
+import pathlib
+import threading
 import unittest
 # App imports
 import config_manager
 from download_manager.manager import Manager as DownloadManager
+from download_manager.scheduler import DownloadScheduler
+from download_manager.engines import GunzipStreamWriter, FolderIndexParser, TransferEngine, TransferEngineFactory
+from download_manager.checksums import ChecksumFactory, parse_checksums
+from download_manager.pool import ConnectionPool
+from download_manager.metrics import TransferMetrics, summarize, write_report
+from download_manager.retry import RetryPolicy, RetryState, ExponentialBackoffRetryPolicy
+from download_manager.exceptions import TransferEngineException, TransferNotFoundException, \
+    TransferTimeoutException
+from benchmarks.download_manager_benchmark import BenchmarkScenario, DownloadManagerBenchmark
 
 
 class TestDownloadManager(unittest.TestCase):
@@ -36,5 +51,337 @@ class TestDownloadManager(unittest.TestCase):
         self.assertTrue(download_manager.is_success(), "Files downloaded successfully")
 
 
+class TestDownloadScheduler(unittest.TestCase):
+    class FakeJob:
+        """
+        Download job that just keeps track of how many jobs are running at the same time
+        """
+        def __init__(self, host, tracker):
+            self.host = host
+            self.tracker = tracker
+
+        def get_host(self):
+            return self.host
+
+        def get_download_url(self):
+            return "ftp://{}/file".format(self.host)
+
+        def run(self):
+            self.tracker.job_started(self.host)
+            time.sleep(0.05)
+            self.tracker.job_finished(self.host)
+
+    class ConcurrencyTracker:
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.running = 0
+            self.running_per_host = {}
+            self.peak = 0
+            self.peak_per_host = {}
+            self.finished = 0
+
+        def job_started(self, host):
+            with self.lock:
+                self.running += 1
+                self.running_per_host[host] = self.running_per_host.get(host, 0) + 1
+                self.peak = max(self.peak, self.running)
+                self.peak_per_host[host] = max(self.peak_per_host.get(host, 0), self.running_per_host[host])
+
+        def job_finished(self, host):
+            with self.lock:
+                self.running -= 1
+                self.running_per_host[host] -= 1
+                self.finished += 1
+
+    def test_concurrency_limits_are_honored(self):
+        tracker = self.ConcurrencyTracker()
+        scheduler = DownloadScheduler(max_concurrent_downloads=5, max_concurrent_downloads_per_host=2)
+        hosts = ['host-a', 'host-b', 'host-c', 'host-d']
+        for i in range(0, 32):
+            scheduler.submit(self.FakeJob(hosts[i % len(hosts)], tracker))
+        while scheduler.get_count_queued_jobs() or scheduler.get_count_running_jobs():
+            time.sleep(0.1)
+        self.assertEqual(tracker.finished, 32, "All the jobs have been run")
+        self.assertTrue(tracker.peak <= 5, "Global concurrency limit honored")
+        for host in hosts:
+            self.assertTrue(tracker.peak_per_host[host] <= 2, "Per host concurrency limit honored for '{}'"
+                            .format(host))
+
+
+class TestGunzipStreamWriter(unittest.TestCase):
+    __data = "".join(["Sample line #{}\n".format(i) for i in range(0, 10000)]).encode()
+
+    def __get_file_path(self, file_name):
+        return os.path.join(config_manager.get_app_config_manager().get_session_working_dir(), file_name)
+
+    def test_multi_member_stream_is_inflated_while_written(self):
+        compressed_data = gzip.compress(self.__data[:1000]) + gzip.compress(self.__data[1000:])
+        file_path = self.__get_file_path('test_gunzip_stream_writer_multi_member.txt')
+        writer = GunzipStreamWriter(file_path)
+        # Feed the compressed data in small pieces, as it would arrive from the network
+        for start in range(0, len(compressed_data), 333):
+            writer.write(compressed_data[start:start + 333])
+        writer.close()
+        with open(file_path, 'rb') as f:
+            self.assertEqual(f.read(), self.__data, "Inflated content matches the original data")
+
+    def test_truncated_stream_is_detected(self):
+        compressed_data = gzip.compress(self.__data)
+        writer = GunzipStreamWriter(self.__get_file_path('test_gunzip_stream_writer_truncated.txt'))
+        writer.write(compressed_data[:len(compressed_data) // 2])
+        self.assertRaises(TransferEngineException, writer.close)
+
+
+class TestFolderIndexParser(unittest.TestCase):
+    def test_folder_entries_are_found_in_index_page(self):
+        index_page = '<html><body><a href="?C=N;O=D">Name</a><a href="/pub/release-89/gtf/">Parent Directory</a>' \
+                     '<a href="CHECKSUMS">CHECKSUMS</a><a href="Homo_sapiens.GRCh38.89.gtf.gz">gtf</a>' \
+                     '<a href="subfolder/">subfolder</a><a href="http://www.ensembl.org">Ensembl</a></body></html>'
+        parser = FolderIndexParser()
+        parser.feed(index_page)
+        self.assertEqual(parser.entries, ['CHECKSUMS', 'Homo_sapiens.GRCh38.89.gtf.gz', 'subfolder'],
+                         "Only the folder entries are listed")
+
+
+class TestLocalFileTransfer(unittest.TestCase):
+    __logger = config_manager.get_app_config_manager().get_logger_for(__name__)
+    __data = "".join(["Local mirror line #{}\n".format(i) for i in range(0, 1000)]).encode()
+
+    def __get_file_path(self, file_name):
+        return os.path.join(config_manager.get_app_config_manager().get_session_working_dir(), file_name)
+
+    def __get_mirror_file_url(self, file_name):
+        mirror_file_path = self.__get_file_path(file_name)
+        with open(mirror_file_path, 'wb') as mirror_file:
+            mirror_file.write(gzip.compress(self.__data))
+        return pathlib.Path(mirror_file_path).as_uri()
+
+    def test_local_files_are_symlinked_or_copied(self):
+        url = self.__get_mirror_file_url('test_local_file_transfer_mirror.txt.gz')
+        for local_file_mode in (TransferEngine.LOCAL_FILE_MODE_SYMLINK, TransferEngine.LOCAL_FILE_MODE_COPY):
+            dst_file_path = self.__get_file_path("test_local_file_transfer_{}.txt.gz".format(local_file_mode))
+            decompressed_file_path = dst_file_path[:-len('.gz')]
+            checksum = ChecksumFactory.get_checksum(ChecksumFactory.ALGORITHM_MD5)
+            engine = TransferEngineFactory.get_transfer_engine(local_file_mode=local_file_mode)
+            engine.download(url, dst_file_path, 10, decompressed_file_path=decompressed_file_path,
+                            keep_compressed=True, checksum=checksum)
+            self.assertEqual(os.path.islink(dst_file_path), local_file_mode == TransferEngine.LOCAL_FILE_MODE_SYMLINK,
+                             "Local file made available as '{}'".format(local_file_mode))
+            with open(decompressed_file_path, 'rb') as f:
+                self.assertEqual(f.read(), self.__data, "Local file inflated")
+            self.assertEqual(checksum.get_value(),
+                             ChecksumFactory.get_checksum_for_file(dst_file_path, ChecksumFactory.ALGORITHM_MD5),
+                             "Checksum computed for the local file")
+
+    def test_agent_falls_back_to_the_url_when_a_source_is_missing(self):
+        url = self.__get_mirror_file_url('test_local_file_transfer_fallback.txt.gz')
+        missing_source_url = pathlib.Path(self.__get_file_path('test_local_file_transfer_missing.txt.gz')).as_uri()
+        destination_folder = self.__get_file_path('test_local_file_transfer_fallback')
+        os.makedirs(destination_folder, exist_ok=True)
+        download_manager = DownloadManager([url], destination_folder, self.__logger, decompress=True,
+                                           source_urls={url: [missing_source_url]})
+        download_manager.start_downloads()
+        download_manager.wait_all()
+        self.assertEqual(download_manager.get_successful_urls(), [url], "Downloaded from the URL itself")
+        with open(os.path.join(destination_folder, 'test_local_file_transfer_fallback.txt'), 'rb') as f:
+            self.assertEqual(f.read(), self.__data, "Downloaded content inflated")
+
+
+class TestChecksums(unittest.TestCase):
+    # Reference values obtained with GNU 'sum' and 'md5sum'
+    __data = b"Sample line\n" * 5000
+    __bsd_sum = "23686 59"
+    __md5 = "e2938ef0ae91df2e18b72b309bd8e8f0"
+
+    def test_incremental_checksums_match_reference_values(self):
+        for algorithm, expected_value in [(ChecksumFactory.ALGORITHM_BSD_SUM, self.__bsd_sum),
+                                          (ChecksumFactory.ALGORITHM_MD5, self.__md5)]:
+            checksum = ChecksumFactory.get_checksum(algorithm)
+            for start in range(0, len(self.__data), 1000):
+                checksum.update(self.__data[start:start + 1000])
+            self.assertEqual(checksum.get_value(), expected_value, "'{}' checksum computed incrementally"
+                             .format(algorithm))
+
+    def test_file_checksums_match_with_and_without_the_sum_tool(self):
+        file_path = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                                 'test_checksums_bsd_sum.txt')
+        with open(file_path, 'wb') as f:
+            f.write(self.__data)
+        for use_sum_tool in (False, True):
+            self.assertEqual(ChecksumFactory.get_checksum_for_file(file_path, ChecksumFactory.ALGORITHM_BSD_SUM,
+                                                                   use_sum_tool=use_sum_tool),
+                             self.__bsd_sum, "File checksum matches the reference value, 'sum -r' used: {}"
+                             .format(use_sum_tool))
+
+    def test_checksums_file_parsing(self):
+        checksums = parse_checksums("23686    59 Homo_sapiens.GRCh38.pep.all.fa.gz\n"
+                                    "e2938ef0ae91df2e18b72b309bd8e8f0  Homo_sapiens.GRCh38.89.gtf.gz\n")
+        self.assertEqual(checksums['Homo_sapiens.GRCh38.pep.all.fa.gz'],
+                         {'algorithm': ChecksumFactory.ALGORITHM_BSD_SUM, 'value': self.__bsd_sum})
+        self.assertEqual(checksums['Homo_sapiens.GRCh38.89.gtf.gz'],
+                         {'algorithm': ChecksumFactory.ALGORITHM_MD5, 'value': self.__md5})
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def __get_state_after_failures(self, exceptions):
+        retry_state = RetryState()
+        for exception in exceptions:
+            retry_state.start_attempt()
+            retry_state.record_failure(RetryPolicy.classify_failure(exception))
+        return retry_state
+
+    def test_permanent_failures_are_not_retried(self):
+        retry_policy = ExponentialBackoffRetryPolicy()
+        retry_state = self.__get_state_after_failures([TransferNotFoundException("404 Not Found")])
+        self.assertIsNone(retry_policy.get_retry_delay(retry_state), "Missing files are not retried")
+
+    def test_transient_failures_are_retried_with_bounded_backoff(self):
+        retry_policy = ExponentialBackoffRetryPolicy(max_attempts=4, max_timeout_attempts=2, base_delay=1,
+                                                     max_delay=3)
+        retry_state = self.__get_state_after_failures([TransferEngineException("Connection reset")] * 3)
+        delay = retry_policy.get_retry_delay(retry_state)
+        self.assertTrue((delay is not None) and (0 <= delay <= 3), "Network errors are retried, within max delay")
+        retry_state = self.__get_state_after_failures([TransferEngineException("Connection reset")] * 4)
+        self.assertIsNone(retry_policy.get_retry_delay(retry_state), "No more attempts than the maximum")
+        retry_state = self.__get_state_after_failures([TransferTimeoutException("Timed out")] * 2)
+        self.assertIsNone(retry_policy.get_retry_delay(retry_state), "No more timeouts than the maximum")
+
+
+class TestConnectionPool(unittest.TestCase):
+    class DummyConnection:
+        def __init__(self, url):
+            self.url = url
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    __url = "ftp://ftp.ensembl.org/pub/release-89/gtf/homo_sapiens/Homo_sapiens.GRCh38.89.gtf.gz"
+
+    def test_connections_are_reused_per_host(self):
+        connection_pool = ConnectionPool()
+        connection, reused = connection_pool.acquire(self.__url, self.DummyConnection)
+        self.assertFalse(reused, "The first connection to a host is a new one")
+        connection_pool.release(self.__url, connection)
+        same_connection, reused = connection_pool.acquire(self.__url.replace('homo_sapiens', 'mus_musculus'),
+                                                          self.DummyConnection)
+        self.assertTrue(reused and (same_connection is connection), "Idle connections to the host are reused")
+        connection_pool.release(self.__url, same_connection, reusable=False)
+        self.assertTrue(connection.closed, "Connections that can't be reused are closed")
+        self.assertEqual(connection_pool.get_count_idle_connections(), 0, "Closed connections leave the pool")
+
+    def test_max_connections_per_host_is_honored(self):
+        connection_pool = ConnectionPool(max_connections_per_host=1)
+        connection, reused = connection_pool.acquire(self.__url, self.DummyConnection)
+        self.assertRaises(TransferTimeoutException,
+                          connection_pool.acquire, self.__url, self.DummyConnection, timeout=0.1)
+        other_host_connection, reused = connection_pool.acquire("ftp://ftp.ebi.ac.uk/pub/README",
+                                                                self.DummyConnection, timeout=0.1)
+        self.assertEqual(other_host_connection.url, "ftp://ftp.ebi.ac.uk/pub/README", "Limits are per host")
+
+    def test_idle_connections_are_evicted(self):
+        connection_pool = ConnectionPool(idle_timeout=0.1)
+        connection, reused = connection_pool.acquire(self.__url, self.DummyConnection)
+        connection_pool.release(self.__url, connection)
+        time.sleep(0.2)
+        new_connection, reused = connection_pool.acquire(self.__url, self.DummyConnection)
+        self.assertFalse(reused, "Expired connections are not reused")
+        self.assertTrue(connection.closed, "Expired connections are closed")
+
+
+class TestTransferMetrics(unittest.TestCase):
+    def __get_transfer_metrics(self, url, chunks, failure_type=None):
+        transfer_metrics = TransferMetrics(url)
+        transfer_metrics.start()
+        transfer_metrics.start_attempt()
+        bytes_so_far = 0
+        for chunk in chunks:
+            bytes_so_far += chunk
+            transfer_metrics.record_progress(bytes_so_far)
+        transfer_metrics.end_attempt(None if failure_type else bytes_so_far, failure_type)
+        transfer_metrics.finish(TransferMetrics.STATUS_FAILED if failure_type else TransferMetrics.STATUS_COMPLETED,
+                                None if failure_type else bytes_so_far)
+        return transfer_metrics
+
+    def test_transfer_metrics_are_recorded(self):
+        transfer_metrics = self.__get_transfer_metrics("ftp://ftp.ensembl.org/pub/README", [1024] * 4)
+        self.assertEqual(transfer_metrics.bytes_transferred, 4096, "Bytes transferred by a successful attempt")
+        self.assertIsNotNone(transfer_metrics.time_to_first_byte, "Time to first byte")
+        self.assertIsNotNone(transfer_metrics.peak_throughput, "Peak throughput, even for short transfers")
+        failed_metrics = self.__get_transfer_metrics("ftp://ftp.ensembl.org/pub/MISSING", [], 'not_found')
+        self.assertEqual(failed_metrics.to_dict()['failures'], {'not_found': 1}, "Failures by type")
+        self.assertIsNone(failed_metrics.get_average_throughput(), "No throughput without data")
+
+    def test_summary_and_report(self):
+        transfer_metrics = [self.__get_transfer_metrics("ftp://ftp.ensembl.org/pub/README", [1024] * 4),
+                            self.__get_transfer_metrics("ftp://ftp.ensembl.org/pub/MISSING", [], 'not_found'),
+                            self.__get_transfer_metrics("http://ftp.ebi.ac.uk/pub/README", [2048])]
+        summary = summarize(transfer_metrics)
+        self.assertEqual(summary['bytes_transferred'], 6144, "Overall bytes transferred")
+        self.assertEqual(summary['hosts']['ftp.ensembl.org']['statuses'], {'completed': 1, 'failed': 1},
+                         "Transfers per host and status")
+        report_file_path = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                                        'test_transfer_metrics_report.jsonl')
+        write_report(transfer_metrics, report_file_path, append=False)
+        with open(report_file_path, 'r') as report_file:
+            report = [json.loads(line) for line in report_file]
+        self.assertEqual([entry['url'] for entry in report], [metrics.url for metrics in transfer_metrics],
+                         "One report line per transfer")
+
+
+class TestDownloadManagerBenchmark(unittest.TestCase):
+    def test_failure_recovery_against_stand_in_server(self):
+        work_folder = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                                   'test_download_manager_benchmark')
+        benchmark = DownloadManagerBenchmark(work_folder)
+        for protocol in ['http', 'ftp']:
+            result = benchmark.run([BenchmarkScenario("recovery-{}".format(protocol),
+                                                      protocol=protocol,
+                                                      file_count=4,
+                                                      file_size=256 * 1024,
+                                                      missing_file_count=1,
+                                                      disconnected_file_count=1)])[0]
+            self.assertEqual(result['files_downloaded'], 3, "All the available files are downloaded over {}"
+                             .format(protocol))
+            self.assertEqual(result['server_disconnects'], 1, "The interrupted transfer happened over {}"
+                             .format(protocol))
+            self.assertGreater(result['attempts'], 4, "The interrupted transfer was retried over {}".format(protocol))
+
+    def test_segmented_downloads_against_stand_in_server(self):
+        work_folder = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                                   'test_download_manager_benchmark')
+        benchmark = DownloadManagerBenchmark(work_folder)
+        for protocol in ['http', 'ftp']:
+            result = benchmark.run([BenchmarkScenario("segmented-{}".format(protocol),
+                                                      protocol=protocol,
+                                                      file_count=2,
+                                                      file_size=256 * 1024,
+                                                      segment_count=4,
+                                                      disconnected_file_count=1)])[0]
+            self.assertEqual(result['files_downloaded'], 2, "All the files are downloaded, and verified, over {}"
+                             .format(protocol))
+            self.assertEqual(result['server_disconnects'], 1, "The interrupted segment happened over {}"
+                             .format(protocol))
+            # Two files, four segments each, plus the resumed segment
+            self.assertEqual(result['server_range_requests'], 9, "Files downloaded as byte ranges over {}"
+                             .format(protocol))
+
+    def test_segmented_downloads_fall_back_to_single_stream(self):
+        work_folder = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                                   'test_download_manager_benchmark')
+        benchmark = DownloadManagerBenchmark(work_folder)
+        for protocol in ['http', 'ftp']:
+            result = benchmark.run([BenchmarkScenario("segmented-no-ranges-{}".format(protocol),
+                                                      protocol=protocol,
+                                                      file_count=2,
+                                                      file_size=256 * 1024,
+                                                      segment_count=4,
+                                                      byte_ranges=False)])[0]
+            self.assertEqual(result['files_downloaded'], 2, "All the files are downloaded, and verified, over {}"
+                             .format(protocol))
+            self.assertGreater(result['server_range_requests'], 0, "Byte ranges were asked for over {}"
+                               .format(protocol))
+
+
 if __name__ == '__main__':
     print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
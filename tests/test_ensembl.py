@@ -11,10 +11,15 @@
 Unit tests for Ensembl module
 """
 
+import os
+import time
+import shutil
+import threading
 import unittest
 # App modules
 import config_manager
 import ensembl.service
+from ensembl.rest_cache import RestResponseCache
 
 
 class TestEnsemblService(unittest.TestCase):
@@ -49,6 +54,56 @@ class TestEnsemblService(unittest.TestCase):
             self.assertIsNotNone(chromosome_sizes, "We got chromosome sizes")
             self.logger.debug("UCSC Chromosome sizes for taxonomy '{}' ---> '{}'".format(taxonomy, str(chromosome_sizes)))
 
+    def test_chromosome_sizes_are_requested_once_per_taxonomy(self):
+        requested_endpoints = []
+        requested_endpoints_lock = threading.Lock()
+
+        class OfflineService(ensembl.service.Service):
+            def _request(self, endpoint, release=None, max_age=None):
+                with requested_endpoints_lock:
+                    requested_endpoints.append(endpoint)
+                if endpoint == self._ENDPOINT_RELEASE_DATA:
+                    return {'releases': [100]}
+                # Slow enough for the requests to overlap
+                time.sleep(0.2)
+                return {'top_level_region': [{'name': 'X', 'length': 1}, {'name': '1', 'length': 2}]}
+
+        service = OfflineService({'service': {'ensembl_api': {'server': 'http://localhost'},
+                                              'rest_cache': {'enabled': False}}}, 'offline')
+        chromosome_sizes = service.get_chromosome_sizes_for_taxonomies(['9606', '10090', '9606', '10090'])
+        self.assertEqual(set(chromosome_sizes.keys()), {'9606', '10090'}, "One entry per taxonomy")
+        self.assertEqual(chromosome_sizes['9606'], {'1': 2, 'X': 1}, "Chromosome sizes from the assembly information")
+        self.assertEqual(service.get_chromosome_sizes_for_taxonomy('9606'), {'1': 2, 'X': 1},
+                         "Chromosome sizes already requested in this session")
+        self.assertEqual(sorted([endpoint for endpoint in requested_endpoints if endpoint.startswith('info/assembly')]),
+                         ['info/assembly/10090', 'info/assembly/9606'], "Every taxonomy requested only once")
+
+
+class TestRestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.__cache_folder = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                                           'test_rest_response_cache')
+        shutil.rmtree(self.__cache_folder, ignore_errors=True)
+
+    def test_responses_are_shared_among_sessions(self):
+        RestResponseCache(self.__cache_folder).put('info/assembly/9606', {'top_level_region': []}, release=99)
+        rest_cache = RestResponseCache(self.__cache_folder)
+        entry = rest_cache.get('info/assembly/9606', release=99)
+        self.assertEqual(entry['content'], {'top_level_region': []}, "Response found by another session")
+        self.assertTrue(RestResponseCache.get_age(entry) < 60, "Response is fresh")
+        self.assertIsNone(rest_cache.get('info/assembly/9606', release=100), "Responses are bound to their release")
+
+    def test_responses_for_other_releases_are_removed(self):
+        rest_cache = RestResponseCache(self.__cache_folder)
+        rest_cache.put('info/data/?', {'releases': [100]})
+        rest_cache.put('info/species?', {'species': []}, release=99)
+        rest_cache.put('info/species?', {'species': []}, release=100)
+        rest_cache.remove_releases_other_than(100)
+        rest_cache = RestResponseCache(self.__cache_folder)
+        self.assertIsNone(rest_cache.get('info/species?', release=99), "Previous release response removed")
+        self.assertIsNotNone(rest_cache.get('info/species?', release=100), "Current release response kept")
+        self.assertIsNotNone(rest_cache.get('info/data/?'), "Response not bound to a release kept")
+
 
 if __name__ == '__main__':
     print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -11,10 +11,22 @@
 Unit tests for Ensembl Data Downloader
 """
 
+import os
+import gzip
+import json
+import time
+import shutil
+import threading
 import unittest
+import concurrent.futures
 # Application imports
 import config_manager
 import ensembl.data_downloader
+from ensembl.exceptions import EnsemblDownloadManagerException
+from ensembl.manifest import LocalRepositoryManifest
+from download_manager.checksums import ChecksumFactory
+from toolbox import bgzf
+from toolbox.locks import FileLock, FileLease
 
 
 class TestEnsemblDataDownloader(unittest.TestCase):
@@ -31,5 +43,480 @@ class TestEnsemblDataDownloader(unittest.TestCase):
         ensembl_downloader_service.get_genome_reference_for_species(human_ncbi_tax_id)
 
 
+class OfflineEnsemblService:
+    """
+    Ensembl service, on release 100, that knows about any taxonomy but '0', without going to Ensembl
+    """
+    SPECIES_NAMES = {'9606': 'homo_sapiens', '10090': 'mus_musculus'}
+
+    class SpeciesEntry:
+        def __init__(self, name):
+            self.name = name
+
+        def get_name(self):
+            return self.name
+
+        def get_assembly(self):
+            return 'Assembly1'
+
+    def get_release_number(self):
+        return 100
+
+    @staticmethod
+    def get_chromosome_sizes_for_taxonomy(taxonomy_id):
+        return {'1': 1000, 'MT': 16}
+
+    def get_species_data_service(self):
+        return self
+
+    def get_species_entry_for_taxonomy_id(self, taxonomy_id):
+        if taxonomy_id == '0':
+            return None
+        return self.SpeciesEntry(self.SPECIES_NAMES.get(taxonomy_id, "species_{}".format(taxonomy_id)))
+
+
+class OfflineDataDownloadService(ensembl.data_downloader.DataDownloadService):
+    """
+    Data download service for Ensembl release 100, on top of the offline Ensembl service, with its local repository in
+    the given root folder
+    """
+    def __init__(self, configuration_object, configuration_file, root_folder):
+        super().__init__(configuration_object, configuration_file)
+        self.root_folder = root_folder
+
+    @staticmethod
+    def _get_ensembl_service():
+        return OfflineEnsemblService()
+
+    def get_ensembl_release_name(self):
+        return 'release-100'
+
+    def get_local_path_root_ensembl_repo(self):
+        return self.root_folder
+
+
+def get_offline_service(service_class, root_folder, settings=None, *args):
+    """
+    Build an offline data download service, its scratch folder goes within the given local repository root folder
+    :param service_class: OfflineDataDownloadService, or a subclass of it
+    :param root_folder: local repository root folder
+    :param settings: map from data downloader configuration section to the settings to change in it
+    :param args: any other arguments for the service class
+    :return: the offline data download service
+    """
+    configuration_file = config_manager.get_app_config_manager() \
+        .get_file_name_config_modules_ensembl_data_downloader()
+    configuration_object = config_manager.read_config_from_file(configuration_file)
+    configuration_object['data_downloader'].setdefault('storage', {})['scratch_folder'] = \
+        os.path.join(root_folder, 'scratch')
+    for section, section_settings in (settings or {}).items():
+        configuration_object['data_downloader'].setdefault(section, {}).update(section_settings)
+    return service_class(configuration_object, configuration_file, root_folder, *args)
+
+
+def get_test_folder(folder_name):
+    """
+    Get a brand new folder, within the session working directory, for a test
+    :param folder_name: name of the folder
+    :return: path to the folder
+    """
+    folder = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(), folder_name)
+    shutil.rmtree(folder, ignore_errors=True)
+    return folder
+
+
+class TestPrefetch(unittest.TestCase):
+    class FetchTimingDataDownloadService(OfflineDataDownloadService):
+        """
+        Data download service whose fetches just take the time given for every taxonomy
+        """
+        def __init__(self, configuration_object, configuration_file, root_folder, fetch_times):
+            super().__init__(configuration_object, configuration_file, root_folder)
+            self.fetch_times = fetch_times
+            self.fetched = []
+            self.fetched_lock = threading.Lock()
+
+        def _fetch_files_for_species(self, taxonomy_id, kind, suffixes=None):
+            with self.fetched_lock:
+                self.fetched.append(taxonomy_id)
+            time.sleep(self.fetch_times[taxonomy_id])
+            return ["{}_{}".format(taxonomy_id, kind)]
+
+    def __get_service(self, fetch_times, prefetch_concurrency):
+        return get_offline_service(self.FetchTimingDataDownloadService,
+                                   get_test_folder('test_prefetch'),
+                                   {'download_manager': {'prefetch_concurrency': prefetch_concurrency}},
+                                   fetch_times)
+
+    def test_results_are_given_back_as_they_complete(self):
+        service = self.__get_service({'9606': 0.5, '10090': 0.05}, 2)
+        kind = ensembl.data_downloader.DataDownloadService.KIND_GENOME_REFERENCE
+        results = list(service.prefetch(['9606', '10090', '0'], kinds=[kind]))
+        self.assertEqual(results, [('0', kind, None), ('10090', kind, ['10090_{}'.format(kind)]),
+                                   ('9606', kind, ['9606_{}'.format(kind)])],
+                         "Unknown taxonomies first, then the fastest fetch first")
+
+    def test_pending_fetches_are_cancelled_when_the_caller_stops(self):
+        taxonomy_ids = ['9606', '10090', '9544', '7955']
+        service = self.__get_service({taxonomy_id: 0.2 for taxonomy_id in taxonomy_ids}, 1)
+        kind = ensembl.data_downloader.DataDownloadService.KIND_GENOME_REFERENCE
+        prefetch = service.prefetch(taxonomy_ids, kinds=[kind])
+        next(prefetch)
+        prefetch.close()
+        self.assertLess(len(service.fetched), len(taxonomy_ids), "Pending fetches are cancelled")
+
+
+class TestFetchOnce(unittest.TestCase):
+    class CountingDataDownloadService(OfflineDataDownloadService):
+        """
+        Data download service whose fetches of genome reference files put them in the local repository, but the ones
+        given as failed, on the first fetch only
+        """
+        def __init__(self, configuration_object, configuration_file, root_folder, failed_file_names):
+            super().__init__(configuration_object, configuration_file, root_folder)
+            self.failed_file_names = failed_file_names
+            self.fetches = 0
+            self.fetches_lock = threading.Lock()
+
+        def _fetch_files_for_species_kind(self, kind, taxonomy_id, suffixes=None):
+            with self.fetches_lock:
+                self.fetches += 1
+                failed_file_names = self.failed_file_names if self.fetches == 1 else []
+            # Long enough for concurrent callers to find this fetch going on
+            time.sleep(0.2)
+            files = self._get_genome_reference_file_path_local(taxonomy_id, ['first.gtf', 'second.gtf'])
+            os.makedirs(self._get_genome_reference_file_destination_path_local(taxonomy_id), exist_ok=True)
+            for file_name, file_path in files:
+                if file_name not in failed_file_names:
+                    with open(file_path, 'w') as f:
+                        f.write(file_name)
+            return files
+
+    def __get_service(self, failed_file_names):
+        service = get_offline_service(self.CountingDataDownloadService,
+                                      get_test_folder('test_fetch_once'),
+                                      None,
+                                      failed_file_names)
+        service.post_constructor()
+        return service
+
+    def test_concurrent_requests_for_the_same_species_get_the_same_files(self):
+        service = self.__get_service([])
+        kind = ensembl.data_downloader.DataDownloadService.KIND_GENOME_REFERENCE
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda i: service._fetch_files_for_species('9606', kind), range(4)))
+        self.assertEqual(service.fetches, 1, "Files fetched only once")
+        self.assertTrue(all([result == results[0] for result in results]), "Same files for every caller")
+        self.assertEqual(len(results[0]), 2)
+        service._fetch_files_for_species('9606', kind)
+        self.assertEqual(service.fetches, 1, "Fetched files are kept for the session")
+
+    def test_fetches_with_missing_files_are_tried_again(self):
+        service = self.__get_service(['second.gtf'])
+        kind = ensembl.data_downloader.DataDownloadService.KIND_GENOME_REFERENCE
+        self.assertEqual([file_name for file_name, file_path in service._fetch_files_for_species('9606', kind)],
+                         ['first.gtf'], "Files that could not be downloaded are left out")
+        self.assertEqual([file_name for file_name, file_path in service._fetch_files_for_species('9606', kind)],
+                         ['first.gtf', 'second.gtf'], "Files that could not be downloaded are fetched again")
+        self.assertEqual(service.fetches, 2)
+        service._fetch_files_for_species('9606', kind)
+        self.assertEqual(service.fetches, 2, "Fetches with no missing files are kept for the session")
+
+    def test_unknown_kinds_of_files_are_not_fetched(self):
+        service = self.__get_service([])
+        with self.assertRaises(EnsemblDownloadManagerException):
+            service._fetch_files_for_species('9606', 'proteome')
+        self.assertEqual(service.fetches, 0)
+
+
+class TestReleaseRollover(unittest.TestCase):
+    def setUp(self):
+        self.__root_folder = get_test_folder('test_release_rollover')
+
+    def __get_service(self, storage_mode):
+        service = get_offline_service(OfflineDataDownloadService,
+                                      self.__root_folder,
+                                      {'storage': {'mode': storage_mode}})
+        service.post_constructor()
+        return service
+
+    def __add_previous_release_file(self, file_name, checksum):
+        release_folder = os.path.join(self.__root_folder, 'release-99')
+        file_path = os.path.join(release_folder, 'gtf', 'homo_sapiens', file_name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        for path in [file_path, bgzf.get_index_file_path(file_path)]:
+            with open(path, 'wb') as f:
+                f.write(b'Release 99 data')
+        LocalRepositoryManifest(release_folder) \
+            .add_entry(file_path, '9606', 'genome_reference', 'homo_sapiens', 15, checksum=checksum)
+
+    @staticmethod
+    def __roll_over(service, file_name, checksum):
+        files = service._get_genome_reference_file_path_local('9606', [file_name])
+        # As the data download service does, before looking for the files
+        os.makedirs(service._get_genome_reference_file_destination_path_local('9606'), exist_ok=True)
+        download_information = [(file_name, "ftp://ftp.ensembl.org/pub/{}.gz".format(file_name))]
+        missing_files = service._link_files_from_previous_releases(download_information,
+                                                                   files,
+                                                                   {file_name: checksum},
+                                                                   '9606',
+                                                                   'genome_reference')
+        return files, missing_files
+
+    def test_compressed_files_are_linked_from_previous_release(self):
+        self.__add_previous_release_file('Homo_sapiens.GRCh38.99.gtf.bgz', 'sum:1')
+        service = self.__get_service('bgzip')
+        files, missing_files = self.__roll_over(service, 'Homo_sapiens.GRCh38.100.gtf', 'sum:1')
+        self.assertEqual(missing_files, [], "Unchanged compressed file linked")
+        self.assertTrue(os.path.isfile(files[0][1]), "Compressed file in the current release")
+        self.assertTrue(os.path.isfile(bgzf.get_index_file_path(files[0][1])), "Index in the current release")
+
+    def test_files_are_not_linked_among_storage_modes(self):
+        self.__add_previous_release_file('Homo_sapiens.GRCh38.99.gtf', 'sum:1')
+        service = self.__get_service('bgzip')
+        files, missing_files = self.__roll_over(service, 'Homo_sapiens.GRCh38.100.gtf', 'sum:1')
+        self.assertEqual(missing_files, files, "Uncompressed file not linked into a compressed release")
+
+
+class TestEviction(unittest.TestCase):
+    # WARNING! - MAGIC NUMBER AHEAD!!! - every data file takes up this many bytes
+    __FILE_SIZE = 1000
+
+    def setUp(self):
+        self.__root_folder = get_test_folder('test_eviction')
+        self.__service = get_offline_service(OfflineDataDownloadService,
+                                             self.__root_folder,
+                                             {'eviction': {'max_size': 1,
+                                                           'pinned_taxonomies': ['9606'],
+                                                           'min_age': 3600}})
+        self.__service.post_constructor()
+        # Last used long ago, but for one species
+        last_use = time.time() - 10 * 24 * 3600
+        self.__add_file(100, 'homo_sapiens', last_use)
+        self.__add_file(100, 'mus_musculus', last_use)
+        self.__add_file(100, 'species_7955', time.time())
+        self.__add_file(100, 'species_9544', last_use)
+        self.__add_file(99, 'species_9598', last_use)
+        # Unchanged files are hard linked from the previous release, see 'release rollover'
+        self.__link_file(100, 99, 'homo_sapiens')
+        self.__link_file(100, 99, 'species_9544')
+        # The previous release has bookkeeping files that are not about any species, i.e. its manifest
+        LocalRepositoryManifest(self.__get_release_path(99)) \
+            .add_entry(self.__get_file_path(99, 'species_9598'), '9598', 'genome_reference', 'species_9598',
+                       self.__FILE_SIZE, download_time=last_use)
+
+    def __get_release_path(self, release_number):
+        return os.path.join(self.__root_folder, "release-{}".format(release_number))
+
+    def __get_file_path(self, release_number, species):
+        return os.path.join(self.__get_release_path(release_number),
+                            self.__service._get_configuration_manager().get_folder_name_gtf(),
+                            species,
+                            "{}.gtf".format(species))
+
+    def __add_file(self, release_number, species, last_use):
+        file_path = self.__get_file_path(release_number, species)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(b'x' * self.__FILE_SIZE)
+        os.utime(file_path, (last_use, last_use))
+
+    def __link_file(self, release_number, previous_release_number, species):
+        previous_file_path = self.__get_file_path(previous_release_number, species)
+        os.makedirs(os.path.dirname(previous_file_path), exist_ok=True)
+        os.link(self.__get_file_path(release_number, species), previous_file_path)
+
+    def __lease(self, release_number, species):
+        lease = FileLease(self.__service._get_lease_file_path(self.__get_release_path(release_number), species))
+        lease.acquire_shared()
+        return lease
+
+    @staticmethod
+    def __get_evicted(report):
+        return sorted([(summary['release'], summary['species'], summary['freed_size'])
+                       for summary in report['evicted']])
+
+    def __evict(self, dry_run=False):
+        # Someone is using mouse data
+        lease = self.__lease(100, 'mus_musculus')
+        try:
+            return self.__service.evict(dry_run=dry_run)
+        finally:
+            lease.release()
+
+    def test_species_not_evictable_are_skipped(self):
+        report = self.__evict()
+        self.assertEqual(sorted([(summary['species'], summary['reason']) for summary in report['skipped']]),
+                         [('homo_sapiens', 'pinned'),
+                          ('mus_musculus', 'in use'),
+                          ('species_7955', 'recently used')])
+        for species in ['homo_sapiens', 'mus_musculus', 'species_7955']:
+            self.assertTrue(os.path.isfile(self.__get_file_path(100, species)), "'{}' is kept".format(species))
+        self.assertFalse(os.path.isfile(self.__get_file_path(100, 'species_9544')))
+
+    def test_space_is_freed_when_the_last_link_goes(self):
+        report = self.__evict()
+        self.assertEqual(self.__get_evicted(report),
+                         [(99, 'homo_sapiens', 0),
+                          (99, 'species_9544', 0),
+                          (99, 'species_9598', self.__FILE_SIZE),
+                          (100, 'species_9544', self.__FILE_SIZE)],
+                         "Files still linked from a species that is kept free no space, nor the first link to go")
+
+    def test_dry_run_removes_nothing(self):
+        report = self.__evict(dry_run=True)
+        self.assertTrue(report['dry_run'])
+        self.assertEqual(report['removed_releases'], [99])
+        self.assertEqual(len(report['evicted']), 4)
+        for release_number, species in [(99, 'homo_sapiens'), (99, 'species_9544'), (99, 'species_9598'),
+                                         (100, 'species_9544')]:
+            self.assertTrue(os.path.isfile(self.__get_file_path(release_number, species)),
+                            "Release {} '{}' is not removed in a dry run".format(release_number, species))
+        with open(self.__service._get_eviction_report_file_path(), 'r') as report_file:
+            self.assertEqual(json.load(report_file), report, "Dry run report is written")
+
+    def test_previous_release_is_removed_once_all_its_species_are_evicted(self):
+        lease = self.__lease(99, 'species_9598')
+        try:
+            report = self.__evict()
+        finally:
+            lease.release()
+        self.assertEqual(report['removed_releases'], [], "Previous release in use is kept")
+        self.assertTrue(os.path.isfile(self.__get_file_path(99, 'species_9598')))
+        report = self.__evict()
+        self.assertEqual(report['removed_releases'], [99], "Previous release is removed once there is nothing in it")
+        self.assertFalse(os.path.isdir(self.__get_release_path(99)))
+
+    def test_previous_release_being_downloaded_into_is_kept(self):
+        download_lock = FileLock(os.path.join(self.__get_release_path(99),
+                                              self.__service._get_configuration_manager().get_folder_name_gtf(),
+                                              '.download.lock'))
+        with download_lock:
+            report = self.__evict()
+        self.assertEqual(report['removed_releases'], [], "Previous release being downloaded into is kept")
+        self.assertEqual(report['skipped_releases'], [99])
+        self.assertTrue(os.path.isdir(self.__get_release_path(99)))
+
+    def test_previous_release_with_no_species_is_removed_within_budget(self):
+        os.makedirs(os.path.join(self.__get_release_path(98), 'gtf'))
+        service = get_offline_service(OfflineDataDownloadService,
+                                      self.__root_folder,
+                                      {'eviction': {'max_size': 1024 * 1024 * 1024}})
+        service.post_constructor()
+        report = service.evict()
+        self.assertEqual(report['evicted'], [], "Nothing is evicted within the disk budget")
+        self.assertEqual(report['removed_releases'], [98], "Previous release with no species in it is removed")
+        self.assertTrue(os.path.isdir(self.__get_release_path(99)))
+
+
+class TestChromosomeSizes(unittest.TestCase):
+    def test_existing_table_is_read_without_waiting_for_downloads(self):
+        service = get_offline_service(OfflineDataDownloadService, get_test_folder('test_chromosome_sizes'))
+        service.post_constructor()
+        self.assertEqual(service.get_chromosome_sizes_for_species('9606'), {'1': 1000, 'MT': 16}, "Table built")
+        # Someone is downloading GTF files for the same species
+        download_lock = service._get_download_lock(service._get_genome_reference_file_destination_path_local('9606'))
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        try:
+            with download_lock:
+                chromosome_sizes = executor.submit(service.get_chromosome_sizes_for_species, '9606').result(timeout=5)
+        finally:
+            executor.shutdown()
+        self.assertEqual(chromosome_sizes, {'1': 1000, 'MT': 16}, "Table read while the download lock is held")
+
+
+class TestReconcileManifest(unittest.TestCase):
+    def test_files_are_verified_when_their_ensembl_file_is_there(self):
+        service = get_offline_service(OfflineDataDownloadService, get_test_folder('test_reconcile_manifest'))
+        service.post_constructor()
+        folder = service._get_genome_reference_file_destination_path_local('9606')
+        os.makedirs(folder)
+        data = b"1\tensembl\tgene\t1\t100\t.\t+\t.\tgene_id \"G1\";\n"
+        with open(os.path.join(folder, 'verified.gtf.gz'), 'wb') as f:
+            f.write(gzip.compress(data))
+        for file_name in ['verified.gtf', 'not_verified.gtf']:
+            with open(os.path.join(folder, file_name), 'wb') as f:
+                f.write(data)
+        checksum = {'algorithm': ChecksumFactory.ALGORITHM_MD5,
+                    'value': ChecksumFactory.get_checksum_for_file(os.path.join(folder, 'verified.gtf.gz'),
+                                                                   ChecksumFactory.ALGORITHM_MD5)}
+        with open(os.path.join(folder, 'CHECKSUMS'), 'w') as f:
+            f.write("{}  verified.gtf.gz\n{}  not_verified.gtf.gz\n".format(checksum['value'], checksum['value']))
+        self.assertEqual(service.reconcile_manifest()['added'], 3)
+        for file_name, expected_checksum in [('verified.gtf.gz', checksum),
+                                             ('verified.gtf', checksum),
+                                             ('not_verified.gtf', None)]:
+            self.assertEqual(service._get_manifest().get_entry(os.path.join(folder, file_name))['checksum'],
+                             expected_checksum, "Checksum recorded for '{}'".format(file_name))
+            self.assertEqual(service._is_local_file_valid(os.path.join(folder, file_name), checksum),
+                             expected_checksum is not None, "'{}' is used as it is".format(file_name))
+
+
+class TestLocalRepositoryManifest(unittest.TestCase):
+    def setUp(self):
+        self.__root_folder = get_test_folder('test_local_repository_manifest')
+        os.makedirs(self.__root_folder)
+
+    def test_entries_are_shared_among_sessions(self):
+        manifest = LocalRepositoryManifest(self.__root_folder)
+        other_manifest = LocalRepositoryManifest(self.__root_folder)
+        file_path = os.path.join(self.__root_folder, 'fasta', 'homo_sapiens', 'pep', 'Homo_sapiens.pep.all.fa')
+        self.assertIsNone(other_manifest.get_entry(file_path), "Files not in the manifest are not found")
+        manifest.add_entry(file_path, '9606', 'protein_sequences', 'homo_sapiens', 1024)
+        other_manifest.reload()
+        self.assertEqual(other_manifest.get_entry(file_path)['size'], 1024, "Files added by other sessions are found")
+        other_manifest.remove_entry(file_path)
+        manifest.reload()
+        self.assertEqual(manifest.get_entries(), [], "Files removed by other sessions are gone")
+
+    def test_entries_removed_by_other_sessions_are_not_found(self):
+        manifest = LocalRepositoryManifest(self.__root_folder)
+        other_manifest = LocalRepositoryManifest(self.__root_folder)
+        file_path = os.path.join(self.__root_folder, 'gtf', 'homo_sapiens', 'x.gtf')
+        manifest.add_entry(file_path, '9606', 'genome_reference', 'homo_sapiens', 1024)
+        self.assertIsNotNone(other_manifest.get_entry(file_path), "Files added by other sessions are found")
+        manifest.remove_entry(file_path)
+        other_manifest.reload()
+        self.assertIsNone(other_manifest.get_entry(file_path), "Files already looked up, and then removed by other "
+                                                               "sessions, are not found")
+
+    def test_rebuilt_manifest_replaces_previous_one(self):
+        manifest = LocalRepositoryManifest(self.__root_folder)
+        other_manifest = LocalRepositoryManifest(self.__root_folder)
+        old_file_path = os.path.join(self.__root_folder, 'old.gtf')
+        new_file_path = os.path.join(self.__root_folder, 'new.gtf')
+        manifest.add_entry(old_file_path, '10090', 'genome_reference', 'mus_musculus', 1)
+        self.assertIsNotNone(other_manifest.get_entry(old_file_path))
+        manifest.rebuild([manifest.create_entry(new_file_path, '10090', 'genome_reference', 'mus_musculus', 2)])
+        other_manifest.reload()
+        self.assertIsNotNone(other_manifest.get_entry(new_file_path), "Rebuilt manifest is picked up")
+        self.assertEqual([entry['path'] for entry in other_manifest.get_entries()], ['new.gtf'],
+                         "Only the files in the rebuilt manifest are there")
+
+    def test_lookups_read_the_manifest_at_most_every_few_seconds(self):
+        manifest = LocalRepositoryManifest(self.__root_folder)
+        other_manifest = LocalRepositoryManifest(self.__root_folder)
+        file_path = os.path.join(self.__root_folder, 'gtf', 'danio_rerio', 'Danio_rerio.gtf')
+        self.assertIsNone(other_manifest.get_entry(file_path))
+        manifest.add_entry(file_path, '7955', 'genome_reference', 'danio_rerio', 1)
+        self.assertIsNone(other_manifest.get_entry(file_path), "The manifest is not read again for every lookup")
+        other_manifest._RELOAD_INTERVAL = 0
+        self.assertIsNotNone(other_manifest.get_entry(file_path), "The manifest is read again once it is outdated")
+
+    def test_accesses_are_recorded_at_most_every_few_minutes(self):
+        manifest = LocalRepositoryManifest(self.__root_folder)
+        other_manifest = LocalRepositoryManifest(self.__root_folder)
+        file_path = os.path.join(self.__root_folder, 'gtf', 'mus_musculus', 'Mus_musculus.gtf')
+        manifest.add_entry(file_path, '10090', 'genome_reference', 'mus_musculus', 1, download_time=time.time() - 3600)
+        manifest.record_access([file_path, os.path.join(self.__root_folder, 'not_in_the_manifest.gtf')])
+        manifest_size = os.path.getsize(manifest.get_manifest_file_path())
+        manifest.record_access([file_path])
+        self.assertEqual(os.path.getsize(manifest.get_manifest_file_path()), manifest_size,
+                         "Very recent accesses are not recorded again")
+        other_manifest.reload()
+        last_access = LocalRepositoryManifest.get_last_access_time(other_manifest.get_entries()[0])
+        self.assertGreater(last_access, time.time() - 60, "Accesses are seen by other sessions")
+
+
 if __name__ == '__main__':
     print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -11,12 +11,27 @@
 Unit Tests for toolboxes
 """
 
+import io
 import os
+import gzip
+import time
+import struct
+import shutil
 import unittest
+import threading
+import http.server
 # App modules
 import config_manager
 from download_manager.manager import Manager as DownloadManager
 import toolbox.general as general_toolbox
+import toolbox.bgzf as bgzf_toolbox
+import toolbox.derived_artifacts as derived_artifacts
+import toolbox.rest as rest_toolbox
+import toolbox.single_flight as single_flight
+from toolbox.scratch import ScratchFolder
+from toolbox.decompression import DecompressionEngine
+from exceptions import ToolBoxException
+from toolbox.locks import FileLock, FileLease, FileLockTimeoutException, remove_stale_lock_files
 
 
 class TestToolboxes(unittest.TestCase):
@@ -45,3 +60,387 @@ class TestToolboxes(unittest.TestCase):
         self.assertTrue(os.path.getsize(destination_file_path_uncompressed) > 0,
                         "The uncompressed test file '{}' is not empty"
                         .format(destination_file_path_uncompressed))
+
+
+class TestFileLocks(unittest.TestCase):
+    def __get_lock_file_path(self, lock_file_name):
+        return os.path.join(config_manager.get_app_config_manager().get_session_working_dir(), lock_file_name)
+
+    def test_lock_excludes_concurrent_holders(self):
+        lock_file_path = self.__get_lock_file_path('test_lock_excludes_concurrent_holders.lock')
+        holders = []
+        violations = []
+
+        def hold_lock():
+            with FileLock(lock_file_path):
+                holders.append(threading.current_thread())
+                if len(holders) > 1:
+                    violations.append(len(holders))
+                time.sleep(0.05)
+                holders.remove(threading.current_thread())
+
+        threads = [threading.Thread(target=hold_lock) for i in range(0, 8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(violations, "The lock was never held by more than one thread at a time")
+        self.assertFalse(os.path.exists(lock_file_path), "The lock file has been cleaned up")
+
+    def test_waiting_for_a_held_lock_times_out(self):
+        lock_file_path = self.__get_lock_file_path('test_waiting_for_a_held_lock_times_out.lock')
+        with FileLock(lock_file_path):
+            waiter = FileLock(lock_file_path, timeout=0.5)
+            result = []
+
+            def wait_for_lock():
+                try:
+                    waiter.acquire()
+                except FileLockTimeoutException:
+                    result.append('timeout')
+
+            thread = threading.Thread(target=wait_for_lock)
+            thread.start()
+            thread.join()
+            self.assertEqual(result, ['timeout'], "Waiting for the lock timed out")
+
+    def test_stale_lock_files_are_removed(self):
+        lock_file_path = self.__get_lock_file_path('test_stale_lock_files_are_removed.lock')
+        # A lock file nobody holds a lock on, as left behind by a dead session
+        with open(lock_file_path, 'w') as f:
+            f.write('{}')
+        removed_lock_files = remove_stale_lock_files(os.path.dirname(lock_file_path),
+                                                     os.path.basename(lock_file_path))
+        self.assertEqual(removed_lock_files, [lock_file_path], "Stale lock file removed")
+        self.assertFalse(os.path.exists(lock_file_path), "Stale lock file is not there any more")
+
+    def test_leased_files_can_not_be_taken_exclusively(self):
+        lease_file_path = self.__get_lock_file_path('test_leased_files_can_not_be_taken_exclusively.lease')
+        lease = FileLease(lease_file_path)
+        lease.acquire_shared()
+        other_lease = FileLease(lease_file_path)
+        other_lease.acquire_shared()
+        self.assertTrue(FileLease.is_leased(lease_file_path), "Leases held by this session count as well")
+        lease.release()
+        self.assertFalse(FileLease(lease_file_path).try_acquire_exclusive(), "There is still someone holding it")
+        other_lease.release()
+        self.assertFalse(FileLease.is_leased(lease_file_path), "Nobody is holding it any more")
+        exclusive_lease = FileLease(lease_file_path)
+        self.assertTrue(exclusive_lease.try_acquire_exclusive())
+        self.assertRaises(FileLockTimeoutException, FileLease(lease_file_path).acquire_shared, 0)
+        exclusive_lease.release()
+
+
+class TestLinkFile(unittest.TestCase):
+    def __get_file_path(self, file_name):
+        return os.path.join(config_manager.get_app_config_manager().get_session_working_dir(), file_name)
+
+    def test_linked_file_shares_data_with_source(self):
+        source_file_path = self.__get_file_path('test_link_file_source.txt')
+        destination_file_path = self.__get_file_path('test_link_file_destination.txt')
+        with open(source_file_path, 'w') as source_file:
+            source_file.write("Unchanged data\n")
+        with open(destination_file_path, 'w') as destination_file:
+            destination_file.write("Stale data\n")
+        link_mode = general_toolbox.link_file(source_file_path, destination_file_path)
+        self.assertEqual(link_mode, general_toolbox.LINK_MODE_HARDLINK, "Hard links are tried first")
+        self.assertTrue(os.path.samefile(source_file_path, destination_file_path), "Existing file replaced by link")
+
+    def test_copied_file_matches_source(self):
+        source_file_path = self.__get_file_path('test_copy_file_source.txt')
+        destination_file_path = self.__get_file_path('test_copy_file_destination.txt')
+        data = "".join(["Copied line #{}\n".format(i) for i in range(0, 10000)])
+        with open(source_file_path, 'w') as source_file:
+            source_file.write(data)
+        self.assertEqual(general_toolbox.copy_file(source_file_path, destination_file_path), len(data),
+                         "All the data copied")
+        with open(destination_file_path, 'r') as destination_file:
+            self.assertEqual(destination_file.read(), data, "Copy matches its source")
+        self.assertFalse(os.path.samefile(source_file_path, destination_file_path), "Copy is a different file")
+
+    def test_short_kernel_copies_fall_back_to_plain_copy(self):
+        source_file_path = self.__get_file_path('test_copy_file_short_source.txt')
+        destination_file_path = self.__get_file_path('test_copy_file_short_destination.txt')
+        data = "".join(["Copied line #{}\n".format(i) for i in range(0, 10000)])
+        with open(source_file_path, 'w') as source_file:
+            source_file.write(data)
+        copy_file_range = getattr(os, 'copy_file_range', None)
+        # A file system where the kernel copy stops after the first chunk
+        calls = []
+
+        def short_copy_file_range(source_fd, destination_fd, count):
+            calls.append(count)
+            return 0 if len(calls) > 1 else os.write(destination_fd, os.read(source_fd, 1024))
+
+        os.copy_file_range = short_copy_file_range
+        try:
+            self.assertEqual(general_toolbox.copy_file(source_file_path, destination_file_path), len(data),
+                             "All the data copied")
+        finally:
+            if copy_file_range is None:
+                del os.copy_file_range
+            else:
+                os.copy_file_range = copy_file_range
+        with open(destination_file_path, 'r') as destination_file:
+            self.assertEqual(destination_file.read(), data, "Copy matches its source")
+
+    def test_failing_link_modes_raise_an_exception(self):
+        self.assertRaises(ToolBoxException, general_toolbox.link_file,
+                          self.__get_file_path('test_link_file_missing.txt'),
+                          self.__get_file_path('test_link_file_missing_destination.txt'))
+
+
+class TestBgzf(unittest.TestCase):
+    __data = "".join(["Sample line #{}\n".format(i) for i in range(0, 100000)]).encode()
+
+    def test_gzip_file_is_recompressed_as_indexed_bgzf(self):
+        folder = config_manager.get_app_config_manager().get_session_working_dir()
+        gzip_file_path = os.path.join(folder, 'test_bgzf.txt.gz')
+        bgzf_file_path = os.path.join(folder, 'test_bgzf.txt.bgz')
+        with open(gzip_file_path, 'wb') as gzip_file:
+            gzip_file.write(gzip.compress(self.__data))
+        self.assertEqual(bgzf_toolbox.recompress_gzip_file(gzip_file_path, bgzf_file_path), len(self.__data))
+        with open(bgzf_file_path, 'rb') as bgzf_file:
+            compressed_data = bgzf_file.read()
+        self.assertEqual(gzip.decompress(compressed_data), self.__data, "BGZF files are valid gzip files")
+        with open(bgzf_toolbox.get_index_file_path(bgzf_file_path), 'rb') as index_file:
+            index_data = index_file.read()
+        count_entries = struct.unpack('<Q', index_data[:8])[0]
+        self.assertGreater(count_entries, 0, "There is more than one block")
+        for entry in range(count_entries):
+            compressed_offset, uncompressed_offset = struct.unpack('<QQ', index_data[8 + entry * 16:24 + entry * 16])
+            # Every block can be inflated on its own
+            block_data = gzip.GzipFile(fileobj=io.BytesIO(compressed_data[compressed_offset:])).read(10)
+            self.assertEqual(block_data, self.__data[uncompressed_offset:uncompressed_offset + 10],
+                             "Index entry #{} points to the right data".format(entry))
+
+
+class TestScratchFolder(unittest.TestCase):
+    def setUp(self):
+        self.__folder = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                                     'test_scratch_folder')
+        shutil.rmtree(self.__folder, ignore_errors=True)
+        self.__source_file_path = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                                               'test_scratch_folder_source.txt')
+        with open(self.__source_file_path, 'w') as source_file:
+            source_file.write("Transient data\n")
+
+    def test_copies_are_reused_and_least_recently_used_ones_evicted(self):
+        materialized = []
+
+        def materialize(source_file_path, file_path):
+            materialized.append(file_path)
+            shutil.copyfile(source_file_path, file_path)
+
+        # A copy left behind by a session that is over, i.e. nobody holds a lease on it
+        os.makedirs(self.__folder, exist_ok=True)
+        leftover_copy = os.path.join(self.__folder, 'leftover.txt')
+        shutil.copyfile(self.__source_file_path, leftover_copy)
+        os.utime(leftover_copy, (0, 0))
+        # A session with room for a single copy
+        scratch_folder = ScratchFolder(self.__folder, 16)
+        first_copy = scratch_folder.get_file('first.txt', self.__source_file_path, materialize)
+        scratch_folder.get_file('first.txt', self.__source_file_path, materialize)
+        self.assertEqual(materialized, [first_copy], "Copies are reused")
+        self.assertFalse(os.path.isfile(leftover_copy), "Copies nobody holds a lease on are evicted")
+        other_scratch_folder = ScratchFolder(self.__folder, 16)
+        second_copy = other_scratch_folder.get_file('second.txt', self.__source_file_path, materialize)
+        self.assertTrue(os.path.isfile(first_copy), "Copies in use by another session are kept")
+        self.assertTrue(os.path.isfile(second_copy), "Copies in use by the session are kept")
+
+    def test_space_is_reclaimed_only_after_making_copies(self):
+        class CountingScratchFolder(ScratchFolder):
+            reclaims = 0
+
+            def reclaim_space(self):
+                self.reclaims += 1
+                return super().reclaim_space()
+
+        scratch_folder = CountingScratchFolder(self.__folder, 1024)
+        for i in range(0, 4):
+            scratch_folder.get_file('reused.txt', self.__source_file_path, shutil.copyfile)
+        self.assertEqual(scratch_folder.reclaims, 1, "Reusing copies doesn't reclaim space")
+        scratch_folder.get_file('other.txt', self.__source_file_path, shutil.copyfile)
+        self.assertEqual(scratch_folder.reclaims, 1, "Copies within the maximum size don't reclaim space")
+        scratch_folder = CountingScratchFolder(self.__folder, 16)
+        scratch_folder.get_file('reused.txt', self.__source_file_path, shutil.copyfile)
+        self.assertEqual(scratch_folder.reclaims, 0, "Reusing copies made by other sessions doesn't reclaim space")
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_results_are_worked_out_once(self):
+        memo = {}
+        memo_lock = threading.Lock()
+        computed = []
+        computing = threading.Event()
+
+        def compute():
+            computed.append(True)
+            computing.wait(5)
+            return ['result']
+
+        results = []
+
+        def call():
+            results.append(single_flight.get_once(memo, memo_lock, 'key', compute))
+
+        threads = [threading.Thread(target=call) for i in range(0, 8)]
+        for thread in threads:
+            thread.start()
+        computing.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(computed), 1, "Concurrent callers wait for the first one")
+        self.assertEqual(results, [['result']] * 8, "Everyone gets the result")
+        single_flight.get_once(memo, memo_lock, 'key', compute)
+        self.assertEqual(len(computed), 1, "Results are kept")
+
+    def test_failures_and_results_not_kept_are_worked_out_again(self):
+        memo = {}
+        memo_lock = threading.Lock()
+        results = iter([None, {}, {'file': 'checksum'}])
+
+        def compute():
+            result = next(results)
+            if result is None:
+                raise ToolBoxException("Failed")
+            return result
+
+        with self.assertRaises(ToolBoxException):
+            single_flight.get_once(memo, memo_lock, 'key', compute, is_kept=bool)
+        self.assertEqual(single_flight.get_once(memo, memo_lock, 'key', compute, is_kept=bool), {},
+                         "Failures are not kept")
+        self.assertEqual(single_flight.get_once(memo, memo_lock, 'key', compute, is_kept=bool), {'file': 'checksum'},
+                         "Results not kept are worked out again")
+        self.assertEqual(single_flight.get_once(memo, memo_lock, 'key', compute, is_kept=bool), {'file': 'checksum'},
+                         "Results kept are not worked out again")
+
+
+class TestDecompressionEngine(unittest.TestCase):
+    __data = "".join(["Sample line #{}\n".format(i) for i in range(0, 100000)]).encode()
+
+    def test_files_are_inflated_concurrently(self):
+        folder = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                              'test_decompression_engine')
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        files = []
+        for file_index in range(0, 4):
+            files.append(os.path.join(folder, "test_file_{}.txt.gz".format(file_index)))
+            with open(files[-1], 'wb') as compressed_file:
+                # Multi member gzip stream
+                compressed_file.write(gzip.compress(self.__data[:1000]) + gzip.compress(self.__data[1000:]))
+        files.append(os.path.join(folder, 'test_file_truncated.txt.gz'))
+        with open(files[-1], 'wb') as compressed_file:
+            compressed_file.write(gzip.compress(self.__data)[:1000])
+        # Small chunks, so compressed data is read, and uncompressed data written, in many steps
+        results = DecompressionEngine(max_workers=4, chunk_size=4096).decompress_files(files)
+        self.assertEqual([result.success for result in results], [True] * 4 + [False], "Truncated file detected")
+        for result in results[:4]:
+            with open(result.destination_file_path, 'rb') as uncompressed_file:
+                self.assertEqual(uncompressed_file.read(), self.__data, "File inflated into '{}'"
+                                 .format(result.destination_file_path))
+            self.assertFalse(os.path.isfile(result.file_path), "Compressed file removed, as gunzip does")
+            self.assertEqual(result.uncompressed_size, len(self.__data))
+        self.assertEqual(sorted(os.listdir(folder)),
+                         sorted(["test_file_{}.txt".format(file_index) for file_index in range(0, 4)]
+                                + ['test_file_truncated.txt.gz']),
+                         "No partial files are left behind")
+
+
+class TestDerivedArtifacts(unittest.TestCase):
+    __fasta_data = b">seq1 description\nACGTACGTAC\nACGTACGTAC\nACG\n>seq2\nMKV\n"
+    __gtf_data = b"#!genome-build GRCh38\n" \
+                 b"1\tensembl\tgene\t1\t100\t.\t+\t.\tgene_id \"G1\";\n" \
+                 b"1\tensembl\tstart_codon\t1\t3\t.\t+\t0\tgene_id \"G1\";\n" \
+                 b"1\tensembl\tCDS\t1\t100\t.\t+\t0\tgene_id \"G1\";\n"
+
+    def setUp(self):
+        self.__folder = os.path.join(config_manager.get_app_config_manager().get_session_working_dir(),
+                                     'test_derived_artifacts')
+        shutil.rmtree(self.__folder, ignore_errors=True)
+        os.makedirs(self.__folder)
+
+    def test_fasta_index_is_the_same_for_plain_and_bgzf_files(self):
+        fasta_file_path = os.path.join(self.__folder, 'test.fa')
+        with open(fasta_file_path, 'wb') as fasta_file:
+            fasta_file.write(self.__fasta_data)
+        with open("{}.gz".format(fasta_file_path), 'wb') as gzip_file:
+            gzip_file.write(gzip.compress(self.__fasta_data))
+        bgzf_toolbox.recompress_gzip_file("{}.gz".format(fasta_file_path), "{}.bgz".format(fasta_file_path))
+        for file_path in [fasta_file_path, "{}.bgz".format(fasta_file_path)]:
+            self.assertEqual(derived_artifacts.build_fasta_index(file_path), 2)
+            with open(derived_artifacts.get_fasta_index_file_path(file_path)) as index_file:
+                self.assertEqual(index_file.read(), "seq1\t23\t18\t10\t11\nseq2\t3\t50\t3\t4\n")
+
+    def test_fasta_with_uneven_lines_can_not_be_indexed(self):
+        fasta_file_path = os.path.join(self.__folder, 'test_uneven.fa')
+        with open(fasta_file_path, 'wb') as fasta_file:
+            fasta_file.write(b">seq1\nACG\nACGTACGTAC\n")
+        self.assertRaises(ToolBoxException, derived_artifacts.build_fasta_index, fasta_file_path)
+        self.assertFalse(os.path.isfile(derived_artifacts.get_fasta_index_file_path(fasta_file_path)))
+
+    def test_slim_gtf_keeps_only_the_given_feature_types(self):
+        gtf_file_path = os.path.join(self.__folder, 'test.gtf')
+        with open(gtf_file_path, 'wb') as gtf_file:
+            gtf_file.write(self.__gtf_data)
+        self.assertEqual(derived_artifacts.build_slim_gtf(gtf_file_path, ['gene', 'CDS']), 2)
+        self.assertTrue(derived_artifacts.is_up_to_date(derived_artifacts.get_slim_gtf_file_path(gtf_file_path),
+                                                        gtf_file_path))
+        with open(derived_artifacts.get_slim_gtf_file_path(gtf_file_path), 'rb') as slim_gtf_file:
+            self.assertEqual(slim_gtf_file.read(),
+                             b"".join([line
+                                       for line in self.__gtf_data.splitlines(True)
+                                       if b'start_codon' not in line]))
+
+
+class TestRestClient(unittest.TestCase):
+    class FlakyRequestHandler(http.server.BaseHTTPRequestHandler):
+        """
+        JSON service that is unavailable for the first couple of requests, it keeps track of the connections used
+        """
+        protocol_version = 'HTTP/1.1'
+        count_requests = 0
+        client_addresses = set()
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            cls = type(self)
+            cls.count_requests += 1
+            cls.client_addresses.add(self.client_address)
+            status, body = (503, b'') if cls.count_requests <= 2 else (200, b'{"releases": [99]}')
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def test_transient_errors_are_retried_on_a_kept_alive_connection(self):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self.FlakyRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = "http://127.0.0.1:{}/info/data".format(server.server_address[1])
+            rest_client = rest_toolbox.RestClient(backoff_base_delay=0.01)
+            self.assertEqual(rest_client.get_json(url), {'releases': [99]}, "Content fetched after retrying")
+            self.assertEqual(self.FlakyRequestHandler.count_requests, 3, "Retried until the service is back")
+            self.assertEqual(len(self.FlakyRequestHandler.client_addresses), 1, "Same connection for all requests")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_token_bucket_honours_its_rate_and_blocks(self):
+        token_bucket = rest_toolbox.TokenBucket(rate=50, capacity=1)
+        start = time.time()
+        for i in range(11):
+            token_bucket.acquire()
+        self.assertTrue(time.time() - start >= 0.19, "Tokens given at the bucket rate")
+        token_bucket.block(0.3)
+        start = time.time()
+        token_bucket.acquire()
+        self.assertTrue(time.time() - start >= 0.29, "No tokens while the bucket is blocked")
+        self.assertTrue(token_bucket.get_time_throttled() >= 0.48, "Time spent waiting for tokens is kept")
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -13,10 +13,10 @@ This toolbox models assembly mapping services between Ensembl and UCSC
 
 import abc
 import json
-import requests
 # Application imports
 import config_manager
 from exceptions import AppException
+from toolbox import rest
 
 
 # Exceptions
@@ -146,9 +146,8 @@ class AssemblyMappingServiceFromStaticFile(AssemblyMappingService):
         if not self.__raw_assembly_data_object:
             self._logger.info("Loading Assembly Mapping data between Ensembl and UCSC from '{}'"
                               .format(self.__get_url_assembly_mapping_data()))
-            response = requests.get(self.__get_url_assembly_mapping_data())
-            # self._logger.info("Assembly Mapping Data ---> '{}'".format(response.content.decode()))
-            self.__raw_assembly_data_object = json.loads(response.content.decode())
+            self.__raw_assembly_data_object = \
+                rest.get_rest_client().get_json(self.__get_url_assembly_mapping_data())
             self._logger.info("#{} assembly mapping entries between Ensembl and UCSC loaded from '{}"
                               .format(len(self.__raw_assembly_data_object),
                                       self.__get_url_assembly_mapping_data()))
@@ -0,0 +1,146 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 20:30
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Blocked gzip (BGZF) support, i.e. the format 'bgzip' (htslib) produces.
+
+A BGZF file is a multi member gzip file where every member, or block, holds at most 64KB of uncompressed data, and it
+carries its own compressed size in a gzip header extra field, so any gzip reader can inflate it, while tools like
+'samtools faidx' can seek within it, with the help of a '.gzi' index of the block offsets.
+
+Data is compressed in a streaming fashion, with no external tools involved. BGZF files can be inflated like any other
+gzip file, see 'toolbox.decompression'.
+"""
+
+import os
+import gzip
+import zlib
+import struct
+# App imports
+from exceptions import ToolBoxException
+
+# Extension for BGZF compressed files
+BGZF_FILE_EXTENSION = '.bgz'
+# Extension for the index of a BGZF compressed file, appended to its file name
+BGZF_INDEX_FILE_EXTENSION = '.gzi'
+# WARNING! - MAGIC NUMBER AHEAD!!! - Uncompressed data per block, as htslib does, so blocks are never bigger than 64KB,
+# even for data that doesn't compress at all
+_BLOCK_DATA_SIZE = 0xff00
+# Gzip header, with the 'BC' extra subfield for the block size, and the empty block that marks the end of a BGZF file
+_BLOCK_HEADER = struct.Struct('<4BI2BH2BHH')
+_BLOCK_TRAILER = struct.Struct('<II')
+_EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+# WARNING! - MAGIC NUMBER AHEAD!!! - 1MB chunks when reading data to compress
+_CHUNK_SIZE = 1024 * 1024
+
+
+class BgzfWriter:
+    """
+    Writes data into a BGZF compressed file, as it comes, keeping track of the block offsets for its index
+    """
+
+    def __init__(self, file_path, compression_level=6):
+        """
+        :param file_path: path to the BGZF file
+        :param compression_level: zlib compression level
+        """
+        self.file_path = file_path
+        self.__compression_level = compression_level
+        self.__file = open(file_path, 'wb')
+        self.__buffer = bytearray()
+        # (compressed offset, uncompressed offset) for every block, but the first one, as in '.gzi' indexes
+        self.__block_offsets = []
+        self.__compressed_offset = 0
+        self.__uncompressed_offset = 0
+
+    def __write_block(self, data):
+        if self.__compressed_offset:
+            self.__block_offsets.append((self.__compressed_offset, self.__uncompressed_offset))
+        compressor = zlib.compressobj(self.__compression_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed_data = compressor.compress(data) + compressor.flush()
+        block_size = _BLOCK_HEADER.size + len(compressed_data) + _BLOCK_TRAILER.size
+        self.__file.write(_BLOCK_HEADER.pack(0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, ord('B'), ord('C'), 2, block_size - 1))
+        self.__file.write(compressed_data)
+        self.__file.write(_BLOCK_TRAILER.pack(zlib.crc32(data) & 0xffffffff, len(data)))
+        self.__compressed_offset += block_size
+        self.__uncompressed_offset += len(data)
+
+    def write(self, data):
+        self.__buffer.extend(data)
+        while len(self.__buffer) >= _BLOCK_DATA_SIZE:
+            self.__write_block(bytes(self.__buffer[:_BLOCK_DATA_SIZE]))
+            del self.__buffer[:_BLOCK_DATA_SIZE]
+
+    def close(self):
+        """
+        Write whatever data is left, and the end of file marker
+        :return: no return value
+        """
+        if self.__buffer:
+            self.__write_block(bytes(self.__buffer))
+            self.__buffer = bytearray()
+        self.__file.write(_EOF_BLOCK)
+        self.__file.close()
+
+    def abort(self):
+        self.__file.close()
+
+    def write_index(self, index_file_path):
+        """
+        Write the '.gzi' index for the BGZF file, i.e. the number of entries, followed by the (compressed offset,
+        uncompressed offset) pairs, all of them as little endian unsigned 64 bit integers
+        :param index_file_path: path to the index file
+        :return: no return value
+        """
+        with open(index_file_path, 'wb') as index_file:
+            index_file.write(struct.pack('<Q', len(self.__block_offsets)))
+            for compressed_offset, uncompressed_offset in self.__block_offsets:
+                index_file.write(struct.pack('<QQ', compressed_offset, uncompressed_offset))
+
+    def get_uncompressed_size(self):
+        return self.__uncompressed_offset + len(self.__buffer)
+
+
+def get_index_file_path(bgzf_file_path):
+    return "{}{}".format(bgzf_file_path, BGZF_INDEX_FILE_EXTENSION)
+
+
+def recompress_gzip_file(gzip_file_path, bgzf_file_path):
+    """
+    Convert a gzip compressed file, e.g. as it comes from Ensembl, into a BGZF compressed file, with its index next to
+    it. Both of them are written under a temporary name, and renamed only once they are complete.
+    :param gzip_file_path: path to the gzip compressed file
+    :param bgzf_file_path: path to the BGZF file
+    :return: the size of the uncompressed data
+    :except: if the gzip file can't be read, or the BGZF file can't be written, an exception will be raised
+    """
+    bgzf_part_file_path = "{}.part".format(bgzf_file_path)
+    index_part_file_path = "{}.part".format(get_index_file_path(bgzf_file_path))
+    writer = BgzfWriter(bgzf_part_file_path)
+    try:
+        with gzip.open(gzip_file_path, 'rb') as gzip_file:
+            for chunk in iter(lambda: gzip_file.read(_CHUNK_SIZE), b''):
+                writer.write(chunk)
+        writer.close()
+        writer.write_index(index_part_file_path)
+    except (OSError, EOFError, zlib.error) as e:
+        writer.abort()
+        for file_path in [bgzf_part_file_path, index_part_file_path]:
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+        raise ToolBoxException("ERROR converting '{}' into BGZF file '{}', '{}'"
+                               .format(gzip_file_path, bgzf_file_path, e)) from e
+    # The index is in place before the file it indexes
+    os.replace(index_part_file_path, get_index_file_path(bgzf_file_path))
+    os.replace(bgzf_part_file_path, bgzf_file_path)
+    return writer.get_uncompressed_size()
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -0,0 +1,186 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 21:20
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+In-process decompression engine for gzip compressed files, including multi member gzip files, like BGZF ones.
+
+Files are inflated concurrently, on a pool of threads, as zlib releases the GIL while it works. Every file is streamed
+in fixed size chunks, and the output of every inflate call is bounded as well, so memory use doesn't depend on the size
+of the files, or how well they compress, but on the number of threads and the chunk size. There are no time limits,
+files take as long as the file system needs.
+
+Uncompressed files are written under a temporary name, and renamed only once they are complete.
+"""
+
+import os
+import zlib
+import time
+import concurrent.futures
+# App imports
+import config_manager
+
+
+class DecompressionResult:
+    """
+    Outcome of inflating a file, with its throughput
+    """
+
+    def __init__(self, file_path, destination_file_path):
+        self.file_path = file_path
+        self.destination_file_path = destination_file_path
+        self.success = False
+        self.error = None
+        self.compressed_size = 0
+        self.uncompressed_size = 0
+        self.elapsed_time = 0
+
+    def get_throughput(self):
+        """
+        :return: uncompressed bytes per second, None if unknown
+        """
+        if not self.elapsed_time:
+            return None
+        return self.uncompressed_size / self.elapsed_time
+
+    def to_dict(self):
+        result = dict(self.__dict__)
+        result['throughput'] = self.get_throughput()
+        return result
+
+
+class DecompressionEngine:
+    """
+    Inflates gzip compressed files on a pool of threads
+    """
+    _COMPRESSED_FILE_EXTENSION = '.gz'
+    _PART_FILE_EXTENSION = '.part'
+    # WARNING! - MAGIC NUMBER AHEAD!!! - 1MB chunks, both when reading compressed data and producing uncompressed data
+    _DEFAULT_CHUNK_SIZE = 1024 * 1024
+    # WARNING! - MAGIC NUMBER AHEAD!!! - there is little point in having more threads than this competing for the disk
+    _DEFAULT_MAX_WORKERS = 8
+
+    def __init__(self, max_workers=None, chunk_size=_DEFAULT_CHUNK_SIZE, keep_compressed=False):
+        """
+        :param max_workers: number of files inflated at the same time, by default, as many as processors, up to 8
+        :param chunk_size: chunk size, in bytes, for reading and writing data
+        :param keep_compressed: whether to keep the compressed files, or remove them once inflated, as 'gunzip' does
+        """
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        self.max_workers = max_workers or min(os.cpu_count() or 1, self._DEFAULT_MAX_WORKERS)
+        self.chunk_size = chunk_size
+        self.keep_compressed = keep_compressed
+
+    def get_destination_file_path(self, file_path):
+        """
+        The uncompressed file goes next to the compressed one, with the same name, without the '.gz' extension, or with
+        an '.out' extension, for files with no '.gz' extension, as 'gunzip' does
+        :param file_path: compressed file path
+        :return: uncompressed file path
+        """
+        if file_path.endswith(self._COMPRESSED_FILE_EXTENSION):
+            return file_path[:-len(self._COMPRESSED_FILE_EXTENSION)]
+        return "{}.out".format(file_path)
+
+    def __inflate(self, file_path, destination_file_path, result):
+        # Expect gzip header and trailer
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        member_in_progress = False
+        count_members = 0
+        with open(file_path, 'rb') as compressed_file, open(destination_file_path, 'wb') as destination_file:
+            for chunk in iter(lambda: compressed_file.read(self.chunk_size), b''):
+                result.compressed_size += len(chunk)
+                data = chunk
+                while data:
+                    # Bounded output, whatever the compression ratio
+                    uncompressed_data = decompressor.decompress(data, self.chunk_size)
+                    destination_file.write(uncompressed_data)
+                    result.uncompressed_size += len(uncompressed_data)
+                    member_in_progress = True
+                    if decompressor.eof:
+                        count_members += 1
+                        member_in_progress = False
+                        # Whatever comes after the end of a member, is the beginning of the next one
+                        data = decompressor.unused_data
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    else:
+                        data = decompressor.unconsumed_tail
+            # Flush any data still held by the decompressor
+            while member_in_progress and (not decompressor.eof):
+                uncompressed_data = decompressor.decompress(decompressor.unconsumed_tail, self.chunk_size)
+                if not uncompressed_data:
+                    break
+                destination_file.write(uncompressed_data)
+                result.uncompressed_size += len(uncompressed_data)
+            if decompressor.eof:
+                count_members += 1
+                member_in_progress = False
+        if member_in_progress or (not count_members):
+            raise zlib.error("TRUNCATED gzip stream")
+
+    def decompress_file(self, file_path, destination_file_path=None):
+        """
+        Inflate a gzip compressed file, in the calling thread
+        :param file_path: compressed file path
+        :param destination_file_path: uncompressed file path, see 'get_destination_file_path' for the default one
+        :return: DecompressionResult
+        """
+        if destination_file_path is None:
+            destination_file_path = self.get_destination_file_path(file_path)
+        result = DecompressionResult(file_path, destination_file_path)
+        if not os.path.isfile(file_path):
+            result.error = "it IS NOT A FILE"
+            return result
+        destination_part_file_path = "{}.{}{}".format(destination_file_path, os.getpid(), self._PART_FILE_EXTENSION)
+        start_time = time.time()
+        try:
+            self.__inflate(file_path, destination_part_file_path, result)
+            os.replace(destination_part_file_path, destination_file_path)
+            if not self.keep_compressed:
+                os.remove(file_path)
+        except (OSError, zlib.error) as e:
+            result.error = "ERROR uncompressing file '{}', '{}'".format(file_path, e)
+            if os.path.isfile(destination_part_file_path):
+                os.remove(destination_part_file_path)
+        else:
+            result.success = True
+        result.elapsed_time = time.time() - start_time
+        if result.success:
+            self._logger.debug("INFLATED '{}' into '{}', #{} bytes -> #{} bytes, {:.0f} bytes/s"
+                               .format(file_path,
+                                       destination_file_path,
+                                       result.compressed_size,
+                                       result.uncompressed_size,
+                                       result.get_throughput() or 0))
+        else:
+            self._logger.error(result.error)
+        return result
+
+    def decompress_files(self, files):
+        """
+        Inflate the given gzip compressed files, at the same time, next to them, see 'get_destination_file_path'
+        :param files: list of compressed file paths
+        :return: list of DecompressionResult, in the same order as the given files
+        """
+        if not files:
+            return []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_workers, len(files))) as executor:
+            results = list(executor.map(self.decompress_file, files))
+        total_uncompressed_size = sum([result.uncompressed_size for result in results])
+        self._logger.info("INFLATED #{} out of #{} files, #{} bytes, using #{} threads"
+                          .format(len([result for result in results if result.success]),
+                                  len(results),
+                                  total_uncompressed_size,
+                                  min(self.max_workers, len(files))))
+        return results
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -0,0 +1,209 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 21:50
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Artifacts derived from data files, built once, next to the files they come from, so their users don't have to work
+them out every time they need them:
+    - FASTA index, '.fai', as 'samtools faidx' makes it, with the offsets of the uncompressed data, so it is valid for
+      both a BGZF compressed FASTA file, and its uncompressed copy
+    - Slim GTF, with only the feature types a tool needs, e.g. PoGo, which means much less data to parse
+    - Chromosome sizes table, i.e. 'chromosome name <TAB> size' lines, as 'bedToBigBed' expects it
+
+Source files may be plain, or BGZF compressed, see 'toolbox.bgzf'. Artifacts are written under a temporary name, and
+renamed only once they are complete.
+"""
+
+import os
+import gzip
+# App imports
+from exceptions import ToolBoxException
+from toolbox import bgzf
+
+# Extension for FASTA index files, appended to the name of the FASTA file they index
+FASTA_INDEX_FILE_EXTENSION = '.fai'
+# Extension for slim GTF files, appended to the name of the GTF file they come from, before any compression extension
+SLIM_GTF_FILE_EXTENSION = '.slim.gtf'
+# Extension for chromosome sizes files
+CHROMOSOME_SIZES_FILE_EXTENSION = '.chrom.sizes'
+_PART_FILE_EXTENSION = '.part'
+
+
+def is_up_to_date(artifact_file_path, source_file_path):
+    """
+    An artifact is up to date when it is there, and it is not older than the file it comes from
+    :param artifact_file_path: path to the artifact
+    :param source_file_path: path to the file it comes from
+    :return: True if the artifact doesn't need to be built again, False otherwise
+    """
+    try:
+        return os.path.getmtime(artifact_file_path) >= os.path.getmtime(source_file_path)
+    except OSError:
+        return False
+
+
+def get_fasta_index_file_path(fasta_file_path):
+    return "{}{}".format(fasta_file_path, FASTA_INDEX_FILE_EXTENSION)
+
+
+def get_slim_gtf_file_path(gtf_file_path):
+    """
+    The slim GTF file is stored as its source GTF file is, i.e. BGZF compressed if the source file is
+    :param gtf_file_path: path to the source GTF file
+    :return: path to the slim GTF file
+    """
+    if gtf_file_path.endswith(bgzf.BGZF_FILE_EXTENSION):
+        return "{}{}{}".format(gtf_file_path[:-len(bgzf.BGZF_FILE_EXTENSION)],
+                               SLIM_GTF_FILE_EXTENSION,
+                               bgzf.BGZF_FILE_EXTENSION)
+    return "{}{}".format(gtf_file_path, SLIM_GTF_FILE_EXTENSION)
+
+
+def _open_source_file(file_path):
+    if file_path.endswith(bgzf.BGZF_FILE_EXTENSION):
+        return gzip.open(file_path, 'rb')
+    return open(file_path, 'rb')
+
+
+def _remove_files(file_paths):
+    for file_path in file_paths:
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+
+
+def build_fasta_index(fasta_file_path, index_file_path=None):
+    """
+    Build the index of a FASTA file, i.e. one 'name <TAB> length <TAB> offset <TAB> line bases <TAB> line width' line
+    per sequence, where the offset is that of the first base of the sequence in the uncompressed data
+    :param fasta_file_path: path to the FASTA file, plain or BGZF compressed
+    :param index_file_path: path to the index file, next to the FASTA file by default
+    :return: the number of sequences in the index
+    :except: ToolBoxException if the FASTA file can't be read, or indexed, i.e. sequence lines of different lengths
+    """
+    if index_file_path is None:
+        index_file_path = get_fasta_index_file_path(fasta_file_path)
+    index_part_file_path = "{}{}".format(index_file_path, _PART_FILE_EXTENSION)
+    # [name, length, offset, line bases, line width] for every sequence
+    entries = []
+    # Sequence lines must all be the same length, but the last one of every sequence
+    short_line_found = False
+    offset = 0
+    try:
+        with _open_source_file(fasta_file_path) as fasta_file:
+            for line in fasta_file:
+                if line.startswith(b'>'):
+                    name = line[1:].split(None, 1)[0].decode() if line[1:].strip() else ''
+                    entries.append([name, 0, offset + len(line), 0, 0])
+                    short_line_found = False
+                elif entries:
+                    entry = entries[-1]
+                    line_bases = len(line.rstrip(b'\r\n'))
+                    if line_bases:
+                        if not entry[3]:
+                            entry[3] = line_bases
+                            entry[4] = len(line)
+                        elif short_line_found or (line_bases > entry[3]):
+                            raise ToolBoxException("DIFFERENT line lengths in sequence '{}', FASTA file '{}'"
+                                                   .format(entry[0], fasta_file_path))
+                        short_line_found = short_line_found or (line_bases < entry[3])
+                        entry[1] += line_bases
+                    else:
+                        short_line_found = True
+                offset += len(line)
+        with open(index_part_file_path, 'w') as index_file:
+            for entry in entries:
+                index_file.write("{}\n".format("\t".join([str(value) for value in entry])))
+    except (OSError, EOFError, UnicodeDecodeError) as e:
+        _remove_files([index_part_file_path])
+        raise ToolBoxException("ERROR indexing FASTA file '{}', '{}'".format(fasta_file_path, e)) from e
+    except ToolBoxException:
+        _remove_files([index_part_file_path])
+        raise
+    os.replace(index_part_file_path, index_file_path)
+    return len(entries)
+
+
+def build_slim_gtf(gtf_file_path, feature_types, slim_gtf_file_path=None):
+    """
+    Build a slim version of a GTF file, with only its header lines, and the features of the given types
+    :param gtf_file_path: path to the GTF file, plain or BGZF compressed
+    :param feature_types: feature types to keep, e.g. ['gene', 'transcript', 'exon', 'CDS']
+    :param slim_gtf_file_path: path to the slim GTF file, see 'get_slim_gtf_file_path' for the default one, it is BGZF
+    compressed, with its index, if its name says so
+    :return: the number of features in the slim GTF file
+    :except: ToolBoxException if the GTF file can't be read, or the slim GTF file can't be written
+    """
+    if slim_gtf_file_path is None:
+        slim_gtf_file_path = get_slim_gtf_file_path(gtf_file_path)
+    feature_types = set([feature_type.encode() for feature_type in feature_types])
+    compressed = slim_gtf_file_path.endswith(bgzf.BGZF_FILE_EXTENSION)
+    slim_gtf_part_file_path = "{}{}".format(slim_gtf_file_path, _PART_FILE_EXTENSION)
+    index_part_file_path = "{}{}".format(bgzf.get_index_file_path(slim_gtf_file_path), _PART_FILE_EXTENSION)
+    count_features = 0
+    writer = None
+    try:
+        writer = bgzf.BgzfWriter(slim_gtf_part_file_path) if compressed else open(slim_gtf_part_file_path, 'wb')
+        with _open_source_file(gtf_file_path) as gtf_file:
+            for line in gtf_file:
+                if line.startswith(b'#'):
+                    writer.write(line)
+                    continue
+                # Feature type is the third column
+                columns = line.split(b'\t', 3)
+                if (len(columns) > 3) and (columns[2] in feature_types):
+                    writer.write(line)
+                    count_features += 1
+        writer.close()
+        if compressed:
+            writer.write_index(index_part_file_path)
+    except (OSError, EOFError) as e:
+        if compressed and (writer is not None):
+            writer.abort()
+        elif writer is not None:
+            writer.close()
+        _remove_files([slim_gtf_part_file_path, index_part_file_path])
+        raise ToolBoxException("ERROR building slim GTF file '{}' from '{}', '{}'"
+                               .format(slim_gtf_file_path, gtf_file_path, e)) from e
+    if compressed:
+        # The index is in place before the file it indexes
+        os.replace(index_part_file_path, bgzf.get_index_file_path(slim_gtf_file_path))
+    os.replace(slim_gtf_part_file_path, slim_gtf_file_path)
+    return count_features
+
+
+def write_chromosome_sizes(chromosome_sizes, chromosome_sizes_file_path):
+    """
+    Write a chromosome sizes table
+    :param chromosome_sizes: map from chromosome name to its size
+    :param chromosome_sizes_file_path: path to the chromosome sizes file
+    :return: no return value
+    """
+    chromosome_sizes_part_file_path = "{}{}".format(chromosome_sizes_file_path, _PART_FILE_EXTENSION)
+    with open(chromosome_sizes_part_file_path, 'w') as chromosome_sizes_file:
+        for chromosome, size in chromosome_sizes.items():
+            chromosome_sizes_file.write("{}\t{}\n".format(chromosome, size))
+    os.replace(chromosome_sizes_part_file_path, chromosome_sizes_file_path)
+
+
+def read_chromosome_sizes(chromosome_sizes_file_path):
+    """
+    Read a chromosome sizes table
+    :param chromosome_sizes_file_path: path to the chromosome sizes file
+    :return: map from chromosome name to its size, in the same order as they are in the file
+    """
+    chromosome_sizes = {}
+    with open(chromosome_sizes_file_path, 'r') as chromosome_sizes_file:
+        for line in chromosome_sizes_file:
+            if line.strip():
+                chromosome, size = line.rstrip('\n').split('\t')
+                chromosome_sizes[chromosome] = int(size)
+    return chromosome_sizes
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
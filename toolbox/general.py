@@ -13,8 +13,8 @@ This module implements some useful functions for the pipeline runner
 
 import os
 import json
+import fcntl
 import shutil
-import subprocess
 # Application modules
 from exceptions import ToolBoxException
 
@@ -40,7 +40,8 @@ def check_create_folders(folders):
     for folder in folders:
         if not os.path.exists(folder):
             try:
-                os.makedirs(folder)
+                # Concurrent sessions may be creating the same folder
+                os.makedirs(folder, exist_ok=True)
             except Exception as e:
                 raise ToolBoxException(str(e))
         else:
@@ -103,47 +104,97 @@ def create_latest_symlink_overwrite(destination_path):
 def gunzip_files(files):
     """
     Given a list of paths for Gzip compressed files, this method will uncompress them, returning a list with the files
-    that could not be gunzipped and the reason why that happened
+    that could not be gunzipped and the reason why that happened. Files are uncompressed in process, at the same time,
+    see 'toolbox.decompression'
     :param files: list of paths to files that will be un-compressed
     :return: a list of possible failing to uncompress files
     """
-    gunzip_command_template = "gunzip {}"
-    files_with_error = []
-    for file in files:
-        if os.path.isfile(file):
+    # Imported here, as the decompression engine depends on 'config_manager', that depends on this module
+    from toolbox.decompression import DecompressionEngine
+    return [(result.file_path, result.error)
+            for result in DecompressionEngine().decompress_files(files)
+            if not result.success]
+
+
+# Ways of making a file available at a different path without copying its data
+LINK_MODE_HARDLINK = 'hardlink'
+LINK_MODE_REFLINK = 'reflink'
+# WARNING! - MAGIC NUMBER AHEAD!!! - Linux FICLONE ioctl request code, i.e. _IOW(0x94, 9, int)
+_IOCTL_FICLONE = 0x40049409
+
+
+def _reflink_file(source_file_path, destination_file_path):
+    with open(source_file_path, 'rb') as source_file:
+        with open(destination_file_path, 'wb') as destination_file:
+            fcntl.ioctl(destination_file.fileno(), _IOCTL_FICLONE, source_file.fileno())
+
+
+def link_file(source_file_path, destination_file_path, link_modes=(LINK_MODE_HARDLINK, LINK_MODE_REFLINK)):
+    """
+    Make the given file available at the destination path, sharing its data on disk, i.e. via a hard link or, on file
+    systems that support it, a copy-on-write clone (reflink). Link modes are tried in the given order, until one of
+    them works. Any existing file at the destination path is atomically replaced.
+    :param source_file_path: path to the file to link
+    :param destination_file_path: path for the linked file
+    :param link_modes: link modes to try, in order
+    :return: the link mode that worked
+    :except: if the file could not be linked with any of the given link modes, an exception will be raised
+    """
+    # Readers never see a partially created destination file
+    temporary_file_path = "{}.{}.link".format(destination_file_path, os.getpid())
+    errors = []
+    for link_mode in link_modes:
+        try:
+            if link_mode == LINK_MODE_HARDLINK:
+                os.link(source_file_path, temporary_file_path)
+            elif link_mode == LINK_MODE_REFLINK:
+                _reflink_file(source_file_path, temporary_file_path)
+            else:
+                errors.append("UNKNOWN link mode '{}'".format(link_mode))
+                continue
+            os.replace(temporary_file_path, destination_file_path)
+            return link_mode
+        except OSError as e:
+            errors.append("{} - '{}'".format(link_mode, e))
             try:
-                gunzip_subprocess = subprocess.Popen(gunzip_command_template.format(file),
-                                                     stdout=subprocess.PIPE,
-                                                     stderr=subprocess.PIPE,
-                                                     shell=True)
-                # Timeout, in seconds, is either 10 seconds or the size of the file in MB * 10, e.g. 1MB -> 10 seconds
-                file_size_mb = os.path.getsize(file) / (1024 * 1024)
-                timeout = max(10, int(file_size_mb))
-                (stdout, stderr) = gunzip_subprocess.communicate(timeout=timeout)
-                if gunzip_subprocess.poll() is not None:
-                    if gunzip_subprocess.returncode != 0:
-                        # ERROR - Report this
-                        err_msg = "ERROR uncompressing file '{}' output from subprocess STDOUT: {}\nSTDERR: {}"\
-                            .format(file, stdout.decode('utf8'), stderr.decode('utf8'))
-                        files_with_error.append((file, err_msg))
-            except subprocess.TimeoutExpired as e:
-                err_msg = "TIMEOUT ERROR uncompressing file '{}', size {}MB, given timeframe of '{}seconds', output from subprocess STDOUT: {}\nSTDERR: {}" \
-                    .format(file_size_mb,
-                            timeout,
-                            file,
-                            stdout.decode('utf8'),
-                            stderr.decode('utf8'))
-                files_with_error.append((file, err_msg))
-            except Exception as e:
-                err_msg = "UNKNOWN ERROR uncompressing file '{}' ---> {}\nOutput from subprocess STDOUT: {}\nSTDERR: {}" \
-                    .format(file,
-                            e,
-                            stdout.decode('utf8'),
-                            stderr.decode('utf8'))
-                files_with_error.append((file, err_msg))
-        else:
-            files_with_error.append((file, "it IS NOT A FILE"))
-    return files_with_error
+                os.remove(temporary_file_path)
+            except FileNotFoundError:
+                pass
+    raise ToolBoxException("COULD NOT LINK '{}' to '{}', {}"
+                           .format(source_file_path, destination_file_path, ", ".join(errors)))
+
+
+def copy_file(source_file_path, destination_file_path):
+    """
+    Copy a file, letting the kernel move the data, via 'copy_file_range', without going through user space, and even
+    sharing it on disk on file systems that support it. Plain copy is used where 'copy_file_range' is not available, or
+    it stops short of the whole file, e.g. on some virtual or network file systems.
+    :param source_file_path: path to the file to copy
+    :param destination_file_path: path for the copy, any existing file there is overwritten
+    :return: number of bytes copied
+    """
+    with open(source_file_path, 'rb') as source_file:
+        with open(destination_file_path, 'wb') as destination_file:
+            size = os.fstat(source_file.fileno()).st_size
+            copied = 0
+            try:
+                while copied < size:
+                    count = os.copy_file_range(source_file.fileno(), destination_file.fileno(), size - copied)
+                    if count == 0:
+                        break
+                    copied += count
+            except (AttributeError, OSError):
+                # Not supported by this platform, or file systems
+                copied = None
+            if copied != size:
+                # Start over with a plain copy
+                source_file.seek(0)
+                destination_file.seek(0)
+                destination_file.truncate()
+                shutil.copyfileobj(source_file, destination_file)
+                copied = destination_file.tell()
+    return copied
+
 
 if __name__ == '__main__':
     print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
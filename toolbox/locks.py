@@ -0,0 +1,350 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 14:05
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+This toolbox offers advisory file locks for coordinating different pipeline sessions, possibly running on different
+hosts that share the same file system, e.g. concurrent HPC jobs, as well as the threads within the same session, and
+leases, that keep files in use by any session from being removed.
+
+Locks are 'fcntl' record locks on a lock file, they are released by the operating system when the process holding them
+dies, so a lock file left behind by a dead job does not lock anything, it is just taken over by the next session that
+locks it, and it can be cleaned up at any time.
+"""
+
+import os
+import json
+import time
+import fcntl
+import socket
+import threading
+# Application imports
+import config_manager
+from exceptions import ToolBoxException
+
+
+# Exceptions
+class FileLockException(ToolBoxException):
+    def __init__(self, value):
+        super().__init__(value)
+
+
+class FileLockTimeoutException(FileLockException):
+    def __init__(self, value):
+        super().__init__(value)
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a lock file, it can be used as a context manager.
+
+    'fcntl' locks are owned by processes, not threads, that's why there is also a thread lock per lock file path, so
+    threads within the same process exclude each other as well.
+    """
+    # WARNING! - MAGIC NUMBER AHEAD!!! - seconds between attempts, when waiting for a lock with a timeout
+    _POLL_INTERVAL = 1
+    # Lock file path -> thread lock
+    __thread_locks = {}
+    __thread_locks_guard = threading.Lock()
+
+    def __init__(self, lock_file_path, timeout=None):
+        """
+        :param lock_file_path: path to the lock file, it will be created if it doesn't exist
+        :param timeout: maximum amount of time, in seconds, to wait for the lock, None means forever
+        """
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        self.__lock_file_path = os.path.abspath(lock_file_path)
+        self.__timeout = timeout
+        self.__fd = None
+
+    @staticmethod
+    def __get_thread_lock(lock_file_path):
+        with FileLock.__thread_locks_guard:
+            if lock_file_path not in FileLock.__thread_locks:
+                FileLock.__thread_locks[lock_file_path] = threading.Lock()
+            return FileLock.__thread_locks[lock_file_path]
+
+    @staticmethod
+    def __is_same_file(fd, file_path):
+        """
+        Check that the given file descriptor still refers to the file at the given path, a previous lock holder may have
+        removed the lock file while we were waiting on it
+        """
+        try:
+            return os.path.samestat(os.fstat(fd), os.stat(file_path))
+        except FileNotFoundError:
+            return False
+
+    def __try_lock(self, blocking):
+        """
+        Single attempt at taking the lock on the lock file
+        :param blocking: whether to wait until the lock is available or not
+        :return: True if the lock has been taken, False otherwise
+        """
+        fd = os.open(self.__lock_file_path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX if blocking else (fcntl.LOCK_EX | fcntl.LOCK_NB))
+        except OSError:
+            os.close(fd)
+            if blocking:
+                raise
+            return False
+        if not self.__is_same_file(fd, self.__lock_file_path):
+            # We got the lock on a lock file that is not there any more, try again on the current one
+            os.close(fd)
+            return False
+        # Leave information about the lock holder, for anyone waiting on it
+        os.ftruncate(fd, 0)
+        os.write(fd, json.dumps({'host': socket.gethostname(),
+                                 'pid': os.getpid(),
+                                 'since': time.time()}).encode())
+        self.__fd = fd
+        return True
+
+    def get_holder_information(self):
+        """
+        Get the information the current lock holder left in the lock file
+        :return: dictionary with the host, pid and time since the lock is held, or None if not available
+        """
+        try:
+            with open(self.__lock_file_path, 'r') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def acquire(self):
+        """
+        Take the lock, waiting for it, at most for the configured timeout, if someone else is holding it
+        :return: no return value
+        :except: FileLockTimeoutException if the lock could not be taken within the configured timeout
+        """
+        deadline = None if self.__timeout is None else time.time() + self.__timeout
+        thread_lock = self.__get_thread_lock(self.__lock_file_path)
+        if not thread_lock.acquire(timeout=-1 if deadline is None else max(0, deadline - time.time())):
+            raise FileLockTimeoutException("TIMED OUT waiting for lock '{}' held by this session"
+                                           .format(self.__lock_file_path))
+        try:
+            waiting_reported = False
+            while not self.__try_lock(blocking=False):
+                if not waiting_reported:
+                    self._logger.info("WAITING for lock '{}', held by '{}'"
+                                      .format(self.__lock_file_path, self.get_holder_information()))
+                    waiting_reported = True
+                if deadline is None:
+                    if self.__try_lock(blocking=True):
+                        break
+                    continue
+                if time.time() >= deadline:
+                    raise FileLockTimeoutException("TIMED OUT waiting for lock '{}', held by '{}'"
+                                                   .format(self.__lock_file_path, self.get_holder_information()))
+                time.sleep(self._POLL_INTERVAL)
+        except Exception:
+            thread_lock.release()
+            raise
+        self._logger.debug("Lock '{}' ACQUIRED".format(self.__lock_file_path))
+
+    def release(self):
+        """
+        Release the lock, the lock file is removed, anyone waiting on it will notice and use a new one
+        :return: no return value
+        """
+        if self.__fd is None:
+            raise FileLockException("Lock '{}' is NOT HELD".format(self.__lock_file_path))
+        try:
+            # Remove the lock file while still holding the lock
+            os.remove(self.__lock_file_path)
+        except FileNotFoundError:
+            pass
+        fcntl.lockf(self.__fd, fcntl.LOCK_UN)
+        os.close(self.__fd)
+        self.__fd = None
+        self.__get_thread_lock(self.__lock_file_path).release()
+        self._logger.debug("Lock '{}' RELEASED".format(self.__lock_file_path))
+
+    def is_locked(self):
+        return self.__fd is not None
+
+    def get_lock_file_path(self):
+        return self.__lock_file_path
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class FileLease:
+    """
+    Advisory lease on the files covered by a lease file. Sessions using those files hold a shared lock on the lease
+    file, for as long as they need them, and anyone wanting to remove them has to take an exclusive lock on it first,
+    which is only possible when nobody is holding the lease. As any other 'fcntl' lock, leases are released by the
+    operating system when the process holding them dies.
+
+    'fcntl' locks are owned by processes, and closing any file descriptor on a lease file releases all the locks the
+    process holds on it, that's why every process keeps a single file descriptor per lease file, shared by its threads.
+    """
+    # WARNING! - MAGIC NUMBER AHEAD!!! - seconds between attempts, when waiting for a lease
+    _POLL_INTERVAL = 1
+    _MODE_SHARED = 'shared'
+    _MODE_EXCLUSIVE = 'exclusive'
+    __guard = threading.Lock()
+    # Lease file path -> [file descriptor, number of shared holders within this process]
+    __shared_leases = {}
+    # Lease file path -> file descriptor, for those lease files exclusively locked by this process
+    __exclusive_leases = {}
+
+    def __init__(self, lease_file_path):
+        """
+        :param lease_file_path: path to the lease file, it will be created if it doesn't exist
+        """
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        self.__lease_file_path = os.path.abspath(lease_file_path)
+        self.__mode = None
+
+    def __try_lock(self, mode):
+        """
+        Single, non blocking, attempt at locking the lease file, this method must be called holding the guard
+        :return: the locked file descriptor, or None if the lease file could not be locked
+        """
+        os.makedirs(os.path.dirname(self.__lease_file_path), exist_ok=True)
+        fd = os.open(self.__lease_file_path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.lockf(fd, (fcntl.LOCK_SH if mode == self._MODE_SHARED else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return None
+        try:
+            if os.path.samestat(os.fstat(fd), os.stat(self.__lease_file_path)):
+                return fd
+        except FileNotFoundError:
+            pass
+        # The lease file has been removed in the meantime
+        fcntl.lockf(fd, fcntl.LOCK_UN)
+        os.close(fd)
+        return None
+
+    def acquire_shared(self, timeout=None):
+        """
+        Take the lease, along with anyone else using the files it covers, waiting, at most for the given timeout, while
+        someone holds it exclusively
+        :param timeout: maximum amount of time, in seconds, to wait for the lease, None means forever
+        :return: no return value
+        :except: FileLockTimeoutException if the lease could not be taken within the given timeout
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        waiting_reported = False
+        while True:
+            with FileLease.__guard:
+                if self.__lease_file_path in FileLease.__shared_leases:
+                    FileLease.__shared_leases[self.__lease_file_path][1] += 1
+                    self.__mode = self._MODE_SHARED
+                    return
+                if self.__lease_file_path not in FileLease.__exclusive_leases:
+                    fd = self.__try_lock(self._MODE_SHARED)
+                    if fd is not None:
+                        FileLease.__shared_leases[self.__lease_file_path] = [fd, 1]
+                        self.__mode = self._MODE_SHARED
+                        self._logger.debug("Lease '{}' ACQUIRED".format(self.__lease_file_path))
+                        return
+            if not waiting_reported:
+                self._logger.info("WAITING for lease '{}', its files are being removed"
+                                  .format(self.__lease_file_path))
+                waiting_reported = True
+            if (deadline is not None) and (time.time() >= deadline):
+                raise FileLockTimeoutException("TIMED OUT waiting for lease '{}'".format(self.__lease_file_path))
+            time.sleep(self._POLL_INTERVAL)
+
+    def try_acquire_exclusive(self):
+        """
+        Take the lease exclusively, for removing the files it covers, only if nobody, this session included, is holding
+        it, no waiting
+        :return: True if the lease has been taken, False otherwise
+        """
+        with FileLease.__guard:
+            if (self.__lease_file_path in FileLease.__shared_leases) \
+                    or (self.__lease_file_path in FileLease.__exclusive_leases):
+                return False
+            fd = self.__try_lock(self._MODE_EXCLUSIVE)
+            if fd is None:
+                return False
+            FileLease.__exclusive_leases[self.__lease_file_path] = fd
+            self.__mode = self._MODE_EXCLUSIVE
+            return True
+
+    def release(self):
+        """
+        Release the lease, the lease file is left in place
+        :return: no return value
+        """
+        with FileLease.__guard:
+            if self.__mode == self._MODE_SHARED:
+                shared_lease = FileLease.__shared_leases[self.__lease_file_path]
+                shared_lease[1] -= 1
+                fd = shared_lease[0] if not shared_lease[1] else None
+                if fd is not None:
+                    del FileLease.__shared_leases[self.__lease_file_path]
+            elif self.__mode == self._MODE_EXCLUSIVE:
+                fd = FileLease.__exclusive_leases.pop(self.__lease_file_path)
+            else:
+                raise FileLockException("Lease '{}' is NOT HELD".format(self.__lease_file_path))
+            self.__mode = None
+            if fd is not None:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+                os.close(fd)
+                self._logger.debug("Lease '{}' RELEASED".format(self.__lease_file_path))
+
+    def is_held(self):
+        return self.__mode is not None
+
+    def get_lease_file_path(self):
+        return self.__lease_file_path
+
+    @staticmethod
+    def is_leased(lease_file_path):
+        """
+        Find out whether anyone, this session included, is holding the given lease, without taking it
+        :param lease_file_path: path to the lease file
+        :return: True if the lease is being held, False otherwise
+        """
+        lease = FileLease(lease_file_path)
+        if not lease.try_acquire_exclusive():
+            return True
+        lease.release()
+        return False
+
+
+def remove_stale_lock_files(folder, lock_file_name):
+    """
+    Remove the lock files, with the given name, left behind in the given folder tree by sessions that died while
+    holding them, i.e. lock files nobody is holding a lock on
+    :param folder: root of the folder tree to clean up
+    :param lock_file_name: name of the lock files
+    :return: list of removed lock file paths
+    """
+    removed_lock_files = []
+    for dir_path, dir_names, file_names in os.walk(folder):
+        if lock_file_name in file_names:
+            lock = FileLock(os.path.join(dir_path, lock_file_name), timeout=0)
+            try:
+                lock.acquire()
+            except FileLockTimeoutException:
+                # Someone is actually holding it
+                continue
+            lock.release()
+            removed_lock_files.append(lock.get_lock_file_path())
+    return removed_lock_files
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
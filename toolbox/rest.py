@@ -1,42 +1,338 @@
-# 
+#
 # Author    : Manuel Bernal Llinares
 # Project   : trackhub-creator
 # Timestamp : 03-07-2017 13:36
 # ---
 # © 2017 Manuel Bernal Llinares <mbdebian@gmail.com>
 # All rights reserved.
-# 
+#
 
 """
 Toolbox related to REST services
+
+All the REST requests made by the application go through a shared REST client, that keeps the connections open for
+reuse (keep-alive), gets the responses gzip compressed, gives up on requests that take too long, and retries failed
+requests with exponential backoff.
+
+Requests are rate limited per host, by a token bucket shared by all the threads of the application, that adapts to the
+request quota the server advertises, i.e. Ensembl REST 'X-RateLimit-*' headers, and stops all the requests to the server
+for as long as it says so via 'Retry-After'. The time requests have been held back is kept, see 'get_time_throttled'.
 """
 
 import time
 import random
+import threading
+import email.utils
 import requests
+import requests.adapters
+from urllib.parse import urlparse
+# App imports
+import config_manager
 
 # Initialize pseudo-random number generator
 random.seed(time.time())
 
 
-def make_rest_request_content_type_json(url):
-    # TODO - Magic number here!!!
-    n_attempts = 42
-    response = None
-    while n_attempts:
-        n_attempts -= 1
+class TokenBucket:
+    """
+    Thread safe token bucket, every request takes a token, tokens are refilled at 'rate' tokens per second, up to
+    'capacity' tokens, i.e. the size of the bursts allowed. Tokens are reserved, i.e. the bucket can go below zero, so
+    concurrent requests are given their turn in order, instead of all of them polling for the next token.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        :param rate: tokens per second
+        :param capacity: maximum number of tokens in the bucket
+        """
+        self.__lock = threading.Lock()
+        self.__rate = rate
+        self.__capacity = capacity
+        self.__tokens = capacity
+        # Time of the last refill, it is in the future while the bucket is blocked
+        self.__last_refill = time.monotonic()
+        self.__blocked_until = self.__last_refill
+        self.__time_throttled = 0.0
+
+    def __refill(self, now):
+        if now > self.__last_refill:
+            self.__tokens = min(self.__capacity, self.__tokens + ((now - self.__last_refill) * self.__rate))
+            self.__last_refill = now
+
+    def acquire(self):
+        """
+        Take a token, waiting for it if there is none available
+        :return: time, in seconds, spent waiting for the token
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__refill(now)
+            self.__tokens -= 1
+            wait = max(0.0, self.__last_refill - now) + (max(0.0, -self.__tokens) / self.__rate)
+        waited = 0.0
+        while wait > 0:
+            time.sleep(wait)
+            waited += wait
+            # The bucket may have been blocked in the meantime
+            with self.__lock:
+                wait = self.__blocked_until - time.monotonic()
+        if waited:
+            with self.__lock:
+                self.__time_throttled += waited
+        return waited
+
+    def set_rate(self, rate):
+        """
+        Change the rate at which tokens are refilled
+        :param rate: tokens per second
+        :return: no return value
+        """
+        with self.__lock:
+            self.__refill(time.monotonic())
+            self.__rate = rate
+
+    def block(self, duration):
+        """
+        No tokens are given for the given time, and the bucket is empty afterwards, e.g. when the server says so
+        :param duration: time, in seconds, to block the bucket for
+        :return: no return value
+        """
+        with self.__lock:
+            now = time.monotonic()
+            blocked_until = now + duration
+            if blocked_until > self.__blocked_until:
+                self.__refill(now)
+                self.__tokens = min(self.__tokens, 0)
+                self.__last_refill = max(self.__last_refill, blocked_until)
+                self.__blocked_until = blocked_until
+
+    def get_rate(self):
+        return self.__rate
+
+    def get_time_throttled(self):
+        """
+        Get the time requests have spent waiting for their tokens
+        :return: time, in seconds, added up for all the requests
+        """
+        with self.__lock:
+            return self.__time_throttled
+
+
+class RestClient:
+    """
+    Thread safe REST client, all the threads share the same connection pool, the client keeps no other state between
+    requests, i.e. authentication, if any, is given with every request.
+
+    Requests failing because of connection errors, timeouts, or HTTP statuses that mean 'try again later', e.g. 429 or
+    503, are retried with exponential backoff, plus some jitter, so concurrent clients don't retry all at the same time.
+    Only idempotent requests are retried by default, e.g. a POST request is made only once, unless told otherwise.
+
+    Requests to every host are rate limited by a token bucket, see 'TokenBucket', at most 'max_rate' requests per
+    second, less if the server says the remaining quota can't take it ('X-RateLimit-Remaining' requests until
+    'X-RateLimit-Reset' seconds from now), and none at all, for any thread, for the time the server asks in
+    'Retry-After', which is waited instead of the backoff delay.
+    """
+    # WARNING! - MAGIC NUMBERS AHEAD!!!
+    _DEFAULT_MAX_ATTEMPTS = 8
+    # (connect, read) timeouts, in seconds
+    _DEFAULT_TIMEOUT = (10, 120)
+    # Backoff delays, in seconds, i.e. 1, 2, 4, ... up to 60 seconds between attempts
+    _DEFAULT_BACKOFF_BASE_DELAY = 1
+    _DEFAULT_BACKOFF_MAX_DELAY = 60
+    # Connections kept open per host, enough for all the threads of the application talking to the same REST service
+    _DEFAULT_POOL_MAX_SIZE = 32
+    # Ensembl REST allows, on average, 15 requests per second
+    _DEFAULT_MAX_RATE = 15
+    _RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+    _IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+    _HEADER_RATE_LIMIT_REMAINING = 'X-RateLimit-Remaining'
+    _HEADER_RATE_LIMIT_RESET = 'X-RateLimit-Reset'
+    _HEADER_RETRY_AFTER = 'Retry-After'
+
+    def __init__(self, max_attempts=_DEFAULT_MAX_ATTEMPTS, timeout=_DEFAULT_TIMEOUT,
+                 backoff_base_delay=_DEFAULT_BACKOFF_BASE_DELAY, backoff_max_delay=_DEFAULT_BACKOFF_MAX_DELAY,
+                 pool_max_size=_DEFAULT_POOL_MAX_SIZE, max_rate=_DEFAULT_MAX_RATE):
+        """
+        :param max_attempts: default maximum number of attempts for a request
+        :param timeout: default timeout, in seconds, for a request, either a single value, or (connect, read) timeouts
+        :param backoff_base_delay: delay, in seconds, before the first retry, it doubles with every retry
+        :param backoff_max_delay: maximum delay, in seconds, between attempts
+        :param pool_max_size: maximum number of connections kept open per host
+        :param max_rate: maximum number of requests per second per host, bursts included
+        """
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.backoff_base_delay = backoff_base_delay
+        self.backoff_max_delay = backoff_max_delay
+        self.__session = requests.Session()
+        # Retries are done by this client, not by the connection pool
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_max_size, max_retries=0)
+        self.__session.mount('http://', adapter)
+        self.__session.mount('https://', adapter)
+        self.__session.headers.update({'Accept-Encoding': 'gzip'})
+        self.max_rate = max_rate
+        # Host -> token bucket for the requests to that host
+        self.__token_buckets = {}
+        self.__token_buckets_lock = threading.Lock()
+
+    def _get_token_bucket(self, url):
+        host = urlparse(url).netloc
+        with self.__token_buckets_lock:
+            if host not in self.__token_buckets:
+                self.__token_buckets[host] = TokenBucket(self.max_rate, self.max_rate)
+            return self.__token_buckets[host]
+
+    @staticmethod
+    def _get_retry_after(response):
+        """
+        Get the time the server asks us to wait before making any other request, if any
+        :param response: response from the server
+        :return: time to wait, in seconds, or None if the server doesn't say
+        """
+        retry_after = response.headers.get(RestClient._HEADER_RETRY_AFTER)
+        if retry_after is None:
+            return None
         try:
-            response = requests.get(url, headers={"Content-Type": "application/json"})
-        except Exception as e:
-            # Any possible exception counts towards the attempt counter
-            # Random wait - TODO - Another magic number!!!
-            time.sleep(random.randint(30))
-            continue
-        if response.ok:
-            return response.json()
-        # Random wait - TODO - Another magic number!!!
-        time.sleep(random.randint(10))
-    response.raise_for_status()
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        # It can be an HTTP date as well
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _adapt_to_rate_limits(self, token_bucket, response):
+        """
+        Adapt the rate of requests to the host to the quota advertised by the server in the given response
+        :param token_bucket: token bucket for the host
+        :param response: response from the server
+        :return: time, in seconds, the server asks us to wait before making any other request, None if it doesn't
+        """
+        try:
+            remaining = int(response.headers[self._HEADER_RATE_LIMIT_REMAINING])
+            reset = float(response.headers[self._HEADER_RATE_LIMIT_RESET])
+        except (KeyError, ValueError):
+            pass
+        else:
+            if remaining <= 0:
+                token_bucket.block(reset)
+            elif reset > 0:
+                # Spread the remaining quota over the time left, never faster than allowed
+                token_bucket.set_rate(min(self.max_rate, remaining / reset))
+        retry_after = None
+        if response.status_code in (429, 503):
+            retry_after = self._get_retry_after(response)
+            if retry_after is not None:
+                self._logger.warning("Requests to '{}' THROTTLED by the server for {:.1f} seconds"
+                                     .format(urlparse(response.url).netloc, retry_after))
+                token_bucket.block(retry_after)
+        return retry_after
+
+    def _get_backoff_delay(self, count_failures):
+        """
+        Delay before the next attempt, exponential backoff with full jitter
+        :param count_failures: number of failed attempts so far
+        :return: delay, in seconds
+        """
+        return random.uniform(0, min(self.backoff_max_delay, self.backoff_base_delay * (2 ** (count_failures - 1))))
+
+    def request(self, method, url, timeout=None, max_attempts=None, **kwargs):
+        """
+        Make a request, retrying it if it fails with a transient error
+        :param method: HTTP method, e.g. 'GET'
+        :param url: URL to request
+        :param timeout: timeout, in seconds, for every attempt, the client default if not given
+        :param max_attempts: maximum number of attempts, the client default for idempotent requests if not given, only
+        one attempt for the other requests
+        :param kwargs: any other parameter for 'requests', e.g. 'headers', 'json', 'auth'
+        :return: the response of the last attempt, whatever its HTTP status
+        :except: requests.RequestException if the last attempt could not get a response
+        """
+        if timeout is None:
+            timeout = self.timeout
+        if max_attempts is None:
+            max_attempts = self.max_attempts if method.upper() in self._IDEMPOTENT_METHODS else 1
+        token_bucket = self._get_token_bucket(url)
+        count_failures = 0
+        while True:
+            token_bucket.acquire()
+            retry_after = None
+            try:
+                response = self.__session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                count_failures += 1
+                if count_failures >= max_attempts:
+                    raise
+                reason = str(e)
+            else:
+                retry_after = self._adapt_to_rate_limits(token_bucket, response)
+                if response.status_code not in self._RETRY_STATUS_CODES:
+                    return response
+                count_failures += 1
+                if count_failures >= max_attempts:
+                    return response
+                reason = "HTTP status '{}'".format(response.status_code)
+                response.close()
+            if retry_after is not None:
+                # The token bucket holds the next attempt back for as long as the server asked
+                self._logger.warning("{} '{}' FAILED, attempt #{} of #{}, retrying in {:.1f} seconds, as requested "
+                                     "by the server, '{}'"
+                                     .format(method, url, count_failures, max_attempts, retry_after, reason))
+                continue
+            delay = self._get_backoff_delay(count_failures)
+            self._logger.warning("{} '{}' FAILED, attempt #{} of #{}, retrying in {:.1f} seconds, '{}'"
+                                 .format(method, url, count_failures, max_attempts, delay, reason))
+            time.sleep(delay)
+
+    def get_time_throttled(self, host=None):
+        """
+        Get the time requests made by this client have been held back by rate limiting
+        :param host: host whose requests are of interest, all of them if not given
+        :return: time, in seconds, added up for all the requests
+        """
+        with self.__token_buckets_lock:
+            token_buckets = [token_bucket for token_bucket_host, token_bucket in self.__token_buckets.items()
+                             if (host is None) or (token_bucket_host == host)]
+        return sum([token_bucket.get_time_throttled() for token_bucket in token_buckets])
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get_json(self, url, **kwargs):
+        """
+        Get the JSON content at the given URL
+        :param url: URL to request
+        :param kwargs: any other parameter for 'request'
+        :return: the decoded JSON content
+        :except: requests.RequestException if the content could not be fetched
+        """
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+
+# REST client shared by the whole application
+__rest_client = None
+__rest_client_lock = threading.Lock()
+
+
+def get_rest_client():
+    global __rest_client
+    with __rest_client_lock:
+        if __rest_client is None:
+            __rest_client = RestClient()
+        return __rest_client
+
+
+def make_rest_request_content_type_json(url):
+    return get_rest_client().get_json(url, headers={"Content-Type": "application/json"})
 
 
 if __name__ == '__main__':
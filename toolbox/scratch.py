@@ -0,0 +1,179 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 20:50
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Scratch space for transient copies of files, e.g. the uncompressed version of files that are kept compressed on a
+shared file system, made in a local folder for the tools that need them as plain files.
+
+Copies are shared by all the sessions using the same scratch folder, and they are reused until their source file
+changes. Sessions hold a lease on every copy they have been handed out, for as long as they last, see 'FileLease'.
+Space is reclaimed in a least recently used fashion, when, after making a new copy, the files in the scratch folder take
+up more than the given maximum size, only copies nobody is holding a lease on are removed.
+"""
+
+import os
+import threading
+# App imports
+import config_manager
+from toolbox import general
+from toolbox.locks import FileLock, FileLease
+
+
+class ScratchFolder:
+    """
+    Thread safe cache of transient file copies in a scratch folder
+    """
+    _LOCK_FILE_EXTENSION = '.lock'
+    _PART_FILE_EXTENSION = '.part'
+    # Lock for reclaiming space in the scratch folder
+    _EVICTION_LOCK_FILE_NAME = '.eviction.lock'
+    # Lease files for the copies, laid out as the copies themselves are, within this folder
+    _LEASES_FOLDER_NAME = '.leases'
+
+    def __init__(self, folder, max_size):
+        """
+        :param folder: scratch folder, it will be created if it doesn't exist
+        :param max_size: maximum size, in bytes, of the files in the scratch folder, None means no limit
+        """
+        self._logger = config_manager \
+            .get_app_config_manager() \
+            .get_logger_for("{}.{}".format(__name__, type(self).__name__))
+        self.__folder = os.path.abspath(folder)
+        self.__max_size = max_size
+        # Copy file path -> lease held by this session on the copy, for as long as the session lasts
+        self.__leases = {}
+        self.__leases_lock = threading.Lock()
+        # Size of the copies in the scratch folder, as of the last time it was scanned, plus the copies made by this
+        # session since then, copies made by other sessions are only picked up when scanning the scratch folder
+        self.__total_size = None
+        self.__total_size_lock = threading.Lock()
+        general.check_create_folders([self.__folder])
+
+    def get_folder(self):
+        return self.__folder
+
+    def __get_lease_file_path(self, file_path):
+        return os.path.join(self.__folder, self._LEASES_FOLDER_NAME, os.path.relpath(file_path, self.__folder))
+
+    def __lease_copy(self, file_path):
+        """
+        Take a lease on the given copy, so it is not evicted while this session, or any tool it runs, may be using it,
+        i.e. for as long as this session lasts, the operating system releases the lease when the session process ends.
+        :param file_path: path to the copy
+        :return: no return value
+        """
+        with self.__leases_lock:
+            if file_path in self.__leases:
+                return
+        lease = FileLease(self.__get_lease_file_path(file_path))
+        lease.acquire_shared()
+        with self.__leases_lock:
+            if file_path not in self.__leases:
+                self.__leases[file_path] = lease
+                return
+        # Some other thread took it in the meantime
+        lease.release()
+
+    def __add_to_total_size(self, size):
+        """
+        Account for a new copy in the scratch folder
+        :param size: space taken up by the new copy, minus the space taken up by the copy it replaces, if any
+        :return: True if the scratch folder may be over its maximum size, False otherwise
+        """
+        if self.__max_size is None:
+            return False
+        with self.__total_size_lock:
+            if self.__total_size is None:
+                # The scratch folder has not been scanned yet
+                return True
+            self.__total_size += size
+            return self.__total_size > self.__max_size
+
+    def get_file(self, relative_path, source_file_path, materialize):
+        """
+        Get the transient copy of a file, making it if it is not there, or its source file has changed since it was
+        last used
+        :param relative_path: path of the copy, relative to the scratch folder
+        :param source_file_path: path to the source file
+        :param materialize: function that makes the copy, given the source file path and the copy file path
+        :return: the path to the copy
+        :except: whatever exception 'materialize' raises
+        """
+        file_path = os.path.join(self.__folder, relative_path)
+        general.check_create_folders([os.path.dirname(file_path)])
+        # The lease is taken before making the copy, so it can't be evicted between making it and handing it out
+        self.__lease_copy(file_path)
+        copy_size = None
+        with FileLock("{}{}".format(file_path, self._LOCK_FILE_EXTENSION)):
+            # Copies are touched every time they are used, so their modification time tells their last use
+            if (not os.path.isfile(file_path)) \
+                    or (os.path.getmtime(file_path) < os.path.getmtime(source_file_path)):
+                previous_copy_size = os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+                self._logger.debug("Making scratch copy '{}' of '{}'".format(file_path, source_file_path))
+                materialize(source_file_path, file_path)
+                copy_size = os.path.getsize(file_path) - previous_copy_size
+            os.utime(file_path)
+        # Reusing a copy doesn't take up any more space
+        if (copy_size is not None) and self.__add_to_total_size(copy_size):
+            self.reclaim_space()
+        return file_path
+
+    def __is_copy(self, file_name):
+        return not (file_name.startswith('.')
+                    or file_name.endswith((self._LOCK_FILE_EXTENSION, self._PART_FILE_EXTENSION)))
+
+    def reclaim_space(self):
+        """
+        Evict the least recently used copies until the scratch folder is within its maximum size, or there is nothing
+        else that can be evicted, copies are only evicted if nobody, this session included, is holding a lease on them
+        :return: list of evicted file paths
+        """
+        if self.__max_size is None:
+            return []
+        evicted_files = []
+        with FileLock(os.path.join(self.__folder, self._EVICTION_LOCK_FILE_NAME)):
+            copies = []
+            for dir_path, dir_names, file_names in os.walk(self.__folder):
+                # Hidden folders are not for transient copies
+                dir_names[:] = [dir_name for dir_name in dir_names if not dir_name.startswith('.')]
+                for file_name in file_names:
+                    if not self.__is_copy(file_name):
+                        continue
+                    try:
+                        file_stat = os.stat(os.path.join(dir_path, file_name))
+                    except FileNotFoundError:
+                        continue
+                    copies.append((file_stat.st_mtime, file_stat.st_size, os.path.join(dir_path, file_name)))
+            total_size = sum([size for last_use, size, file_path in copies])
+            for last_use, size, file_path in sorted(copies):
+                if total_size <= self.__max_size:
+                    break
+                with FileLock("{}{}".format(file_path, self._LOCK_FILE_EXTENSION)):
+                    lease = FileLease(self.__get_lease_file_path(file_path))
+                    if not lease.try_acquire_exclusive():
+                        # Someone is using it
+                        continue
+                    try:
+                        os.remove(file_path)
+                    except FileNotFoundError:
+                        continue
+                    finally:
+                        lease.release()
+                total_size -= size
+                evicted_files.append(file_path)
+        with self.__total_size_lock:
+            self.__total_size = total_size
+        if evicted_files:
+            self._logger.info("EVICTED #{} files from scratch folder '{}', {} bytes in use now"
+                              .format(len(evicted_files), self.__folder, total_size))
+        return evicted_files
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
@@ -0,0 +1,57 @@
+#
+# Author    : Manuel Bernal Llinares
+# Project   : trackhub-creator
+# Timestamp : 18-10-2026 23:10
+# ---
+# © 2026 Manuel Bernal Llinares <mbdebian@gmail.com>
+# All rights reserved.
+#
+
+"""
+Toolbox for working things out only once per session, no matter how many threads ask for them at the same time.
+
+Results are kept in a memo, a map from key to the future for its result, guarded by a lock that is only held for
+accessing the memo, so callers for different keys don't wait for each other, while callers for the same key wait for
+the first one to finish, instead of working out the same thing at the same time.
+"""
+
+import concurrent.futures
+
+
+def get_once(memo, memo_lock, key, compute, is_kept=None):
+    """
+    Work something out only once, the first caller for the given key computes it, other threads asking for the same key
+    in the meantime wait for it to finish, and the result is kept for the rest of the session. Failures are not kept,
+    the next caller tries again.
+    :param memo: map from key to the future for its result
+    :param memo_lock: lock guarding the memo
+    :param key: key for the result
+    :param compute: callable that works out the result
+    :param is_kept: if given, callable that tells whether a result is kept for later callers, or not, e.g. partial
+    results, callers waiting for it get it anyway
+    :return: the result
+    :except: whatever exception 'compute' raises, to the first caller and those waiting for it
+    """
+    with memo_lock:
+        future = memo.get(key)
+        is_computer = future is None
+        if is_computer:
+            future = concurrent.futures.Future()
+            memo[key] = future
+    if is_computer:
+        try:
+            result = compute()
+        except Exception as e:
+            with memo_lock:
+                del memo[key]
+            future.set_exception(e)
+            raise
+        if (is_kept is not None) and (not is_kept(result)):
+            with memo_lock:
+                del memo[key]
+        future.set_result(result)
+    return future.result()
+
+
+if __name__ == '__main__':
+    print("ERROR: This script is part of a pipeline collection and it is not meant to be run in stand alone mode")
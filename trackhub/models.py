@@ -160,6 +160,18 @@ class TrackHubLocalFilesystemExporter(TrackHubExporter):
             self.logger.error(message)
         return non_empty_file_tracks
 
+    def __prefetch_chromosome_sizes(self, trackhub_builder):
+        taxonomy_ids = [track.taxonomy_id
+                        for assembly in trackhub_builder.assemblies.values()
+                        for track in assembly.track_collector.get_tracks()
+                        if (track.get_type() == BaseTrack.TRACK_TYPE_BED) and track.taxonomy_id]
+        try:
+            ensembl.service.get_service().get_chromosome_sizes_for_taxonomies(taxonomy_ids)
+        except Exception as e:
+            # Not a problem, the converters will request them again
+            self.logger.warning("Chromosome sizes COULD NOT BE PREFETCHED for taxonomies {}, '{}'"
+                                .format(sorted(set(taxonomy_ids)), e))
+
     def export_simple_trackhub(self, trackhub_builder):
         """
         When exporting a simple trackhub from a (simple) trackhub builder, those tracks with empty .bed files will be
@@ -191,6 +203,9 @@ class TrackHubLocalFilesystemExporter(TrackHubExporter):
             assembly_mapping = {}
             assembly_mapping_service = AssemblyMappingServiceFactory.get_assembly_mapping_service()
             ensembl_species_service = ensembl.service.get_service().get_species_data_service()
+            # Chromosome sizes for all the assemblies are requested up front, at the same time, the .bed to .bigBed
+            # converters of every track then find them already there, instead of requesting them one by one
+            self.__prefetch_chromosome_sizes(trackhub_builder)
             for assembly in dict(trackhub_builder.assemblies):
                 try:
                     ucsc_assembly = assembly_mapping_service \
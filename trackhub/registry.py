@@ -13,10 +13,10 @@ This module models the trackhub registry
 
 import json
 import time
-import requests
 # App imports
 import config_manager
 import ensembl.service
+from toolbox import rest
 from . import models as trackhub_models
 from . import exceptions as trackhub_exceptions
 
@@ -104,11 +104,11 @@ class TrackhubRegistryService:
 
     def __login(self):
         if not self.__auth_token:
-            response = requests.get("{}{}"
-                                    .format(self.trackhub_registry_base_url,
-                                            self.__TRACKHUB_REGISTRY_API_SUBPATH_LOGIN),
-                                    auth=(self.username, self.password),
-                                    verify=True)
+            response = rest.get_rest_client().get("{}{}"
+                                                  .format(self.trackhub_registry_base_url,
+                                                          self.__TRACKHUB_REGISTRY_API_SUBPATH_LOGIN),
+                                                  auth=(self.username, self.password),
+                                                  verify=True)
             if not response.ok:
                 raise trackhub_exceptions.TrackhubRegistryServiceException(
                     "LOGIN ERROR '{}', HTTP status '{}'".format(response.text, response.status_code))
@@ -118,10 +118,10 @@ class TrackhubRegistryService:
 
     def __logout(self):
         if self.__auth_token:
-            response = requests.get("{}{}"
-                                    .format(self.trackhub_registry_base_url,
-                                            self.__TRACKHUB_REGISTRY_API_SUBPATH_LOGOUT),
-                                    headers={'user': self.username, 'auth_token': self.__auth_token})
+            response = rest.get_rest_client().get("{}{}"
+                                                  .format(self.trackhub_registry_base_url,
+                                                          self.__TRACKHUB_REGISTRY_API_SUBPATH_LOGOUT),
+                                                  headers={'user': self.username, 'auth_token': self.__auth_token})
             if not response.ok:
                 raise trackhub_exceptions.TrackhubRegistryServiceException(
                     "LOGOUT ERROR '{}', HTTP status '{}'".format(response.text, response.status_code))
@@ -147,8 +147,8 @@ class TrackhubRegistryService:
                 try_counter -= 1
                 self.logger.error("<--- TRACKHUB REGISTRATION ATTEMPT (#{} attempts left) --->".format(try_counter))
                 # Register Trackhub
-                response = requests.post(api_register_endpoint,
-                                         headers=headers, json=payload, verify=True)
+                response = rest.get_rest_client().post(api_register_endpoint,
+                                                       headers=headers, json=payload, verify=True)
                 if response.ok:
                     self.logger.info("HOLY CRAP! Trackhub REGISTERED!, #{} attempts left".format(try_counter))
                     break